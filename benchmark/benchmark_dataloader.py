@@ -0,0 +1,139 @@
+# copyright (c) 2024 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Throughput of the dataloader of a training config, e.g.
+
+python3 benchmark/benchmark_dataloader.py -c configs/det/PP-OCRv3/PP-OCRv3_mobile_det.yml \
+    --num_batches 100 -o Train.loader.num_workers=4
+
+With --profile_ops, the transforms of the samples are also timed op by op in
+the main process, to find the ops which bound the dataloader.
+
+With --compare_batch_aug, the dataloader of a config with RecAug is also timed
+with RecAug replaced by BatchRecAugCollator, which augments the whole batches.
+"""
+
+from __future__ import print_function
+
+import copy
+import os
+import sys
+import time
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "..")))
+
+import numpy as np
+import paddle
+
+from ppocr.data import build_dataloader
+from ppocr.utils.logging import get_logger
+from tools.program import ArgsParser, load_config, merge_config
+
+
+def parse_args():
+    parser = ArgsParser()
+    parser.add_argument("--mode", type=str, default="Train")
+    parser.add_argument("--num_batches", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--profile_ops", action="store_true")
+    parser.add_argument("--num_samples", type=int, default=50)
+    parser.add_argument("--compare_batch_aug", action="store_true")
+    return parser.parse_args()
+
+
+def benchmark_loader(data_loader, num_batches, warmup):
+    num_samples = 0
+    tic = None
+    for idx, batch in enumerate(data_loader):
+        if idx == warmup:
+            tic = time.time()
+        if idx >= warmup:
+            num_samples += batch[0].shape[0]
+        if idx + 1 == warmup + num_batches:
+            break
+    elapse = time.time() - tic
+    num_batches = idx + 1 - warmup
+    return num_batches / elapse, num_samples / elapse
+
+
+def to_batch_aug(config, mode):
+    """Move RecAug of the transforms of mode to BatchRecAugCollator"""
+    config = copy.deepcopy(config)
+    transforms = config[mode]["dataset"]["transforms"]
+    names = [list(op)[0] for op in transforms]
+    assert "RecAug" in names, "the transforms have no RecAug"
+    collate_fn = {"name": "BatchRecAugCollator"}
+    collate_fn.update(transforms.pop(names.index("RecAug"))["RecAug"] or {})
+    keep_keys = transforms[-1].get("KeepKeys", {}).get("keep_keys", [])
+    if "valid_ratio" in keep_keys:
+        collate_fn["valid_ratio_idx"] = keep_keys.index("valid_ratio")
+    config[mode]["loader"]["collate_fn"] = collate_fn
+    return config
+
+
+def profile_ops(dataset, num_samples):
+    """Time every transform op of the dataset on the first num_samples samples"""
+    ops = dataset.ops
+    costs = np.zeros(len(ops))
+    num_samples = min(num_samples, len(dataset))
+    for idx in range(num_samples):
+        # load the sample without the transforms
+        dataset.ops = []
+        data = dataset[idx]
+        dataset.ops = ops
+        for op_idx, op in enumerate(ops):
+            tic = time.time()
+            data = op(data)
+            costs[op_idx] += time.time() - tic
+            if data is None:
+                break
+    return [(op.__class__.__name__, cost / num_samples) for op, cost in zip(ops, costs)]
+
+
+def main():
+    FLAGS = parse_args()
+    config = load_config(FLAGS.config)
+    config = merge_config(config, FLAGS.opt)
+    logger = get_logger()
+    paddle.set_device("cpu")
+
+    configs = [("", config)]
+    if FLAGS.compare_batch_aug:
+        configs.append((" with BatchRecAugCollator", to_batch_aug(config, FLAGS.mode)))
+    for name, loader_config in configs:
+        data_loader = build_dataloader(
+            loader_config, FLAGS.mode, paddle.CPUPlace(), logger
+        )
+        batch_per_s, samples_per_s = benchmark_loader(
+            data_loader, FLAGS.num_batches, FLAGS.warmup
+        )
+        logger.info(
+            "{} dataloader{}, num_workers: {}, {:.2f} batches/s, {:.2f} samples/s".format(
+                FLAGS.mode,
+                name,
+                config[FLAGS.mode]["loader"]["num_workers"],
+                batch_per_s,
+                samples_per_s,
+            )
+        )
+
+    if FLAGS.profile_ops:
+        data_loader = build_dataloader(config, FLAGS.mode, paddle.CPUPlace(), logger)
+        for name, cost in profile_ops(data_loader.dataset, FLAGS.num_samples):
+            logger.info("{:<32s}{:.3f} ms/sample".format(name, cost * 1000))
+
+
+if __name__ == "__main__":
+    main()
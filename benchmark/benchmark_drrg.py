@@ -0,0 +1,209 @@
+# copyright (c) 2024 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Time of the DRRG post process on random pages of text components, e.g.
+
+python3 benchmark/benchmark_drrg.py --num_lines 100 500 2000 --check_max 500
+
+With --check_max, the boundaries are compared with the graph of dicts and
+the breadth first search before, on the pages up to check_max lines.
+"""
+
+from __future__ import print_function
+
+import argparse
+import functools
+import operator
+import os
+import sys
+import time
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "..")))
+
+import numpy as np
+from numpy.linalg import norm
+
+from ppocr.postprocess.drrg_postprocess import DRRGPostprocess, fix_corner
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num_lines", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--max_comps", type=int, default=40)
+    parser.add_argument("--link_thr", type=float, default=0.8)
+    parser.add_argument("--check_max", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def random_page(rng, num_lines, max_comps, k=8):
+    """Text components [N, 9] along lines, the edges [M, 2] to the k nearest
+    components and their scores [M], which are high on the same line"""
+    image_size = 100 * np.sqrt(num_lines * max_comps)
+    comps, line_ids = [], []
+    for line_id in range(num_lines):
+        start = rng.random(2) * image_size
+        angle = rng.uniform(-0.5, 0.5)
+        step = np.array([np.cos(angle), np.sin(angle)]) * rng.uniform(8, 20)
+        normal = np.array([-step[1], step[0]]) / norm(step) * rng.uniform(5, 12)
+        for j in range(rng.integers(1, max_comps)):
+            center = start + j * step + rng.normal(0, 1, 2)
+            box = [center - step / 2 - normal, center + step / 2 - normal]
+            box += [center + step / 2 + normal, center - step / 2 + normal]
+            comps.append(np.append(np.concatenate(box), rng.random()))
+            line_ids.append(line_id)
+    text_comps = np.array(comps, dtype=np.float32)
+    line_ids = np.array(line_ids)
+    centers = text_comps[:, :8].reshape(-1, 4, 2).mean(axis=1)
+    # the nearest components within the cells of a grid
+    cells = (centers // 100).astype(np.int64)
+    edges = []
+    for cell in np.unique(cells, axis=0):
+        near = np.flatnonzero((np.abs(cells - cell) <= 1).all(axis=1))
+        own = near[(cells[near] == cell).all(axis=1)]
+        distances = norm(centers[own, None] - centers[None, near], axis=-1)
+        nearest = near[np.argsort(distances, axis=1, kind="stable")[:, 1 : k + 1]]
+        edges.append(
+            np.stack([np.repeat(own, nearest.shape[1]), nearest.ravel()], axis=1)
+        )
+    # the components alone in their cells to their nearest component, the
+    # components in no edge joined an arbitrary cluster before
+    alone = np.setdiff1d(np.arange(len(text_comps)), np.concatenate(edges)[:, 0])
+    if len(alone) > 0:
+        distances = norm(centers[alone, None] - centers[None], axis=-1)
+        distances[np.arange(len(alone)), alone] = np.inf
+        edges.append(np.stack([alone, np.argmin(distances, axis=1)], axis=1))
+    edges = np.concatenate(edges)
+    same_line = line_ids[edges[:, 0]] == line_ids[edges[:, 1]]
+    scores = np.clip(same_line * 0.7 + rng.normal(0.15, 0.2, len(edges)), 0, 1)
+    return edges, scores, text_comps
+
+
+def min_connect_path(points):
+    """The min_connect_path before, with dicts of the lengths to the ends"""
+
+    def norm2(point1, point2):
+        return ((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2) ** 0.5
+
+    points_queue = points.copy()
+    shortest_path = []
+    current_edge = [points_queue[0], points_queue[0]]
+    points_queue.remove(points_queue[0])
+    while points_queue:
+        edge_dict0, edge_dict1 = {}, {}
+        for point in points_queue:
+            edge_dict0[norm2(point, current_edge[0])] = [point, current_edge[0]]
+            edge_dict1[norm2(current_edge[1], point)] = [current_edge[1], point]
+        key0, key1 = min(edge_dict0.keys()), min(edge_dict1.keys())
+        if key0 <= key1:
+            start, end = edge_dict0[key0]
+            shortest_path.insert(0, [points.index(start), points.index(end)])
+            points_queue.remove(start)
+            current_edge[0] = start
+        else:
+            start, end = edge_dict1[key1]
+            shortest_path.append([points.index(start), points.index(end)])
+            points_queue.remove(end)
+            current_edge[1] = end
+    shortest_path = functools.reduce(operator.concat, shortest_path)
+    return sorted(set(shortest_path), key=shortest_path.index)
+
+
+def dict_drrg(edges, scores, text_comps, link_thr, edge_len_thr=50.0):
+    """The boundaries of the DRRG post process before, by the graph of dicts
+    and the breadth first search"""
+    edges = np.sort(edges, axis=1)
+    score_dict = {}
+    for i, edge in enumerate(edges):
+        center1 = np.mean(text_comps[edge[0], :8].reshape(4, 2), axis=0)
+        center2 = np.mean(text_comps[edge[1], :8].reshape(4, 2), axis=0)
+        if norm(center1 - center2) > edge_len_thr:
+            scores[i] = 0
+        key = (edge[0], edge[1])
+        if key in score_dict:
+            score_dict[key] = 0.5 * (score_dict[key] + scores[i])
+        else:
+            score_dict[key] = scores[i]
+    links = {}
+    for a, b in edges:
+        links.setdefault(a, set()).add(b)
+        links.setdefault(b, set()).add(a)
+    labels = np.zeros(len(text_comps))
+    remaining = set(links)
+    for node in sorted(links):
+        if node not in remaining:
+            continue
+        cluster, queue = {node}, [node]
+        while queue:
+            node = queue.pop(0)
+            for neighbor in links[node] - cluster:
+                if score_dict[tuple(sorted([node, neighbor]))] >= link_thr:
+                    cluster.add(neighbor)
+                    queue.append(neighbor)
+        remaining -= cluster
+        labels[list(cluster)] = min(cluster)
+
+    boundaries = []
+    for label in np.unique(labels):
+        inds = np.where(labels == label)[0]
+        if len(inds) < 2:
+            continue
+        boxes = text_comps[inds, :8].reshape((-1, 4, 2)).astype(np.int32)
+        centers = np.mean(boxes, axis=1).astype(np.int32).tolist()
+        boxes = boxes[min_connect_path(centers)]
+        top_line = np.mean(boxes[:, 0:2, :], axis=1).astype(np.int32).tolist()
+        bot_line = np.mean(boxes[:, 2:4, :], axis=1).astype(np.int32).tolist()
+        top_line, bot_line = fix_corner(top_line, bot_line, boxes[0], boxes[-1])
+        boundary_points = top_line + bot_line[::-1]
+        score = np.mean(text_comps[inds, -1])
+        boundaries.append([p for point in boundary_points for p in point] + [score])
+    return boundaries
+
+
+def timeit(func, *args):
+    tic = time.time()
+    result = func(*args)
+    return result, time.time() - tic
+
+
+def main():
+    FLAGS = parse_args()
+    rng = np.random.default_rng(FLAGS.seed)
+    post_process = DRRGPostprocess(link_thr=FLAGS.link_thr)
+    shape_list = np.array([[0, 0, 1.0, 1.0]])
+    for num_lines in FLAGS.num_lines:
+        edges, scores, text_comps = random_page(rng, num_lines, FLAGS.max_comps)
+        result, elapse = timeit(
+            post_process, (edges, scores.copy(), text_comps), shape_list
+        )
+        boundaries = [
+            points.reshape(-1).tolist() + [score]
+            for points, score in zip(result[0]["points"], result[0]["scores"])
+        ]
+        info = "{:>6d} lines, {:>7d} components, {:>8d} edges, {:.3f}s".format(
+            num_lines, len(text_comps), len(edges), elapse
+        )
+        if num_lines <= FLAGS.check_max:
+            expected, ref_elapse = timeit(
+                dict_drrg, edges, scores.copy(), text_comps, FLAGS.link_thr
+            )
+            # the boundaries were in the order of a set before
+            same = sorted(boundaries) == sorted(expected)
+            info += ", dict graph {:.3f}s, same: {}".format(ref_elapse, same)
+        print(info)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# copyright (c) 2024 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Time of the formula decoding of LaTeX-OCR on batches of random crops of
+different sizes, padded as TextRecognizer pads them, e.g.
+
+python3 benchmark/benchmark_latexocr.py -c configs/rec/rec_latex_ocr.yml \
+    --batch_sizes 1 4 8 --seq_len 256 --compare \
+    -o Global.pretrained_model=./rec_latex_ocr_train/best_accuracy
+
+With --compare, the decoding is also timed with the whole prefix recomputed
+at every step as before, on the same batches, and with --greedy, which keeps
+only the best token at every step, the tokens of both are compared.
+Without pretrained_model, the weights are random and the sequences seldom
+sample [EOS], so that every step of seq_len is decoded.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "..")))
+
+import numpy as np
+import paddle
+import paddle.nn.functional as F
+
+from ppocr.modeling.architectures import build_model
+from ppocr.modeling.heads.rec_latexocr_head import top_k
+from ppocr.utils.save_load import load_model
+from tools.program import ArgsParser, load_config, merge_config
+
+
+def parse_args():
+    parser = ArgsParser()
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument(
+        "--image_sizes",
+        type=str,
+        nargs="+",
+        default=["64x256", "96x384", "128x512", "192x672"],
+        help="the sizes HxW of the crops, the crops of a batch cycle through them",
+    )
+    parser.add_argument("--seq_len", type=int, default=None)
+    parser.add_argument("--num_batches", type=int, default=2)
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--greedy", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def random_batch(rng, batch_size, image_sizes):
+    """Crops of image_sizes padded to the largest one with 1, like TextRecognizer"""
+    sizes = [image_sizes[i % len(image_sizes)] for i in range(batch_size)]
+    max_h = max(h for h, _ in sizes)
+    max_w = max(w for _, w in sizes)
+    batch = np.ones((batch_size, 1, max_h, max_w), dtype="float32")
+    for i, (h, w) in enumerate(sizes):
+        batch[i, 0, :h, :w] = rng.standard_normal((h, w))
+    return paddle.to_tensor(batch)
+
+
+def full_generate(head, context, seq_len, filter_thres, temperature):
+    """The decoding before, with the whole prefix recomputed at every step"""
+    out = paddle.full([context.shape[0], 1], head.bos_token, dtype="int64")
+    mask = paddle.full_like(out, True, dtype=paddle.bool)
+    for _ in range(seq_len):
+        logits = head.net(out, mask=mask, context=context)[:, -1, :]
+        probs = F.softmax(top_k(logits, thres=filter_thres) / temperature, axis=-1)
+        out = paddle.concat((out, paddle.multinomial(probs, 1)), axis=-1)
+        mask = paddle.concat((mask, paddle.ones([mask.shape[0], 1], "bool")), axis=1)
+        if (paddle.cumsum((out == head.eos_token).cast("int64"), 1)[:, -1] >= 1).all():
+            break
+    out = out[:, 1:].numpy()
+    # the tokens after [EOS] are padded, as by head.generate
+    after_eos = np.cumsum(out == head.eos_token, axis=1) - (out == head.eos_token)
+    out[after_eos > 0] = head.pad_value
+    return out
+
+
+def timeit(func, *args, **kwargs):
+    tic = time.time()
+    result = func(*args, **kwargs)
+    return result, time.time() - tic
+
+
+def main():
+    FLAGS = parse_args()
+    config = load_config(FLAGS.config)
+    config = merge_config(config, FLAGS.opt)
+    paddle.seed(FLAGS.seed)
+    model = build_model(config["Architecture"])
+    load_model(config, model, model_type=config["Architecture"]["model_type"])
+    model.eval()
+    head = model.head
+    seq_len = FLAGS.seq_len or head.max_seq_len
+    filter_thres = 1 - 1.5 / head.net.token_emb.weight.shape[0] if FLAGS.greedy else 0.9
+    image_sizes = [[int(v) for v in s.split("x")] for s in FLAGS.image_sizes]
+    rng = np.random.default_rng(FLAGS.seed)
+
+    for batch_size in FLAGS.batch_sizes:
+        elapse, ref_elapse, num_tokens, same = 0.0, 0.0, 0, True
+        for _ in range(FLAGS.num_batches):
+            images = random_batch(rng, batch_size, image_sizes)
+            with paddle.no_grad():
+                context = model.backbone(images)
+                bos = paddle.full([batch_size, 1], head.bos_token, dtype="int64")
+                out, batch_elapse = timeit(
+                    head.generate,
+                    bos,
+                    seq_len,
+                    eos_token=head.eos_token,
+                    context=context,
+                    temperature=head.temperature,
+                    filter_thres=filter_thres,
+                )
+                out = out.numpy()
+                elapse += batch_elapse
+                num_tokens += int((out != head.pad_value).sum())
+                if FLAGS.compare:
+                    expected, batch_elapse = timeit(
+                        full_generate,
+                        head,
+                        context,
+                        seq_len,
+                        filter_thres,
+                        head.temperature,
+                    )
+                    ref_elapse += batch_elapse
+                    same = same and np.array_equal(out, expected)
+        info = "batch_size {:>3d}: {:.3f}s/batch, {:.1f} tokens/s".format(
+            batch_size, elapse / FLAGS.num_batches, num_tokens / elapse
+        )
+        if FLAGS.compare:
+            info += ", full prefix {:.3f}s/batch".format(ref_elapse / FLAGS.num_batches)
+            if FLAGS.greedy:
+                info += ", same: {}".format(same)
+        print(info)
+
+
+if __name__ == "__main__":
+    main()
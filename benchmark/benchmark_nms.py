@@ -0,0 +1,152 @@
+# copyright (c) 2024 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Time of the quad nms of EAST/SAST and the polygon nms of FCE on random
+candidates, e.g.
+
+python3 benchmark/benchmark_nms.py --num_candidates 1000 5000 20000 --check_max 2000
+
+With --check_max, the kept candidates are compared with the pairwise nms
+before, on the candidate sets up to check_max, which is slow.
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "..")))
+
+import numpy as np
+
+from ppocr.postprocess.locality_aware_nms import intersection, nms
+from ppocr.utils.poly_nms import boundary_iou, poly_nms
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--num_candidates", type=int, nargs="+", default=[1000, 5000, 10000, 20000]
+    )
+    parser.add_argument("--image_size", type=int, default=1000)
+    parser.add_argument("--thresh", type=float, default=0.2)
+    parser.add_argument("--check_max", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def random_quads(rng, num, image_size, integer=False):
+    """Rotated text boxes [N, 9] with scores, and 10% duplicated boxes as ties"""
+    center = rng.random((num, 2)) * image_size
+    size = rng.random((num, 2)) * np.array([60, 15]) + 5
+    angle = (rng.random(num) - 0.5) * 0.6
+    unit = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]]) / 2 * size[:, None]
+    x = unit[..., 0] * np.cos(angle)[:, None] - unit[..., 1] * np.sin(angle)[:, None]
+    y = unit[..., 0] * np.sin(angle)[:, None] + unit[..., 1] * np.cos(angle)[:, None]
+    points = np.stack([x, y], axis=-1) + center[:, None]
+    if integer:
+        points = np.round(points)
+    quads = np.concatenate([points.reshape(num, 8), rng.random((num, 1))], axis=1)
+    duplicated = np.flatnonzero(rng.random(num) < 0.1)
+    quads[duplicated, :8] = quads[duplicated - 1, :8]
+    return quads
+
+
+def random_boundaries(rng, num, image_size, num_points=20):
+    """Jittered ellipses [x1, y1, ..., xk, yk, score] like the FCE boundaries"""
+    center = rng.random((num, 2)) * image_size
+    radius = rng.random((num, 1)) * 20 + 5
+    angle = np.linspace(0, 2 * np.pi, num_points, endpoint=False)
+    jitter = 1 + 0.2 * rng.random((num, num_points))
+    x = center[:, :1] + 3 * radius * jitter * np.cos(angle)
+    y = center[:, 1:] + radius * jitter * np.sin(angle)
+    points = np.stack([x, y], axis=-1).reshape(num, -1)
+    return [list(p) + [s] for p, s in zip(points, rng.random(num))]
+
+
+def pairwise_nms(S, thres):
+    """The nms of locality_aware_nms before, comparing all the pairs"""
+    order = np.argsort(S[:, 8])[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        ovr = np.array([intersection(S[i], S[t]) for t in order[1:]])
+        order = order[np.where(ovr <= thres)[0] + 1]
+    return keep
+
+
+def pairwise_poly_nms(polygons, threshold):
+    """The poly_nms before, comparing all the pairs"""
+    polygons = np.array(sorted(polygons, key=lambda x: x[-1]))
+    keep_poly = []
+    index = [i for i in range(polygons.shape[0])]
+    while len(index) > 0:
+        keep_poly.append(polygons[index[-1]].tolist())
+        A = polygons[index[-1]][:-1]
+        index = np.delete(index, -1)
+        iou_list = np.zeros((len(index),))
+        for i in range(len(index)):
+            B = polygons[index[i]][:-1]
+            iou_list[i] = boundary_iou(A, B)
+        remove_index = np.where(iou_list > threshold)
+        index = np.delete(index, remove_index)
+    return keep_poly
+
+
+def timeit(func, *args):
+    tic = time.time()
+    result = func(*args)
+    return result, time.time() - tic
+
+
+def main():
+    FLAGS = parse_args()
+    rng = np.random.default_rng(FLAGS.seed)
+    for num in FLAGS.num_candidates:
+        check = num <= FLAGS.check_max
+        cases = [
+            ("quad nms", nms, pairwise_nms, random_quads(rng, num, FLAGS.image_size)),
+            (
+                "quad nms (int)",
+                nms,
+                pairwise_nms,
+                random_quads(rng, num, FLAGS.image_size, integer=True),
+            ),
+            (
+                "poly nms",
+                poly_nms,
+                pairwise_poly_nms,
+                random_boundaries(rng, num, FLAGS.image_size),
+            ),
+        ]
+        for name, func, reference, candidates in cases:
+            keep, elapse = timeit(func, candidates, FLAGS.thresh)
+            info = "{:<16s}{:>7d} candidates, {:>6d} kept, {:.3f}s".format(
+                name, num, len(keep), elapse
+            )
+            if check:
+                expected, ref_elapse = timeit(reference, candidates, FLAGS.thresh)
+                same = [np.asarray(k).tolist() for k in keep] == [
+                    np.asarray(k).tolist() for k in expected
+                ]
+                info += ", pairwise {:.3f}s, same: {}".format(ref_elapse, same)
+            print(info)
+
+
+if __name__ == "__main__":
+    main()
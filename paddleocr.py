@@ -65,6 +65,7 @@ from tools.infer import predict_system
 from tools.infer.utility import draw_ocr, str2bool, check_gpu
 from ppstructure.utility import init_args, draw_structure_result
 from ppstructure.predict_system import StructureSystem, save_structure_res, to_excel
+from ppstructure.document_pipeline import DocumentPipeline
 from ppstructure.recovery.recovery_to_doc import sorted_layout_boxes, convert_info_docx
 from ppstructure.recovery.recovery_to_markdown import convert_info_markdown
 
@@ -916,10 +917,23 @@ class PPStructure(StructureSystem):
         img, flag_gif, flag_pdf = check_img(img, alpha_color)
         if isinstance(img, list) and flag_pdf:
             res_list = []
+            if self.mode == "structure" and self.use_doc_pipeline:
+                pipeline = DocumentPipeline(self, page_batch_num=self.page_batch_num)
+                for index, _, res, _ in pipeline(img, return_ocr_result_in_table):
+                    logger.info("processing {}/{} page:".format(index + 1, len(img)))
+                    res_list.append(res)
+                return res_list
+            # the layout of all pages is analysed in batches
+            layout_res_list, _ = self.predict_layout_batch(img)
             for index, pdf_img in enumerate(img):
                 logger.info("processing {}/{} page:".format(index + 1, len(img)))
                 res, _ = super().__call__(
-                    pdf_img, return_ocr_result_in_table, img_idx=index
+                    pdf_img,
+                    return_ocr_result_in_table,
+                    img_idx=index,
+                    layout_res=(
+                        layout_res_list[index] if layout_res_list is not None else None
+                    ),
                 )
                 res_list.append(res)
             return res_list
@@ -1027,7 +1041,8 @@ def main():
 
                 if args.recovery and result != []:
                     h, w, _ = img.shape
-                    result_cp = deepcopy(result)
+                    # shallow copy of the regions, sorted_layout_boxes sets their layout
+                    result_cp = [dict(region) for region in result]
                     result_sorted = sorted_layout_boxes(result_cp, w)
                     all_res += result_sorted
 
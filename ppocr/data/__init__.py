@@ -35,9 +35,12 @@ import paddle.distributed as dist
 from ppocr.data.imaug import transform, create_operators
 from ppocr.data.simple_dataset import SimpleDataSet, MultiScaleDataSet
 from ppocr.data.lmdb_dataset import LMDBDataSet, LMDBDataSetSR, LMDBDataSetTableMaster
+from ppocr.data.shard_dataset import ShardDataSet
 from ppocr.data.pgnet_dataset import PGDataSet
 from ppocr.data.pubtab_dataset import PubTabDataSet
 from ppocr.data.multi_scale_sampler import MultiScaleSampler
+from ppocr.data.resample_sampler import ResampleBatchSampler
+from ppocr.data.bucket_sampler import RatioBucketSampler
 from ppocr.data.latexocr_dataset import LaTeXOCRDataSet
 
 # for PaddleX dataset_type
@@ -97,6 +100,7 @@ def build_dataloader(config, mode, device, logger, seed=None):
         "PubTabTableRecDataset",
         "KieDataset",
         "LaTeXOCRDataSet",
+        "ShardDataSet",
     ]
     module_name = config[mode]["dataset"]["name"]
     assert module_name in support_dict, Exception(
@@ -104,7 +108,15 @@ def build_dataloader(config, mode, device, logger, seed=None):
     )
     assert mode in ["Train", "Eval", "Test"], "Mode should be Train, Eval or Test."
 
-    dataset = eval(module_name)(config, mode, logger, seed)
+    dataset_class = eval(module_name)
+    # datasets with ratio_list < 1 are resampled by ResampleBatchSampler
+    resample_by_sampler = mode == "Train" and "sampler" not in config[mode]
+    if resample_by_sampler and issubclass(dataset_class, (SimpleDataSet, ShardDataSet)):
+        dataset = dataset_class(
+            config, mode, logger, seed, resample_by_sampler=resample_by_sampler
+        )
+    else:
+        dataset = dataset_class(config, mode, logger, seed)
     loader_config = config[mode]["loader"]
     batch_size = loader_config["batch_size_per_card"]
     drop_last = loader_config["drop_last"]
@@ -114,6 +126,10 @@ def build_dataloader(config, mode, device, logger, seed=None):
         use_shared_memory = loader_config["use_shared_memory"]
     else:
         use_shared_memory = True
+    # keep the workers of the resampled dataset across epochs by default
+    persistent_workers = loader_config.get(
+        "persistent_workers", getattr(dataset, "resample_by_sampler", False)
+    ) and (num_workers > 0)
 
     if mode == "Train":
         # Distribute data to multiple cards
@@ -121,6 +137,14 @@ def build_dataloader(config, mode, device, logger, seed=None):
             config_sampler = config[mode]["sampler"]
             sampler_name = config_sampler.pop("name")
             batch_sampler = eval(sampler_name)(dataset, **config_sampler)
+        elif getattr(dataset, "resample_by_sampler", False):
+            batch_sampler = ResampleBatchSampler(
+                dataset=dataset,
+                batch_size=batch_size,
+                shuffle=shuffle,
+                drop_last=drop_last,
+                seed=seed,
+            )
         else:
             batch_sampler = DistributedBatchSampler(
                 dataset=dataset,
@@ -137,7 +161,12 @@ def build_dataloader(config, mode, device, logger, seed=None):
     if "collate_fn" in loader_config:
         from . import collate_fn
 
-        collate_fn = getattr(collate_fn, loader_config["collate_fn"])()
+        collate_fn_config = loader_config["collate_fn"]
+        if isinstance(collate_fn_config, dict):
+            collate_fn_name = collate_fn_config.pop("name")
+        else:
+            collate_fn_name, collate_fn_config = collate_fn_config, {}
+        collate_fn = getattr(collate_fn, collate_fn_name)(**collate_fn_config)
     else:
         collate_fn = None
     data_loader = DataLoader(
@@ -148,6 +177,7 @@ def build_dataloader(config, mode, device, logger, seed=None):
         return_list=True,
         use_shared_memory=use_shared_memory,
         collate_fn=collate_fn,
+        persistent_workers=persistent_workers,
     )
 
     return data_loader
@@ -0,0 +1,249 @@
+# copyright (c) 2024 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import paddle.distributed as dist
+from paddle.io import Sampler
+from PIL import Image
+
+
+def _image_size(img_path):
+    try:
+        with Image.open(img_path) as img:
+            return img.size
+    except Exception:
+        return (0, 0)
+
+
+def load_image_sizes(label_file, data_dir, delimiter="\t", num_threads=16):
+    """
+    The (width, height) of the images of the lines of label_file, [N, 2]. The
+    sizes are read from the image headers once and cached next to the label
+    file as label_file + ".wh.npz", which is rebuilt when the label file
+    changes. The size of a missing image is (0, 0).
+    """
+    cache_file = label_file + ".wh.npz"
+    stat = os.stat(label_file)
+    if os.path.exists(cache_file):
+        with np.load(cache_file) as cache:
+            if (
+                int(cache["label_size"]) == stat.st_size
+                and int(cache["label_mtime_ns"]) == stat.st_mtime_ns
+            ):
+                return cache["wh"]
+
+    img_paths = []
+    with open(label_file, "rb") as f:
+        for line in f.readlines():
+            file_name = line.decode("utf-8").strip("\n").split(delimiter)[0]
+            if len(file_name) > 0 and file_name[0] == "[":
+                # multiple images -> one gt label
+                try:
+                    file_name = json.loads(file_name)[0]
+                except Exception:
+                    pass
+            img_paths.append(os.path.join(data_dir, file_name))
+    with ThreadPoolExecutor(num_threads) as pool:
+        wh = np.array(list(pool.map(_image_size, img_paths)), dtype=np.int32)
+    wh = wh.reshape(-1, 2)
+
+    # the index is written by a rank and replaced at once
+    tmp_file = "{}.{}.tmp.npz".format(label_file, os.getpid())
+    try:
+        np.savez(
+            tmp_file,
+            wh=wh,
+            label_size=stat.st_size,
+            label_mtime_ns=stat.st_mtime_ns,
+        )
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass
+    return wh
+
+
+class RatioBucketSampler(Sampler):
+    """
+    Distributed batch sampler for rec training with MultiScaleDataSet, which
+    groups the samples of close aspect ratios into batches of variable size,
+    padded to the width of their widest sample instead of max_width.
+
+    The samples are sorted by their width resized to image_height, rounded up
+    to width_divisor, and cut into batches from the narrowest, with at most
+    max_pixels pixels, i.e. batch_size images of max_width by default. The
+    order within a width and the order of the batches are shuffled by epoch.
+    The batches of the epoch are the same on all ranks, and split among them.
+    The image sizes are read from a cached index, see load_image_sizes.
+
+    Args:
+        data_source: MultiScaleDataSet with ds_width false, which gets the
+            samples as (width, height, index, None).
+        image_height, max_width: the size of the images after resize.
+        batch_size: the batch size of max_width images.
+        max_pixels: the pixel budget of a batch, image_height * max_width *
+            batch_size by default.
+        max_batch_size: the max number of samples of a batch, 4 * batch_size
+            by default.
+        width_divisor: the widths of the batches are multiples of it.
+    """
+
+    def __init__(
+        self,
+        data_source,
+        image_height=48,
+        max_width=320,
+        batch_size=128,
+        max_pixels=None,
+        max_batch_size=None,
+        width_divisor=8,
+        shuffle=True,
+        drop_last=False,
+        seed=None,
+        **kwargs,
+    ):
+        self.data_source = data_source
+        self.image_height = image_height
+        self.max_width = max_width
+        self.max_pixels = max_pixels or image_height * max_width * batch_size
+        self.max_batch_size = max_batch_size or 4 * batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed if seed is not None else data_source.seed
+        self.epoch = 0
+        self.nranks = dist.get_world_size()
+        self.local_rank = dist.get_rank()
+
+        wh_ratio = self.get_wh_ratio(data_source)
+        # the width of every sample resized by MultiScaleDataSet
+        self.resized_widths = np.minimum(
+            np.ceil(image_height * wh_ratio), max_width
+        ).astype(np.int64)
+        self.widths = np.clip(
+            -(-self.resized_widths // width_divisor) * width_divisor,
+            width_divisor,
+            max_width,
+        )
+        self.sorted_idxs = np.argsort(self.widths, kind="stable")
+        self.bounds = self.batch_bounds(self.widths[self.sorted_idxs])
+        self.num_batches = len(self.bounds)
+        self.length = -(-self.num_batches // self.nranks)
+
+        num_samples = sum(end - begin for begin, end, _ in self.bounds)
+        data_source.logger.info(
+            "RatioBucketSampler: {} batches of {} samples, padding efficiency "
+            "{:.2%}, {:.2%} with the width of {}".format(
+                self.num_batches,
+                num_samples,
+                self.padding_efficiency(),
+                self.resized_widths.sum() / (len(self.widths) * max_width),
+                max_width,
+            )
+        )
+
+    def get_wh_ratio(self, data_source):
+        """The width / height of the samples of data_source"""
+        size_of_line = {}
+        for label_file in data_source.label_file_list:
+            wh = load_image_sizes(
+                label_file, data_source.data_dir, data_source.delimiter
+            )
+            with open(label_file, "rb") as f:
+                size_of_line.update(zip(f.readlines(), wh.tolist()))
+        wh = np.array(
+            [
+                size_of_line.get(data_source.data_lines[file_idx], (0, 0))
+                for file_idx in data_source.data_idx_order_list
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+        valid = (wh > 0).all(axis=1)
+        wh_ratio = np.ones(len(wh))
+        wh_ratio[valid] = wh[valid, 0] / wh[valid, 1]
+        if valid.any():
+            # the missing images are replaced by other samples in the dataset
+            wh_ratio[~valid] = np.median(wh_ratio[valid])
+        return wh_ratio
+
+    def batch_bounds(self, sorted_widths):
+        """
+        The batches of the samples sorted by width, as (begin, end, width) in
+        the sorted order. A batch of narrower samples, which are too many for
+        the budget of a wider sample, is closed before the wider samples.
+        """
+        bounds = []
+        begin = 0
+        widths, ends = np.unique(sorted_widths, return_index=True)
+        ends = list(ends[1:]) + [len(sorted_widths)]
+        prev_width = None
+        cur = 0
+        for width, end in zip(widths.tolist(), ends):
+            capacity = self.capacity(width)
+            if cur - begin >= capacity:
+                bounds.append((begin, cur, prev_width))
+                begin = cur
+            while begin + capacity <= end:
+                bounds.append((begin, begin + capacity, width))
+                begin += capacity
+            cur = end
+            prev_width = width
+        if begin < cur and not self.drop_last:
+            bounds.append((begin, cur, prev_width))
+        return bounds
+
+    def capacity(self, width):
+        return int(
+            min(
+                self.max_batch_size,
+                max(1, self.max_pixels // (self.image_height * width)),
+            )
+        )
+
+    def padding_efficiency(self):
+        """The valid pixels / the pixels of the batches"""
+        resized_widths = self.resized_widths[self.sorted_idxs]
+        valid, total = 0, 0
+        for begin, end, width in self.bounds:
+            valid += resized_widths[begin:end].sum()
+            total += (end - begin) * width
+        return valid / max(total, 1)
+
+    def __iter__(self):
+        seed = self.epoch if self.seed is None else self.seed + self.epoch
+        self.epoch += 1
+        rng = np.random.RandomState(seed)
+        sorted_idxs = self.sorted_idxs
+        if self.shuffle:
+            # shuffle the samples of the same width
+            order = rng.permutation(len(self.widths))
+            sorted_idxs = order[np.argsort(self.widths[order], kind="stable")]
+        bounds = list(self.bounds)
+        if self.shuffle:
+            bounds = [bounds[i] for i in rng.permutation(len(bounds))]
+        # the same number of batches on every rank
+        bounds += bounds[: self.length * self.nranks - len(bounds)]
+        for begin, end, width in bounds[self.local_rank :: self.nranks]:
+            yield [
+                (width, self.image_height, int(idx), None)
+                for idx in sorted_idxs[begin:end]
+            ]
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        return self.length
@@ -17,6 +17,8 @@ import numbers
 import numpy as np
 from collections import defaultdict
 
+from .imaug.rec_img_aug import BatchRecAug
+
 
 class DictCollator(object):
     """
@@ -131,3 +133,35 @@ class LaTeXOCRCollator(object):
     def __call__(self, batch):
         images, labels, attention_mask = batch[0]
         return images, labels, attention_mask
+
+
+class BatchRecAugCollator(object):
+    """
+    Stack the samples like the default collate_fn, and augment the images of
+    the batch with BatchRecAug, in place of RecAug in the transforms:
+
+    loader:
+      collate_fn:
+        name: BatchRecAugCollator
+        valid_ratio_idx: 4  # the index of valid_ratio in KeepKeys
+        tia_prob: 0.4
+        ...
+
+    The images of the batch [B, C, H, W] are augmented at once in the workers
+    of the dataloader, and only on the width of valid_ratio.
+    """
+
+    def __init__(self, image_idx=0, valid_ratio_idx=None, **kwargs):
+        self.image_idx = image_idx
+        self.valid_ratio_idx = valid_ratio_idx
+        self.batch_aug = BatchRecAug(**kwargs)
+
+    def __call__(self, batch):
+        output = [np.stack(d, axis=0) for d in zip(*batch)]
+        imgs = output[self.image_idx]
+        widths = None
+        if self.valid_ratio_idx is not None:
+            valid_ratio = output[self.valid_ratio_idx].astype("float32")
+            widths = np.round(valid_ratio * imgs.shape[-1]).astype("int64")
+        output[self.image_idx] = self.batch_aug(imgs, widths)
+        return output
@@ -19,6 +19,7 @@ from __future__ import unicode_literals
 
 import copy
 import numpy as np
+import re
 import string
 from shapely.geometry import LineString, Point, Polygon
 import json
@@ -1056,6 +1057,11 @@ class VQATokenLabelEncode(object):
         self.use_textline_bbox_info = use_textline_bbox_info
         self.order_method = order_method
         assert self.order_method in [None, "tb-yx"]
+        # the word bboxes come from the token offsets, unless the tokenizer
+        # can not return them
+        self.use_offsets_mapping = (
+            not use_textline_bbox_info and self._offsets_mapping_supported()
+        )
 
     def split_bbox(self, bbox, text, tokenizer):
         words = text.split()
@@ -1070,6 +1076,69 @@ class VQATokenLabelEncode(object):
             x1 += (len(word) + 1) * unit_w
         return token_bboxes
 
+    def split_bbox_by_offsets(self, bbox, text, offset_mapping):
+        """
+        The bboxes of the tokens, which are the bboxes of split_bbox of the
+        words their offsets start in, without tokenizing the words again.
+        """
+        words = [match.span() for match in re.finditer(r"\S+", text)]
+        if len(words) == 0 or len(offset_mapping) == 0:
+            return []
+        x1, y1, x2, y2 = bbox
+        unit_w = (x2 - x1) / len(text)
+        # the words are one space apart, as in split_bbox
+        word_bboxes = []
+        for start, end in words:
+            curr_w = (end - start) * unit_w
+            word_bboxes.append([x1, y1, x1 + curr_w, y2])
+            x1 += (end - start + 1) * unit_w
+        token_starts = np.array(offset_mapping).reshape(-1, 2)[:, 0]
+        token_words = np.searchsorted(np.array(words)[:, 0], token_starts, side="right")
+        return [word_bboxes[max(i - 1, 0)] for i in token_words.tolist()]
+
+    def _offsets_mapping_supported(self):
+        """
+        Whether the tokenizer returns an offset for every token, checked on a
+        sample text, e.g. the python tokenizers of some versions of paddlenlp
+        raise or return no offsets.
+        """
+        try:
+            encode_res = self.tokenizer.batch_encode(
+                ["Date: 2024 ,  Total 1.5"],
+                pad_to_max_seq_len=False,
+                return_offsets_mapping=True,
+                return_dict=False,
+            )[0]
+            supported = len(encode_res["offset_mapping"]) == len(
+                encode_res["input_ids"]
+            )
+        except Exception:
+            supported = False
+        if not supported:
+            logger = get_logger()
+            logger.warning(
+                "the tokenizer returns no offset mapping, "
+                "the words are tokenized again for their bboxes"
+            )
+        return supported
+
+    def batch_encode(self, texts):
+        """
+        Encode all the lines of a document in one batched call of the
+        tokenizer, with the offsets of the tokens if the word bboxes are used.
+        """
+        if len(texts) == 0:
+            return []
+        encode_params = dict(
+            pad_to_max_seq_len=False,
+            return_attention_mask=True,
+            return_token_type_ids=True,
+            return_dict=False,
+        )
+        if self.use_offsets_mapping:
+            encode_params["return_offsets_mapping"] = True
+        return self.tokenizer.batch_encode(texts, **encode_params)
+
     def filter_empty_contents(self, ocr_info):
         """
         find out the empty texts and remove the links
@@ -1126,6 +1195,16 @@ class VQATokenLabelEncode(object):
 
         data["ocr_info"] = copy.deepcopy(ocr_info)
 
+        # all the lines of the document are tokenized at once
+        encode_results = self.batch_encode(
+            [
+                info["transcription"]
+                for info in ocr_info
+                if len(info["transcription"]) > 0
+            ]
+        )
+        encode_results = iter(encode_results)
+
         for info in ocr_info:
             text = info["transcription"]
             if len(text) <= 0:
@@ -1140,12 +1219,12 @@ class VQATokenLabelEncode(object):
             # smooth_box
             info["bbox"] = self.trans_poly_to_bbox(info["points"])
 
-            encode_res = self.tokenizer.encode(
-                text,
-                pad_to_max_seq_len=False,
-                return_attention_mask=True,
-                return_token_type_ids=True,
-            )
+            encode_res = next(encode_results)
+            offset_mapping = encode_res.pop("offset_mapping", None)
+            if offset_mapping is not None and len(offset_mapping) != len(
+                encode_res["input_ids"]
+            ):
+                offset_mapping = None
 
             if not self.add_special_ids:
                 # TODO: use tok.all_special_ids to remove
@@ -1155,6 +1234,11 @@ class VQATokenLabelEncode(object):
 
             if self.use_textline_bbox_info:
                 bbox = [info["bbox"]] * len(encode_res["input_ids"])
+            elif offset_mapping is not None:
+                # the special tokens get [0, 0, 0, 0] below
+                bbox = self.split_bbox_by_offsets(
+                    info["bbox"], info["transcription"], offset_mapping[1:-1]
+                )
             else:
                 bbox = self.split_bbox(
                     info["bbox"], info["transcription"], self.tokenizer
@@ -1228,7 +1312,23 @@ class VQATokenLabelEncode(object):
 
     def _load_ocr_info(self, data):
         if self.infer_mode:
-            ocr_result = self.ocr_engine.ocr(data["image"], cls=False)[0]
+            if data.get("ocr_info") is not None:
+                # the OCR results computed beforehand, a list of
+                # {"transcription": str, "points": [[x, y], ...]}
+                return copy.deepcopy(data["ocr_info"])
+            assert (
+                self.ocr_engine is not None
+            ), "the ocr_info of the image is needed without an ocr_engine"
+            if hasattr(self.ocr_engine, "ocr"):
+                ocr_result = self.ocr_engine.ocr(data["image"], cls=False)[0] or []
+            else:
+                # a TextSystem, which returns the boxes and the texts
+                dt_boxes, rec_res, _ = self.ocr_engine(data["image"], cls=False)
+                if dt_boxes is None:
+                    dt_boxes, rec_res = [], []
+                ocr_result = [
+                    [np.array(box).tolist(), res] for box, res in zip(dt_boxes, rec_res)
+                ]
             ocr_info = []
             for res in ocr_result:
                 ocr_info.append(
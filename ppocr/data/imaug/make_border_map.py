@@ -21,12 +21,12 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import math
 import numpy as np
 import cv2
 
 np.seterr(divide="ignore", invalid="ignore")
 import pyclipper
-from shapely.geometry import Polygon
 import sys
 import warnings
 
@@ -35,6 +35,38 @@ warnings.simplefilter("ignore")
 __all__ = ["MakeBorderMap"]
 
 
+def polygon_area_length(polygon):
+    """
+    Area and perimeter of a polygon [num_points, 2], as those of
+    shapely.geometry.Polygon, or of polygons [num_polygons, num_points, 2].
+    """
+    polygon = np.asarray(polygon, dtype=np.float64)
+    edges = np.roll(polygon, -1, axis=-2) - polygon
+    area = (
+        np.abs(
+            np.sum(
+                polygon[..., 0] * edges[..., 1] - polygon[..., 1] * edges[..., 0],
+                axis=-1,
+            )
+        )
+        / 2.0
+    )
+    length = np.sum(np.hypot(edges[..., 0], edges[..., 1]), axis=-1)
+    return area, length
+
+
+def polygons_area_length(polygons):
+    """Areas and perimeters of a list of polygons, in one pass if they are an array"""
+    if isinstance(polygons, np.ndarray) and polygons.ndim == 3:
+        return polygon_area_length(polygons)
+    areas, lengths = [], []
+    for polygon in polygons:
+        area, length = polygon_area_length(polygon)
+        areas.append(area)
+        lengths.append(length)
+    return areas, lengths
+
+
 class MakeBorderMap(object):
     def __init__(self, shrink_ratio=0.4, thresh_min=0.3, thresh_max=0.7, **kwargs):
         self.shrink_ratio = shrink_ratio
@@ -53,29 +85,30 @@ class MakeBorderMap(object):
         canvas = np.zeros(img.shape[:2], dtype=np.float32)
         mask = np.zeros(img.shape[:2], dtype=np.float32)
 
+        areas, lengths = polygons_area_length(text_polys)
         for i in range(len(text_polys)):
             if ignore_tags[i]:
                 continue
-            self.draw_border_map(text_polys[i], canvas, mask=mask)
+            self.draw_border_map(
+                text_polys[i], canvas, mask=mask, area_length=(areas[i], lengths[i])
+            )
         canvas = canvas * (self.thresh_max - self.thresh_min) + self.thresh_min
 
         data["threshold_map"] = canvas
         data["threshold_mask"] = mask
         return data
 
-    def draw_border_map(self, polygon, canvas, mask):
+    def draw_border_map(self, polygon, canvas, mask, area_length=None):
         polygon = np.array(polygon)
         assert polygon.ndim == 2
         assert polygon.shape[1] == 2
 
-        polygon_shape = Polygon(polygon)
-        if polygon_shape.area <= 0:
+        if area_length is None:
+            area_length = polygon_area_length(polygon)
+        area, length = area_length
+        if area <= 0:
             return
-        distance = (
-            polygon_shape.area
-            * (1 - np.power(self.shrink_ratio, 2))
-            / polygon_shape.length
-        )
+        distance = area * (1 - np.power(self.shrink_ratio, 2)) / length
         subject = [tuple(l) for l in polygon]
         padding = pyclipper.PyclipperOffset()
         padding.AddPath(subject, pyclipper.JT_ROUND, pyclipper.ET_CLOSEDPOLYGON)
@@ -93,20 +126,13 @@ class MakeBorderMap(object):
         polygon[:, 0] = polygon[:, 0] - xmin
         polygon[:, 1] = polygon[:, 1] - ymin
 
-        xs = np.broadcast_to(
-            np.linspace(0, width - 1, num=width).reshape(1, width), (height, width)
+        distance_map = self._min_square_distance(
+            polygon.astype(np.float64), height, width, distance
         )
-        ys = np.broadcast_to(
-            np.linspace(0, height - 1, num=height).reshape(height, 1), (height, width)
+        distance_map = np.clip(np.sqrt(distance_map) / distance, 0, 1).astype(
+            np.float32
         )
 
-        distance_map = np.zeros((polygon.shape[0], height, width), dtype=np.float32)
-        for i in range(polygon.shape[0]):
-            j = (i + 1) % polygon.shape[0]
-            absolute_distance = self._distance(xs, ys, polygon[i], polygon[j])
-            distance_map[i] = np.clip(absolute_distance / distance, 0, 1)
-        distance_map = distance_map.min(axis=0)
-
         xmin_valid = min(max(0, xmin), canvas.shape[1] - 1)
         xmax_valid = min(max(0, xmax), canvas.shape[1] - 1)
         ymin_valid = min(max(0, ymin), canvas.shape[0] - 1)
@@ -120,6 +146,46 @@ class MakeBorderMap(object):
             canvas[ymin_valid : ymax_valid + 1, xmin_valid : xmax_valid + 1],
         )
 
+    def _min_square_distance(self, polygon, height, width, distance):
+        """
+        The square of the min distance of every pixel to the edges of the
+        polygon, the same distance as _distance, but only computed in the window
+        of each edge where it is less than distance, the other pixels are
+        distance ** 2. All terms are sums of a row and a column vector, so no
+        [num_edges, height, width] tensor is built.
+        """
+        result = np.full((height, width), distance * distance, dtype=np.float64)
+        xs = np.arange(width, dtype=np.float64)
+        ys = np.arange(height, dtype=np.float64)
+        points = polygon.tolist()
+        for i in range(len(points)):
+            (x1, y1), (x2, y2) = points[i - 1], points[i]
+            col_begin = max(math.floor(min(x1, x2) - distance), 0)
+            col_end = min(math.ceil(max(x1, x2) + distance) + 1, width)
+            row_begin = max(math.floor(min(y1, y2) - distance), 0)
+            row_end = min(math.ceil(max(y1, y2) + distance) + 1, height)
+            if col_begin >= col_end or row_begin >= row_end:
+                continue
+            dx1 = xs[col_begin:col_end] - x1
+            dx2 = xs[col_begin:col_end] - x2
+            dy1 = ys[row_begin:row_end, np.newaxis] - y1
+            dy2 = ys[row_begin:row_end, np.newaxis] - y2
+            square_result = np.fmin(
+                np.square(dx1) + np.square(dy1), np.square(dx2) + np.square(dy2)
+            )
+            edge_length = math.hypot(x1 - x2, y1 - y2)
+            if edge_length > 0:
+                # the pixels which form a right or obtuse angle with the ends
+                # of the edge take the distance to the line of the edge
+                obtuse = np.less_equal(dx1 * dx2, -(dy1 * dy2))
+                line_distance = (dx1 * ((y1 - y2) / edge_length)) - (
+                    dy1 * ((x1 - x2) / edge_length)
+                )
+                np.copyto(square_result, np.square(line_distance), where=obtuse)
+            window = result[row_begin:row_end, col_begin:col_end]
+            np.fmin(window, square_result, out=window)
+        return result
+
     def _distance(self, xs, ys, point_1, point_2):
         """
         compute the distance from point to a line
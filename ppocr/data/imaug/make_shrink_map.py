@@ -23,9 +23,10 @@ from __future__ import unicode_literals
 
 import numpy as np
 import cv2
-from shapely.geometry import Polygon
 import pyclipper
 
+from .make_border_map import polygons_area_length
+
 __all__ = ["MakeShrinkMap"]
 
 
@@ -52,15 +53,16 @@ class MakeShrinkMap(object):
         text_polys, ignore_tags = self.validate_polygons(text_polys, ignore_tags, h, w)
         gt = np.zeros((h, w), dtype=np.float32)
         mask = np.ones((h, w), dtype=np.float32)
+        areas, lengths = polygons_area_length(text_polys)
         for i in range(len(text_polys)):
             polygon = text_polys[i]
-            height = max(polygon[:, 1]) - min(polygon[:, 1])
-            width = max(polygon[:, 0]) - min(polygon[:, 0])
+            height = polygon[:, 1].max() - polygon[:, 1].min()
+            width = polygon[:, 0].max() - polygon[:, 0].min()
             if ignore_tags[i] or min(height, width) < self.min_text_size:
                 cv2.fillPoly(mask, polygon.astype(np.int32)[np.newaxis, :, :], 0)
                 ignore_tags[i] = True
             else:
-                polygon_shape = Polygon(polygon)
+                area, length = areas[i], lengths[i]
                 subject = [tuple(l) for l in polygon]
                 padding = pyclipper.PyclipperOffset()
                 padding.AddPath(subject, pyclipper.JT_ROUND, pyclipper.ET_CLOSEDPOLYGON)
@@ -72,11 +74,7 @@ class MakeShrinkMap(object):
                 # print(possible_ratios)
                 for ratio in possible_ratios:
                     # print(f"Change shrink ratio to {ratio}")
-                    distance = (
-                        polygon_shape.area
-                        * (1 - np.power(ratio, 2))
-                        / polygon_shape.length
-                    )
+                    distance = area * (1 - np.power(ratio, 2)) / length
                     shrinked = padding.Execute(-distance)
                     if len(shrinked) == 1:
                         break
@@ -101,12 +99,19 @@ class MakeShrinkMap(object):
         if len(polygons) == 0:
             return polygons, ignore_tags
         assert len(polygons) == len(ignore_tags)
-        for polygon in polygons:
-            polygon[:, 0] = np.clip(polygon[:, 0], 0, w - 1)
-            polygon[:, 1] = np.clip(polygon[:, 1], 0, h - 1)
+        if isinstance(polygons, np.ndarray) and polygons.ndim == 3:
+            # all polygons at once
+            polygons[:, :, 0] = np.clip(polygons[:, :, 0], 0, w - 1)
+            polygons[:, :, 1] = np.clip(polygons[:, :, 1], 0, h - 1)
+            areas = self.polygon_area(polygons)
+        else:
+            for polygon in polygons:
+                polygon[:, 0] = np.clip(polygon[:, 0], 0, w - 1)
+                polygon[:, 1] = np.clip(polygon[:, 1], 0, h - 1)
+            areas = [self.polygon_area(polygon) for polygon in polygons]
 
         for i in range(len(polygons)):
-            area = self.polygon_area(polygons[i])
+            area = areas[i]
             if abs(area) < 1:
                 ignore_tags[i] = True
             if area > 0:
@@ -115,11 +120,10 @@ class MakeShrinkMap(object):
 
     def polygon_area(self, polygon):
         """
-        compute polygon area
+        compute polygon area, or the areas of polygons [num_polygons, num_points, 2]
         """
-        area = 0
-        q = polygon[-1]
-        for p in polygon:
-            area += p[0] * q[1] - p[1] * q[0]
-            q = p
-        return area / 2.0
+        q = np.roll(polygon, 1, axis=-2)
+        return (
+            np.sum(polygon[..., 0] * q[..., 1] - polygon[..., 1] * q[..., 0], axis=-1)
+            / 2.0
+        )
@@ -38,7 +38,9 @@ class DecodeImage(object):
 
     def __call__(self, data):
         img = data["image"]
-        assert type(img) is bytes and len(img) > 0, "invalid input 'img' in DecodeImage"
+        assert (
+            isinstance(img, (bytes, memoryview)) and len(img) > 0
+        ), "invalid input 'img' in DecodeImage"
         img = np.frombuffer(img, dtype="uint8")
         if self.ignore_orientation:
             img = cv2.imdecode(img, cv2.IMREAD_IGNORE_ORIENTATION | cv2.IMREAD_COLOR)
@@ -19,7 +19,14 @@ import random
 import copy
 from PIL import Image
 import PIL
-from .text_image_aug import tia_perspective, tia_stretch, tia_distort
+from .text_image_aug import (
+    tia_perspective,
+    tia_stretch,
+    tia_distort,
+    tia_perspective_batch,
+    tia_stretch_batch,
+    tia_distort_batch,
+)
 from .abinet_aug import (
     CVGeometry,
     CVDeterioration,
@@ -112,6 +119,155 @@ class BaseDataAugmentation(object):
         return data
 
 
+class BatchRecAug(object):
+    """
+    RecAug on a batch of images [B, C, H, W] normalized by RecResizeImg, for
+    BatchRecAugCollator. Every op is drawn for each image with the
+    probabilities of RecAug, and applied to all the drawn images at once.
+
+    The images are augmented after the resize, so the warps and crops are
+    relative to the resized images, and a cropped image is stretched back to
+    H without changing its width. The padding on the right of widths is kept.
+    """
+
+    def __init__(
+        self,
+        tia_prob=0.4,
+        crop_prob=0.4,
+        reverse_prob=0.4,
+        noise_prob=0.4,
+        jitter_prob=0.4,
+        blur_prob=0.4,
+        hsv_aug_prob=0.4,
+        scale=1.0 / 255.0,
+        mean=0.5,
+        std=0.5,
+        **kwargs,
+    ):
+        self.tia_prob = tia_prob
+        self.crop_prob = crop_prob
+        self.reverse_prob = reverse_prob
+        self.noise_prob = noise_prob
+        self.jitter_prob = jitter_prob
+        self.blur_prob = blur_prob
+        self.hsv_aug_prob = hsv_aug_prob
+        # the normalization of RecResizeImg, (img * scale - mean) / std
+        self.scale = scale
+        self.mean = mean
+        self.std = std
+        # for GaussianBlur
+        self.fil = cv2.getGaussianKernel(ksize=5, sigma=1, ktype=cv2.CV_32F)
+
+    def __call__(self, imgs, widths=None):
+        batch_size, _, h, w = imgs.shape
+        if widths is None:
+            widths = np.full(batch_size, w)
+        widths = np.asarray(widths, dtype=np.int64)
+        # [B, H, W, C] in pixels
+        pixels = (imgs.transpose(0, 2, 3, 1) * self.std + self.mean) / self.scale
+        pixels = pixels.astype(np.float32)
+        every = np.ones(batch_size, dtype=bool)
+        large = (widths >= 20) & (h >= 20)
+
+        # tia
+        idx = self._draw(self.tia_prob, large)
+        if len(idx) > 0:
+            for tia_batch in [tia_distort_batch, tia_stretch_batch]:
+                segments = np.random.randint(3, 7, len(idx))
+                for segment in np.unique(segments):
+                    sub_idx = idx[segments == segment]
+                    pixels[sub_idx] = tia_batch(
+                        pixels[sub_idx], segment, widths[sub_idx]
+                    )
+            pixels[idx] = tia_perspective_batch(pixels[idx], widths[idx])
+
+        # bda
+        idx = self._draw(self.crop_prob, large)
+        if len(idx) > 0:
+            pixels[idx] = self._crop(pixels[idx])
+
+        idx = self._draw(self.blur_prob, every)
+        if len(idx) > 0:
+            pixels[idx] = self._blur(pixels[idx])
+
+        idx = self._draw(self.hsv_aug_prob, every)
+        if len(idx) > 0:
+            # the brightness of hsv_aug, which scales V of HSV
+            delta = (
+                0.001 * np.random.rand(len(idx)) * np.random.choice([-1, 1], len(idx))
+            )
+            pixels[idx] = np.minimum(
+                pixels[idx] * (1 + delta[:, None, None, None]), 255
+            )
+
+        idx = self._draw(self.jitter_prob, (widths > 10) & (h > 10))
+        for i in idx:
+            pixels[i, :, : widths[i]] = self._jitter(pixels[i, :, : widths[i]])
+
+        idx = self._draw(self.noise_prob, every)
+        if len(idx) > 0:
+            # add_gasuss_noise, drawn in float32 by a generator seeded from
+            # np.random, which is seeded in every worker
+            rng = np.random.default_rng(np.random.randint(2**31))
+            noisy = rng.standard_normal(pixels[idx].shape, dtype=np.float32)
+            noisy *= 0.5 * 0.1**0.5
+            noisy += pixels[idx]
+            pixels[idx] = np.clip(noisy, 0, 255, out=noisy)
+
+        idx = self._draw(self.reverse_prob, every)
+        if len(idx) > 0:
+            pixels[idx] = 255 - pixels[idx]
+
+        out = (pixels * self.scale - self.mean) / self.std
+        out = out.transpose(0, 3, 1, 2).astype(imgs.dtype)
+        for i in np.nonzero(widths < w)[0]:
+            out[i, :, :, widths[i] :] = imgs[i, :, :, widths[i] :]
+        return out
+
+    @staticmethod
+    def _draw(prob, valid):
+        """the indexes of the valid images drawn with prob"""
+        return np.nonzero((np.random.rand(len(valid)) <= prob) & valid)[0]
+
+    def _crop(self, pixels):
+        """get_crop and the resize back to H, along the rows"""
+        num, h = pixels.shape[:2]
+        top_crop = np.minimum(np.random.randint(1, 9, num), h - 1)
+        from_top = np.random.randint(0, 2, num)
+        # the rows of cv2.resize from h - top_crop to h rows
+        rows = (np.arange(h) + 0.5) * ((h - top_crop) / h)[:, None] - 0.5
+        rows = np.clip(rows, 0, (h - top_crop - 1)[:, None])
+        rows += (from_top * top_crop)[:, None]
+        row0 = np.floor(rows).astype(np.int64)
+        row1 = np.minimum(row0 + 1, h - 1)
+        frac = (rows - row0).astype(np.float32)[:, :, None, None]
+        batch_idx = np.arange(num)[:, None]
+        return pixels[batch_idx, row0] * (1 - frac) + pixels[batch_idx, row1] * frac
+
+    def _blur(self, pixels):
+        """GaussianBlur by sepFilter2D, on the images stacked along y"""
+        num, h, w = pixels.shape[:3]
+        pad = len(self.fil) // 2
+        # the rows reflected at the top and bottom of every image
+        padded = np.pad(pixels, [(0, 0), (pad, pad), (0, 0), (0, 0)], mode="reflect")
+        padded = padded.reshape((num * (h + 2 * pad), w) + pixels.shape[3:])
+        blurred = cv2.sepFilter2D(padded, -1, self.fil, self.fil)
+        blurred = blurred.reshape((num, h + 2 * pad) + pixels.shape[2:])
+        return blurred[:, pad : h + pad]
+
+    @staticmethod
+    def _jitter(img):
+        """jitter of an image [H, W, C]"""
+        h, w = img.shape[:2]
+        s = int(random.random() * min(w, h) * 0.01)
+        if s <= 1:
+            return img
+        # the pixel (y, x) is moved from (y - m, x - m) by the copies of jitter
+        ys, xs = np.meshgrid(np.arange(h), np.arange(w), indexing="ij")
+        shift = np.minimum(np.minimum(ys, xs), s - 1)
+        return img[ys - shift, xs - shift]
+
+
 class ABINetRecAug(object):
     def __init__(
         self, geometry_p=0.5, deterioration_p=0.25, colorjitter_p=0.25, **kwargs
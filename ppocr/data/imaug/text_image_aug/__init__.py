@@ -12,6 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from .augment import tia_perspective, tia_distort, tia_stretch
+from .augment import (
+    tia_perspective,
+    tia_distort,
+    tia_stretch,
+    tia_perspective_batch,
+    tia_distort_batch,
+    tia_stretch_batch,
+)
 
-__all__ = ["tia_distort", "tia_stretch", "tia_perspective"]
+__all__ = [
+    "tia_distort",
+    "tia_stretch",
+    "tia_perspective",
+    "tia_distort_batch",
+    "tia_stretch_batch",
+    "tia_perspective_batch",
+]
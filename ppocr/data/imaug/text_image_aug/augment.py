@@ -17,7 +17,7 @@ https://github.com/RubanSeven/Text-Image-Augmentation-python/blob/master/augment
 """
 
 import numpy as np
-from .warp_mls import WarpMLS
+from .warp_mls import WarpMLS, warp_mls_batch
 
 
 def tia_distort(src, segment=4):
@@ -121,3 +121,98 @@ def tia_perspective(src):
     dst = trans.generate()
 
     return dst
+
+
+def _batch_widths(src, widths):
+    if widths is None:
+        widths = np.full(src.shape[0], src.shape[2])
+    return np.asarray(widths, dtype=np.int64)
+
+
+def _batch_pts(xs, ys, batch_size):
+    """[B, K, 2] points from the lists of K x and K y, each a scalar or [B]"""
+    xs = [np.broadcast_to(x, (batch_size,)) for x in xs]
+    ys = [np.broadcast_to(y, (batch_size,)) for y in ys]
+    return np.stack([np.stack(xs, axis=-1), np.stack(ys, axis=-1)], axis=-1)
+
+
+def tia_distort_batch(src, segment=4, widths=None):
+    """
+    tia_distort of a batch of images [B, H, W, C], which are padded on the
+    right from widths, with the control points drawn for every image.
+    """
+    batch_size, img_h = src.shape[:2]
+    img_w = _batch_widths(src, widths)
+
+    cut = img_w // segment
+    thresh = np.maximum(cut // 3, 1)
+
+    def rand():
+        return np.random.randint(0, thresh)
+
+    src_xs = [0, img_w, img_w, 0]
+    src_ys = [0, 0, img_h, img_h]
+    dst_xs = [rand(), img_w - rand(), img_w - rand(), rand()]
+    dst_ys = [rand(), rand(), img_h - rand(), img_h - rand()]
+
+    half_thresh = thresh * 0.5
+
+    for cut_idx in np.arange(1, segment, 1):
+        src_xs += [cut * cut_idx, cut * cut_idx]
+        src_ys += [0, img_h]
+        dst_xs += [
+            cut * cut_idx + rand() - half_thresh,
+            cut * cut_idx + rand() - half_thresh,
+        ]
+        dst_ys += [rand() - half_thresh, img_h + rand() - half_thresh]
+
+    src_pts = _batch_pts(src_xs, src_ys, batch_size)
+    dst_pts = _batch_pts(dst_xs, dst_ys, batch_size)
+    return warp_mls_batch(src, src_pts, dst_pts, img_w)
+
+
+def tia_stretch_batch(src, segment=4, widths=None):
+    """tia_stretch of a batch of images, as tia_distort_batch"""
+    batch_size, img_h = src.shape[:2]
+    img_w = _batch_widths(src, widths)
+
+    cut = img_w // segment
+    thresh = np.maximum(cut * 4 // 5, 1)
+
+    src_xs = [0, img_w, img_w, 0]
+    src_ys = [0, 0, img_h, img_h]
+    dst_xs = [0, img_w, img_w, 0]
+    dst_ys = [0, 0, img_h, img_h]
+
+    half_thresh = thresh * 0.5
+
+    for cut_idx in np.arange(1, segment, 1):
+        move = np.random.randint(0, thresh) - half_thresh
+        src_xs += [cut * cut_idx, cut * cut_idx]
+        src_ys += [0, img_h]
+        dst_xs += [cut * cut_idx + move, cut * cut_idx + move]
+        dst_ys += [0, img_h]
+
+    src_pts = _batch_pts(src_xs, src_ys, batch_size)
+    dst_pts = _batch_pts(dst_xs, dst_ys, batch_size)
+    return warp_mls_batch(src, src_pts, dst_pts, img_w)
+
+
+def tia_perspective_batch(src, widths=None):
+    """tia_perspective of a batch of images, as tia_distort_batch"""
+    batch_size, img_h = src.shape[:2]
+    img_w = _batch_widths(src, widths)
+
+    thresh = max(img_h // 2, 1)
+
+    def rand():
+        return np.random.randint(0, thresh, batch_size)
+
+    src_xs = [0, img_w, img_w, 0]
+    src_ys = [0, 0, img_h, img_h]
+    dst_xs = [0, img_w, img_w, 0]
+    dst_ys = [rand(), rand(), img_h - rand(), img_h - rand()]
+
+    src_pts = _batch_pts(src_xs, src_ys, batch_size)
+    dst_pts = _batch_pts(dst_xs, dst_ys, batch_size)
+    return warp_mls_batch(src, src_pts, dst_pts, img_w)
@@ -16,9 +16,91 @@ This code is refer from:
 https://github.com/RubanSeven/Text-Image-Augmentation-python/blob/master/warp_mls.py
 """
 
+import cv2
 import numpy as np
 
 
+def mls_points(points, src_pts, dst_pts):
+    """
+    Map points with the similarity moving least squares deformation, which
+    moves dst_pts to src_pts, as computed by WarpMLS for the grid nodes.
+
+    Args:
+        points: [..., N, 2] points (x, y).
+        src_pts, dst_pts: [..., K, 2] control points, the leading dims are
+            broadcast with points.
+    Returns:
+        [..., N, 2] mapped points.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    src_pts = np.asarray(src_pts, dtype=np.float64)
+    dst_pts = np.asarray(dst_pts, dtype=np.float64)
+    # [..., N, K, 2]
+    diff = points[..., :, None, :] - dst_pts[..., None, :, :]
+    square_dist = np.square(diff).sum(axis=-1)
+    coincide = square_dist == 0
+    with np.errstate(divide="ignore"):
+        w = np.where(coincide, 0.0, 1.0 / square_dist)
+    sw = w.sum(axis=-1, keepdims=True)
+    pstar = (w[..., None] * dst_pts[..., None, :, :]).sum(axis=-2) / sw
+    qstar = (w[..., None] * src_pts[..., None, :, :]).sum(axis=-2) / sw
+
+    pt_i = dst_pts[..., None, :, :] - pstar[..., None, :]
+    miu_s = (w * np.square(pt_i).sum(axis=-1)).sum(axis=-1, keepdims=True)
+    cur_pt = (points - pstar)[..., None, :]
+    # <pt_i, cur_pt>, <pt_j, cur_pt> and <pt_i, cur_pt_j> with the rotated
+    # vectors pt_j = (-pt_i.y, pt_i.x) and cur_pt_j = (-cur_pt.y, cur_pt.x)
+    dot = (pt_i * cur_pt).sum(axis=-1)
+    cross = pt_i[..., 0] * cur_pt[..., 1] - pt_i[..., 1] * cur_pt[..., 0]
+    src_x = src_pts[..., None, :, 0]
+    src_y = src_pts[..., None, :, 1]
+    weight = w / miu_s
+    new_pts = np.stack(
+        [
+            (weight * (dot * src_x - cross * src_y)).sum(axis=-1),
+            (weight * (cross * src_x + dot * src_y)).sum(axis=-1),
+        ],
+        axis=-1,
+    )
+    new_pts += qstar
+
+    # a point on a control point is mapped to it, but for the last control
+    # point, which is left out of the sum like WarpMLS
+    coincide[..., -1] = False
+    on_pt = coincide.any(axis=-1)
+    if on_pt.any():
+        src_pts = np.broadcast_to(src_pts[..., None, :, :], coincide.shape + (2,))
+        first = coincide.argmax(axis=-1)[..., None, None]
+        new_pts = np.where(
+            on_pt[..., None],
+            np.take_along_axis(src_pts, first, axis=-2)[..., 0, :],
+            new_pts,
+        )
+    return new_pts
+
+
+def grid_nodes(size, grid_size):
+    """The grid nodes of WarpMLS along an axis of size, ending with size - 1"""
+    return np.append(np.arange(0, size, grid_size), size - 1)
+
+
+def grid_cells(size, grid_size):
+    """
+    The cell of every pixel along an axis, as the index of its first grid node
+    in grid_nodes(size, grid_size) and the offset in the cell, both [size].
+    """
+    pixels = np.arange(size)
+    cell = pixels // grid_size
+    start = cell * grid_size
+    # the last cell ends at size - 1, which is not a step of the grid
+    length = np.where(start + grid_size >= size, size - start, grid_size)
+    return cell, (pixels - start) / length
+
+
+def bilinear_interp(x, y, v11, v12, v21, v22):
+    return (v11 * (1 - y) + v12 * y) * (1 - x) + (v21 * (1 - y) + v22 * y) * x
+
+
 class WarpMLS:
     def __init__(self, src, src_pts, dst_pts, dst_w, dst_h, trans_ratio=1.0):
         self.src = src
@@ -32,156 +114,141 @@ class WarpMLS:
         self.rdx = np.zeros((self.dst_h, self.dst_w))
         self.rdy = np.zeros((self.dst_h, self.dst_w))
 
-    @staticmethod
-    def __bilinear_interp(x, y, v11, v12, v21, v22):
-        return (v11 * (1 - y) + v12 * y) * (1 - x) + (v21 * (1 - y) + v22 * y) * x
-
     def generate(self):
         self.calc_delta()
         return self.gen_img()
 
     def calc_delta(self):
-        w = np.zeros(self.pt_count, dtype=np.float32)
-
         if self.pt_count < 2:
             return
 
-        i = 0
-        while 1:
-            if self.dst_w <= i < self.dst_w + self.grid_size - 1:
-                i = self.dst_w - 1
-            elif i >= self.dst_w:
-                break
-
-            j = 0
-            while 1:
-                if self.dst_h <= j < self.dst_h + self.grid_size - 1:
-                    j = self.dst_h - 1
-                elif j >= self.dst_h:
-                    break
-
-                sw = 0
-                swp = np.zeros(2, dtype=np.float32)
-                swq = np.zeros(2, dtype=np.float32)
-                new_pt = np.zeros(2, dtype=np.float32)
-                cur_pt = np.array([i, j], dtype=np.float32)
-
-                k = 0
-                for k in range(self.pt_count):
-                    if i == self.dst_pts[k][0] and j == self.dst_pts[k][1]:
-                        break
-
-                    w[k] = 1.0 / (
-                        (i - self.dst_pts[k][0]) * (i - self.dst_pts[k][0])
-                        + (j - self.dst_pts[k][1]) * (j - self.dst_pts[k][1])
-                    )
-
-                    sw += w[k]
-                    swp = swp + w[k] * np.array(self.dst_pts[k])
-                    swq = swq + w[k] * np.array(self.src_pts[k])
-
-                if k == self.pt_count - 1:
-                    pstar = 1 / sw * swp
-                    qstar = 1 / sw * swq
-
-                    miu_s = 0
-                    for k in range(self.pt_count):
-                        if i == self.dst_pts[k][0] and j == self.dst_pts[k][1]:
-                            continue
-                        pt_i = self.dst_pts[k] - pstar
-                        miu_s += w[k] * np.sum(pt_i * pt_i)
-
-                    cur_pt -= pstar
-                    cur_pt_j = np.array([-cur_pt[1], cur_pt[0]])
-
-                    for k in range(self.pt_count):
-                        if i == self.dst_pts[k][0] and j == self.dst_pts[k][1]:
-                            continue
-
-                        pt_i = self.dst_pts[k] - pstar
-                        pt_j = np.array([-pt_i[1], pt_i[0]])
-
-                        tmp_pt = np.zeros(2, dtype=np.float32)
-                        tmp_pt[0] = (
-                            np.sum(pt_i * cur_pt) * self.src_pts[k][0]
-                            - np.sum(pt_j * cur_pt) * self.src_pts[k][1]
-                        )
-                        tmp_pt[1] = (
-                            -np.sum(pt_i * cur_pt_j) * self.src_pts[k][0]
-                            + np.sum(pt_j * cur_pt_j) * self.src_pts[k][1]
-                        )
-                        tmp_pt *= w[k] / miu_s
-                        new_pt += tmp_pt
-
-                    new_pt += qstar
-                else:
-                    new_pt = self.src_pts[k]
-
-                self.rdx[j, i] = new_pt[0] - i
-                self.rdy[j, i] = new_pt[1] - j
-
-                j += self.grid_size
-            i += self.grid_size
+        xs = grid_nodes(self.dst_w, self.grid_size)
+        ys = grid_nodes(self.dst_h, self.grid_size)
+        nodes = np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2)
+        delta = mls_points(nodes, self.src_pts, self.dst_pts) - nodes
+        delta = delta.reshape(len(ys), len(xs), 2)
+        self.rdx[ys[:, None], xs] = delta[..., 0]
+        self.rdy[ys[:, None], xs] = delta[..., 1]
 
     def gen_img(self):
         src_h, src_w = self.src.shape[:2]
-        dst = np.zeros_like(self.src, dtype=np.float32)
-
-        for i in np.arange(0, self.dst_h, self.grid_size):
-            for j in np.arange(0, self.dst_w, self.grid_size):
-                ni = i + self.grid_size
-                nj = j + self.grid_size
-                w = h = self.grid_size
-                if ni >= self.dst_h:
-                    ni = self.dst_h - 1
-                    h = ni - i + 1
-                if nj >= self.dst_w:
-                    nj = self.dst_w - 1
-                    w = nj - j + 1
-
-                di = np.reshape(np.arange(h), (-1, 1))
-                dj = np.reshape(np.arange(w), (1, -1))
-                delta_x = self.__bilinear_interp(
-                    di / h,
-                    dj / w,
-                    self.rdx[i, j],
-                    self.rdx[i, nj],
-                    self.rdx[ni, j],
-                    self.rdx[ni, nj],
-                )
-                delta_y = self.__bilinear_interp(
-                    di / h,
-                    dj / w,
-                    self.rdy[i, j],
-                    self.rdy[i, nj],
-                    self.rdy[ni, j],
-                    self.rdy[ni, nj],
-                )
-                nx = j + dj + delta_x * self.trans_ratio
-                ny = i + di + delta_y * self.trans_ratio
-                nx = np.clip(nx, 0, src_w - 1)
-                ny = np.clip(ny, 0, src_h - 1)
-                nxi = np.array(np.floor(nx), dtype=np.int32)
-                nyi = np.array(np.floor(ny), dtype=np.int32)
-                nxi1 = np.array(np.ceil(nx), dtype=np.int32)
-                nyi1 = np.array(np.ceil(ny), dtype=np.int32)
-
-                if len(self.src.shape) == 3:
-                    x = np.tile(np.expand_dims(ny - nyi, axis=-1), (1, 1, 3))
-                    y = np.tile(np.expand_dims(nx - nxi, axis=-1), (1, 1, 3))
-                else:
-                    x = ny - nyi
-                    y = nx - nxi
-                dst[i : i + h, j : j + w] = self.__bilinear_interp(
-                    x,
-                    y,
-                    self.src[nyi, nxi],
-                    self.src[nyi, nxi1],
-                    self.src[nyi1, nxi],
-                    self.src[nyi1, nxi1],
-                )
+        xs = grid_nodes(self.dst_w, self.grid_size)
+        ys = grid_nodes(self.dst_h, self.grid_size)
+        col_cell, col_offset = grid_cells(self.dst_w, self.grid_size)
+        row_cell, row_offset = grid_cells(self.dst_h, self.grid_size)
+        j, nj = xs[col_cell], xs[col_cell + 1]
+        i, ni = ys[row_cell][:, None], ys[row_cell + 1][:, None]
+        di = row_offset[:, None]
+        dj = col_offset[None, :]
+
+        delta_x = bilinear_interp(
+            di, dj, self.rdx[i, j], self.rdx[i, nj], self.rdx[ni, j], self.rdx[ni, nj]
+        )
+        delta_y = bilinear_interp(
+            di, dj, self.rdy[i, j], self.rdy[i, nj], self.rdy[ni, j], self.rdy[ni, nj]
+        )
+        nx = np.arange(self.dst_w) + delta_x * self.trans_ratio
+        ny = np.arange(self.dst_h)[:, None] + delta_y * self.trans_ratio
+        nx = np.clip(nx, 0, src_w - 1)
+        ny = np.clip(ny, 0, src_h - 1)
+        nxi = np.floor(nx).astype(np.int32)
+        nyi = np.floor(ny).astype(np.int32)
+        nxi1 = np.ceil(nx).astype(np.int32)
+        nyi1 = np.ceil(ny).astype(np.int32)
+
+        x = ny - nyi
+        y = nx - nxi
+        if self.src.ndim == 3:
+            x = x[..., None]
+            y = y[..., None]
+        dst = bilinear_interp(
+            x,
+            y,
+            self.src[nyi, nxi],
+            self.src[nyi, nxi1],
+            self.src[nyi1, nxi],
+            self.src[nyi1, nxi1],
+        ).astype(np.float32)
 
         dst = np.clip(dst, 0, 255)
         dst = np.array(dst, dtype=np.uint8)
 
         return dst
+
+
+def warp_mls_batch(src, src_pts, dst_pts, widths=None, trans_ratio=1.0, grid_size=100):
+    """
+    WarpMLS of a batch of images, with the grid nodes and the remapping of all
+    images computed at once.
+
+    Args:
+        src: [B, H, W] or [B, H, W, C] images, float or uint8.
+        src_pts, dst_pts: [B, K, 2] control points of every image.
+        widths: [B] widths of the images in src, which are padded on the right
+            to W. The padding is kept. None for W.
+        trans_ratio, grid_size: as WarpMLS.
+    Returns:
+        the warped images, float32 of the shape of src.
+    """
+    batch_size, height, width = src.shape[:3]
+    if widths is None:
+        widths = np.full(batch_size, width)
+    widths = np.asarray(widths, dtype=np.int64)[:, None]
+
+    # the nodes along x of every image, padded with its last node
+    num_x = (width - 1) // grid_size + 2
+    xs = np.arange(num_x) * grid_size
+    xs = np.where(xs < widths, xs, widths - 1)
+    ys = grid_nodes(height, grid_size)
+    nodes = np.stack(np.broadcast_arrays(xs[:, None, :], ys[None, :, None]), -1)
+    nodes = nodes.reshape(batch_size, -1, 2)
+    delta = mls_points(nodes, src_pts, dst_pts) - nodes
+    # [2, B, num_y, num_x] deltas along x and y
+    delta = delta.reshape(batch_size, len(ys), num_x, 2).transpose(3, 0, 1, 2)
+    delta = (delta * trans_ratio).astype(np.float32)
+
+    # the cells along x depend on the width of every image
+    pixels = np.arange(width)
+    col_cell = np.minimum(pixels // grid_size, num_x - 2)
+    start = col_cell * grid_size
+    length = np.where(start + grid_size >= widths, widths - start, grid_size)
+    # the padding is not warped
+    col_offset = (pixels - start) / np.maximum(length, 1)
+    col_offset = col_offset.astype(np.float32)[:, None, :]
+    _, row_offset = grid_cells(height, grid_size)
+    row_offset = row_offset.astype(np.float32)[:, None]
+    # the bilinear interpolation of the deltas, along x on the rows of nodes
+    # and then along y to [2, B, H, W]
+    delta = (
+        delta[..., col_cell] * (1 - col_offset) + delta[..., col_cell + 1] * col_offset
+    )
+    maps = np.empty((2, batch_size, height, width), dtype=np.float32)
+    for cell in range(len(ys) - 1):
+        rows = slice(cell * grid_size, (cell + 1) * grid_size)
+        top = delta[:, :, cell, None]
+        np.multiply(
+            delta[:, :, cell + 1, None] - top, row_offset[rows], maps[:, :, rows]
+        )
+        maps[:, :, rows] += top
+
+    map_x, map_y = maps
+    map_x += pixels
+    np.maximum(map_x, 0, out=map_x)
+    np.minimum(map_x, widths[:, None] - 1, out=map_x)
+    map_y += np.arange(height)[:, None]
+    np.maximum(map_y, 0, out=map_y)
+    np.minimum(map_y, height - 1, out=map_y)
+    # remap the images stacked along y at once, no pixel is sampled out of
+    # its image as the coordinates are clipped
+    map_y += (np.arange(batch_size) * height)[:, None, None]
+    stacked_shape = (batch_size * height, width)
+    dst = cv2.remap(
+        np.ascontiguousarray(src.reshape(stacked_shape + src.shape[3:]), np.float32),
+        map_x.reshape(stacked_shape),
+        map_y.reshape(stacked_shape),
+        cv2.INTER_LINEAR,
+    ).reshape(src.shape)
+
+    for idx in np.nonzero(widths[:, 0] < width)[0]:
+        dst[idx, :, widths[idx, 0] :] = src[idx, :, widths[idx, 0] :]
+    return dst
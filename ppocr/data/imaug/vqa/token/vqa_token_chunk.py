@@ -14,11 +14,30 @@
 
 from collections import defaultdict
 
+import numpy as np
+
+from .vqa_token_pad import VQATokenPad
+
 
 class VQASerTokenChunk(object):
-    def __init__(self, max_seq_len=512, infer_mode=False, **kwargs):
+    """
+    The first chunk of max_seq_len tokens, or with return_all_chunks all the
+    chunks padded to max_seq_len and stacked [num_chunks, max_seq_len, ...],
+    so the tokens of a long document run in one batch.
+    """
+
+    def __init__(
+        self, max_seq_len=512, infer_mode=False, return_all_chunks=False, **kwargs
+    ):
         self.max_seq_len = max_seq_len
         self.infer_mode = infer_mode
+        self.return_all_chunks = return_all_chunks
+        if return_all_chunks:
+            self.pad = VQATokenPad(
+                max_seq_len=max_seq_len,
+                return_attention_mask=True,
+                infer_mode=infer_mode,
+            )
 
     def __call__(self, data):
         encoded_inputs_all = []
@@ -46,8 +65,25 @@ class VQASerTokenChunk(object):
             encoded_inputs_all.append(encoded_inputs_example)
         if len(encoded_inputs_all) == 0:
             return None
+        if self.return_all_chunks:
+            return self.stack_chunks(data, encoded_inputs_all)
         return encoded_inputs_all[0]
 
+    def stack_chunks(self, data, encoded_inputs_all):
+        chunks = [self.pad(chunk) for chunk in encoded_inputs_all]
+        data = dict(data)
+        data.pop("tokenizer_params", None)
+        for key in chunks[0]:
+            if isinstance(chunks[0][key], np.ndarray) and key in [
+                "input_ids",
+                "labels",
+                "token_type_ids",
+                "bbox",
+                "attention_mask",
+            ]:
+                data[key] = np.stack([chunk[key] for chunk in chunks])
+        return data
+
 
 class VQAReTokenChunk(object):
     def __init__(
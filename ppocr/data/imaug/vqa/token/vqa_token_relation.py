@@ -13,6 +13,9 @@
 # limitations under the License.
 
 
+import numpy as np
+
+
 class VQAReTokenRelation(object):
     def __init__(self, **kwargs):
         pass
@@ -27,45 +30,44 @@ class VQAReTokenRelation(object):
         empty_entity = data.pop("empty_entity")
         entity_id_to_index_map = data.pop("entity_id_to_index_map")
 
-        relations = list(set(relations))
-        relations = [
-            rel
-            for rel in relations
-            if rel[0] not in empty_entity and rel[1] not in empty_entity
-        ]
-        kv_relations = []
-        for rel in relations:
-            pair = [id2label[rel[0]], id2label[rel[1]]]
-            if pair == ["question", "answer"]:
-                kv_relations.append(
-                    {
-                        "head": entity_id_to_index_map[rel[0]],
-                        "tail": entity_id_to_index_map[rel[1]],
-                    }
-                )
-            elif pair == ["answer", "question"]:
-                kv_relations.append(
-                    {
-                        "head": entity_id_to_index_map[rel[1]],
-                        "tail": entity_id_to_index_map[rel[0]],
-                    }
-                )
-            else:
-                continue
-        relations = sorted(
-            [
-                {
-                    "head": rel["head"],
-                    "tail": rel["tail"],
-                    "start_index": self.get_relation_span(rel, entities)[0],
-                    "end_index": self.get_relation_span(rel, entities)[1],
-                }
-                for rel in kv_relations
-            ],
-            key=lambda x: x["head"],
-        )
+        # the unique links, without the empty entities
+        relations = np.array(relations, dtype=np.int64).reshape(-1, 2)
+        relations = np.unique(relations, axis=0)
+        relations = relations[
+            ~np.isin(relations, list(empty_entity)).any(axis=1)
+        ].reshape(-1, 2)
+        pairs = np.array(
+            [[id2label[a], id2label[b]] for a, b in relations.tolist()],
+            dtype=object,
+        ).reshape(-1, 2)
+        qa = (pairs[:, 0] == "question") & (pairs[:, 1] == "answer")
+        aq = (pairs[:, 0] == "answer") & (pairs[:, 1] == "question")
+        # the question is the head of the relation
+        relations = np.concatenate([relations[qa], relations[aq][:, ::-1]])
+        index = np.array(
+            [entity_id_to_index_map[i] for i in relations.ravel().tolist()],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        index = index[np.argsort(index[:, 0], kind="stable")]
 
-        data["relations"] = relations
+        # the span of the tokens of the head and the tail
+        starts = np.array([entity["start"] for entity in entities], dtype=np.int64)
+        ends = np.array([entity["end"] for entity in entities], dtype=np.int64)
+        bounds = np.concatenate([starts[index], ends[index]], axis=1)
+        data["relations"] = [
+            {
+                "head": head,
+                "tail": tail,
+                "start_index": start_index,
+                "end_index": end_index,
+            }
+            for head, tail, start_index, end_index in zip(
+                index[:, 0].tolist(),
+                index[:, 1].tolist(),
+                bounds.min(axis=1).tolist(),
+                bounds.max(axis=1).tolist(),
+            )
+        ]
         return data
 
     def get_relation_span(self, rel, entities):
@@ -0,0 +1,93 @@
+# copyright (c) 2024 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+
+import numpy as np
+from paddle.io import DistributedBatchSampler
+
+
+class ResampleBatchSampler(DistributedBatchSampler):
+    """
+    Distributed batch sampler of a dataset with ratio_list < 1, which draws a
+    new subset of the samples of every data source in each epoch.
+
+    The dataset keeps all samples and provides get_epoch_indexes(seed), so the
+    dataset and the workers of the dataloader are kept across epochs. The
+    batches of the epoch resampled with seed are the same as the batches of
+    the dataset and sampler built again with seed, as done before by
+    tools/program.py.
+
+    Args:
+        dataset: dataset built with resample_by_sampler.
+        batch_size, shuffle, drop_last: as DistributedBatchSampler.
+        seed: the seed of the first epoch.
+    """
+
+    def __init__(self, dataset, batch_size, shuffle=False, drop_last=False, seed=None):
+        super(ResampleBatchSampler, self).__init__(
+            dataset=dataset, batch_size=batch_size, shuffle=shuffle, drop_last=drop_last
+        )
+        self.data_source = dataset
+        self.resample(seed)
+
+    def resample(self, seed):
+        """Draw the samples of the next epoch"""
+        self.epoch_indexes = self.data_source.get_epoch_indexes(seed)
+        self.num_samples = int(math.ceil(len(self.epoch_indexes) * 1.0 / self.nranks))
+        self.total_size = self.num_samples * self.nranks
+        # the order of a rebuilt sampler
+        self.epoch = 0
+
+    def __iter__(self):
+        # same as DistributedBatchSampler, on the samples of the epoch
+        local_batch_size = self.batch_size * self._acc_steps
+        indices = list(self.epoch_indexes)
+        padding_size = self.total_size - len(indices)
+        if padding_size <= len(indices):
+            indices += indices[:padding_size]
+        else:
+            indices += (indices * math.ceil(padding_size / len(indices)))[:padding_size]
+        if self.shuffle:
+            np.random.RandomState(self.epoch).shuffle(indices)
+            self.epoch += 1
+
+        if self.nranks > 1:
+            last_batch_size = self.total_size % (self.batch_size * self.nranks)
+            last_local_batch_size = last_batch_size // self.nranks
+            local_indices = []
+            for i in range(
+                self.local_rank * self.batch_size,
+                len(indices) - last_batch_size,
+                self.batch_size * self.nranks,
+            ):
+                local_indices.extend(indices[i : i + self.batch_size])
+            last_indices = indices[len(indices) - last_batch_size :]
+            local_indices.extend(
+                last_indices[
+                    self.local_rank
+                    * last_local_batch_size : (self.local_rank + 1)
+                    * last_local_batch_size
+                ]
+            )
+            indices = local_indices
+
+        batch_indices = []
+        for idx in indices:
+            batch_indices.append(int(idx))
+            if len(batch_indices) == local_batch_size:
+                yield batch_indices
+                batch_indices = []
+        if not self.drop_last and len(batch_indices) > 0:
+            yield batch_indices
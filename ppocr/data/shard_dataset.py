@@ -0,0 +1,355 @@
+# copyright (c) 2024 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Packed shard format of training samples.
+
+A shard file is made of a header, the images and labels of the samples
+concatenated, and an index of the offsets and lengths of the image and the
+label of every sample, so that any sample is read with one slice of the
+memory-mapped file:
+
+    header: magic, version, flags, height, num_samples, index_offset
+    data:   image 0, label 0, image 1, label 1, ...
+    index:  (img_offset, img_len, label_offset, label_len) of every sample
+
+The images are stored encoded, as in the image files, or, with the
+SHARD_FLAG_DECODED_GRAY flag, decoded to grayscale and resized to a fixed
+height (for recognition), as raw uint8 pixels of shape (height, img_len // height).
+"""
+
+import os
+import mmap
+import glob
+import struct
+import traceback
+
+import cv2
+import numpy as np
+from paddle.io import Dataset
+
+from .imaug import transform, create_operators
+from .imaug.operators import DecodeImage
+
+SHARD_MAGIC = b"PPOCRSHD"
+SHARD_VERSION = 1
+SHARD_FLAG_DECODED_GRAY = 1
+# magic, version, flags, height of the decoded images, num_samples, index_offset
+SHARD_HEADER = struct.Struct("<8sIIIxxxxQQ")
+SHARD_INDEX_DTYPE = np.dtype(
+    [
+        ("img_offset", "<u8"),
+        ("img_len", "<u8"),
+        ("label_offset", "<u8"),
+        ("label_len", "<u8"),
+    ]
+)
+
+
+class ShardWriter(object):
+    """
+    Write samples to a shard file.
+
+    Args:
+        file_path: path of the shard file.
+        decode_height: if set, the images are decoded to grayscale and resized
+            to this height, keeping the aspect ratio, instead of stored encoded.
+    """
+
+    def __init__(self, file_path, decode_height=None):
+        self.file_path = file_path
+        self.decode_height = decode_height
+        self.file = open(file_path, "wb")
+        self.file.write(b"\0" * SHARD_HEADER.size)
+        self.index = []
+
+    def add(self, img, label):
+        """
+        Add a sample, img is the encoded image file content. Returns False if
+        the image can not be decoded.
+        """
+        if self.decode_height:
+            img = cv2.imdecode(np.frombuffer(img, dtype="uint8"), cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                return False
+            h, w = img.shape
+            resized_w = max(int(round(w * self.decode_height / float(h))), 1)
+            img = cv2.resize(img, (resized_w, self.decode_height)).tobytes()
+        label = label.encode("utf-8")
+        img_offset = self.file.tell()
+        self.file.write(img)
+        self.file.write(label)
+        self.index.append((img_offset, len(img), img_offset + len(img), len(label)))
+        return True
+
+    def close(self):
+        if self.file is None:
+            return
+        # align the index for the memory-mapped reads
+        self.file.write(b"\0" * (-self.file.tell() % SHARD_INDEX_DTYPE.itemsize))
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.index, dtype=SHARD_INDEX_DTYPE).tobytes())
+        flags = SHARD_FLAG_DECODED_GRAY if self.decode_height else 0
+        self.file.seek(0)
+        self.file.write(
+            SHARD_HEADER.pack(
+                SHARD_MAGIC,
+                SHARD_VERSION,
+                flags,
+                self.decode_height or 0,
+                len(self.index),
+                index_offset,
+            )
+        )
+        self.file.close()
+        self.file = None
+
+    def abort(self):
+        """Remove the partial shard file, which has no valid header or index"""
+        if self.file is None:
+            return
+        self.file.close()
+        self.file = None
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+class ShardFile(object):
+    """Memory-mapped reader of a shard file, the images are read without copy"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._open()
+
+    def _open(self):
+        with open(self.file_path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.flags, self.height, num_samples, index_offset = (
+            SHARD_HEADER.unpack_from(self.mm, 0)
+        )
+        assert (
+            magic == SHARD_MAGIC and version == SHARD_VERSION
+        ), "{} is not a shard file of version {}".format(self.file_path, SHARD_VERSION)
+        self.decoded = bool(self.flags & SHARD_FLAG_DECODED_GRAY)
+        self.index = np.frombuffer(
+            self.mm, dtype=SHARD_INDEX_DTYPE, count=num_samples, offset=index_offset
+        )
+
+    def __len__(self):
+        return len(self.index)
+
+    def get_label(self, idx):
+        label_offset, label_len = int(self.index[idx][2]), int(self.index[idx][3])
+        return self.mm[label_offset : label_offset + label_len].decode("utf-8")
+
+    def get_image(self, idx):
+        """
+        The encoded image as a memoryview of the file, or the decoded image as
+        a read-only array of shape (height, width) viewing the file.
+        """
+        img_offset, img_len = int(self.index[idx][0]), int(self.index[idx][1])
+        if self.decoded:
+            return np.frombuffer(
+                self.mm, dtype="uint8", count=img_len, offset=img_offset
+            ).reshape(self.height, -1)
+        return memoryview(self.mm)[img_offset : img_offset + img_len]
+
+    def __getstate__(self):
+        # the mapping is opened again in the worker processes
+        return {"file_path": self.file_path}
+
+    def __setstate__(self, state):
+        self.file_path = state["file_path"]
+        self._open()
+
+
+class ShardDataSet(Dataset):
+    """
+    Dataset of shard files, see ShardWriter and ppocr/utils/create_shard_dataset.py.
+
+    The shards are data_dir/*.shard, or the shard_file_list of the dataset
+    config, with ratio_list as for SimpleDataSet. If the images of the shards
+    are decoded, the DecodeImage op of the transforms is replaced by the
+    conversion of the grayscale images to 3 channels.
+    """
+
+    def __init__(self, config, mode, logger, seed=None, resample_by_sampler=False):
+        super(ShardDataSet, self).__init__()
+        self.logger = logger
+        self.mode = mode.lower()
+
+        global_config = config["Global"]
+        dataset_config = config[mode]["dataset"]
+        loader_config = config[mode]["loader"]
+
+        self.data_dir = dataset_config["data_dir"]
+        shard_file_list = dataset_config.get("shard_file_list")
+        if shard_file_list is None:
+            shard_file_list = sorted(glob.glob(os.path.join(self.data_dir, "*.shard")))
+        elif isinstance(shard_file_list, str):
+            shard_file_list = [shard_file_list]
+        assert len(shard_file_list) > 0, "no shard file found in {}".format(
+            self.data_dir
+        )
+        data_source_num = len(shard_file_list)
+        ratio_list = dataset_config.get("ratio_list", 1.0)
+        if isinstance(ratio_list, (float, int)):
+            ratio_list = [float(ratio_list)] * int(data_source_num)
+        assert (
+            len(ratio_list) == data_source_num
+        ), "The length of ratio_list should be the same as the file_list."
+        self.do_shuffle = loader_config["shuffle"]
+        self.seed = seed
+        self.ratio_list = ratio_list
+        self.need_reset = True in [x < 1 for x in ratio_list]
+        # all samples are kept, the samples of every epoch are drawn by
+        # ResampleBatchSampler with get_epoch_indexes
+        self.resample_by_sampler = self.need_reset and (
+            resample_by_sampler or dataset_config.get("resample_by_sampler", False)
+        )
+
+        logger.info("Initialize indexs of datasets:%s" % shard_file_list)
+        self.shards = [ShardFile(file_path) for file_path in shard_file_list]
+        self.decoded = self.shards[0].decoded
+        assert all(
+            shard.decoded == self.decoded for shard in self.shards
+        ), "decoded and encoded shards can not be mixed"
+        self.shard_begins = np.cumsum([0] + [len(shard) for shard in self.shards])
+        if self.resample_by_sampler:
+            self.data_idx_order_list = np.arange(self.shard_begins[-1], dtype="int64")
+        else:
+            self.data_idx_order_list = self.get_sample_indexes(ratio_list, self.seed)
+            if self.mode == "train" and self.do_shuffle:
+                self.shuffle_data_random()
+
+        self.ops = create_operators(dataset_config["transforms"], global_config)
+        self.ext_op_transform_idx = dataset_config.get("ext_op_transform_idx", 2)
+        self.decode_op = None
+        if self.decoded and isinstance(self.ops[0], DecodeImage):
+            self.decode_op = self.ops.pop(0)
+            self.ext_op_transform_idx -= 1
+
+    def get_sample_indexes(self, ratio_list, seed):
+        """Global indexes of the samples, the samples of a shard are drawn by its ratio"""
+        rng = np.random.RandomState(seed)
+        indexes = []
+        for shard_begin, shard, ratio in zip(
+            self.shard_begins, self.shards, ratio_list
+        ):
+            num = len(shard)
+            if ratio < 1.0:
+                shard_indexes = np.sort(
+                    rng.choice(num, int(round(num * ratio)), replace=False)
+                )
+            else:
+                shard_indexes = np.arange(num)
+            indexes.append(shard_indexes + shard_begin)
+        return np.concatenate(indexes).astype("int64")
+
+    def shuffle_data_random(self):
+        np.random.RandomState(self.seed).shuffle(self.data_idx_order_list)
+        return
+
+    def get_epoch_indexes(self, seed):
+        """
+        Indexes of the samples of an epoch, the same samples in the same order
+        as the dataset built with the seed.
+        """
+        indexes = self.get_sample_indexes(self.ratio_list, seed)
+        if self.do_shuffle:
+            np.random.RandomState(seed).shuffle(indexes)
+        return indexes
+
+    def get_sample(self, sample_idx):
+        shard_idx = (
+            int(np.searchsorted(self.shard_begins, sample_idx, side="right")) - 1
+        )
+        shard = self.shards[shard_idx]
+        sample_idx = sample_idx - self.shard_begins[shard_idx]
+        img = shard.get_image(sample_idx)
+        if self.decode_op is not None:
+            # the image of the img_mode of the DecodeImage op, the channels
+            # of a gray image are the same in RGB and BGR. The image is copied
+            # from the read-only mapping, so the transforms can write into it
+            if self.decode_op.img_mode == "GRAY":
+                img = img.copy()
+                if self.decode_op.channel_first:
+                    img = img[np.newaxis]
+            else:
+                img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+                if self.decode_op.channel_first:
+                    img = img.transpose((2, 0, 1))
+        data = {
+            "img_path": "{}:{}".format(shard.file_path, sample_idx),
+            "label": shard.get_label(sample_idx),
+            "image": img,
+        }
+        return data
+
+    def get_ext_data(self):
+        ext_data_num = 0
+        for op in self.ops:
+            if hasattr(op, "ext_data_num"):
+                ext_data_num = getattr(op, "ext_data_num")
+                break
+        load_data_ops = self.ops[: self.ext_op_transform_idx]
+        ext_data = []
+
+        while len(ext_data) < ext_data_num:
+            sample_idx = self.data_idx_order_list[np.random.randint(self.__len__())]
+            data = transform(self.get_sample(sample_idx), load_data_ops)
+            if data is None:
+                continue
+            if "polys" in data.keys():
+                if data["polys"].shape[1] != 4:
+                    continue
+            ext_data.append(data)
+        return ext_data
+
+    def __getitem__(self, idx):
+        sample_idx = self.data_idx_order_list[idx]
+        try:
+            data = self.get_sample(sample_idx)
+            data["ext_data"] = self.get_ext_data()
+            outs = transform(data, self.ops)
+        except:
+            self.logger.error(
+                "When parsing sample {}, error happened with msg: {}".format(
+                    sample_idx, traceback.format_exc()
+                )
+            )
+            outs = None
+        if outs is None:
+            # during evaluation, we should fix the idx to get same results for many times of evaluation.
+            rnd_idx = (
+                np.random.randint(self.__len__())
+                if self.mode == "train"
+                else (idx + 1) % self.__len__()
+            )
+            return self.__getitem__(rnd_idx)
+        return outs
+
+    def __len__(self):
+        return len(self.data_idx_order_list)
@@ -23,7 +23,7 @@ from .imaug import transform, create_operators
 
 
 class SimpleDataSet(Dataset):
-    def __init__(self, config, mode, logger, seed=None):
+    def __init__(self, config, mode, logger, seed=None, resample_by_sampler=False):
         super(SimpleDataSet, self).__init__()
         self.logger = logger
         self.mode = mode.lower()
@@ -34,6 +34,7 @@ class SimpleDataSet(Dataset):
 
         self.delimiter = dataset_config.get("delimiter", "\t")
         label_file_list = dataset_config.pop("label_file_list")
+        self.label_file_list = label_file_list
         data_source_num = len(label_file_list)
         ratio_list = dataset_config.get("ratio_list", 1.0)
         if isinstance(ratio_list, (float, int)):
@@ -45,28 +46,57 @@ class SimpleDataSet(Dataset):
         self.data_dir = dataset_config["data_dir"]
         self.do_shuffle = loader_config["shuffle"]
         self.seed = seed
+        self.ratio_list = ratio_list
+        self.need_reset = True in [x < 1 for x in ratio_list]
+        # all lines are kept, the samples of every epoch are drawn by
+        # ResampleBatchSampler with get_epoch_indexes
+        self.resample_by_sampler = self.need_reset and (
+            resample_by_sampler or dataset_config.get("resample_by_sampler", False)
+        )
         logger.info("Initialize indexs of datasets:%s" % label_file_list)
         self.data_lines = self.get_image_info_list(label_file_list, ratio_list)
         self.data_idx_order_list = list(range(len(self.data_lines)))
-        if self.mode == "train" and self.do_shuffle:
+        if self.mode == "train" and self.do_shuffle and not self.resample_by_sampler:
             self.shuffle_data_random()
         self.ops = create_operators(dataset_config["transforms"], global_config)
         self.ext_op_transform_idx = dataset_config.get("ext_op_transform_idx", 2)
-        self.need_reset = True in [x < 1 for x in ratio_list]
 
     def get_image_info_list(self, file_list, ratio_list):
         if isinstance(file_list, str):
             file_list = [file_list]
         data_lines = []
+        self.data_source_ranges = []
         for idx, file in enumerate(file_list):
             with open(file, "rb") as f:
                 lines = f.readlines()
-                if self.mode == "train" or ratio_list[idx] < 1.0:
+                if not self.resample_by_sampler and (
+                    self.mode == "train" or ratio_list[idx] < 1.0
+                ):
                     random.seed(self.seed)
                     lines = random.sample(lines, round(len(lines) * ratio_list[idx]))
+                self.data_source_ranges.append(
+                    (len(data_lines), len(data_lines) + len(lines))
+                )
                 data_lines.extend(lines)
         return data_lines
 
+    def get_epoch_indexes(self, seed):
+        """
+        Indexes of the samples of an epoch, the same samples in the same order
+        as the dataset built with the seed, see get_image_info_list and
+        shuffle_data_random.
+        """
+        indexes = []
+        for (begin, end), ratio in zip(self.data_source_ranges, self.ratio_list):
+            random.seed(seed)
+            indexes.extend(
+                random.sample(range(begin, end), round((end - begin) * ratio))
+            )
+        if self.do_shuffle:
+            random.seed(seed)
+            random.shuffle(indexes)
+        return indexes
+
     def shuffle_data_random(self):
         random.seed(self.seed)
         random.shuffle(self.data_lines)
@@ -156,8 +186,10 @@ class SimpleDataSet(Dataset):
 
 
 class MultiScaleDataSet(SimpleDataSet):
-    def __init__(self, config, mode, logger, seed=None):
-        super(MultiScaleDataSet, self).__init__(config, mode, logger, seed)
+    def __init__(self, config, mode, logger, seed=None, resample_by_sampler=False):
+        super(MultiScaleDataSet, self).__init__(
+            config, mode, logger, seed, resample_by_sampler
+        )
         self.ds_width = config[mode]["dataset"].get("ds_width", False)
         if self.ds_width:
             self.wh_aware()
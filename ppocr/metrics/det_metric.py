@@ -18,12 +18,54 @@ from __future__ import print_function
 
 __all__ = ["DetMetric", "DetFCEMetric"]
 
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+
 from .eval_det_iou import DetectionIoUEvaluator
 
 
-class DetMetric(object):
-    def __init__(self, main_indicator="hmean", **kwargs):
+class ImageEvaluator(object):
+    """
+    Evaluate the images with DetectionIoUEvaluator, in a pool of num_workers
+    processes if num_workers > 0, the results of a pool are futures. The pool
+    is shut down when the results are combined.
+    """
+
+    def __init__(self, num_workers=0):
         self.evaluator = DetectionIoUEvaluator()
+        self.num_workers = num_workers
+        self.pool = None
+
+    def evaluate_images(self, gts, preds):
+        if self.num_workers <= 0:
+            return self.evaluator.evaluate_images(gts, preds)
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                self.num_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.pool.submit(self.evaluator.evaluate_images, gts, preds)
+
+    def combine_results(self, results):
+        image_results = []
+        for result in results:
+            if isinstance(result, Future):
+                image_results.extend(result.result())
+            else:
+                image_results.extend(result)
+        return self.evaluator.combine_results(image_results)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __del__(self):
+        self.close()
+
+
+class DetMetric(object):
+    def __init__(self, main_indicator="hmean", num_workers=0, **kwargs):
+        self.evaluator = ImageEvaluator(num_workers)
         self.main_indicator = main_indicator
         self.reset()
 
@@ -39,6 +81,7 @@ class DetMetric(object):
         """
         gt_polyons_batch = batch[2]
         ignore_tags_batch = batch[3]
+        gt_info_lists, det_info_lists = [], []
         for pred, gt_polyons, ignore_tags in zip(
             preds, gt_polyons_batch, ignore_tags_batch
         ):
@@ -51,8 +94,11 @@ class DetMetric(object):
             det_info_list = [
                 {"points": det_polyon, "text": ""} for det_polyon in pred["points"]
             ]
-            result = self.evaluator.evaluate_image(gt_info_list, det_info_list)
-            self.results.append(result)
+            gt_info_lists.append(gt_info_list)
+            det_info_lists.append(det_info_list)
+        self.results.append(
+            self.evaluator.evaluate_images(gt_info_lists, det_info_lists)
+        )
 
     def get_metric(self):
         """
@@ -64,6 +110,7 @@ class DetMetric(object):
         """
 
         metrics = self.evaluator.combine_results(self.results)
+        self.evaluator.close()
         self.reset()
         return metrics
 
@@ -72,8 +119,8 @@ class DetMetric(object):
 
 
 class DetFCEMetric(object):
-    def __init__(self, main_indicator="hmean", **kwargs):
-        self.evaluator = DetectionIoUEvaluator()
+    def __init__(self, main_indicator="hmean", num_workers=0, **kwargs):
+        self.evaluator = ImageEvaluator(num_workers)
         self.main_indicator = main_indicator
         self.reset()
 
@@ -89,7 +136,8 @@ class DetFCEMetric(object):
         """
         gt_polyons_batch = batch[2]
         ignore_tags_batch = batch[3]
-
+        gt_info_lists = []
+        det_info_lists = {score_thr: [] for score_thr in self.results.keys()}
         for pred, gt_polyons, ignore_tags in zip(
             preds, gt_polyons_batch, ignore_tags_batch
         ):
@@ -104,14 +152,18 @@ class DetFCEMetric(object):
                 for det_polyon, score in zip(pred["points"], pred["scores"])
             ]
 
+            gt_info_lists.append(gt_info_list)
             for score_thr in self.results.keys():
                 det_info_list_thr = [
                     det_info
                     for det_info in det_info_list
                     if det_info["score"] >= score_thr
                 ]
-                result = self.evaluator.evaluate_image(gt_info_list, det_info_list_thr)
-                self.results[score_thr].append(result)
+                det_info_lists[score_thr].append(det_info_list_thr)
+        for score_thr in self.results.keys():
+            self.results[score_thr].append(
+                self.evaluator.evaluate_images(gt_info_lists, det_info_lists[score_thr])
+            )
 
     def get_metric(self):
         """
@@ -138,6 +190,7 @@ class DetFCEMetric(object):
             hmean = max(hmean, metric["hmean"])
         metrics["hmean"] = hmean
 
+        self.evaluator.close()
         self.reset()
         return metrics
 
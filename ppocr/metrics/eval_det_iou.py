@@ -4,17 +4,94 @@ from collections import namedtuple
 import numpy as np
 from shapely.geometry import Polygon
 
+from ppocr.utils.nms import convex_intersection_area, is_convex_quad
+
 """
 reference from :
 https://github.com/MhLiao/DB/blob/3c32b808d4412680310d3d28eeb6a2d5bf1566c5/concern/icdar2015_eval/detection/iou.py#L8
 """
 
 
+# the values within EPS of a constraint are computed again by shapely
+EPS = 1e-6
+
+
+class PolygonSet(object):
+    """The valid polygons of the gt or the det of an image"""
+
+    def __init__(self, points_list):
+        self.polygons = []
+        for points in points_list:
+            polygon = Polygon(points)
+            self.polygons.append(polygon if polygon.is_valid else None)
+        self.valid_idxs = [i for i, p in enumerate(self.polygons) if p is not None]
+        self.polygons = [self.polygons[i] for i in self.valid_idxs]
+        num = len(self.polygons)
+        self.bounds = np.array([p.bounds for p in self.polygons]).reshape(num, 4)
+        self.areas = np.array([p.area for p in self.polygons]).reshape(num)
+        self.quads = np.zeros((num, 4, 2))
+        self.is_quad = np.zeros(num, dtype=bool)
+        for i in range(num):
+            points = np.asarray(points_list[self.valid_idxs[i]], dtype=np.float64)
+            if points.shape == (4, 2):
+                self.quads[i] = points
+                self.is_quad[i] = True
+        self.is_quad[self.is_quad] = is_convex_quad(self.quads[self.is_quad])
+
+    def __len__(self):
+        return len(self.polygons)
+
+
 class DetectionIoUEvaluator(object):
     def __init__(self, iou_constraint=0.5, area_precision_constraint=0.5):
         self.iou_constraint = iou_constraint
         self.area_precision_constraint = area_precision_constraint
 
+    def exceeds(self, gt_pols, det_pols, gt_idxs, det_idxs, constraint, iou=True):
+        """
+        Whether the iou of the pairs (gt_idxs, det_idxs), or the intersection
+        over the det area if not iou, is above the constraint. The values are
+        bounded by the intersection of the bounding boxes, computed on the
+        convex quads, and computed by shapely as before only if they are
+        within EPS of the constraint.
+        """
+        result = np.zeros(len(gt_idxs), dtype=bool)
+        gt_bounds, det_bounds = gt_pols.bounds[gt_idxs], det_pols.bounds[det_idxs]
+        gt_areas, det_areas = gt_pols.areas[gt_idxs], det_pols.areas[det_idxs]
+        overlap = np.minimum(gt_bounds[:, 2:], det_bounds[:, 2:]) - np.maximum(
+            gt_bounds[:, :2], det_bounds[:, :2]
+        )
+        overlap = overlap.clip(0).prod(axis=1)
+        inter = np.minimum(overlap, np.minimum(gt_areas, det_areas))
+
+        def ratio(inter):
+            if iou:
+                return inter / (gt_areas + det_areas - inter)
+            return np.where(
+                det_areas > 0, inter / np.where(det_areas > 0, det_areas, 1), 0
+            )
+
+        # the upper bounds of the values
+        todo = (overlap > 0) & (ratio(inter) > constraint - EPS)
+        quads = todo & gt_pols.is_quad[gt_idxs] & det_pols.is_quad[det_idxs]
+        if quads.any():
+            inter[quads] = convex_intersection_area(
+                det_pols.quads[det_idxs[quads]], gt_pols.quads[gt_idxs[quads]]
+            )
+            values = ratio(inter)
+            result[quads] = values[quads] > constraint
+            todo[quads] = np.abs(values[quads] - constraint) <= EPS
+        for i in np.flatnonzero(todo):
+            pG = gt_pols.polygons[gt_idxs[i]]
+            pD = det_pols.polygons[det_idxs[i]]
+            if iou:
+                value = pD.intersection(pG).area / pD.union(pG).area
+            else:
+                value = pG.intersection(pD).area
+                value = 0 if pD.area == 0 else value / pD.area
+            result[i] = value > constraint
+        return result
+
     def evaluate_image(self, gt, pred):
         def get_union(pD, pG):
             return Polygon(pD).union(Polygon(pG)).area
@@ -190,12 +267,76 @@ class DetectionIoUEvaluator(object):
         numGlobalCareDet += numDetCare
 
         perSampleMetrics = {
+            "precision": precision,
+            "recall": recall,
+            "hmean": hmean,
+            "pairs": pairs,
+            "iouMat": [] if len(detPols) > 100 else iouMat.tolist(),
+            "gtPolPoints": gtPolPoints,
+            "detPolPoints": detPolPoints,
             "gtCare": numGtCare,
             "detCare": numDetCare,
+            "gtDontCare": gtDontCarePolsNum,
+            "detDontCare": detDontCarePolsNum,
             "detMatched": detMatched,
+            "evaluationLog": evaluationLog,
         }
         return perSampleMetrics
 
+    def count_matches(self, gt, pred):
+        """
+        The gtCare, detCare and detMatched counts of evaluate_image, which are
+        all combine_results needs, without the pairwise shapely computations.
+        """
+        gt_pols = PolygonSet([g["points"] for g in gt])
+        det_pols = PolygonSet([p["points"] for p in pred])
+        gt_care = np.array(
+            [not gt[i]["ignore"] for i in gt_pols.valid_idxs], dtype=bool
+        ).reshape(-1)
+        det_care = np.ones(len(det_pols), dtype=bool)
+
+        # Detected Polygons matched with a don't Care GT
+        gt_idxs, det_idxs = np.nonzero(
+            np.ones((int((~gt_care).sum()), len(det_pols)), dtype=bool)
+        )
+        gt_idxs = np.flatnonzero(~gt_care)[gt_idxs]
+        dont_care = self.exceeds(
+            gt_pols,
+            det_pols,
+            gt_idxs,
+            det_idxs,
+            self.area_precision_constraint,
+            iou=False,
+        )
+        det_care[det_idxs[dont_care]] = False
+
+        # match the GT and the det in order
+        detMatched = 0
+        if len(gt_pols) > 0 and len(det_pols) > 0:
+            gt_idxs, det_idxs = np.nonzero(gt_care[:, None] & det_care[None, :])
+            match = np.zeros((len(gt_pols), len(det_pols)), dtype=bool)
+            match[gt_idxs, det_idxs] = self.exceeds(
+                gt_pols, det_pols, gt_idxs, det_idxs, self.iou_constraint
+            )
+            det_matched = np.zeros(len(det_pols), dtype=bool)
+            for gtNum in np.flatnonzero(match.any(axis=1)):
+                detNums = np.flatnonzero(match[gtNum] & ~det_matched)
+                if len(detNums) > 0:
+                    det_matched[detNums[0]] = True
+                    detMatched += 1
+
+        numGtCare = int(gt_care.sum())
+        numDetCare = int(det_care.sum())
+        perSampleMetrics = {
+            "gtCare": numGtCare,
+            "detCare": numDetCare,
+            "detMatched": detMatched,
+        }
+        return perSampleMetrics
+
+    def evaluate_images(self, gts, preds):
+        return [self.count_matches(gt, pred) for gt, pred in zip(gts, preds)]
+
     def combine_results(self, results):
         numGlobalCareGt = 0
         numGlobalCareDet = 0
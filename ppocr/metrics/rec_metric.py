@@ -12,49 +12,117 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+# process.cpdist is available from rapidfuzz 3.6
+from rapidfuzz import process
 from rapidfuzz.distance import Levenshtein
 from difflib import SequenceMatcher
+from collections import Counter
 
+import re
+import threading
 import numpy as np
 import string
 from .bleu import compute_blue_score, compute_edit_distance
 
+NON_ALNUM = re.compile("[^{}]".format(string.digits + string.ascii_letters))
+
 
 class RecMetric(object):
+    """
+    Accuracy and normalized edit distance of the rec results, computed on the
+    whole batch. The metric can be updated from a worker thread, e.g.
+    ppocr.utils.stats.MetricWorker.
+
+    Args:
+        length_buckets: the boundaries of the label lengths, e.g. [5, 10, 20],
+            the metrics of every bucket are added to get_metric.
+        char_confusion_topk: if > 0, the topk most frequent char errors of the
+            alignments of the wrong results are reported by
+            get_char_confusion after get_metric, as
+            'label char'->'pred char': count, '' for a missing char.
+        workers: the threads of the edit distances of a batch.
+    """
+
     def __init__(
-        self, main_indicator="acc", is_filter=False, ignore_space=True, **kwargs
+        self,
+        main_indicator="acc",
+        is_filter=False,
+        ignore_space=True,
+        length_buckets=None,
+        char_confusion_topk=0,
+        workers=1,
+        **kwargs,
     ):
         self.main_indicator = main_indicator
         self.is_filter = is_filter
         self.ignore_space = ignore_space
+        self.length_buckets = sorted(length_buckets or [])
+        self.char_confusion_topk = char_confusion_topk
+        self.workers = workers
         self.eps = 1e-5
+        self.lock = threading.Lock()
+        self.char_confusion = ""
         self.reset()
 
     def _normalize_text(self, text):
-        text = "".join(
-            filter(lambda x: x in (string.digits + string.ascii_letters), text)
-        )
-        return text.lower()
+        return NON_ALNUM.sub("", text).lower()
 
     def __call__(self, pred_label, *args, **kwargs):
         preds, labels = pred_label
-        correct_num = 0
-        all_num = 0
+        num = min(len(preds), len(labels))
+        preds = [pred for pred, _ in preds[:num]]
+        targets = [target for target, _ in labels[:num]]
+        if self.ignore_space:
+            preds = [pred.replace(" ", "") for pred in preds]
+            targets = [target.replace(" ", "") for target in targets]
+        if self.is_filter:
+            preds = [self._normalize_text(pred) for pred in preds]
+            targets = [self._normalize_text(target) for target in targets]
+        edit_dis = process.cpdist(
+            preds,
+            targets,
+            scorer=Levenshtein.normalized_distance,
+            dtype=np.float64,
+            workers=self.workers,
+        )
+        correct = np.array(
+            [pred == target for pred, target in zip(preds, targets)], dtype=bool
+        )
+        # summed in order as the distances of the pairs before
         norm_edit_dis = 0.0
-        for (pred, pred_conf), (target, _) in zip(preds, labels):
-            if self.ignore_space:
-                pred = pred.replace(" ", "")
-                target = target.replace(" ", "")
-            if self.is_filter:
-                pred = self._normalize_text(pred)
-                target = self._normalize_text(target)
-            norm_edit_dis += Levenshtein.normalized_distance(pred, target)
-            if pred == target:
-                correct_num += 1
-            all_num += 1
-        self.correct_num += correct_num
-        self.all_num += all_num
-        self.norm_edit_dis += norm_edit_dis
+        for dis in edit_dis.tolist():
+            norm_edit_dis += dis
+        correct_num = int(correct.sum())
+        all_num = num
+
+        if self.length_buckets:
+            bucket = np.searchsorted(
+                self.length_buckets,
+                [len(target) for target in targets],
+                side="right",
+            )
+        if self.char_confusion_topk > 0:
+            char_errors = Counter()
+            for idx in np.flatnonzero(~correct):
+                pred, target = preds[idx], targets[idx]
+                for tag, pred_pos, target_pos in Levenshtein.editops(pred, target):
+                    if tag == "replace":
+                        char_errors[(target[target_pos], pred[pred_pos])] += 1
+                    elif tag == "insert":
+                        char_errors[(target[target_pos], "")] += 1
+                    else:
+                        char_errors[("", pred[pred_pos])] += 1
+
+        with self.lock:
+            self.correct_num += correct_num
+            self.all_num += all_num
+            self.norm_edit_dis += norm_edit_dis
+            if self.length_buckets:
+                np.add.at(self.bucket_all_num, bucket, 1)
+                np.add.at(self.bucket_correct_num, bucket, correct)
+                np.add.at(self.bucket_norm_edit_dis, bucket, edit_dis)
+            if self.char_confusion_topk > 0:
+                self.char_errors.update(char_errors)
         return {
             "acc": correct_num / (all_num + self.eps),
             "norm_edit_dis": 1 - norm_edit_dis / (all_num + self.eps),
@@ -66,16 +134,50 @@ class RecMetric(object):
                  'acc': 0,
                  'norm_edit_dis': 0,
             }
+        with the metrics of the length buckets if set
         """
-        acc = 1.0 * self.correct_num / (self.all_num + self.eps)
-        norm_edit_dis = 1 - self.norm_edit_dis / (self.all_num + self.eps)
+        with self.lock:
+            acc = 1.0 * self.correct_num / (self.all_num + self.eps)
+            norm_edit_dis = 1 - self.norm_edit_dis / (self.all_num + self.eps)
+            metric = {"acc": acc, "norm_edit_dis": norm_edit_dis}
+            bounds = [0] + self.length_buckets
+            for i, lower in enumerate(bounds):
+                if not self.length_buckets:
+                    break
+                if i + 1 < len(bounds):
+                    name = "len_{}-{}".format(lower, bounds[i + 1] - 1)
+                else:
+                    name = "len_{}+".format(lower)
+                all_num = self.bucket_all_num[i] + self.eps
+                metric["acc_" + name] = float(self.bucket_correct_num[i] / all_num)
+                metric["norm_edit_dis_" + name] = float(
+                    1 - self.bucket_norm_edit_dis[i] / all_num
+                )
+            if self.char_confusion_topk > 0:
+                self.char_confusion = ", ".join(
+                    "'{}'->'{}': {}".format(target, pred, count)
+                    for (target, pred), count in self.char_errors.most_common(
+                        self.char_confusion_topk
+                    )
+                )
         self.reset()
-        return {"acc": acc, "norm_edit_dis": norm_edit_dis}
+        return metric
+
+    def get_char_confusion(self):
+        """The char confusion of the last get_metric, kept out of the metrics,
+        which are all numbers"""
+        return self.char_confusion
 
     def reset(self):
-        self.correct_num = 0
-        self.all_num = 0
-        self.norm_edit_dis = 0
+        with self.lock:
+            self.correct_num = 0
+            self.all_num = 0
+            self.norm_edit_dis = 0
+            num_buckets = len(self.length_buckets) + 1
+            self.bucket_all_num = np.zeros(num_buckets, dtype=np.int64)
+            self.bucket_correct_num = np.zeros(num_buckets, dtype=np.int64)
+            self.bucket_norm_edit_dis = np.zeros(num_buckets)
+            self.char_errors = Counter()
 
 
 class CNTMetric(object):
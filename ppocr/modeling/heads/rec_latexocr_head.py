@@ -151,8 +151,8 @@ class AbsolutePositionalEmbedding(nn.Layer):
 
         normal_(self.emb.weight)
 
-    def forward(self, x):
-        n = paddle.arange(x.shape[1])
+    def forward(self, x, offset=0):
+        n = paddle.arange(x.shape[1]) + offset
         return self.emb(n)[None, :, :]
 
 
@@ -196,6 +196,10 @@ class Rezero(nn.Layer):
         x, *rest = self.fn(x, **kwargs)
         return (x * self.g, *rest)
 
+    def forward_step(self, x, *args, **kwargs):
+        x, *rest = self.fn.forward_step(x, *args, **kwargs)
+        return (x * self.g, *rest)
+
 
 class ScaleNorm(nn.Layer):
     def __init__(self, dim, eps=1e-5):
@@ -478,6 +482,83 @@ class Attention(nn.Layer):
 
         return self.to_out(out), intermediates
 
+    def split_heads(self, x):
+        return x.reshape([0, 0, self.heads, -1]).transpose([0, 2, 1, 3])
+
+    def supports_cache(self):
+        """Whether forward_step computes the same attention as forward"""
+        return not (
+            self.talking_heads
+            or self.collab_heads
+            or exists(self.sparse_topk)
+            or self.num_mem_kv > 0
+        )
+
+    def context_cache(self, context):
+        """The keys and values [2, B, heads, N, dim_head] of context for forward_step"""
+        return paddle.stack(
+            [self.split_heads(self.to_k(context)), self.split_heads(self.to_v(context))]
+        )
+
+    def forward_step(
+        self,
+        x,
+        cache,
+        mask=None,
+        self_attend=False,
+        sinusoidal_emb=None,
+        prev_attn=None,
+        offset=0,
+    ):
+        """
+        The attention of one position x [B, 1, dim] to the cached keys and values
+        cache [2, B, heads, N, dim_head], of the context, or if self_attend, of
+        the positions before x and x itself, at position offset. mask [.., N]
+        masks the positions of cache not decoded yet.
+
+        Returns:
+            the attention output, the attention before softmax, and if
+            self_attend, the keys and values [2, B, heads, 1, dim_head] of x
+            for the cache.
+        """
+        if not self.supports_cache():
+            raise NotImplementedError(
+                "forward_step does not support talking_heads, collab_heads, "
+                "sparse_topk or num_mem_kv"
+            )
+        q_input = x
+        kv = None
+        if self_attend:
+            k_input = x
+            if exists(sinusoidal_emb):
+                emb = sinusoidal_emb(x, offset=offset)
+                q_input = x + emb
+                k_input = x + emb
+            kv = paddle.stack(
+                [self.split_heads(self.to_k(k_input)), self.split_heads(self.to_v(x))]
+            )
+        q = self.split_heads(self.to_q(q_input))
+        dots = paddle.matmul(q, cache[0], transpose_y=True) * self.scale
+        if exists(mask):
+            dots = paddle.where(mask, dots, paddle.full_like(dots, max_neg_value(dots)))
+        if self_attend:
+            # x attends to itself, after the cached positions
+            dots = paddle.concat(
+                [dots, (q * kv[0]).sum(axis=-1, keepdim=True) * self.scale], axis=-1
+            )
+        if exists(prev_attn):
+            dots = dots + prev_attn
+        pre_softmax_attn = dots
+        attn = self.dropout(self.attn_fn(dots, axis=-1))
+        if self_attend:
+            out = paddle.matmul(attn[..., :-1], cache[1]) + attn[..., -1:] * kv[1]
+        else:
+            out = paddle.matmul(attn, cache[1])
+        out = out.transpose([0, 2, 1, 3]).flatten(2)
+        if exists(self.to_v_gate):
+            out = out * self.to_v_gate(x).sigmoid()
+        return self.to_out(out), pre_softmax_attn, kv
+
 
 class AttentionLayers(nn.Layer):
     def __init__(
@@ -516,9 +597,12 @@ class AttentionLayers(nn.Layer):
 
         self.dim = dim
         self.depth = depth
+        self.heads = heads
+        self.dim_head = dim_head
         self.layers = nn.LayerList([])
 
         self.has_pos_emb = position_infused_attn or rel_pos_bias or rotary_pos_emb
+        self.use_rotary_pos_emb = rotary_pos_emb
         self.pia_pos_emb = (
             FixedPositionalEmbedding(dim) if position_infused_attn else None
         )
@@ -677,6 +761,86 @@ class AttentionLayers(nn.Layer):
 
         return x
 
+    def supports_cache(self):
+        """Whether forward_step computes the same outputs as forward"""
+        if exists(self.rel_pos) or self.use_rotary_pos_emb:
+            return False
+        for layer_type, (_, block, _) in zip(self.layer_types, self.layers):
+            if layer_type in ("a", "c"):
+                attn = block.fn if isinstance(block, Rezero) else block
+                if not attn.supports_cache():
+                    return False
+        return True
+
+    def context_cache(self, context):
+        """
+        The keys and values of context of the cross attention layers for
+        forward_step, [num_cross_layers, 2, B, heads, N, dim_head].
+        """
+        caches = []
+        for layer_type, (_, block, _) in zip(self.layer_types, self.layers):
+            if layer_type == "c":
+                attn = block.fn if isinstance(block, Rezero) else block
+                caches.append(attn.context_cache(context))
+        return paddle.stack(caches)
+
+    def forward_step(self, x, self_cache, context_cache=None, self_mask=None, offset=0):
+        """
+        Decode one position x [B, 1, dim] at position offset, with the keys
+        and values of the positions before cached in self_cache
+        [num_attn_layers, 2, B, heads, N, dim_head] and those of the context in
+        context_cache, see Attention.forward_step.
+
+        Returns:
+            x and the keys and values of x for self_cache
+            [num_attn_layers, 2, B, heads, 1, dim_head].
+        """
+        if exists(self.rel_pos) or self.use_rotary_pos_emb:
+            raise NotImplementedError(
+                "forward_step does not support rel_pos_bias or rotary_pos_emb"
+            )
+        prev_attn = None
+        prev_cross_attn = None
+        kvs = []
+        num_cross = 0
+        for ind, (layer_type, (norm, block, residual_fn)) in enumerate(
+            zip(self.layer_types, self.layers)
+        ):
+            is_last = ind == (len(self.layers) - 1)
+            residual = x
+            if self.pre_norm:
+                x = norm(x)
+
+            if layer_type == "a":
+                out, pre_softmax_attn, kv = block.forward_step(
+                    x,
+                    self_cache[len(kvs)],
+                    mask=self_mask,
+                    self_attend=True,
+                    sinusoidal_emb=self.pia_pos_emb,
+                    prev_attn=prev_attn,
+                    offset=offset,
+                )
+                kvs.append(kv)
+            elif layer_type == "c":
+                out, pre_softmax_attn, _ = block.forward_step(
+                    x, context_cache[num_cross], prev_attn=prev_cross_attn
+                )
+                num_cross += 1
+            elif layer_type == "f":
+                out = block(x)
+
+            x = residual_fn(out, residual)
+
+            if layer_type == "a" and self.residual_attn:
+                prev_attn = pre_softmax_attn
+            elif layer_type == "c" and self.cross_residual_attn:
+                prev_cross_attn = pre_softmax_attn
+
+            if not self.pre_norm and not is_last:
+                x = norm(x)
+        return x, paddle.stack(kvs)
+
 
 class Encoder(AttentionLayers):
     def __init__(self, **kwargs):
@@ -808,6 +972,30 @@ class TransformerDecoder(nn.Layer):
 
         return out
 
+    def forward_step(self, x, self_cache, context_cache=None, self_mask=None, offset=0):
+        """
+        The logits [B, num_tokens] of the next token after the tokens x [B, 1]
+        at position offset, see AttentionLayers.forward_step.
+
+        Returns:
+            the logits and the keys and values of x for self_cache.
+        """
+        x = self.token_emb(x)
+        x = x + self.pos_emb(x, offset=offset)
+
+        x = self.emb_dropout(x)
+        x = self.project_emb(x)
+
+        x, kvs = self.attn_layers.forward_step(
+            x,
+            self_cache,
+            context_cache=context_cache,
+            self_mask=self_mask,
+            offset=offset,
+        )
+        x = self.norm(x)
+        return self.to_logits(x)[:, -1], kvs
+
 
 def top_p(logits, thres=0.9):
     sorted_logits, sorted_indices = paddle.sort(logits, descending=True)
@@ -880,12 +1068,39 @@ class LaTeXOCRHead(nn.Layer):
         start_tokens,
         seq_len,
         eos_token=None,
+        context=None,
         temperature=1.0,
-        filter_logits_fn=top_k,
+        filter_logits_fn=None,
         filter_thres=0.9,
         **kwargs,
     ):
-        was_training = self.net.training
+        """
+        Sample up to seq_len tokens after start_tokens [B, T], one position at
+        a time, with the keys and values of the positions before cached in
+        buffers preallocated for all the positions. The samples which have
+        sampled eos_token are dropped from the batch, and padded with pad_value.
+        The attention layers which forward_step does not support are decoded
+        by generate_uncached.
+
+        Returns:
+            the sampled tokens [B, L], up to the step where every sample has
+            sampled eos_token.
+        """
+        if filter_logits_fn is None:
+            filter_logits_fn = top_k
+        if filter_logits_fn not in {top_k, top_p}:
+            raise NotImplementedError("The filter_logits_fn is not supported ")
+        attn_layers = self.net.attn_layers
+        if not attn_layers.supports_cache():
+            return self.generate_uncached(
+                start_tokens,
+                seq_len,
+                eos_token=eos_token,
+                context=context,
+                temperature=temperature,
+                filter_logits_fn=filter_logits_fn,
+                filter_thres=filter_thres,
+            )
         num_dims = len(start_tokens.shape)
 
         if num_dims == 1:
@@ -894,52 +1109,95 @@ class LaTeXOCRHead(nn.Layer):
         b, t = start_tokens.shape
 
         self.net.eval()
-        out = start_tokens
-        mask = kwargs.pop("mask", None)
-
-        if mask is None:
-            mask = paddle.full_like(out, True, dtype=paddle.bool)
-
-        for _ in range(seq_len):
-            x = out[:, -self.max_seq_len :]
-            mask = mask[:, -self.max_seq_len :]
-            logits = self.net(x, mask=mask, **kwargs)[:, -1, :]
-            if filter_logits_fn in {top_k, top_p}:
-                filtered_logits = filter_logits_fn(logits, thres=filter_thres)
-
-                probs = F.softmax(filtered_logits / temperature, axis=-1)
+        # the positions are limited by the positional embedding
+        seq_len = min(seq_len, self.max_seq_len - t + 1)
+        max_len = t + seq_len - 1
+        self_cache = paddle.zeros(
+            [
+                attn_layers.num_attn_layers,
+                2,
+                b,
+                attn_layers.heads,
+                max_len,
+                attn_layers.dim_head,
+            ]
+        )
+        context_cache = None
+        if exists(context):
+            context_cache = attn_layers.context_cache(context)
+        positions = paddle.arange(max_len)
+
+        def step_logits(x, step, self_cache):
+            logits, kvs = self.net.forward_step(
+                x,
+                self_cache,
+                context_cache=context_cache,
+                self_mask=(positions < step).reshape([1, 1, 1, -1]),
+                offset=step,
+            )
+            index = paddle.zeros_like(kvs, dtype="int64") + step
+            if paddle.in_dynamic_mode():
+                self_cache.put_along_axis_(index, kvs, axis=4)
             else:
-                raise NotImplementedError("The filter_logits_fn is not supported ")
+                # inplace ops are not supported by to_static
+                self_cache = paddle.put_along_axis(self_cache, index, kvs, axis=4)
+            return logits, self_cache
+
+        for step in range(t - 1):
+            _, self_cache = step_logits(
+                start_tokens[:, step : step + 1], step, self_cache
+            )
 
+        out = paddle.full([b, seq_len], self.pad_value, dtype=start_tokens.dtype)
+        out_positions = paddle.arange(seq_len)
+        num_steps = paddle.zeros([], dtype="int64")
+        active = paddle.arange(b)
+        x = start_tokens[:, -1:]
+        for i in range(paddle.to_tensor(seq_len)):
+            logits, self_cache = step_logits(x, t - 1 + i, self_cache)
+            filtered_logits = filter_logits_fn(logits, thres=filter_thres)
+            probs = F.softmax(filtered_logits / temperature, axis=-1)
             sample = paddle.multinomial(probs, 1)
-            out = paddle.concat((out, sample), axis=-1)
-            pad_mask = paddle.full(shape=[mask.shape[0], 1], fill_value=1, dtype="bool")
-            mask = paddle.concat((mask, pad_mask), axis=1)
-            if (
-                eos_token is not None
-                and (
-                    paddle.cumsum((out == eos_token).cast(paddle.int64), 1)[:, -1] >= 1
-                ).all()
-            ):
-                break
-        out = out[:, t:]
+
+            column = paddle.scatter(
+                paddle.full([b], self.pad_value, dtype=out.dtype),
+                active,
+                sample.flatten(),
+            )
+            out = paddle.where(out_positions == i, column.unsqueeze(-1), out)
+            num_steps = num_steps + 1
+            x = sample
+            if exists(eos_token):
+                finished = sample.flatten() == eos_token
+                if finished.all():
+                    break
+                if finished.any():
+                    keep = paddle.nonzero(~finished).flatten()
+                    active = paddle.gather(active, keep)
+                    x = paddle.gather(sample, keep)
+                    self_cache = paddle.gather(self_cache, keep, axis=2)
+                    if exists(context_cache):
+                        context_cache = paddle.gather(context_cache, keep, axis=2)
+        out = out[:, :num_steps]
         if num_dims == 1:
             out = out.squeeze(0)
         return out
 
     @paddle.no_grad()
-    def generate_export(
+    def generate_uncached(
         self,
         start_tokens,
         seq_len,
         eos_token=None,
         context=None,
         temperature=1.0,
-        filter_logits_fn=None,
+        filter_logits_fn=top_k,
         filter_thres=0.9,
-        **kwargs,
     ):
-        was_training = self.net.training
+        """
+        Sample as generate, decoding all the positions again at each step, for
+        the attention layers which forward_step does not support.
+        """
         num_dims = len(start_tokens.shape)
 
         if num_dims == 1:
@@ -949,39 +1207,26 @@ class LaTeXOCRHead(nn.Layer):
 
         self.net.eval()
         out = start_tokens
-        mask = kwargs.pop("mask", None)
-
-        if mask is None:
-            mask = paddle.full_like(out, True, dtype=paddle.bool)
+        mask = paddle.full_like(out, True, dtype=paddle.bool)
 
-        i_idx = paddle.full([], 0)
-        while i_idx < paddle.to_tensor(seq_len):
+        for _ in range(seq_len):
             x = out[:, -self.max_seq_len :]
-            paddle.jit.api.set_dynamic_shape(x, [-1, -1])
             mask = mask[:, -self.max_seq_len :]
-            paddle.jit.api.set_dynamic_shape(mask, [-1, -1])
-            logits = self.net(x, mask=mask, context=context, seq_len=i_idx, **kwargs)[
-                :, -1, :
-            ]
-            if filter_logits_fn in {top_k, top_p}:
-                filtered_logits = filter_logits_fn(logits, thres=filter_thres)
-
-                probs = F.softmax(filtered_logits / temperature, axis=-1)
-
+            logits = self.net(x, mask=mask, context=context)[:, -1, :]
+            filtered_logits = filter_logits_fn(logits, thres=filter_thres)
+            probs = F.softmax(filtered_logits / temperature, axis=-1)
             sample = paddle.multinomial(probs, 1)
             out = paddle.concat((out, sample), axis=-1)
-
-            pad_mask = paddle.full(shape=[mask.shape[0], 1], fill_value=1, dtype="bool")
+            pad_mask = paddle.full(shape=[b, 1], fill_value=1, dtype="bool")
             mask = paddle.concat((mask, pad_mask), axis=1)
-            if (
-                eos_token is not None
-                and (
-                    paddle.cumsum((out == eos_token).cast(paddle.int64), 1)[:, -1] >= 1
-                ).all()
-            ):
+            if exists(eos_token) and (out[:, t:] == eos_token).any(axis=1).all():
                 break
-            i_idx += 1
         out = out[:, t:]
+        if exists(eos_token):
+            # the tokens after eos_token are padded with pad_value as in generate
+            is_eos = (out == eos_token).cast("int64")
+            after_eos = (paddle.cumsum(is_eos, axis=1) - is_eos) > 0
+            out = paddle.where(after_eos, paddle.full_like(out, self.pad_value), out)
         if num_dims == 1:
             out = out.squeeze(0)
         return out
@@ -993,24 +1238,14 @@ class LaTeXOCRHead(nn.Layer):
             encoded_feat = inputs
             batch_num = encoded_feat.shape[0]
             bos_tensor = paddle.full([batch_num, 1], self.bos_token, dtype=paddle.int64)
-            if self.is_export:
-                word_pred = self.generate_export(
-                    bos_tensor,
-                    self.max_seq_len,
-                    eos_token=self.eos_token,
-                    context=encoded_feat,
-                    temperature=self.temperature,
-                    filter_logits_fn=top_k,
-                )
-            else:
-                word_pred = self.generate(
-                    bos_tensor,
-                    self.max_seq_len,
-                    eos_token=self.eos_token,
-                    context=encoded_feat,
-                    temperature=self.temperature,
-                    filter_logits_fn=top_k,
-                )
+            word_pred = self.generate(
+                bos_tensor,
+                self.max_seq_len,
+                eos_token=self.eos_token,
+                context=encoded_feat,
+                temperature=self.temperature,
+                filter_logits_fn=top_k,
+            )
             return word_pred
 
         encoded_feat, tgt_seq, mask = inputs
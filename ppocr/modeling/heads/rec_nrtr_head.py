@@ -168,17 +168,48 @@ class Transformer(nn.Layer):
             memory = src  # B N C
         else:
             memory = src
+        # every step decodes only the last position, with the keys and values
+        # of the memory projected once and those of the positions before cached
+        # in [num_layers, 2, B, nhead, max_len, head_dim]
+        cross_cache = paddle.stack(
+            [layer.cross_attn.memory_cache(memory) for layer in self.decoder]
+        )
+        self_cache = paddle.zeros(
+            [
+                len(self.decoder),
+                2,
+                bs,
+                self.nhead,
+                self.max_len,
+                self.d_model // self.nhead,
+            ],
+            dtype=memory.dtype,
+        )
+        positions = paddle.arange(self.max_len)
         dec_seq = paddle.full((bs, 1), 2, dtype=paddle.int64)
         dec_prob = paddle.full((bs, 1), 1.0, dtype=paddle.float32)
+        # the samples which have not decoded </s>, the finished ones are dropped
+        # from the batch and padded with </s>
+        active = paddle.arange(bs)
+        dec_input = dec_seq
         for len_dec_seq in range(1, paddle.to_tensor(self.max_len)):
-            dec_seq_embed = self.embedding(dec_seq)
-            dec_seq_embed = self.positional_encoding(dec_seq_embed)
-            tgt_mask = self.generate_square_subsequent_mask(dec_seq_embed.shape[1])
-            tgt = dec_seq_embed
-            for decoder_layer in self.decoder:
-                tgt = decoder_layer(tgt, memory, self_mask=tgt_mask)
-            dec_output = tgt
-            dec_output = dec_output[:, -1, :]
+            step = len_dec_seq - 1
+            tgt = self.embedding(dec_input)
+            tgt = self.positional_encoding(tgt, offset=step)
+            position = (positions == step).astype(tgt.dtype).unsqueeze(-1)
+            self_mask = paddle.where(
+                positions <= step,
+                paddle.zeros([self.max_len]),
+                paddle.full([self.max_len], float("-inf")),
+            )
+            caches = []
+            for i, decoder_layer in enumerate(self.decoder):
+                tgt, cache = decoder_layer.forward_step(
+                    tgt, self_cache[i], cross_cache[i], self_mask, position
+                )
+                caches.append(cache)
+            self_cache = paddle.stack(caches)
+            dec_output = tgt[:, -1, :]
             word_prob = F.softmax(self.tgt_word_prj(dec_output), axis=-1)
             preds_idx = paddle.argmax(word_prob, axis=-1)
             if paddle.equal_all(
@@ -186,12 +217,24 @@ class Transformer(nn.Layer):
             ):
                 break
             preds_prob = paddle.max(word_prob, axis=-1)
+            preds_idx_all = paddle.scatter(
+                paddle.full([bs], 3, dtype="int64"), active, preds_idx
+            )
+            preds_prob_all = paddle.scatter(
+                paddle.full([bs], 1.0, dtype="float32"), active, preds_prob
+            )
             dec_seq = paddle.concat(
-                [dec_seq, paddle.reshape(preds_idx, [-1, 1])], axis=1
+                [dec_seq, paddle.reshape(preds_idx_all, [-1, 1])], axis=1
             )
             dec_prob = paddle.concat(
-                [dec_prob, paddle.reshape(preds_prob, [-1, 1])], axis=1
+                [dec_prob, paddle.reshape(preds_prob_all, [-1, 1])], axis=1
             )
+
+            keep = paddle.nonzero(preds_idx != 3).flatten()
+            active = paddle.gather(active, keep)
+            dec_input = paddle.reshape(paddle.gather(preds_idx, keep), [-1, 1])
+            self_cache = paddle.gather(self_cache, keep, axis=2)
+            cross_cache = paddle.gather(cross_cache, keep, axis=2)
         return [dec_seq, dec_prob]
 
     def forward_beam(self, images):
@@ -407,19 +450,17 @@ class MultiheadAttention(nn.Layer):
             )
             q, k, v = qkv[0], qkv[1], qkv[2]
         else:
-            kN = key.shape[1]
             q = (
                 self.q(query)
                 .reshape([0, qN, self.num_heads, self.head_dim])
                 .transpose([0, 2, 1, 3])
             )
-            kv = (
-                self.kv(key)
-                .reshape((0, kN, 2, self.num_heads, self.head_dim))
-                .transpose((2, 0, 3, 1, 4))
-            )
+            kv = self.memory_cache(key)
             k, v = kv[0], kv[1]
 
+        return self.attend(q, k, v, attn_mask, qN)
+
+    def attend(self, q, k, v, attn_mask, qN):
         attn = (q.matmul(k.transpose((0, 1, 3, 2)))) * self.scale
 
         if attn_mask is not None:
@@ -433,6 +474,41 @@ class MultiheadAttention(nn.Layer):
 
         return x
 
+    def memory_cache(self, key):
+        """The keys and values [2, B, num_heads, kN, head_dim] of the cross attention to key"""
+        kN = key.shape[1]
+        return (
+            self.kv(key)
+            .reshape((0, kN, 2, self.num_heads, self.head_dim))
+            .transpose((2, 0, 3, 1, 4))
+        )
+
+    def forward_step(self, query, cache, attn_mask=None, position=None):
+        """
+        The attention of one position query [B, 1, C] to the cached keys and
+        values cache [2, B, num_heads, N, head_dim]. The keys and values of
+        the self attention are added to the cache at position, a one-hot
+        [N, 1] of the position of query, where the cache is still zero.
+
+        Returns:
+            the attention output and the cache.
+        """
+        if self.self_attn:
+            qkv = (
+                self.qkv(query)
+                .reshape((0, 1, 3, self.num_heads, self.head_dim))
+                .transpose((2, 0, 3, 1, 4))
+            )
+            q = qkv[0]
+            cache = cache + qkv[1:] * position
+        else:
+            q = (
+                self.q(query)
+                .reshape([0, 1, self.num_heads, self.head_dim])
+                .transpose([0, 2, 1, 3])
+            )
+        return self.attend(q, cache[0], cache[1], attn_mask, 1), cache
+
 
 class TransformerBlock(nn.Layer):
     def __init__(
@@ -486,6 +562,20 @@ class TransformerBlock(nn.Layer):
         tgt = self.norm3(tgt + self.dropout3(self.mlp(tgt)))
         return tgt
 
+    def forward_step(self, tgt, self_cache, cross_cache, self_mask, position):
+        """
+        Decode one position tgt [B, 1, C] with the caches of
+        MultiheadAttention.forward_step, returns tgt and the updated self_cache.
+        """
+        tgt1, self_cache = self.self_attn.forward_step(
+            tgt, self_cache, attn_mask=self_mask, position=position
+        )
+        tgt = self.norm1(tgt + self.dropout1(tgt1))
+        tgt2, _ = self.cross_attn.forward_step(tgt, cross_cache)
+        tgt = self.norm2(tgt + self.dropout2(tgt2))
+        tgt = self.norm3(tgt + self.dropout3(self.mlp(tgt)))
+        return tgt, self_cache
+
 
 class PositionalEncoding(nn.Layer):
     """Inject some information about the relative or absolute position of the tokens
@@ -519,10 +609,11 @@ class PositionalEncoding(nn.Layer):
         pe = paddle.transpose(pe, [1, 0, 2])
         self.register_buffer("pe", pe)
 
-    def forward(self, x):
+    def forward(self, x, offset=0):
         """Inputs of forward function
         Args:
             x: the sequence fed to the positional encoder model (required).
+            offset: the position of the first element of x (default=0).
         Shape:
             x: [sequence length, batch size, embed dim]
             output: [sequence length, batch size, embed dim]
@@ -530,7 +621,7 @@ class PositionalEncoding(nn.Layer):
             >>> output = pos_encoder(x)
         """
         x = x.transpose([1, 0, 2])
-        x = x + self.pe[: x.shape[0], :]
+        x = x + self.pe[offset : offset + x.shape[0], :]
         return self.dropout(x).transpose([1, 0, 2])
 
 
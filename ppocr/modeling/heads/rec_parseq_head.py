@@ -111,6 +111,54 @@ class DecoderLayer(paddle.nn.Layer):
         tgt = tgt + self.dropout3(tgt2)
         return tgt, sa_weights, ca_weights
 
+    def forward_stream_step(self, tgt, tgt_norm, self_cache, memory_cache, tgt_mask):
+        """forward_stream of one position tgt [B, 1, C], with the keys and
+        values of tgt_kv and memory in the StaticCache self_cache and memory_cache.
+        """
+        tgt2 = self.self_attn(tgt_norm, attn_mask=tgt_mask, cache=self_cache)[0]
+        tgt = tgt + self.dropout1(tgt2)
+        tgt2 = self.cross_attn(self.norm1(tgt), cache=memory_cache)[0]
+        tgt = tgt + self.dropout2(tgt2)
+        tgt2 = self.linear2(
+            self.dropout(self.activation(self.linear1(self.norm2(tgt))))
+        )
+        tgt = tgt + self.dropout3(tgt2)
+        return tgt
+
+    def forward_step(
+        self,
+        query,
+        content,
+        memory_cache,
+        k_cache,
+        v_cache,
+        position,
+        tgt_mask,
+        update_content=True,
+    ):
+        """
+        Decode the query and the content of one position [B, 1, C]. The keys
+        and values of the content before are cached in k_cache and v_cache
+        [B, nhead, L, head_dim], where those of content are added at position,
+        a one-hot [L, 1] of its position, and masked by tgt_mask [L].
+
+        Returns:
+            query, content and the caches.
+        """
+        content_norm = self.norm_c(content)
+        k, v = self.self_attn.compute_kv(content_norm, content_norm)
+        k_cache = k_cache + k * position
+        v_cache = v_cache + v * position
+        self_cache = self.self_attn.StaticCache(k_cache, v_cache)
+        query = self.forward_stream_step(
+            query, self.norm_q(query), self_cache, memory_cache, tgt_mask
+        )
+        if update_content:
+            content = self.forward_stream_step(
+                content, content_norm, self_cache, memory_cache, tgt_mask
+            )
+        return query, content, k_cache, v_cache
+
     def forward(
         self,
         query,
@@ -179,6 +227,32 @@ class Decoder(paddle.nn.Layer):
         query = self.norm(query)
         return query
 
+    def forward_step(
+        self, query, content, memory_k, memory_v, k_cache, v_cache, position, tgt_mask
+    ):
+        """
+        Decode one position with the caches of DecoderLayer.forward_step. The
+        keys and values of the memory memory_k and memory_v, k_cache and
+        v_cache are [num_layers, B, nhead, L, head_dim] of all layers.
+        """
+        k_caches, v_caches = [], []
+        for i, mod in enumerate(self.layers):
+            last = i == len(self.layers) - 1
+            query, content, k, v = mod.forward_step(
+                query,
+                content,
+                mod.cross_attn.StaticCache(memory_k[i], memory_v[i]),
+                k_cache[i],
+                v_cache[i],
+                position,
+                tgt_mask,
+                update_content=not last,
+            )
+            k_caches.append(k)
+            v_caches.append(v)
+        query = self.norm(query)
+        return query, paddle.stack(k_caches), paddle.stack(v_caches)
+
 
 class TokenEmbedding(paddle.nn.Layer):
     def __init__(self, charset_size: int, embed_dim: int):
@@ -328,58 +402,27 @@ class ParseQHead(nn.Layer):
             diagonal=1,
         )
         if self.decode_ar:
-            tgt_in = paddle.full(shape=(bs, num_steps), fill_value=self.pad_id).astype(
-                "int64"
-            )
-            tgt_in[:, (0)] = self.bos_id
-
-            logits = []
-            for i in range(paddle.to_tensor(num_steps)):
-                j = i + 1
-                tgt_out = self.decode(
-                    tgt_in[:, :j],
-                    memory,
-                    tgt_mask[:j, :j],
-                    tgt_query=pos_queries[:, i:j],
-                    tgt_query_mask=query_mask[i:j, :j],
-                )
-                p_i = self.head(tgt_out)
-                logits.append(p_i)
-                if j < num_steps:
-                    tgt_in[:, (j)] = p_i.squeeze().argmax(axis=-1)
-                    if (
-                        testing
-                        and (tgt_in == self.eos_id)
-                        .astype("bool")
-                        .any(axis=-1)
-                        .astype("bool")
-                        .all()
-                    ):
-                        break
-            logits = paddle.concat(x=logits, axis=1)
+            logits = self.decode_ar_cached(memory, pos_queries, num_steps, testing)
         else:
             tgt_in = paddle.full(shape=(bs, 1), fill_value=self.bos_id).astype("int64")
             tgt_out = self.decode(tgt_in, memory, tgt_query=pos_queries)
             logits = self.head(tgt_out)
         if self.refine_iters:
-            temp = paddle.triu(
-                x=paddle.ones(shape=[num_steps, num_steps], dtype="bool"), diagonal=2
+            # query_mask is tgt_mask too
+            tgt_mask = query_mask = paddle.where(
+                paddle.triu(paddle.ones([num_steps, num_steps]), diagonal=2) > 0,
+                paddle.zeros([num_steps, num_steps]),
+                query_mask,
             )
-            posi = np.where(temp.cpu().numpy() == True)
-            query_mask[posi] = 0
             bos = paddle.full(shape=(bs, 1), fill_value=self.bos_id).astype("int64")
             for i in range(self.refine_iters):
                 tgt_in = paddle.concat(x=[bos, logits[:, :-1].argmax(axis=-1)], axis=1)
                 tgt_padding_mask = (tgt_in == self.eos_id).astype(dtype="int32")
-                tgt_padding_mask = tgt_padding_mask.cpu()
                 tgt_padding_mask = tgt_padding_mask.cumsum(axis=-1) > 0
-                tgt_padding_mask = (
-                    tgt_padding_mask.cuda().astype(dtype="float32") == 1.0
-                )
                 tgt_out = self.decode(
                     tgt_in,
                     memory,
-                    tgt_mask,
+                    tgt_mask[: tgt_in.shape[1], : tgt_in.shape[1]],
                     tgt_padding_mask,
                     tgt_query=pos_queries,
                     tgt_query_mask=query_mask[:, : tgt_in.shape[1]],
@@ -393,6 +436,81 @@ class ParseQHead(nn.Layer):
 
         return final_output
 
+    def decode_ar_cached(self, memory, pos_queries, num_steps, testing):
+        """
+        Autoregressive decoding of num_steps positions, every step decodes only
+        the last position, with the keys and values of memory projected once
+        and those of the content before cached. When testing, the samples
+        which have decoded <eos> are dropped from the batch, and their logits
+        after <eos> are the logits of <eos>.
+        """
+        bs = memory.shape[0]
+        memory_kv = [
+            layer.cross_attn.compute_kv(memory, memory) for layer in self.decoder.layers
+        ]
+        memory_k = paddle.stack([k for k, _ in memory_kv])
+        memory_v = paddle.stack([v for _, v in memory_kv])
+        self_attn = self.decoder.layers[0].self_attn
+        cache_shape = [
+            len(self.decoder.layers),
+            bs,
+            self_attn.num_heads,
+            num_steps,
+            self_attn.head_dim,
+        ]
+        k_cache = paddle.zeros(cache_shape, dtype=memory.dtype)
+        v_cache = paddle.zeros(cache_shape, dtype=memory.dtype)
+        positions = paddle.arange(num_steps)
+
+        logits = paddle.zeros(
+            [bs, num_steps, self.head.weight.shape[1]], dtype=memory.dtype
+        )
+        step_logits = logits[:, 0]
+        num_decoded = paddle.zeros([1], dtype="int64")
+        active = paddle.arange(bs)
+        tgt_in = paddle.full(shape=(bs, 1), fill_value=self.bos_id).astype("int64")
+        content = self.text_embed(tgt_in)
+        for i in range(paddle.to_tensor(num_steps)):
+            content = self.dropout(content)
+            query = self.dropout(paddle.gather(pos_queries[:, i : i + 1], active))
+            position = (positions == i).astype(memory.dtype).unsqueeze(-1)
+            tgt_mask = paddle.where(
+                positions <= i,
+                paddle.zeros([num_steps]),
+                paddle.full([num_steps], float("-inf")),
+            )
+            tgt_out, k_cache, v_cache = self.decoder.forward_step(
+                query,
+                content,
+                memory_k,
+                memory_v,
+                k_cache,
+                v_cache,
+                position,
+                tgt_mask,
+            )
+            p_i = self.head(tgt_out)[:, 0]
+            step_logits = paddle.scatter(step_logits, active, p_i)
+            logits = logits * (1 - position) + step_logits.unsqueeze(1) * position
+            num_decoded = num_decoded + 1
+            tgt_in = p_i.argmax(axis=-1)
+            if testing:
+                if paddle.equal_all(
+                    tgt_in, paddle.full(tgt_in.shape, self.eos_id, dtype="int64")
+                ):
+                    break
+                keep = paddle.nonzero(tgt_in != self.eos_id).flatten()
+                active = paddle.gather(active, keep)
+                tgt_in = paddle.gather(tgt_in, keep)
+                k_cache = paddle.gather(k_cache, keep, axis=1)
+                v_cache = paddle.gather(v_cache, keep, axis=1)
+                memory_k = paddle.gather(memory_k, keep, axis=1)
+                memory_v = paddle.gather(memory_v, keep, axis=1)
+            content = self.pos_queries[:, i : i + 1] + self.text_embed(
+                tgt_in.unsqueeze(-1)
+            )
+        return logits[:, :num_decoded]
+
     def gen_tgt_perms(self, tgt):
         """Generate shared permutations for the whole batch.
         This works because the same attention mask can be used for the shorter sequences
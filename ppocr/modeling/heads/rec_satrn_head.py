@@ -219,18 +219,22 @@ class MultiHeadAttention(nn.Layer):
 
     def forward(self, q, k, v, mask=None):
         batch_size, len_q, _ = q.shape
-        _, len_k, _ = k.shape
 
         q = self.linear_q(q).reshape([batch_size, len_q, self.n_head, self.d_k])
+        q = q.transpose([0, 2, 1, 3])
+        k, v = self.project_kv(k, v)
+
+        return self.attend(q, k, v, mask)
+
+    def project_kv(self, k, v):
+        """The keys and values [N, n_head, len_k, d_k or d_v] of k and v"""
+        batch_size, len_k, _ = k.shape
         k = self.linear_k(k).reshape([batch_size, len_k, self.n_head, self.d_k])
         v = self.linear_v(v).reshape([batch_size, len_k, self.n_head, self.d_v])
+        return k.transpose([0, 2, 1, 3]), v.transpose([0, 2, 1, 3])
 
-        q, k, v = (
-            q.transpose([0, 2, 1, 3]),
-            k.transpose([0, 2, 1, 3]),
-            v.transpose([0, 2, 1, 3]),
-        )
-
+    def attend(self, q, k, v, mask=None):
+        batch_size, _, len_q, _ = q.shape
         if mask is not None:
             if mask.dim() == 3:
                 mask = mask.unsqueeze(1)
@@ -248,6 +252,24 @@ class MultiHeadAttention(nn.Layer):
 
         return attn_out
 
+    def forward_step(self, q, k_cache, v_cache, mask=None, position=None):
+        """
+        The attention of one position q [N, 1, C] to the cached keys and values
+        of project_kv. For the self attention, position is a one-hot [len_k, 1]
+        of the position of q, the keys and values of q are added to the caches
+        there, where they are still zero.
+
+        Returns:
+            the attention output and the caches.
+        """
+        if position is not None:
+            k, v = self.project_kv(q, q)
+            k_cache = k_cache + k * position
+            v_cache = v_cache + v * position
+        q = self.linear_q(q).reshape([0, 1, self.n_head, self.d_k])
+        q = q.transpose([0, 2, 1, 3])
+        return self.attend(q, k_cache, v_cache, mask), k_cache, v_cache
+
 
 class SATRNEncoder(nn.Layer):
     def __init__(
@@ -291,10 +313,9 @@ class SATRNEncoder(nn.Layer):
         feat = self.position_enc(feat)
         n, c, h, w = feat.shape
 
-        mask = paddle.zeros((n, h, w))
-        for i, valid_ratio in enumerate(valid_ratios):
-            valid_width = int(min(w, paddle.ceil(w * valid_ratio)))
-            mask[i, :, :valid_width] = 1
+        valid_widths = paddle.ceil(w * paddle.reshape(valid_ratios, [-1, 1, 1]))
+        mask = (paddle.arange(w, dtype="float32") < valid_widths).astype("float32")
+        mask = mask.expand([n, h, w])
 
         mask = mask.reshape([n, h * w])
         feat = feat.reshape([n, c, h * w])
@@ -348,8 +369,8 @@ class PositionalEncoding(nn.Layer):
 
         return sinusoid_table.unsqueeze(0)
 
-    def forward(self, x):
-        x = x + self.position_table[:, : x.shape[1]].clone().detach()
+    def forward(self, x, offset=0):
+        x = x + self.position_table[:, offset : offset + x.shape[1]].clone().detach()
         return self.dropout(x)
 
 
@@ -447,6 +468,62 @@ class TFDecoderLayer(nn.Layer):
 
         return mlp_out
 
+    def forward_step(
+        self,
+        dec_input,
+        k_cache,
+        v_cache,
+        enc_k,
+        enc_v,
+        self_attn_mask,
+        position,
+        dec_enc_attn_mask=None,
+    ):
+        """
+        Decode one position dec_input [N, 1, C] with the caches of
+        MultiHeadAttention.forward_step, returns the output and the caches.
+        """
+        if self.operation_order == (
+            "self_attn",
+            "norm",
+            "enc_dec_attn",
+            "norm",
+            "ffn",
+            "norm",
+        ):
+            dec_attn_out, k_cache, v_cache = self.self_attn.forward_step(
+                dec_input, k_cache, v_cache, self_attn_mask, position
+            )
+            dec_attn_out += dec_input
+            dec_attn_out = self.norm1(dec_attn_out)
+
+            enc_dec_attn_out, _, _ = self.enc_attn.forward_step(
+                dec_attn_out, enc_k, enc_v, dec_enc_attn_mask
+            )
+            enc_dec_attn_out += dec_attn_out
+            enc_dec_attn_out = self.norm2(enc_dec_attn_out)
+
+            mlp_out = self.mlp(enc_dec_attn_out)
+            mlp_out += enc_dec_attn_out
+            mlp_out = self.norm3(mlp_out)
+        else:
+            dec_input_norm = self.norm1(dec_input)
+            dec_attn_out, k_cache, v_cache = self.self_attn.forward_step(
+                dec_input_norm, k_cache, v_cache, self_attn_mask, position
+            )
+            dec_attn_out += dec_input
+
+            enc_dec_attn_in = self.norm2(dec_attn_out)
+            enc_dec_attn_out, _, _ = self.enc_attn.forward_step(
+                enc_dec_attn_in, enc_k, enc_v, dec_enc_attn_mask
+            )
+            enc_dec_attn_out += dec_attn_out
+
+            mlp_out = self.mlp(self.norm3(enc_dec_attn_out))
+            mlp_out += enc_dec_attn_out
+
+        return mlp_out, k_cache, v_cache
+
 
 class SATRNDecoder(nn.Layer):
     def __init__(
@@ -540,27 +617,90 @@ class SATRNDecoder(nn.Layer):
     def forward_test(self, feat, out_enc, valid_ratio):
         src_mask = self._get_mask(out_enc, valid_ratio)
         N = out_enc.shape[0]
-        init_target_seq = paddle.full(
-            (N, self.max_seq_len + 1), self.padding_idx, dtype="int64"
+        num_classes = self.classifier.weight.shape[1]
+        # the start token also ends the sequence, as in SATRNLabelDecode
+        end_idx = self.start_idx
+
+        # every step decodes only the last position, with the keys and values
+        # of out_enc projected once and those of the positions before cached
+        enc_kv = [
+            layer.enc_attn.project_kv(out_enc, out_enc) for layer in self.layer_stack
+        ]
+        enc_k = paddle.stack([k for k, _ in enc_kv])
+        enc_v = paddle.stack([v for _, v in enc_kv])
+        self_attn = self.layer_stack[0].self_attn
+        k_cache = paddle.zeros(
+            [
+                len(self.layer_stack),
+                N,
+                self_attn.n_head,
+                self.max_seq_len,
+                self_attn.d_k,
+            ],
+            dtype=out_enc.dtype,
         )
-        # bsz * seq_len
-        init_target_seq[:, 0] = self.start_idx
-
-        outputs = []
+        v_cache = paddle.zeros(
+            [
+                len(self.layer_stack),
+                N,
+                self_attn.n_head,
+                self.max_seq_len,
+                self_attn.d_v,
+            ],
+            dtype=out_enc.dtype,
+        )
+        positions = paddle.arange(self.max_seq_len)
+
+        # the steps after the end of a sequence are the end token
+        end_result = F.one_hot(paddle.full([N], end_idx, dtype="int64"), num_classes)
+        outputs = end_result.unsqueeze(1).tile([1, self.max_seq_len, 1])
+        # the samples which have not decoded the end token, the finished ones
+        # are dropped from the batch
+        active = paddle.arange(N)
+        trg_seq = paddle.full((N, 1), self.start_idx, dtype="int64")
         for step in range(0, paddle.to_tensor(self.max_seq_len)):
-            decoder_output = self._attention(
-                init_target_seq, out_enc, src_mask=src_mask
-            )
-            # bsz * seq_len * C
-            step_result = F.softmax(
-                self.classifier(decoder_output[:, step, :]), axis=-1
-            )
+            trg_embedding = self.trg_word_emb(trg_seq)
+            trg_pos_encoded = self.position_enc(trg_embedding, offset=step)
+            output = self.dropout(trg_pos_encoded)
+            position = (positions == step).astype(output.dtype).unsqueeze(-1)
+            self_attn_mask = (positions <= step).reshape([1, 1, 1, -1])
+            k_caches, v_caches = [], []
+            for i, dec_layer in enumerate(self.layer_stack):
+                output, k, v = dec_layer.forward_step(
+                    output,
+                    k_cache[i],
+                    v_cache[i],
+                    enc_k[i],
+                    enc_v[i],
+                    self_attn_mask,
+                    position,
+                    dec_enc_attn_mask=src_mask,
+                )
+                k_caches.append(k)
+                v_caches.append(v)
+            k_cache = paddle.stack(k_caches)
+            v_cache = paddle.stack(v_caches)
+            decoder_output = self.layer_norm(output)
             # bsz * num_classes
-            outputs.append(step_result)
+            step_result = F.softmax(self.classifier(decoder_output[:, 0, :]), axis=-1)
             step_max_index = paddle.argmax(step_result, axis=-1)
-            init_target_seq[:, step + 1] = step_max_index
-
-        outputs = paddle.stack(outputs, axis=1)
+            step_result = paddle.scatter(end_result, active, step_result)
+            outputs = outputs * (1 - position) + step_result.unsqueeze(1) * position
+            if paddle.equal_all(
+                step_max_index,
+                paddle.full(step_max_index.shape, end_idx, dtype="int64"),
+            ):
+                break
+
+            keep = paddle.nonzero(step_max_index != end_idx).flatten()
+            active = paddle.gather(active, keep)
+            trg_seq = paddle.gather(step_max_index, keep).reshape([-1, 1])
+            k_cache = paddle.gather(k_cache, keep, axis=1)
+            v_cache = paddle.gather(v_cache, keep, axis=1)
+            enc_k = paddle.gather(enc_k, keep, axis=1)
+            enc_v = paddle.gather(enc_v, keep, axis=1)
+            if src_mask is not None:
+                src_mask = paddle.gather(src_mask, keep)
 
         return outputs
 
@@ -16,108 +16,110 @@ This code is refer from:
 https://github.com/open-mmlab/mmocr/blob/main/mmocr/models/textdet/postprocess/drrg_postprocessor.py
 """
 
-import functools
-import operator
-
 import numpy as np
 import paddle
 from numpy.linalg import norm
 import cv2
 
-
-class Node:
-    def __init__(self, ind):
-        self.__ind = ind
-        self.__links = set()
-
-    @property
-    def ind(self):
-        return self.__ind
-
-    @property
-    def links(self):
-        return set(self.__links)
-
-    def add_link(self, link_node):
-        self.__links.add(link_node)
-        link_node.__links.add(self)
+# the edge lengths within EPS of edge_len_thr are computed again by norm
+EPS = 1e-3
 
 
 def graph_propagation(edges, scores, text_comps, edge_len_thr=50.0):
+    """
+    The graph of the text components, with the edges longer than edge_len_thr
+    scored 0 if text_comps is given and the scores of the repeated edges
+    averaged in order.
+
+    Returns:
+        nodes (ndarray): The sorted indexes of the text components in edges.
+        graph (tuple): The CSR adjacency (indptr, indices, link_scores) of
+            the nodes, each edge is in the rows of both its nodes.
+    """
     assert edges.ndim == 2
     assert edges.shape[1] == 2
     assert edges.shape[0] == scores.shape[0]
-    assert text_comps.ndim == 2
+    assert text_comps is None or text_comps.ndim == 2
     assert isinstance(edge_len_thr, float)
 
     edges = np.sort(edges, axis=1)
-    score_dict = {}
-    for i, edge in enumerate(edges):
-        if text_comps is not None:
-            box1 = text_comps[edge[0], :8].reshape(4, 2)
-            box2 = text_comps[edge[1], :8].reshape(4, 2)
-            center1 = np.mean(box1, axis=0)
-            center2 = np.mean(box2, axis=0)
-            distance = norm(center1 - center2)
-            if distance > edge_len_thr:
-                scores[i] = 0
-        if (edge[0], edge[1]) in score_dict:
-            score_dict[edge[0], edge[1]] = 0.5 * (
-                score_dict[edge[0], edge[1]] + scores[i]
-            )
-        else:
-            score_dict[edge[0], edge[1]] = scores[i]
-
-    nodes = np.sort(np.unique(edges.flatten()))
-    mapping = -1 * np.ones((np.max(nodes) + 1), dtype=np.int32)
-    mapping[nodes] = np.arange(nodes.shape[0])
-    order_inds = mapping[edges]
-    vertices = [Node(node) for node in nodes]
-    for ind in order_inds:
-        vertices[ind[0]].add_link(vertices[ind[1]])
-
-    return vertices, score_dict
+    if text_comps is not None:
+        centers = np.mean(text_comps[:, :8].reshape((-1, 4, 2)), axis=1)
+        offsets = centers[edges[:, 0]] - centers[edges[:, 1]]
+        distances = np.sqrt(np.sum(offsets * offsets, axis=1))
+        for i in np.flatnonzero(np.abs(distances - edge_len_thr) <= EPS):
+            distances[i] = norm(offsets[i])
+        scores[distances > edge_len_thr] = 0
+
+    links, inverse = np.unique(edges, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    # the k-th repeat of every edge is averaged with the score so far
+    order = np.argsort(inverse, kind="stable")
+    counts = np.bincount(inverse)
+    ranks = np.arange(len(order)) - np.repeat(np.cumsum(counts) - counts, counts)
+    link_scores = np.zeros(len(links), dtype=scores.dtype)
+    link_scores[inverse[order[ranks == 0]]] = scores[order[ranks == 0]]
+    for rank in range(1, counts.max(initial=0)):
+        repeats = order[ranks == rank]
+        link_scores[inverse[repeats]] = 0.5 * (
+            link_scores[inverse[repeats]] + scores[repeats]
+        )
 
+    nodes, links = np.unique(links, return_inverse=True)
+    links = links.reshape(-1, 2)
+    rows = np.concatenate([links[:, 0], links[:, 1]])
+    cols = np.concatenate([links[:, 1], links[:, 0]])
+    data = np.concatenate([link_scores, link_scores])
+    # the self loops once
+    once = np.concatenate([np.ones(len(links), bool), links[:, 0] != links[:, 1]])
+    order = np.argsort(rows[once], kind="stable")
+    indptr = np.concatenate(
+        [[0], np.cumsum(np.bincount(rows[once], minlength=len(nodes)))]
+    )
+    return nodes, (indptr, cols[once][order], data[once][order])
+
+
+def connected_components(nodes, graph, link_thr):
+    """
+    The clusters of the nodes, linked by the edges scored link_thr or more,
+    by union find on the arrays of the edges.
 
-def connected_components(nodes, score_dict, link_thr):
-    assert isinstance(nodes, list)
-    assert all([isinstance(node, Node) for node in nodes])
-    assert isinstance(score_dict, dict)
+    Returns:
+        clusters (ndarray): The cluster index of every node, the clusters
+            are in the order of their first nodes.
+    """
     assert isinstance(link_thr, float)
-
-    clusters = []
-    nodes = set(nodes)
-    while nodes:
-        node = nodes.pop()
-        cluster = {node}
-        node_queue = [node]
-        while node_queue:
-            node = node_queue.pop(0)
-            neighbors = set(
-                [
-                    neighbor
-                    for neighbor in node.links
-                    if score_dict[tuple(sorted([node.ind, neighbor.ind]))] >= link_thr
-                ]
-            )
-            neighbors.difference_update(cluster)
-            nodes.difference_update(neighbors)
-            cluster.update(neighbors)
-            node_queue.extend(neighbors)
-        clusters.append(list(cluster))
+    indptr, indices, link_scores = graph
+    assert len(indptr) == len(nodes) + 1
+
+    linked = link_scores >= link_thr
+    rows = np.repeat(np.arange(len(nodes)), np.diff(indptr))[linked]
+    cols = indices[linked]
+    parents = np.arange(len(nodes))
+    while True:
+        # hook every root to the smallest root linked to its tree
+        roots = np.minimum(parents[rows], parents[cols])
+        np.minimum.at(parents, parents[rows], roots)
+        np.minimum.at(parents, parents[cols], roots)
+        while True:
+            grandparents = parents[parents]
+            if np.array_equal(grandparents, parents):
+                break
+            parents = grandparents
+        if np.array_equal(parents[rows], parents[cols]):
+            break
+    _, clusters = np.unique(parents, return_inverse=True)
     return clusters
 
 
-def clusters2labels(clusters, num_nodes):
-    assert isinstance(clusters, list)
-    assert all([isinstance(cluster, list) for cluster in clusters])
-    assert all([isinstance(node, Node) for cluster in clusters for node in cluster])
+def clusters2labels(nodes, clusters, num_nodes):
+    """The cluster labels of all the text components, the components in no
+    edge are labelled 0 as before."""
+    assert len(nodes) == len(clusters)
     assert isinstance(num_nodes, int)
 
     node_labels = np.zeros(num_nodes)
-    for cluster_ind, cluster in enumerate(clusters):
-        for node in cluster:
-            node_labels[node.ind] = cluster_ind
+    node_labels[nodes] = clusters
     return node_labels
 
 
@@ -125,66 +127,55 @@ def remove_single(text_comps, comp_pred_labels):
     assert text_comps.ndim == 2
     assert text_comps.shape[0] == comp_pred_labels.shape[0]
 
-    single_flags = np.zeros_like(comp_pred_labels)
-    pred_labels = np.unique(comp_pred_labels)
-    for label in pred_labels:
-        current_label_flag = comp_pred_labels == label
-        if np.sum(current_label_flag) == 1:
-            single_flags[np.where(current_label_flag)[0][0]] = 1
-    keep_ind = [i for i in range(len(comp_pred_labels)) if not single_flags[i]]
+    _, inverse, counts = np.unique(
+        comp_pred_labels, return_inverse=True, return_counts=True
+    )
+    keep_ind = np.flatnonzero(counts[inverse] > 1)
     filtered_text_comps = text_comps[keep_ind, :]
     filtered_labels = comp_pred_labels[keep_ind]
 
     return filtered_text_comps, filtered_labels
 
 
-def norm2(point1, point2):
-    return ((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2) ** 0.5
-
-
 def min_connect_path(points):
+    """
+    The greedy path through the points, which grows at the end closer to the
+    next point. The squared lengths of all the pairs are computed at once,
+    the ties are broken as the dicts of lengths before, by the last point.
+    """
     assert isinstance(points, list)
     assert all([isinstance(point, list) for point in points])
     assert all([isinstance(coord, int) for point in points for coord in point])
 
-    points_queue = points.copy()
-    shortest_path = []
-    current_edge = [[], []]
-
-    edge_dict0 = {}
-    edge_dict1 = {}
-    current_edge[0] = points_queue[0]
-    current_edge[1] = points_queue[0]
-    points_queue.remove(points_queue[0])
-    while points_queue:
-        for point in points_queue:
-            length0 = norm2(point, current_edge[0])
-            edge_dict0[length0] = [point, current_edge[0]]
-            length1 = norm2(current_edge[1], point)
-            edge_dict1[length1] = [current_edge[1], point]
-        key0 = min(edge_dict0.keys())
-        key1 = min(edge_dict1.keys())
-
-        if key0 <= key1:
-            start = edge_dict0[key0][0]
-            end = edge_dict0[key0][1]
-            shortest_path.insert(0, [points.index(start), points.index(end)])
-            points_queue.remove(start)
-            current_edge[0] = start
+    points = np.array(points, dtype=np.int64).reshape(-1, 2)
+    num = len(points)
+    offsets = points[:, None] - points[None]
+    lengths = np.sum(offsets * offsets, axis=-1)
+    # the first of the equal points, as points.index
+    first = np.argmax(lengths == 0, axis=1)
+    duplicated = (first != np.arange(num)).any()
+    removed_length = np.iinfo(np.int64).max
+    lengths[:, 0] = removed_length
+
+    start = end = 0
+    start_path, end_path = [], []
+    for _ in range(num - 1):
+        start_next = num - 1 - lengths[start, ::-1].argmin()
+        end_next = num - 1 - lengths[end, ::-1].argmin()
+        if lengths[start, start_next] <= lengths[end, end_next]:
+            start_path.append([first[start_next], first[start]])
+            removed = start = start_next
         else:
-            start = edge_dict1[key1][0]
-            end = edge_dict1[key1][1]
-            shortest_path.append([points.index(start), points.index(end)])
-            points_queue.remove(end)
-            current_edge[1] = end
-
-        edge_dict0 = {}
-        edge_dict1 = {}
-
-    shortest_path = functools.reduce(operator.concat, shortest_path)
-    shortest_path = sorted(set(shortest_path), key=shortest_path.index)
+            end_path.append([first[end], first[end_next]])
+            removed = end = end_next
+        if duplicated:
+            removed = np.flatnonzero(
+                (first == first[removed]) & (lengths[0] < removed_length)
+            )[0]
+        lengths[:, removed] = removed_length
 
-    return shortest_path
+    shortest_path = [ind for edge in start_path[::-1] + end_path for ind in edge]
+    return [int(ind) for ind in dict.fromkeys(shortest_path)]
 
 
 def in_contour(cont, point):
@@ -226,8 +217,10 @@ def comps2boundaries(text_comps, comp_pred_labels):
     boundaries = []
     if len(text_comps) < 1:
         return boundaries
-    for cluster_ind in range(0, int(np.max(comp_pred_labels)) + 1):
-        cluster_comp_inds = np.where(comp_pred_labels == cluster_ind)
+    # the components of every cluster in their order, with one sort
+    order = np.argsort(comp_pred_labels, kind="stable")
+    _, starts = np.unique(comp_pred_labels[order], return_index=True)
+    for cluster_comp_inds in np.split(order, starts[1:]):
         text_comp_boxes = (
             text_comps[cluster_comp_inds, :8].reshape((-1, 4, 2)).astype(np.int32)
         )
@@ -296,9 +289,9 @@ class DRRGPostprocess(object):
             assert text_comps.ndim == 2
             assert text_comps.shape[1] == 9
 
-            vertices, score_dict = graph_propagation(edges, scores, text_comps)
-            clusters = connected_components(vertices, score_dict, self.link_thr)
-            pred_labels = clusters2labels(clusters, text_comps.shape[0])
+            nodes, graph = graph_propagation(edges, scores, text_comps)
+            clusters = connected_components(nodes, graph, self.link_thr)
+            pred_labels = clusters2labels(nodes, clusters, text_comps.shape[0])
             text_comps, pred_labels = remove_single(text_comps, pred_labels)
             boundaries = comps2boundaries(text_comps, pred_labels)
         else:
@@ -21,9 +21,7 @@ from .locality_aware_nms import nms_locality
 import cv2
 import paddle
 
-import os
-from ppocr.utils.utility import check_install
-import sys
+from ppocr.utils.nms import overlap_pairs, quad_bounds
 
 
 class EASTPostProcess(object):
@@ -72,27 +70,45 @@ class EASTPostProcess(object):
         boxes[:, :8] = text_box_restored.reshape((-1, 8))
         boxes[:, 8] = score_map[xy_text[:, 0], xy_text[:, 1]]
 
-        try:
-            check_install("lanms", "lanms-nova")
-            import lanms
-
-            boxes = lanms.merge_quadrangle_n9(boxes, nms_thresh)
-        except:
-            print(
-                "You should install lanms by pip3 install lanms-nova to speed up nms_locality"
-            )
-            boxes = nms_locality(boxes.astype(np.float64), nms_thresh)
+        boxes = nms_locality(boxes.astype(np.float64), nms_thresh)
         if boxes.shape[0] == 0:
             return []
         # Here we filter some low score boxes by the average score map,
         #   this is different from the orginal paper.
-        for i, box in enumerate(boxes):
-            mask = np.zeros_like(score_map, dtype=np.uint8)
-            cv2.fillPoly(mask, box[:8].reshape((-1, 4, 2)).astype(np.int32) // 4, 1)
-            boxes[i, 8] = cv2.mean(score_map, mask)[0]
+        boxes[:, 8] = self.mean_scores(score_map, boxes)
         boxes = boxes[boxes[:, 8] > cover_thresh]
         return boxes
 
+    def mean_scores(self, score_map, boxes):
+        """
+        The mean scores of score_map within the quads of boxes, at 1/4 of
+        their coordinates. The quads are filled with their labels into a few
+        label maps, where the quads of a map have no overlapping bounding
+        boxes, and the scores are summed per label over each map at once.
+        """
+        quads = boxes[:, :8].reshape((-1, 4, 2)).astype(np.int32) // 4
+        indptr, indices = overlap_pairs(quad_bounds(quads))
+        # the first layer without a quad before which overlaps
+        layers = np.zeros(len(quads), dtype=np.int64)
+        for i in range(len(quads)):
+            before = indices[indptr[i] : indptr[i + 1]]
+            used = layers[before[before < i]]
+            free = np.flatnonzero(np.bincount(used, minlength=len(used) + 1) == 0)
+            layers[i] = free[0]
+
+        sums = np.zeros(len(quads) + 1)
+        counts = np.zeros(len(quads) + 1)
+        label_map = np.zeros(score_map.shape, dtype=np.int32)
+        for layer in range(layers.max() + 1):
+            label_map[:] = 0
+            for i in np.flatnonzero(layers == layer):
+                cv2.fillPoly(label_map, quads[i : i + 1], int(i) + 1)
+            label = label_map.reshape(-1)
+            sums += np.bincount(label, score_map.reshape(-1), len(quads) + 1)
+            counts += np.bincount(label, minlength=len(quads) + 1)
+        # cv2.mean gives 0 for an empty mask
+        return np.where(counts > 0, sums / np.maximum(counts, 1), 0)[1:]
+
     def sort_poly(self, p):
         """
         Sort polygons.
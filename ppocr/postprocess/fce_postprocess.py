@@ -16,11 +16,12 @@ This code is refer from:
 https://github.com/open-mmlab/mmocr/blob/v0.3.0/mmocr/models/textdet/postprocess/wrapper.py
 """
 
+from functools import lru_cache
+
 import cv2
 import paddle
 import numpy as np
-from numpy.fft import ifft
-from ppocr.utils.poly_nms import poly_nms, valid_boundary
+from ppocr.utils.poly_nms import BufferedPolygons, poly_nms_groups, valid_boundary
 
 
 def fill_hole(input_mask):
@@ -36,6 +37,17 @@ def fill_hole(input_mask):
     return ~canvas | input_mask
 
 
+@lru_cache(maxsize=None)
+def fourier_basis(fourier_degree, num_reconstr_points):
+    """
+    The basis [2k+1, n'] of the inverse Fourier transform, the points of the
+    polygons are the products of their coefficients with it.
+    """
+    freqs = np.arange(-fourier_degree, fourier_degree + 1)
+    points = np.arange(num_reconstr_points)
+    return np.exp(2j * np.pi * np.outer(freqs, points) / num_reconstr_points)
+
+
 def fourier2poly(fourier_coeff, num_reconstr_points=50):
     """Inverse Fourier transform
     Args:
@@ -47,17 +59,14 @@ def fourier2poly(fourier_coeff, num_reconstr_points=50):
         Polygons (ndarray): The reconstructed polygons shaped (n, n')
     """
 
-    a = np.zeros((len(fourier_coeff), num_reconstr_points), dtype="complex")
-    k = (len(fourier_coeff[0]) - 1) // 2
-
-    a[:, 0 : k + 1] = fourier_coeff[:, k:]
-    a[:, -k:] = fourier_coeff[:, :k]
-
-    poly_complex = ifft(a) * num_reconstr_points
+    k = (fourier_coeff.shape[1] - 1) // 2
+    poly_complex = fourier_coeff @ fourier_basis(k, num_reconstr_points)
     polygon = np.zeros((len(fourier_coeff), num_reconstr_points, 2))
     polygon[:, :, 0] = poly_complex.real
     polygon[:, :, 1] = poly_complex.imag
-    return polygon.astype("int32").reshape((len(fourier_coeff), -1))
+    return polygon.astype("int32").reshape(
+        (len(fourier_coeff), 2 * num_reconstr_points)
+    )
 
 
 class FCEPostProcess(object):
@@ -130,121 +139,120 @@ class FCEPostProcess(object):
 
     def get_boundary(self, score_maps, shape_list):
         assert len(score_maps) == len(self.scales)
-        boundaries = []
-        for idx, score_map in enumerate(score_maps):
-            scale = self.scales[idx]
-            boundaries = boundaries + self._get_boundary_single(score_map, scale)
-
-        # nms
-        boundaries = poly_nms(boundaries, self.nms_thr)
-        boundaries, scores = self.resize_boundary(
-            boundaries, (1 / shape_list[0, 2:]).tolist()[::-1]
-        )
-
-        boxes_batch = [dict(points=boundaries, scores=scores)]
+        boxes_batch = []
+        for batch_index in range(len(shape_list)):
+            boundaries = self._get_boundary_single(
+                [[cls[batch_index], reg[batch_index]] for cls, reg in score_maps]
+            )
+            boundaries, scores = self.resize_boundary(
+                boundaries, (1 / shape_list[batch_index, 2:]).tolist()[::-1]
+            )
+            boxes_batch.append(dict(points=boundaries, scores=scores))
         return boxes_batch
 
-    def _get_boundary_single(self, score_map, scale):
-        assert len(score_map) == 2
-        assert score_map[1].shape[1] == 4 * self.fourier_degree + 2
-
-        return self.fcenet_decode(
-            preds=score_map,
-            fourier_degree=self.fourier_degree,
-            num_reconstr_points=self.num_reconstr_points,
-            scale=scale,
-            alpha=self.alpha,
-            beta=self.beta,
-            box_type=self.box_type,
-            score_thr=self.score_thr,
-            nms_thr=self.nms_thr,
+    def _get_boundary_single(self, score_maps):
+        """
+        The boundaries of an image from the predictions of all the levels.
+
+        The candidates of a level are nms-ed per text region, the results of
+        the regions per level and the results of the levels together, by
+        poly_nms_groups on the candidates of all the levels at once, so every
+        polygon is buffered once.
+        """
+        points, scores, regions, levels = [], [], [], []
+        for level, (cls_pred, reg_pred) in enumerate(score_maps):
+            assert reg_pred.shape[0] == 4 * self.fourier_degree + 2
+            level_points, level_scores, level_regions = self.fcenet_decode(
+                cls_pred, reg_pred, self.scales[level]
+            )
+            points.append(level_points)
+            scores.append(level_scores)
+            regions.append(level_regions)
+            levels.append(np.full(len(level_scores), level))
+        points, scores = np.concatenate(points), np.concatenate(scores)
+        regions, levels = np.concatenate(regions), np.concatenate(levels)
+        if len(scores) == 0:
+            return []
+        polygons = BufferedPolygons(points)
+
+        # the ids of the regions of all the levels, in order
+        region_ids = levels * (regions.max() + 1) + regions
+        keep = poly_nms_groups(polygons, scores, region_ids, self.nms_thr)
+        keep = keep[
+            poly_nms_groups(
+                polygons.take(keep),
+                scores[keep],
+                levels[keep],
+                self.nms_thr,
+            )
+        ]
+
+        if self.box_type == "quad":
+            quads = []
+            for i in keep:
+                poly = points[i].reshape(-1, 2).astype(np.float32)
+                quad = np.int64(cv2.boxPoints(cv2.minAreaRect(poly)))
+                quads.append(quad.reshape(-1))
+            points = np.array(quads).reshape(len(keep), -1)
+            polygons = BufferedPolygons(points)
+            scores = scores[keep]
+        else:
+            points = points[keep]
+            polygons = polygons.take(keep)
+            scores = scores[keep]
+
+        keep = poly_nms_groups(
+            polygons, scores, np.zeros(len(scores), dtype=np.int64), self.nms_thr
         )
+        boundaries = np.concatenate([points[keep], scores[keep, None]], axis=1)
+        return boundaries.tolist()
 
-    def fcenet_decode(
-        self,
-        preds,
-        fourier_degree,
-        num_reconstr_points,
-        scale,
-        alpha=1.0,
-        beta=2.0,
-        box_type="poly",
-        score_thr=0.3,
-        nms_thr=0.1,
-    ):
-        """Decoding predictions of FCENet to instances.
+    def fcenet_decode(self, cls_pred, reg_pred, scale):
+        """Decoding the predictions of FCENet of a level to candidates.
 
         Args:
-            preds (list(Tensor)): The head output tensors.
-            fourier_degree (int): The maximum Fourier transform degree k.
-            num_reconstr_points (int): The points number of the polygon
-                reconstructed from predicted Fourier coefficients.
+            cls_pred (ndarray): The text region and center region
+                predictions (4, h, w).
+            reg_pred (ndarray): The Fourier coefficient predictions
+                (4k+2, h, w).
             scale (int): The down-sample scale of the prediction.
-            alpha (float) : The parameter to calculate final scores. Score_{final}
-                    = (Score_{text region} ^ alpha)
-                    * (Score_{text center region}^ beta)
-            beta (float) : The parameter to calculate final score.
-            box_type (str):  Boundary encoding type 'poly' or 'quad'.
-            score_thr (float) : The threshold used to filter out the final
-                candidates.
-            nms_thr (float) :  The threshold of nms.
 
         Returns:
-            boundaries (list[list[float]]): The instance boundary and confidence
-                list.
+            points (ndarray): The reconstructed polygons of the candidates
+                (n, 2n'), in the order of the text regions and in raster
+                order in a region.
+            scores (ndarray): The scores of the candidates (n,).
+            regions (ndarray): The text regions of the candidates (n,).
         """
-        assert isinstance(preds, list)
-        assert len(preds) == 2
-        assert box_type in ["poly", "quad"]
-
-        cls_pred = preds[0][0]
+        assert self.box_type in ["poly", "quad"]
+        k = self.fourier_degree
         tr_pred = cls_pred[0:2]
         tcl_pred = cls_pred[2:]
 
-        reg_pred = preds[1][0].transpose([1, 2, 0])
-        x_pred = reg_pred[:, :, : 2 * fourier_degree + 1]
-        y_pred = reg_pred[:, :, 2 * fourier_degree + 1 :]
-
-        score_pred = (tr_pred[1] ** alpha) * (tcl_pred[1] ** beta)
-        tr_pred_mask = (score_pred) > score_thr
+        score_pred = (tr_pred[1] ** self.alpha) * (tcl_pred[1] ** self.beta)
+        tr_pred_mask = (score_pred) > self.score_thr
         tr_mask = fill_hole(tr_pred_mask)
 
         tr_contours, _ = cv2.findContours(
             tr_mask.astype(np.uint8), cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE
         )  # opencv4
 
-        mask = np.zeros_like(tr_mask)
-        boundaries = []
-        for cont in tr_contours:
-            deal_map = mask.copy().astype(np.int8)
-            cv2.drawContours(deal_map, [cont], -1, 1, -1)
-
-            score_map = score_pred * deal_map
-            score_mask = score_map > 0
-            xy_text = np.argwhere(score_mask)
-            dxy = xy_text[:, 1] + xy_text[:, 0] * 1j
-
-            x, y = x_pred[score_mask], y_pred[score_mask]
-            c = x + y * 1j
-            c[:, fourier_degree] = c[:, fourier_degree] + dxy
-            c *= scale
-
-            polygons = fourier2poly(c, num_reconstr_points)
-            score = score_map[score_mask].reshape(-1, 1)
-            polygons = poly_nms(np.hstack((polygons, score)).tolist(), nms_thr)
-
-            boundaries = boundaries + polygons
-
-        boundaries = poly_nms(boundaries, nms_thr)
-
-        if box_type == "quad":
-            new_boundaries = []
-            for boundary in boundaries:
-                poly = np.array(boundary[:-1]).reshape(-1, 2).astype(np.float32)
-                score = boundary[-1]
-                points = cv2.boxPoints(cv2.minAreaRect(poly))
-                points = np.int64(points)
-                new_boundaries.append(points.reshape(-1).tolist() + [score])
-                boundaries = new_boundaries
-
-        return boundaries
+        # the filled contours do not overlap, as the holes are filled
+        region_map = np.zeros(tr_mask.shape, dtype=np.int32)
+        for i, cont in enumerate(tr_contours):
+            cv2.drawContours(region_map, [cont], -1, i + 1, -1)
+        region_map[score_pred <= 0] = 0
+        # the candidates of the regions in order, in raster order in a region
+        flat_region = region_map.reshape(-1)
+        candidates = np.flatnonzero(flat_region)
+        candidates = candidates[np.argsort(flat_region[candidates], kind="stable")]
+        y, x = np.divmod(candidates, region_map.shape[1])
+
+        reg_pred = reg_pred.reshape(len(reg_pred), -1)[:, candidates].T
+        c = reg_pred[:, : 2 * k + 1] + reg_pred[:, 2 * k + 1 :] * 1j
+        c[:, k] = c[:, k] + (x + y * 1j)
+        c *= scale
+
+        points = fourier2poly(c, self.num_reconstr_points)
+        scores = score_pred.reshape(-1)[candidates].astype(np.float64)
+        return points, scores, flat_region[candidates] - 1
@@ -6,6 +6,18 @@ This code is refered from: https://github.com/songdejia/EAST/blob/master/localit
 import numpy as np
 from shapely.geometry import Polygon
 
+from ppocr.utils.nms import (
+    convex_intersection_area,
+    greedy_nms,
+    is_convex_quad,
+    overlap_pairs,
+    polygon_area,
+    quad_bounds,
+)
+
+# the ious within EPS of the threshold are computed again by intersection
+EPS = 1e-6
+
 
 def intersection(g, p):
     """
@@ -43,6 +55,66 @@ def intersection_iog(g, p):
         return inter / union
 
 
+def bounds_overlap(g, p):
+    """
+    Whether the bounding boxes of the quads g and p overlap, the iou of the
+    quads is 0 if not.
+    """
+    g_x, g_y, p_x, p_y = g[0:8:2], g[1:8:2], p[0:8:2], p[1:8:2]
+    return (
+        g_x.min() <= p_x.max()
+        and p_x.min() <= g_x.max()
+        and g_y.min() <= p_y.max()
+        and p_y.min() <= g_y.max()
+    )
+
+
+def iou_above(G, P, thres):
+    """
+    Whether the ious of the pairs of quads G and P [M, 9] are above thres.
+    The ious of the convex quads are computed by convex_intersection_area, and
+    by intersection as before only if they are within EPS of thres.
+    """
+    g_quads = G[:, :8].astype(np.float64).reshape((-1, 4, 2))
+    p_quads = P[:, :8].astype(np.float64).reshape((-1, 4, 2))
+    g_areas = np.abs(polygon_area(g_quads))
+    p_areas = np.abs(polygon_area(p_quads))
+    fast = np.flatnonzero(
+        is_convex_quad(g_quads)
+        & (g_areas > 0)
+        & is_convex_quad(p_quads)
+        & (p_areas > 0)
+    )
+    above = np.zeros(len(G), dtype=bool)
+    exact = np.ones(len(G), dtype=bool)
+    inter = convex_intersection_area(g_quads[fast], p_quads[fast])
+    iou = inter / (g_areas[fast] + p_areas[fast] - inter)
+    above[fast] = iou > thres
+    exact[fast] = np.abs(iou - thres) <= EPS
+    for k in np.flatnonzero(exact):
+        above[k] = intersection(G[k], P[k]) > thres
+    return above
+
+
+def quad_nms(S, thres):
+    """
+    Standard nms of the quads S [N, 9], which compares the quads with
+    overlapping bounding boxes by iou_above, so the kept quads are the same.
+
+    Returns:
+        the indexes of the kept quads, in the descending order of the scores.
+    """
+    order = np.argsort(S[:, 8])[::-1]
+    quads = S[:, :8].astype(np.float64).reshape((-1, 4, 2))
+    indptr, indices = overlap_pairs(quad_bounds(quads))
+
+    # the ious from the kept quads only, most quads are suppressed
+    def suppress(idx, entries):
+        return iou_above(S[[idx] * len(entries)], S[indices[entries]], thres)
+
+    return greedy_nms(order, (indptr, indices), suppress)
+
+
 def weighted_merge(g, p):
     """
     Weighted merge.
@@ -56,16 +128,7 @@ def standard_nms(S, thres):
     """
     Standard nms.
     """
-    order = np.argsort(S[:, 8])[::-1]
-    keep = []
-    while order.size > 0:
-        i = order[0]
-        keep.append(i)
-        ovr = np.array([intersection(S[i], S[t]) for t in order[1:]])
-
-        inds = np.where(ovr <= thres)[0]
-        order = order[inds + 1]
-
+    keep = quad_nms(S, thres)
     return S[keep]
 
 
@@ -73,34 +136,14 @@ def standard_nms_inds(S, thres):
     """
     Standard nms, retun inds.
     """
-    order = np.argsort(S[:, 8])[::-1]
-    keep = []
-    while order.size > 0:
-        i = order[0]
-        keep.append(i)
-        ovr = np.array([intersection(S[i], S[t]) for t in order[1:]])
-
-        inds = np.where(ovr <= thres)[0]
-        order = order[inds + 1]
-
-    return keep
+    return quad_nms(S, thres)
 
 
 def nms(S, thres):
     """
     nms.
     """
-    order = np.argsort(S[:, 8])[::-1]
-    keep = []
-    while order.size > 0:
-        i = order[0]
-        keep.append(i)
-        ovr = np.array([intersection(S[i], S[t]) for t in order[1:]])
-
-        inds = np.where(ovr <= thres)[0]
-        order = order[inds + 1]
-
-    return keep
+    return quad_nms(S, thres)
 
 
 def soft_nms(boxes_in, Nt_thres=0.3, threshold=0.8, sigma=0.5, method=2):
@@ -143,7 +186,7 @@ def soft_nms(boxes_in, Nt_thres=0.3, threshold=0.8, sigma=0.5, method=2):
         # NMS iteration
         while pos < N:
             sbox = boxes[pos].copy()
-            ts_iou_val = intersection(tbox, sbox)
+            ts_iou_val = intersection(tbox, sbox) if bounds_overlap(tbox, sbox) else 0
             if ts_iou_val > 0:
                 if method == 1:
                     if ts_iou_val > Nt_thres:
@@ -176,23 +219,45 @@ def nms_locality(polys, thres=0.3):
     :param polys: a N*9 numpy array. first 8 coordinates, then prob
     :return: boxes after nms
     """
-    S = []
-    p = None
-    for g in polys:
-        if p is not None and intersection(g, p) > thres:
-            p = weighted_merge(g, p)
-        else:
-            if p is not None:
-                S.append(p)
-            p = g
-    if p is not None:
-        S.append(p)
-
-    if len(S) == 0:
+    polys = np.asarray(polys, dtype=np.float64)
+    if len(polys) == 0:
         return np.array([])
+    # python floats, the merge is cheaper than in numpy
+    rows = polys.tolist()
+    # whether each quad is merged into the merged quad p before it, guessed
+    # from the ious to the merged quads of the previous guess until they agree.
+    # The guesses before the first disagreement are right, and a quad which is
+    # not merged starts p again, so only a few merged quads change.
+    merge = np.ones(len(rows), dtype=bool)
+    merge[0] = False
+    above = np.zeros(len(rows), dtype=bool)
+    merged = [rows[0]] * len(rows)
+    start = 1
+    while start < len(rows):
+        todo = [start]
+        for i in range(start, len(rows)):
+            p = _weighted_merge(rows[i], merged[i - 1]) if merge[i] else rows[i]
+            if i + 1 < len(rows) and p != merged[i]:
+                todo.append(i + 1)
+            merged[i] = p
+        above[todo] = iou_above(
+            polys[todo], np.array([merged[i - 1] for i in todo]), thres
+        )
+        changed = np.flatnonzero(above[start:] != merge[start:])
+        if len(changed) == 0:
+            break
+        merge[start:] = above[start:]
+        start += changed[0]
+    S = [merged[i] for i in np.flatnonzero(~np.append(merge[1:], False))]
     return standard_nms(np.array(S), thres)
 
 
+def _weighted_merge(g, p):
+    """weighted_merge of the lists g and p"""
+    weight = g[8] + p[8]
+    return [(g[8] * g[i] + p[8] * p[i]) / weight for i in range(8)] + [weight]
+
+
 if __name__ == "__main__":
     # 343,350,448,135,474,143,369,359
     print(Polygon(np.array([[343, 350], [448, 135], [474, 143], [369, 359]])).area)
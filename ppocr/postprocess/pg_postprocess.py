@@ -50,17 +50,17 @@ class PGPostProcess(object):
         if sys.version_info.major == 3 and sys.version_info.minor == 5:
             self.is_python35 = True
 
-    def __call__(self, outs_dict, shape_list):
-        post = PGNet_PostProcess(
+        # the dictionary is loaded once, not on every call
+        self.post = PGNet_PostProcess(
             self.character_dict_path,
             self.valid_set,
             self.score_thresh,
-            outs_dict,
-            shape_list,
             point_gather_mode=self.point_gather_mode,
         )
+
+    def __call__(self, outs_dict, shape_list):
         if self.mode == "fast":
-            data = post.pg_postprocess_fast()
+            data = self.post.pg_postprocess_fast(outs_dict, shape_list)
         else:
-            data = post.pg_postprocess_slow()
+            data = self.post.pg_postprocess_slow(outs_dict, shape_list)
         return data
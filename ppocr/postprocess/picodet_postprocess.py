@@ -48,6 +48,41 @@ def hard_nms(box_scores, iou_threshold, top_k=-1, candidate_size=200):
     return box_scores[picked, :]
 
 
+def batched_hard_nms(
+    box_scores, group_ids, iou_threshold, top_k=-1, candidate_size=200
+):
+    """
+    Same as hard_nms for every group of boxes, e.g. every class of every image,
+    the iou between the candidates of a group is computed at once.
+    Args:
+        box_scores (N, 5): boxes in corner-form and probabilities.
+        group_ids (N): group index of every box.
+        iou_threshold: intersection over union threshold.
+        top_k: keep top_k results of every group. If k <= 0, keep all the results.
+        candidate_size: only consider the candidates with the highest scores of every group.
+    Returns:
+         picked: indexes of the kept boxes, sorted by group index and score.
+    """
+    picked = []
+    for group_id in np.unique(group_ids):
+        indexes = np.nonzero(group_ids == group_id)[0]
+        # the same candidate order as hard_nms
+        indexes = indexes[np.argsort(box_scores[indexes, -1])][-candidate_size:][::-1]
+        boxes = box_scores[indexes, :-1]
+        iou = iou_of(np.expand_dims(boxes, axis=1), np.expand_dims(boxes, axis=0))
+        suppressed = np.zeros(len(indexes), dtype=bool)
+        group_picked = 0
+        for i in range(len(indexes)):
+            if suppressed[i]:
+                continue
+            picked.append(indexes[i])
+            group_picked += 1
+            if 0 < top_k == group_picked:
+                break
+            suppressed |= ~(iou[i] <= iou_threshold)
+    return np.array(picked, dtype=np.int64)
+
+
 def iou_of(boxes0, boxes1, eps=1e-5):
     """Return intersection-over-union (Jaccard index) of boxes.
     Args:
@@ -120,6 +155,7 @@ class PicoDetPostProcess(object):
         self.nms_threshold = nms_threshold
         self.nms_top_k = nms_top_k
         self.keep_top_k = keep_top_k
+        self._centers = {}
 
     def load_layout_dict(self, layout_dict_path):
         with open(layout_dict_path, "r", encoding="utf-8") as fp:
@@ -164,111 +200,116 @@ class PicoDetPostProcess(object):
         scale_factor = np.array((scale_factor,)).astype("float32")
         return ori_shape, input_shape, scale_factor
 
+    def get_centers(self, input_shape, stride):
+        """Anchor centers of a feature map, cached by input shape and stride"""
+        key = (tuple(input_shape), stride)
+        if key not in self._centers:
+            fm_h = input_shape[0] / stride
+            fm_w = input_shape[1] / stride
+            h_range = np.arange(fm_h)
+            w_range = np.arange(fm_w)
+            ww, hh = np.meshgrid(w_range, h_range)
+            ct_row = (hh.flatten() + 0.5) * stride
+            ct_col = (ww.flatten() + 0.5) * stride
+            self._centers[key] = np.stack((ct_col, ct_row, ct_col, ct_row), axis=1)
+        return self._centers[key]
+
     def __call__(self, ori_img, img, preds):
+        """
+        Args:
+            ori_img: the original image, or a list of the original images of the batch.
+            img: the network input of shape (N, C, H, W).
+            preds: the network outputs.
+        Returns:
+            the layout results of the image, or a list of the layout results of
+            every image when ori_img is a list.
+        """
         scores, raw_boxes = preds["boxes"], preds["boxes_num"]
         batch_size = raw_boxes[0].shape[0]
         reg_max = int(raw_boxes[0].shape[-1] / 4 - 1)
-        out_boxes_num = []
-        out_boxes_list = []
-        results = []
-        ori_shape, input_shape, scale_factor = self.img_info(ori_img, img)
+        ori_imgs = ori_img if isinstance(ori_img, (list, tuple)) else [ori_img]
+        assert len(ori_imgs) == batch_size
+
+        # decode the boxes of the whole batch at once
+        decode_boxes = []
+        select_scores = []
+        input_shape = img.shape[2:]
+        reg_range = np.arange(reg_max + 1)
+        for stride, box_distribute, score in zip(self.strides, raw_boxes, scores):
+            # centers
+            center = self.get_centers(input_shape, stride)
+
+            # box distribution to distance
+            box_distance = box_distribute.reshape((batch_size, -1, reg_max + 1))
+            box_distance = softmax(box_distance, axis=-1)
+            box_distance = box_distance * reg_range
+            box_distance = np.sum(box_distance, axis=-1).reshape((batch_size, -1, 4))
+            box_distance = box_distance * stride
+
+            # top K candidate
+            topk_idx = np.argsort(score.max(axis=-1), axis=-1)[:, ::-1]
+            topk_idx = topk_idx[:, : self.nms_top_k]
+            center = center[topk_idx]
+            score = np.take_along_axis(score, topk_idx[..., None], axis=1)
+            box_distance = np.take_along_axis(box_distance, topk_idx[..., None], axis=1)
+
+            # decode box
+            decode_box = center + [-1, -1, 1, 1] * box_distance
+
+            select_scores.append(score)
+            decode_boxes.append(decode_box)
+
+        # nms for every class of every image
+        bboxes = np.concatenate(decode_boxes, axis=1)
+        confidences = np.concatenate(select_scores, axis=1)
+        num_classes = confidences.shape[2]
+        batch_ids, box_ids, class_ids = np.nonzero(confidences > self.score_threshold)
+        box_probs = np.concatenate(
+            [
+                bboxes[batch_ids, box_ids],
+                confidences[batch_ids, box_ids, class_ids].reshape(-1, 1),
+            ],
+            axis=1,
+        )
+        picked = batched_hard_nms(
+            box_probs,
+            batch_ids * num_classes + class_ids,
+            iou_threshold=self.nms_threshold,
+            top_k=self.keep_top_k,
+        )
 
+        batch_results = []
         for batch_id in range(batch_size):
-            # generate centers
-            decode_boxes = []
-            select_scores = []
-            for stride, box_distribute, score in zip(self.strides, raw_boxes, scores):
-                box_distribute = box_distribute[batch_id]
-                score = score[batch_id]
-                # centers
-                fm_h = input_shape[0] / stride
-                fm_w = input_shape[1] / stride
-                h_range = np.arange(fm_h)
-                w_range = np.arange(fm_w)
-                ww, hh = np.meshgrid(w_range, h_range)
-                ct_row = (hh.flatten() + 0.5) * stride
-                ct_col = (ww.flatten() + 0.5) * stride
-                center = np.stack((ct_col, ct_row, ct_col, ct_row), axis=1)
-
-                # box distribution to distance
-                reg_range = np.arange(reg_max + 1)
-                box_distance = box_distribute.reshape((-1, reg_max + 1))
-                box_distance = softmax(box_distance, axis=1)
-                box_distance = box_distance * np.expand_dims(reg_range, axis=0)
-                box_distance = np.sum(box_distance, axis=1).reshape((-1, 4))
-                box_distance = box_distance * stride
-
-                # top K candidate
-                topk_idx = np.argsort(score.max(axis=1))[::-1]
-                topk_idx = topk_idx[: self.nms_top_k]
-                center = center[topk_idx]
-                score = score[topk_idx]
-                box_distance = box_distance[topk_idx]
-
-                # decode box
-                decode_box = center + [-1, -1, 1, 1] * box_distance
-
-                select_scores.append(score)
-                decode_boxes.append(decode_box)
-
-            # nms
-            bboxes = np.concatenate(decode_boxes, axis=0)
-            confidences = np.concatenate(select_scores, axis=0)
-            picked_box_probs = []
-            picked_labels = []
-            for class_index in range(0, confidences.shape[1]):
-                probs = confidences[:, class_index]
-                mask = probs > self.score_threshold
-                probs = probs[mask]
-                if probs.shape[0] == 0:
-                    continue
-                subset_boxes = bboxes[mask, :]
-                box_probs = np.concatenate([subset_boxes, probs.reshape(-1, 1)], axis=1)
-                box_probs = hard_nms(
-                    box_probs,
-                    iou_threshold=self.nms_threshold,
-                    top_k=self.keep_top_k,
-                )
-                picked_box_probs.append(box_probs)
-                picked_labels.extend([class_index] * box_probs.shape[0])
-
-            if len(picked_box_probs) == 0:
-                out_boxes_list.append(np.empty((0, 4)))
-                out_boxes_num.append(0)
-
-            else:
-                picked_box_probs = np.concatenate(picked_box_probs)
+            batch_picked = picked[batch_ids[picked] == batch_id]
+            picked_box_probs = box_probs[batch_picked]
+            picked_labels = class_ids[batch_picked]
+            ori_shape, _, scale_factor = self.img_info(ori_imgs[batch_id], img)
 
+            results = []
+            if len(picked_box_probs) > 0:
                 # resize output boxes
                 picked_box_probs[:, :4] = self.warp_boxes(
-                    picked_box_probs[:, :4], ori_shape[batch_id]
+                    picked_box_probs[:, :4], ori_shape[0]
                 )
                 im_scale = np.concatenate(
-                    [scale_factor[batch_id][::-1], scale_factor[batch_id][::-1]]
+                    [scale_factor[0][::-1], scale_factor[0][::-1]]
                 )
                 picked_box_probs[:, :4] /= im_scale
-                # clas score box
-                out_boxes_list.append(
-                    np.concatenate(
-                        [
-                            np.expand_dims(np.array(picked_labels), axis=-1),
-                            np.expand_dims(picked_box_probs[:, 4], axis=-1),
-                            picked_box_probs[:, :4],
-                        ],
-                        axis=1,
+                for clsid, box_prob in zip(picked_labels, picked_box_probs):
+                    results.append(
+                        {
+                            "bbox": box_prob[:4],
+                            "label": self.labels[int(clsid)],
+                            "score": box_prob[4],
+                        }
                     )
-                )
-                out_boxes_num.append(len(picked_labels))
-
-        out_boxes_list = np.concatenate(out_boxes_list, axis=0)
-        out_boxes_num = np.asarray(out_boxes_num).astype(np.int32)
+            batch_results.append(self.remove_duplicate(results))
 
-        for dt in out_boxes_list:
-            clsid, bbox, score = int(dt[0]), dt[2:], dt[1]
-            label = self.labels[clsid]
-            result = {"bbox": bbox, "label": label, "score": score}
-            results.append(result)
+        if isinstance(ori_img, (list, tuple)):
+            return batch_results
+        return batch_results[0]
 
+    def remove_duplicate(self, results):
         # Handle conflict where a box is simultaneously recognized as multiple labels.
         # Use IoU to find similar boxes. Prioritize labels as table, text, and others when deduplicate similar boxes.
         bboxes = np.array([x["bbox"] for x in results])
@@ -11,23 +11,15 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import sys
-import os
-import subprocess
+"""
+The Cython extension pse.pyx is built beforehand with
 
-python_path = sys.executable
+python3 setup.py build_ext --inplace
 
-ori_path = os.getcwd()
-os.chdir("ppocr/postprocess/pse_postprocess/pse")
-if (
-    subprocess.call("{} setup.py build_ext --inplace".format(python_path), shell=True)
-    != 0
-):
-    raise RuntimeError(
-        "Cannot compile pse: {}, if your system is windows, you need to install all the default components of `desktop development using C++` in visual studio 2019+".format(
-            os.path.dirname(os.path.realpath(__file__))
-        )
-    )
-os.chdir(ori_path)
+in this directory, otherwise the same expansion is run with NumPy and OpenCV.
+"""
 
-from .pse import pse
+try:
+    from .pse import pse
+except ImportError:
+    from .pse_numpy import pse
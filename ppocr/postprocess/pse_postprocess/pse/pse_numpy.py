@@ -0,0 +1,71 @@
+# copyright (c) 2024 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+The progressive scale expansion of pse.pyx with NumPy and OpenCV, for when the
+Cython extension is not built. The breadth first search of pse.pyx is run one
+distance at a time on the whole frontier, which gives the same labels.
+"""
+
+import cv2
+import numpy as np
+
+__all__ = ["pse"]
+
+
+def filter_small_components(kernel, min_area):
+    """The 4-connected components of kernel with an area of at least min_area"""
+    label_num, label, stats, _ = cv2.connectedComponentsWithStats(
+        kernel, connectivity=4
+    )
+    small = stats[:, cv2.CC_STAT_AREA] < min_area
+    label[small[label]] = 0
+    return label_num, label
+
+
+def pse(kernels, min_area):
+    """
+    Expand the components of the smallest kernel kernels[-1] to the larger
+    kernels [kernel_num, H, W], one kernel after another.
+
+    In pse.pyx, every pixel of the queue labels its unlabeled neighbors
+    (up, down, left, right) in the kernel, which are pushed to the queue, and
+    the pixels which label no neighbor start the queue of the next kernel.
+    The pixels at the same distance are popped in a row, so that a neighbor
+    gets the label of the first of them, in the order of the queue.
+    """
+    kernel_num, h, w = kernels.shape
+    _, label = filter_small_components(kernels[-1], min_area)
+    pred = label.astype(np.int32).reshape(-1)
+    queue = np.flatnonzero(pred)
+    offsets = np.array([-w, w, -1, 1])
+    for kernel_idx in range(kernel_num - 2, -1, -1):
+        kernel = kernels[kernel_idx].reshape(-1)
+        edges = [queue[:0]]
+        while len(queue) > 0:
+            row, col = np.divmod(queue, w)
+            inside = np.stack([row > 0, row < h - 1, col > 0, col < w - 1], axis=1)
+            neighbors = np.where(inside, queue[:, None] + offsets, 0)
+            valid = inside & (kernel[neighbors] != 0) & (pred[neighbors] == 0)
+            parents = np.nonzero(valid)[0]
+            neighbors = neighbors[valid]
+            # the first parent in the order of the queue labels a neighbor
+            _, first = np.unique(neighbors, return_index=True)
+            first.sort()
+            expanded = np.zeros(len(queue), dtype=bool)
+            expanded[parents[first]] = True
+            edges.append(queue[~expanded])
+            pred[neighbors[first]] = pred[queue[parents[first]]]
+            queue = neighbors[first]
+        queue = np.concatenate(edges)
+    return pred.reshape(h, w)
@@ -81,23 +81,28 @@ class PSEPostProcess(object):
 
     def generate_box(self, score, label, shape):
         src_h, src_w, ratio_h, ratio_w = shape
-        label_num = np.max(label) + 1
+        h, w = label.shape
+
+        # the pixels of every label in raster order, from one sort of the map
+        # instead of a pass over it for each label
+        flat_label = label.reshape(-1)
+        order = np.argsort(flat_label, kind="stable")
+        counts = np.bincount(flat_label)
+        ends = np.cumsum(counts)
+        score = score.reshape(-1)
 
         boxes = []
         scores = []
-        for i in range(1, label_num):
-            ind = label == i
-            points = np.array(np.where(ind)).transpose((1, 0))[:, ::-1]
-
-            if points.shape[0] < self.min_area:
-                label[ind] = 0
+        for i in range(1, len(counts)):
+            if counts[i] < self.min_area:
                 continue
+            pixels = order[ends[i] - counts[i] : ends[i]]
 
-            score_i = np.mean(score[ind])
+            score_i = np.mean(score[pixels])
             if score_i < self.box_thresh:
-                label[ind] = 0
                 continue
 
+            points = np.stack([pixels % w, pixels // w], axis=1)
             if self.box_type == "quad":
                 rect = cv2.minAreaRect(points)
                 bbox = cv2.boxPoints(rect)
@@ -44,11 +44,11 @@ class VQAReTokenLayoutLMPostProcess(object):
             pred_relations, ser_results, entity_idx_dict_batch
         ):
             result = []
-            used_tail_id = []
+            used_tail_id = set()
             for relation in pred_relation:
                 if relation["tail_id"] in used_tail_id:
                     continue
-                used_tail_id.append(relation["tail_id"])
+                used_tail_id.add(relation["tail_id"])
                 ocr_info_head = ser_result[entity_idx_dict[relation["head_id"]]]
                 ocr_info_tail = ser_result[entity_idx_dict[relation["tail_id"]]]
                 result.append((ocr_info_head, ocr_info_tail))
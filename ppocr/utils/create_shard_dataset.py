@@ -0,0 +1,133 @@
+# copyright (c) 2024 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Convert label files of SimpleDataSet to the shard files of ShardDataSet, e.g.
+
+python3 ppocr/utils/create_shard_dataset.py --data_dir ./train_data/ \
+    --label_file_list ./train_data/rec_gt_train.txt --output_dir ./train_data/shards \
+    --decode_height 48
+"""
+
+import os
+import sys
+import json
+import argparse
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(__dir__, "../..")))
+
+from ppocr.data.shard_dataset import ShardWriter
+
+
+def create_shard_dataset(
+    data_dir,
+    label_file_list,
+    output_dir,
+    samples_per_shard=100000,
+    decode_height=None,
+    delimiter="\t",
+):
+    """
+    Pack the samples of the label files into shards of samples_per_shard samples,
+    the label files are read line by line. Returns the number of packed samples.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    writer = None
+    shard_idx = 0
+    num_samples = 0
+    num_skipped = 0
+    try:
+        for label_file in label_file_list:
+            with open(label_file, "rb") as f:
+                for data_line in f:
+                    substr = data_line.decode("utf-8").strip("\n").split(delimiter)
+                    if len(substr) < 2:
+                        continue
+                    file_name, label = substr[0], substr[1]
+                    # multiple images -> one gt label, the first one is packed
+                    if len(file_name) > 0 and file_name[0] == "[":
+                        try:
+                            file_name = json.loads(file_name)[0]
+                        except:
+                            pass
+                    img_path = os.path.join(data_dir, file_name)
+                    if not os.path.exists(img_path):
+                        num_skipped += 1
+                        continue
+                    with open(img_path, "rb") as img_file:
+                        img = img_file.read()
+
+                    if writer is None:
+                        writer = ShardWriter(
+                            os.path.join(
+                                output_dir, "part-{:05d}.shard".format(shard_idx)
+                            ),
+                            decode_height=decode_height,
+                        )
+                        shard_idx += 1
+                    if not writer.add(img, label):
+                        num_skipped += 1
+                        continue
+                    num_samples += 1
+                    if len(writer) == samples_per_shard:
+                        writer.close()
+                        writer = None
+    except BaseException:
+        # the shard being written is incomplete
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is not None:
+        writer.close()
+    print(
+        "{} samples are packed to {} shards in {}, {} samples are skipped".format(
+            num_samples, shard_idx, output_dir, num_skipped
+        )
+    )
+    return num_samples
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--data_dir", type=str, default=".", help="The root directory of images"
+    )
+    parser.add_argument(
+        "--label_file_list",
+        type=str,
+        nargs="+",
+        required=True,
+        help="Label files of SimpleDataSet",
+    )
+    parser.add_argument(
+        "--output_dir", type=str, required=True, help="Output directory of the shards"
+    )
+    parser.add_argument("--samples_per_shard", type=int, default=100000)
+    parser.add_argument(
+        "--decode_height",
+        type=int,
+        default=0,
+        help="If > 0, store the images decoded to grayscale and resized to this height, for recognition",
+    )
+    parser.add_argument("--delimiter", type=str, default="\t")
+
+    args = parser.parse_args()
+    create_shard_dataset(
+        args.data_dir,
+        args.label_file_list,
+        args.output_dir,
+        samples_per_shard=args.samples_per_shard,
+        decode_height=args.decode_height or None,
+        delimiter=args.delimiter,
+    )
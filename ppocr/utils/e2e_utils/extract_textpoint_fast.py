@@ -89,37 +89,60 @@ def ctc_greedy_decoder(probs_seq, blank=95, keep_blank_in_idxs=True):
     return dst_str, keep_idx_list
 
 
+def align_gather_info(gather_info):
+    """
+    The points of gather_info [[y, x], ...] with the points between every two
+    of them inserted, one per pixel of the longer side, truncated to int.
+    """
+    gather_info = np.array(gather_info)
+    diff = gather_info[:-1] - gather_info[1:]
+    max_points = np.abs(diff).max(axis=1).astype(np.int64)
+    if (max_points == 0).any():
+        # the repeated points shift the points after them, as before
+        return _align_gather_info_loop(gather_info)
+    stride = diff / max_points[:, None]
+    # every point, followed by its inserted points
+    counts = np.append(max_points, 1)
+    start = np.repeat(np.arange(len(gather_info)), counts)
+    step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    stride = np.concatenate([stride, np.zeros((1, 2))])
+    points = gather_info[start] - step[:, None] * stride[start]
+    inserted = step > 0
+    aligned = gather_info[start]
+    aligned[inserted] = points[inserted]
+    return aligned
+
+
+def _align_gather_info_loop(gather_info):
+    insert_num = 0
+    length = len(gather_info) - 1
+    for index in range(length):
+        stride_y = np.abs(
+            gather_info[index + insert_num][0] - gather_info[index + 1 + insert_num][0]
+        )
+        stride_x = np.abs(
+            gather_info[index + insert_num][1] - gather_info[index + 1 + insert_num][1]
+        )
+        max_points = int(max(stride_x, stride_y))
+        stride = (
+            gather_info[index + insert_num] - gather_info[index + 1 + insert_num]
+        ) / (max_points)
+        insert_num_temp = max_points - 1
+
+        for i in range(int(insert_num_temp)):
+            insert_value = gather_info[index + insert_num] - (i + 1) * stride
+            insert_index = index + i + 1 + insert_num
+            gather_info = np.insert(gather_info, insert_index, insert_value, axis=0)
+        insert_num += insert_num_temp
+    return gather_info
+
+
 def instance_ctc_greedy_decoder(
     gather_info, logits_map, pts_num=4, point_gather_mode=None
 ):
     _, _, C = logits_map.shape
     if point_gather_mode == "align":
-        insert_num = 0
-        gather_info = np.array(gather_info)
-        length = len(gather_info) - 1
-        for index in range(length):
-            stride_y = np.abs(
-                gather_info[index + insert_num][0]
-                - gather_info[index + 1 + insert_num][0]
-            )
-            stride_x = np.abs(
-                gather_info[index + insert_num][1]
-                - gather_info[index + 1 + insert_num][1]
-            )
-            max_points = int(max(stride_x, stride_y))
-            stride = (
-                gather_info[index + insert_num] - gather_info[index + 1 + insert_num]
-            ) / (max_points)
-            insert_num_temp = max_points - 1
-
-            for i in range(int(insert_num_temp)):
-                insert_value = gather_info[index + insert_num] - (i + 1) * stride
-                insert_index = index + i + 1 + insert_num
-                gather_info = np.insert(gather_info, insert_index, insert_value, axis=0)
-            insert_num += insert_num_temp
-        gather_info = gather_info.tolist()
-    else:
-        pass
+        gather_info = align_gather_info(gather_info).tolist()
     ys, xs = zip(*gather_info)
     logits_seq = logits_map[list(ys), list(xs)]
     probs_seq = logits_seq
@@ -135,24 +158,41 @@ def ctc_decoder_for_image(
     gather_info_list, logits_map, Lexicon_Table, pts_num=6, point_gather_mode=None
 ):
     """
-    CTC decoder using multiple processes.
+    CTC decoder of all the instances at once, the labels of the points of all
+    the instances are gathered and deduplicated in one go.
     """
+    _, _, C = logits_map.shape
+    gather_info_list = [
+        gather_info for gather_info in gather_info_list if len(gather_info) >= pts_num
+    ]
+    if point_gather_mode == "align":
+        gather_info_list = [
+            align_gather_info(gather_info).tolist() for gather_info in gather_info_list
+        ]
+    if len(gather_info_list) == 0:
+        return [], []
+    lengths = np.array([len(gather_info) for gather_info in gather_info_list])
+    points = np.concatenate([np.array(gather_info) for gather_info in gather_info_list])
+    labels = np.argmax(logits_map[points[:, 0], points[:, 1]], axis=1)
+    # the first label of every run of an instance, which is not blank
+    starts = np.cumsum(lengths) - lengths
+    new_run = np.ones(len(labels), dtype=bool)
+    new_run[1:] = labels[1:] != labels[:-1]
+    new_run[starts] = True
+    keep = new_run & (labels != C - 1)
+    instance_ids = np.repeat(np.arange(len(lengths)), lengths)
+    chars = np.split(labels[keep], np.cumsum(np.bincount(instance_ids[keep]))[:-1])
+
     decoder_str = []
     decoder_xys = []
-    for gather_info in gather_info_list:
-        if len(gather_info) < pts_num:
-            continue
-        dst_str, xys_list = instance_ctc_greedy_decoder(
-            gather_info,
-            logits_map,
-            pts_num=pts_num,
-            point_gather_mode=point_gather_mode,
-        )
+    for gather_info, dst_str in zip(gather_info_list, chars):
         dst_str_readable = "".join([Lexicon_Table[idx] for idx in dst_str])
         if len(dst_str_readable) < 2:
             continue
+        detal = len(gather_info) // (pts_num - 1)
+        keep_idx_list = [0] + [detal * (i + 1) for i in range(pts_num - 2)] + [-1]
         decoder_str.append(dst_str_readable)
-        decoder_xys.append(xys_list)
+        decoder_xys.append([gather_info[idx] for idx in keep_idx_list])
     return decoder_str, decoder_xys
 
 
@@ -163,37 +203,34 @@ def sort_with_direction(pos_list, f_direction):
     """
 
     def sort_part_with_direction(pos_list, point_direction):
-        pos_list = np.array(pos_list).reshape(-1, 2)
-        point_direction = np.array(point_direction).reshape(-1, 2)
         average_direction = np.mean(point_direction, axis=0, keepdims=True)
         pos_proj_leng = np.sum(pos_list * average_direction, axis=1)
-        sorted_list = pos_list[np.argsort(pos_proj_leng)].tolist()
-        sorted_direction = point_direction[np.argsort(pos_proj_leng)].tolist()
-        return sorted_list, sorted_direction
+        order = np.argsort(pos_proj_leng)
+        return pos_list[order], point_direction[order]
 
     pos_list = np.array(pos_list).reshape(-1, 2)
     point_direction = f_direction[pos_list[:, 0], pos_list[:, 1]]  # x, y
     point_direction = point_direction[:, ::-1]  # x, y -> y, x
     sorted_point, sorted_direction = sort_part_with_direction(pos_list, point_direction)
+    # the halves are sorted by the directions in float64, as the lists before
+    sorted_point = sorted_point.astype(np.int64)
+    sorted_direction = sorted_direction.astype(np.float64)
 
     point_num = len(sorted_point)
     if point_num >= 16:
         middle_num = point_num // 2
-        first_part_point = sorted_point[:middle_num]
-        first_point_direction = sorted_direction[:middle_num]
         sorted_fist_part_point, sorted_fist_part_direction = sort_part_with_direction(
-            first_part_point, first_point_direction
+            sorted_point[:middle_num], sorted_direction[:middle_num]
         )
-
-        last_part_point = sorted_point[middle_num:]
-        last_point_direction = sorted_direction[middle_num:]
         sorted_last_part_point, sorted_last_part_direction = sort_part_with_direction(
-            last_part_point, last_point_direction
+            sorted_point[middle_num:], sorted_direction[middle_num:]
+        )
+        sorted_point = np.concatenate([sorted_fist_part_point, sorted_last_part_point])
+        sorted_direction = np.concatenate(
+            [sorted_fist_part_direction, sorted_last_part_direction]
         )
-        sorted_point = sorted_fist_part_point + sorted_last_part_point
-        sorted_direction = sorted_fist_part_direction + sorted_last_part_direction
 
-    return sorted_point, np.array(sorted_direction)
+    return sorted_point.tolist(), sorted_direction
 
 
 def add_id(pos_list, image_id=0):
@@ -280,34 +317,22 @@ def sort_and_expand_with_direction_v2(pos_list, f_direction, binary_tcl_map):
 
     append_num = max(int((left_average_len + right_average_len) / 2.0 * 0.15), 1)
     max_append_num = 2 * append_num
-
-    left_list = []
-    right_list = []
-    for i in range(max_append_num):
-        ly, lx = (
-            np.round(left_start + left_step * (i + 1))
-            .flatten()
-            .astype("int32")
-            .tolist()
-        )
-        if ly < h and lx < w and (ly, lx) not in left_list:
-            if binary_tcl_map[ly, lx] > 0.5:
-                left_list.append((ly, lx))
-            else:
-                break
-
-    for i in range(max_append_num):
-        ry, rx = (
-            np.round(right_start + right_step * (i + 1))
-            .flatten()
-            .astype("int32")
-            .tolist()
-        )
-        if ry < h and rx < w and (ry, rx) not in right_list:
-            if binary_tcl_map[ry, rx] > 0.5:
-                right_list.append((ry, rx))
-            else:
-                break
+    steps = np.arange(1, max_append_num + 1).reshape(-1, 1)
+
+    def expand(start, step):
+        # the points along step from start, until one is off the text center line
+        points = np.round(start + step * steps).astype("int32").tolist()
+        expand_list = []
+        for y, x in points:
+            if y < h and x < w and (y, x) not in expand_list:
+                if binary_tcl_map[y, x] > 0.5:
+                    expand_list.append((y, x))
+                else:
+                    break
+        return expand_list
+
+    left_list = expand(left_start, left_step)
+    right_list = expand(right_start, right_step)
 
     all_list = left_list[::-1] + sorted_list + right_list
     return all_list
@@ -378,18 +403,17 @@ def restore_poly(
         if valid_set == "totaltext":
             offset_expand = 1.2
 
-        point_pair_list = []
-        for y, x in yx_center_line:
-            offset = p_border[:, y, x].reshape(2, 2) * offset_expand
-            ori_yx = np.array([y, x], dtype=np.float32)
-            point_pair = (
-                (ori_yx + offset)[:, ::-1]
-                * 4.0
-                / np.array([ratio_w, ratio_h]).reshape(-1, 2)
-            )
-            point_pair_list.append(point_pair)
-
-        detected_poly = point_pair2poly(point_pair_list)
+        yx_center_line = np.array(yx_center_line).reshape(-1, 2)
+        ys, xs = yx_center_line[:, 0], yx_center_line[:, 1]
+        offset = p_border[:, ys, xs].T.reshape(-1, 2, 2) * offset_expand
+        ori_yx = yx_center_line.astype(np.float32).reshape(-1, 1, 2)
+        point_pairs = (
+            (ori_yx + offset)[:, :, ::-1]
+            * 4.0
+            / np.array([ratio_w, ratio_h]).reshape(-1, 2)
+        )
+
+        detected_poly = np.concatenate([point_pairs[:, 0], point_pairs[::-1, 1]])
         detected_poly = expand_poly_along_width(
             detected_poly, shrink_ratio_of_width=0.2
         )
@@ -409,6 +433,24 @@ def restore_poly(
     return poly_list, keep_str_list
 
 
+def thin_components(binary_map):
+    """
+    The thin of binary_map, one 8-connected component at a time in its
+    bounding box, which is the same as the thin of the whole map since the
+    components do not touch, but the iterations are on the pixels around the
+    components only.
+    """
+    component_num, label_map, stats, _ = cv2.connectedComponentsWithStats(
+        binary_map.astype(np.uint8), connectivity=8
+    )
+    skeleton_map = np.zeros(binary_map.shape, dtype=bool)
+    for component_id in range(1, component_num):
+        x, y, w, h = stats[component_id, :4]
+        component = np.pad(label_map[y : y + h, x : x + w] == component_id, 1)
+        skeleton_map[y : y + h, x : x + w] |= thin(component)[1:-1, 1:-1]
+    return skeleton_map
+
+
 def generate_pivot_list_fast(
     p_score,
     p_char_maps,
@@ -423,26 +465,26 @@ def generate_pivot_list_fast(
     p_score = p_score[0]
     f_direction = f_direction.transpose(1, 2, 0)
     p_tcl_map = (p_score > score_thresh) * 1.0
-    skeleton_map = thin(p_tcl_map.astype(np.uint8))
+    skeleton_map = thin_components(p_tcl_map)
     instance_count, instance_label_map = cv2.connectedComponents(
         skeleton_map.astype(np.uint8), connectivity=8
     )
 
-    # get TCL Instance
+    # get TCL Instance, the points of every instance in raster order
     all_pos_yxs = []
-    if instance_count > 0:
-        for instance_id in range(1, instance_count):
-            pos_list = []
-            ys, xs = np.where(instance_label_map == instance_id)
-            pos_list = list(zip(ys, xs))
-
-            if len(pos_list) < 3:
-                continue
-
-            pos_list_sorted = sort_and_expand_with_direction_v2(
-                pos_list, f_direction, p_tcl_map
-            )
-            all_pos_yxs.append(pos_list_sorted)
+    pos_idxs = np.flatnonzero(instance_label_map)
+    instance_ids = instance_label_map.ravel()[pos_idxs]
+    pos_idxs = pos_idxs[np.argsort(instance_ids, kind="stable")]
+    pos_yxs = np.stack(np.divmod(pos_idxs, instance_label_map.shape[1]), axis=1)
+    counts = np.bincount(instance_ids, minlength=max(instance_count, 1))[1:]
+    for pos_list in np.split(pos_yxs, np.cumsum(counts)[:-1]):
+        if len(pos_list) < 3:
+            continue
+
+        pos_list_sorted = sort_and_expand_with_direction_v2(
+            pos_list, f_direction, p_tcl_map
+        )
+        all_pos_yxs.append(pos_list_sorted)
 
     p_char_maps = p_char_maps.transpose([1, 2, 0])
     decoded_str, keep_yxs_list = ctc_decoder_for_image(
@@ -27,14 +27,15 @@ from extract_textpoint_fast import generate_pivot_list_fast, restore_poly
 
 
 class PGNet_PostProcess(object):
-    # two different post-process
+    # two different post-process, the outputs are given to the constructor or
+    # to every call, so the same post-process is reused for all the images
     def __init__(
         self,
         character_dict_path,
         valid_set,
         score_thresh,
-        outs_dict,
-        shape_list,
+        outs_dict=None,
+        shape_list=None,
         point_gather_mode=None,
     ):
         self.Lexicon_Table = get_dict(character_dict_path)
@@ -44,23 +45,24 @@ class PGNet_PostProcess(object):
         self.shape_list = shape_list
         self.point_gather_mode = point_gather_mode
 
-    def pg_postprocess_fast(self):
-        p_score = self.outs_dict["f_score"]
-        p_border = self.outs_dict["f_border"]
-        p_char = self.outs_dict["f_char"]
-        p_direction = self.outs_dict["f_direction"]
-        if isinstance(p_score, paddle.Tensor):
-            p_score = p_score[0].numpy()
-            p_border = p_border[0].numpy()
-            p_direction = p_direction[0].numpy()
-            p_char = p_char[0].numpy()
-        else:
-            p_score = p_score[0]
-            p_border = p_border[0]
-            p_direction = p_direction[0]
-            p_char = p_char[0]
+    @staticmethod
+    def _get_outputs(outs_dict):
+        outputs = []
+        for key in ["f_score", "f_border", "f_char", "f_direction"]:
+            output = outs_dict[key][0]
+            if isinstance(output, paddle.Tensor):
+                output = output.numpy()
+            outputs.append(output)
+        return outputs
 
-        src_h, src_w, ratio_h, ratio_w = self.shape_list[0]
+    def pg_postprocess_fast(self, outs_dict=None, shape_list=None):
+        if outs_dict is None:
+            outs_dict = self.outs_dict
+        if shape_list is None:
+            shape_list = self.shape_list
+        p_score, p_border, p_char, p_direction = self._get_outputs(outs_dict)
+
+        src_h, src_w, ratio_h, ratio_w = shape_list[0]
         instance_yxs_list, seq_strs = generate_pivot_list_fast(
             p_score,
             p_char,
@@ -85,22 +87,13 @@ class PGNet_PostProcess(object):
         }
         return data
 
-    def pg_postprocess_slow(self):
-        p_score = self.outs_dict["f_score"]
-        p_border = self.outs_dict["f_border"]
-        p_char = self.outs_dict["f_char"]
-        p_direction = self.outs_dict["f_direction"]
-        if isinstance(p_score, paddle.Tensor):
-            p_score = p_score[0].numpy()
-            p_border = p_border[0].numpy()
-            p_direction = p_direction[0].numpy()
-            p_char = p_char[0].numpy()
-        else:
-            p_score = p_score[0]
-            p_border = p_border[0]
-            p_direction = p_direction[0]
-            p_char = p_char[0]
-        src_h, src_w, ratio_h, ratio_w = self.shape_list[0]
+    def pg_postprocess_slow(self, outs_dict=None, shape_list=None):
+        if outs_dict is None:
+            outs_dict = self.outs_dict
+        if shape_list is None:
+            shape_list = self.shape_list
+        p_score, p_border, p_char, p_direction = self._get_outputs(outs_dict)
+        src_h, src_w, ratio_h, ratio_w = shape_list[0]
         is_curved = self.valid_set == "totaltext"
         char_seq_idx_set, instance_yxs_list = generate_pivot_list_slow(
             p_score,
@@ -0,0 +1,164 @@
+# copyright (c) 2024 PaddlePaddle Authors. All Rights Reserve.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+The shared parts of the polygon nms and the polygon evaluation: the vectorized
+intersection of convex quads, the pairs of overlapping bounding boxes and the
+greedy nms, which only compares the boxes with overlapping bounding boxes.
+"""
+
+import numpy as np
+
+__all__ = [
+    "polygon_area",
+    "is_convex_quad",
+    "convex_intersection_area",
+    "quad_bounds",
+    "overlap_pairs",
+    "greedy_nms",
+]
+
+
+def polygon_area(points):
+    """The signed areas of the polygons [..., K, 2], positive if counterclockwise"""
+    x, y = points[..., 0], points[..., 1]
+    return 0.5 * (
+        (x * np.roll(y, -1, axis=-1)).sum(-1) - (np.roll(x, -1, axis=-1) * y).sum(-1)
+    )
+
+
+def is_convex_quad(points):
+    """Whether the quads [N, 4, 2] are convex"""
+    edges = np.roll(points, -1, axis=1) - points
+    cross = edges[:, :, 0] * np.roll(edges[:, :, 1], -1, axis=1) - edges[
+        :, :, 1
+    ] * np.roll(edges[:, :, 0], -1, axis=1)
+    return (cross >= 0).all(axis=1) | (cross <= 0).all(axis=1)
+
+
+def convex_intersection_area(subject, clip):
+    """
+    The intersection areas of the pairs of convex quads subject and clip
+    [M, 4, 2], by Sutherland-Hodgman clipping of subject by the edges of clip.
+    """
+    num = len(subject)
+    # a convex polygon clipped by a half plane gets at most one more vertex
+    max_count = 8
+    polygon = np.zeros((num, max_count, 2))
+    polygon[:, :4] = subject
+    count = np.full(num, 4)
+    orientation = np.where(polygon_area(clip) < 0, -1.0, 1.0)
+    vertex_idx = np.arange(max_count)
+    for i in range(4):
+        start, edge = clip[:, i], clip[:, (i + 1) % 4] - clip[:, i]
+        valid = vertex_idx < count[:, None]
+        next_idx = np.where(vertex_idx + 1 < count[:, None], vertex_idx + 1, 0)
+        next_vertex = np.take_along_axis(polygon, next_idx[:, :, None], axis=1)
+        # the distances to the edge, >= 0 inside
+        side = orientation[:, None] * (
+            edge[:, None, 0] * (polygon[:, :, 1] - start[:, None, 1])
+            - edge[:, None, 1] * (polygon[:, :, 0] - start[:, None, 0])
+        )
+        next_side = np.take_along_axis(side, next_idx, axis=1)
+        inside, next_inside = side >= 0, next_side >= 0
+        crossing = valid & (inside != next_inside)
+        denom = np.where(crossing, side - next_side, 1.0)
+        t = np.where(crossing, side / denom, 0.0)
+        crossing_vertex = polygon + t[:, :, None] * (next_vertex - polygon)
+
+        vertices = np.stack([polygon, crossing_vertex], axis=2).reshape(
+            num, 2 * max_count, 2
+        )
+        keep = np.stack([valid & inside, crossing], axis=2).reshape(num, 2 * max_count)
+        order = np.argsort(~keep, axis=1, kind="stable")[:, :max_count]
+        polygon = np.take_along_axis(vertices, order[:, :, None], axis=1)
+        count = keep.sum(axis=1)
+    valid = vertex_idx < count[:, None]
+    next_idx = np.where(vertex_idx + 1 < count[:, None], vertex_idx + 1, 0)
+    next_vertex = np.take_along_axis(polygon, next_idx[:, :, None], axis=1)
+    cross = (
+        polygon[:, :, 0] * next_vertex[:, :, 1]
+        - next_vertex[:, :, 0] * polygon[:, :, 1]
+    )
+    return np.abs(0.5 * np.where(valid, cross, 0).sum(axis=1))
+
+
+def quad_bounds(points):
+    """The bounding boxes (xmin, ymin, xmax, ymax) of the polygons [N, K, 2]"""
+    return np.concatenate([points.min(axis=1), points.max(axis=1)], axis=1)
+
+
+def overlap_pairs(bounds):
+    """
+    The pairs of the bounding boxes [N, 4] which overlap or touch, by a sweep
+    along x, as the neighbors of every box in CSR format (indptr, indices).
+    """
+    num = len(bounds)
+    order = np.argsort(bounds[:, 0], kind="stable")
+    xmin = bounds[order, 0]
+    # the boxes after a box in order, which start before it ends
+    end = np.searchsorted(xmin, bounds[order, 2], side="right")
+    counts = np.maximum(end - np.arange(1, num + 1), 0)
+    first = np.repeat(np.arange(num), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    second = order[first + 1 + offset]
+    first = order[first]
+    overlap = (bounds[second, 1] <= bounds[first, 3]) & (
+        bounds[first, 1] <= bounds[second, 3]
+    )
+    first, second = first[overlap], second[overlap]
+
+    src = np.concatenate([first, second])
+    dst = np.concatenate([second, first])
+    sort_idx = np.argsort(src, kind="stable")
+    indptr = np.zeros(num + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=num), out=indptr[1:])
+    return indptr, dst[sort_idx]
+
+
+def greedy_nms(order, pairs, suppress):
+    """
+    Greedy nms of the boxes in order: a box is kept if it is not suppressed
+    by a box kept before, which suppresses the boxes after it in order for
+    which suppress is True.
+
+    Args:
+        order: the indexes of the boxes, in the order of nms.
+        pairs: the pairs of the boxes, which may suppress each other, e.g. the
+            overlapping boxes of overlap_pairs, in CSR format.
+        suppress: bool array of the pairs, or suppress(idx, entries) -> bool
+            array, whether the box idx suppresses the boxes indices[entries].
+
+    Returns:
+        the indexes of the kept boxes, in order.
+    """
+    indptr, indices = pairs
+    num = len(indptr) - 1
+    rank = np.full(num, -1)
+    rank[order] = np.arange(len(order))
+    removed = rank < 0
+    keep = []
+    for idx in order:
+        if removed[idx]:
+            continue
+        keep.append(idx)
+        entries = np.arange(indptr[idx], indptr[idx + 1])
+        idxs = indices[entries]
+        later = (rank[idxs] > rank[idx]) & ~removed[idxs]
+        entries, idxs = entries[later], idxs[later]
+        if len(idxs) > 0:
+            if callable(suppress):
+                removed[idxs[suppress(idx, entries)]] = True
+            else:
+                removed[idxs[suppress[entries]]] = True
+    return keep
@@ -15,6 +15,8 @@
 import numpy as np
 from shapely.geometry import Polygon
 
+from ppocr.utils.nms import greedy_nms, overlap_pairs, polygon_area
+
 
 def points2polygon(points):
     """Convert k points to 1 polygon.
@@ -124,23 +126,113 @@ def poly_iou(poly_det, poly_gt):
     return area_inters / area_union
 
 
+class BufferedPolygons(object):
+    """
+    The polygons of the boundaries [N, 2k] for poly_nms, every polygon is
+    built and buffered once, when it is first compared.
+    """
+
+    def __init__(self, points):
+        self.points = np.asarray(points).reshape([len(points), -1, 2])
+        self.polygons = [None] * len(points)
+        # the areas of the polygons, as Polygon.area
+        self.areas = np.abs(polygon_area(self.points.astype(np.float64)))
+        # the buffered polygons are in the boxes enlarged by the buffer
+        self.bounds = (
+            np.concatenate([self.points.min(axis=1), self.points.max(axis=1)], axis=1)
+            + np.array([-1, -1, 1, 1]) * 0.001
+        )
+
+    def take(self, index):
+        """The polygons of the boundaries index, with the ones built before"""
+        result = BufferedPolygons(self.points[index])
+        result.polygons = [self.polygons[i] for i in index]
+        result.areas = self.areas[index]
+        return result
+
+    def __getitem__(self, i):
+        if self.polygons[i] is None:
+            poly = points2polygon(self.points[i])
+            self.polygons[i] = (poly.buffer(0.0001), poly.area)
+        return self.polygons[i]
+
+
+def poly_nms_groups(polygons, scores, groups, threshold):
+    """
+    poly_nms of the groups of boundaries at once, where the boundaries are
+    only compared with the boundaries of the same group.
+
+    Args:
+        polygons (BufferedPolygons): The polygons of the boundaries.
+        scores (ndarray): The scores of the boundaries.
+        groups (ndarray): The groups of the boundaries.
+        threshold (float): The iou threshold.
+
+    Returns:
+        keep (ndarray): The indexes of the kept boundaries, in the ascending
+            order of the groups, and in the order of poly_nms in a group.
+    """
+    groups = np.asarray(groups)
+    if len(groups) == 0:
+        return np.zeros(0, dtype=np.int64)
+    # the order of poly_nms, the descending order of a stable sort
+    order = np.argsort(scores, kind="stable")[::-1]
+
+    # the boxes of the groups are moved apart along x, so that only the
+    # boundaries of a group overlap
+    bounds = polygons.bounds
+    _, group_idx = np.unique(groups, return_inverse=True)
+    span = bounds[:, 2].max() - bounds[:, 0].min() + 1
+    offset = (group_idx.reshape(-1) * span)[:, None] * np.array([1, 0, 1, 0])
+    indptr, indices = overlap_pairs(bounds + offset)
+
+    areas = polygons.areas
+
+    def suppress(i, entries):
+        result = np.zeros(len(entries), dtype=bool)
+        idxs = indices[entries]
+        # the iou is at most the one of the intersection of the bounding boxes
+        # of the buffered polygons, which is increasing in the intersection
+        inter_w = np.minimum(bounds[i, 2], bounds[idxs, 2]) - np.maximum(
+            bounds[i, 0], bounds[idxs, 0]
+        )
+        inter_h = np.minimum(bounds[i, 3], bounds[idxs, 3]) - np.maximum(
+            bounds[i, 1], bounds[idxs, 1]
+        )
+        max_inters = inter_w * inter_h
+        max_union = areas[i] + areas[idxs] - max_inters
+        below = (max_union > 0) & (max_inters < (threshold - 1e-6) * max_union)
+        buffered_i, area_i = polygons[i]
+        for k in np.flatnonzero(~below):
+            # poly_iou(A, B) of the buffered polygons
+            j = idxs[k]
+            buffered_j, area_j = polygons[j]
+            area_inters = (buffered_i & buffered_j).area
+            area_union = area_i + area_j - area_inters
+            iou = 0.0 if area_union == 0 else area_inters / area_union
+            result[k] = iou > threshold
+        return result
+
+    keep = np.array(greedy_nms(order, (indptr, indices), suppress), dtype=np.int64)
+    return keep[np.argsort(groups[keep], kind="stable")]
+
+
 def poly_nms(polygons, threshold):
+    """
+    Nms of the boundaries [x1, y1, ..., xk, yk, score] by boundary_iou. Only
+    the boundaries with overlapping bounding boxes are compared, and every
+    polygon is built and buffered once, so the kept boundaries are the same.
+    """
     assert isinstance(polygons, list)
 
     polygons = np.array(sorted(polygons, key=lambda x: x[-1]))
-
-    keep_poly = []
-    index = [i for i in range(polygons.shape[0])]
-
-    while len(index) > 0:
-        keep_poly.append(polygons[index[-1]].tolist())
-        A = polygons[index[-1]][:-1]
-        index = np.delete(index, -1)
-        iou_list = np.zeros((len(index),))
-        for i in range(len(index)):
-            B = polygons[index[i]][:-1]
-            iou_list[i] = boundary_iou(A, B)
-        remove_index = np.where(iou_list > threshold)
-        index = np.delete(index, remove_index)
-
-    return keep_poly
+    if len(polygons) == 0:
+        return []
+
+    keep = poly_nms_groups(
+        BufferedPolygons(polygons[:, :-1]),
+        polygons[:, -1],
+        np.zeros(len(polygons), dtype=np.int64),
+        threshold,
+    )
+    return [polygons[i].tolist() for i in keep]
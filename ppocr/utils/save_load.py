@@ -20,6 +20,7 @@ import errno
 import os
 import pickle
 import json
+import shutil
 
 import paddle
 
@@ -262,6 +263,36 @@ def save_model(
         logger.info("save model in {}".format(model_prefix))
 
 
+def promote_model(model_path, prefix, logger, best_prefix="best_accuracy", **kwargs):
+    """
+    make the model saved with prefix by save_model the best model, as saved
+    by save_model with is_best, and update its states with kwargs
+    """
+    model_prefix = os.path.join(model_path, prefix)
+    best_prefix = os.path.join(model_path, best_prefix)
+    best_model_path = os.path.join(model_path, "best_model")
+    _mkdir_if_not_exist(best_model_path, logger)
+    for ext in [".pdopt", ".pdparams"]:
+        if not os.path.exists(model_prefix + ext):
+            continue
+        os.replace(model_prefix + ext, best_prefix + ext)
+        shutil.copyfile(best_prefix + ext, os.path.join(best_model_path, "model" + ext))
+    with open(best_prefix + ".states", "wb") as f:
+        pickle.dump(kwargs, f, protocol=2)
+    remove_model(model_path, prefix)
+    logger.info("save best model is to {}".format(best_prefix))
+
+
+def remove_model(model_path, prefix):
+    """
+    remove the model saved with prefix by save_model
+    """
+    model_prefix = os.path.join(model_path, prefix)
+    for ext in [".pdopt", ".pdparams", ".states"]:
+        if os.path.exists(model_prefix + ext):
+            os.remove(model_prefix + ext)
+
+
 def update_train_results(config, prefix, metric_info, done_flag=False, last_num=5):
     if paddle.distributed.get_rank() != 0:
         return
@@ -13,10 +13,14 @@
 # limitations under the License.
 
 import collections
-import numpy as np
 import datetime
+import queue
+import threading
+
+import numpy as np
+import paddle
 
-__all__ = ["TrainingStats", "Time"]
+__all__ = ["TrainingStats", "Time", "DeviceStats", "MetricWorker"]
 
 
 class SmoothedValue(object):
@@ -68,3 +72,93 @@ class TrainingStats(object):
             strs.append("{}: {:x<6f}".format(k, v))
         strs = ", ".join(strs)
         return strs
+
+
+class DeviceStats(object):
+    """
+    Stats of the training steps kept as tensors on the device, which are
+    fetched for all the steps at once, instead of a device synchronization
+    in every step.
+    """
+
+    def __init__(self):
+        self.steps = []
+
+    def add(self, step, tensor_stats, stats=None):
+        """
+        Args:
+            step: the global step.
+            tensor_stats: dict of tensors, the mean of a tensor is its value.
+            stats: dict of values on the host, as the learning rate.
+        """
+        tensor_stats = {
+            k: v.detach() if v.shape == [] else v.detach().mean()
+            for k, v in tensor_stats.items()
+        }
+        self.steps.append((step, tensor_stats, stats or {}))
+
+    def fetch(self):
+        """
+        The stats of the steps added since the last fetch, as a list of
+        (step, dict of floats), with a single copy from the device.
+        """
+        tensors = [
+            v for _, tensor_stats, _ in self.steps for v in tensor_stats.values()
+        ]
+        values = []
+        if len(tensors) > 0:
+            values = paddle.stack([v.astype("float32") for v in tensors]).tolist()
+        values = iter(values)
+        steps = []
+        for step, tensor_stats, stats in self.steps:
+            step_stats = {k: next(values) for k in tensor_stats}
+            step_stats.update(stats)
+            steps.append((step, step_stats))
+        self.steps = []
+        return steps
+
+
+class MetricWorker(object):
+    """
+    Run the post-processing and metric of the training steps in a background
+    thread, which copies the predictions from the device. At most max_pending
+    steps are queued, and wait returns the results of all the submitted
+    steps.
+    """
+
+    def __init__(self, max_pending=2):
+        self.tasks = queue.Queue(maxsize=max_pending)
+        self.results = []
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                self.tasks.task_done()
+                break
+            step, func, args = task
+            try:
+                if self.error is None:
+                    self.results.append((step, func(*args)))
+            except BaseException as e:
+                self.error = e
+            finally:
+                self.tasks.task_done()
+
+    def submit(self, step, func, *args):
+        self.tasks.put((step, func, args))
+
+    def wait(self):
+        """The (step, result) of the submitted steps, in the order of submit"""
+        self.tasks.join()
+        if self.error is not None:
+            raise self.error
+        results, self.results = self.results, []
+        return results
+
+    def close(self):
+        self.tasks.put(None)
+        self.thread.join()
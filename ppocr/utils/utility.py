@@ -129,29 +129,33 @@ def check_and_read(img_path):
         imgvalue = frame[:, :, ::-1]
         return imgvalue, True, False
     elif os.path.basename(img_path)[-3:].lower() == "pdf":
-        from paddle.utils import try_import
-
-        fitz = try_import("fitz")
-        from PIL import Image
-
-        imgs = []
-        with fitz.open(img_path) as pdf:
-            for pg in range(0, pdf.page_count):
-                page = pdf[pg]
-                mat = fitz.Matrix(2, 2)
-                pm = page.get_pixmap(matrix=mat, alpha=False)
-
-                # if width or height > 2000 pixels, don't enlarge the image
-                if pm.width > 2000 or pm.height > 2000:
-                    pm = page.get_pixmap(matrix=fitz.Matrix(1, 1), alpha=False)
-
-                img = Image.frombytes("RGB", [pm.width, pm.height], pm.samples)
-                img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-                imgs.append(img)
-            return imgs, False, True
+        imgs = list(iter_pdf_pages(img_path))
+        return imgs, False, True
     return None, False, False
 
 
+def iter_pdf_pages(pdf_path):
+    """Render the pages of a pdf one by one, so that only the pages in use are kept in memory"""
+    from paddle.utils import try_import
+
+    fitz = try_import("fitz")
+    from PIL import Image
+
+    with fitz.open(pdf_path) as pdf:
+        for pg in range(0, pdf.page_count):
+            page = pdf[pg]
+            mat = fitz.Matrix(2, 2)
+            pm = page.get_pixmap(matrix=mat, alpha=False)
+
+            # if width or height > 2000 pixels, don't enlarge the image
+            if pm.width > 2000 or pm.height > 2000:
+                pm = page.get_pixmap(matrix=fitz.Matrix(1, 1), alpha=False)
+
+            img = Image.frombytes("RGB", [pm.width, pm.height], pm.samples)
+            img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+            yield img
+
+
 def load_vqa_bio_label_maps(label_map_path):
     with open(label_map_path, "r", encoding="utf-8") as fin:
         lines = fin.readlines()
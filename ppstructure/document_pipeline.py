@@ -0,0 +1,210 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import queue
+import threading
+
+from ppocr.utils.logging import get_logger
+
+logger = get_logger()
+
+# marks the end of the pages in a stage queue
+_END = object()
+
+
+class DocumentPipeline(object):
+    """
+    Structure analysis of the pages of a document, e.g. a pdf.
+
+    Pages flow through three stages, each running in its own thread:
+    orientation + layout, OCR + table, and formula. The stages of different
+    pages run at the same time, while every predictor is only used by the
+    thread of its stage. The stages are connected by bounded queues, so at
+    most about 3 * queue_size + 2 * page_batch_num pages are in memory, and
+    pages can be rendered lazily, see ppocr.utils.utility.iter_pdf_pages.
+    Layout and formula recognition run on batches of up to page_batch_num
+    pages.
+
+    Args:
+        structure_system: a StructureSystem in structure mode.
+        page_batch_num: max number of pages batched by a stage.
+        queue_size: max number of pages waiting between two stages.
+    """
+
+    def __init__(self, structure_system, page_batch_num=4, queue_size=4):
+        assert structure_system.mode == "structure"
+        self.structure_system = structure_system
+        self.page_batch_num = max(page_batch_num, 1)
+        self.queue_size = max(queue_size, 1)
+
+    def __call__(self, imgs, return_ocr_result_in_table=False):
+        """
+        Args:
+            imgs: iterable of page images.
+            return_ocr_result_in_table: whether to return the ocr results of table regions.
+        Returns:
+            a generator of (img_idx, img, res, time_dict) of every page in page
+            order, yielded as soon as the page is finished. img is the page after
+            orientation correction.
+        """
+        self._stop = threading.Event()
+        self._error = None
+        layout_queue = queue.Queue(maxsize=self.queue_size)
+        region_queue = queue.Queue(maxsize=self.queue_size)
+        output_queue = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(
+                target=self._run_stage,
+                args=(self._layout_stage, iter(imgs), layout_queue),
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._run_stage,
+                args=(
+                    self._region_stage,
+                    layout_queue,
+                    region_queue,
+                    return_ocr_result_in_table,
+                ),
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._run_stage,
+                args=(self._formula_stage, region_queue, output_queue),
+                daemon=True,
+            ),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = self._get(output_queue)
+                if item is _END:
+                    break
+                yield item["img_idx"], item["img"], item["res"], item["time_dict"]
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _run_stage(self, stage, in_queue, out_queue, *args):
+        try:
+            stage(in_queue, out_queue, *args)
+        except Exception as ex:
+            logger.error("error in document pipeline, err msg: {}".format(ex))
+            if self._error is None:
+                self._error = ex
+        finally:
+            self._put(out_queue, _END)
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q, block=True):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1) if block else q.get_nowait()
+            except queue.Empty:
+                if not block:
+                    return None
+        return _END
+
+    def _get_batch(self, q):
+        """Wait for one page, then take the pages that are ready, up to page_batch_num"""
+        batch = [self._get(q)]
+        while batch[-1] is not _END and len(batch) < self.page_batch_num:
+            item = self._get(q, block=False)
+            if item is None:
+                break
+            batch.append(item)
+        end = batch[-1] is _END
+        if end:
+            batch = batch[:-1]
+        return batch, end
+
+    def _layout_stage(self, imgs, out_queue):
+        system = self.structure_system
+        img_idx = 0
+        end = False
+        while not end and not self._stop.is_set():
+            batch = []
+            for img in imgs:
+                time_dict = system._init_time_dict()
+                if system.image_orientation_predictor is not None:
+                    img, time_dict["image_orientation"] = system._correct_orientation(
+                        img
+                    )
+                batch.append(
+                    {
+                        "img_idx": img_idx,
+                        "img": img,
+                        "layout_res": None,
+                        "time_dict": time_dict,
+                    }
+                )
+                img_idx += 1
+                if len(batch) == self.page_batch_num:
+                    break
+            else:
+                end = True
+            if len(batch) == 0:
+                break
+
+            if system.layout_predictor is not None:
+                layout_res_list, elapse = system.layout_predictor.predict_batch(
+                    [item["img"] for item in batch]
+                )
+                for item, layout_res in zip(batch, layout_res_list):
+                    item["layout_res"] = layout_res
+                    item["time_dict"]["layout"] += elapse / len(batch)
+            for item in batch:
+                self._put(out_queue, item)
+
+    def _region_stage(self, in_queue, out_queue, return_ocr_result_in_table):
+        system = self.structure_system
+        while True:
+            item = self._get(in_queue)
+            if item is _END:
+                break
+            item["res"] = system._predict_regions(
+                item["img"],
+                item.pop("layout_res"),
+                return_ocr_result_in_table,
+                item["img_idx"],
+                item["time_dict"],
+            )
+            self._put(out_queue, item)
+
+    def _formula_stage(self, in_queue, out_queue):
+        system = self.structure_system
+        end = False
+        while not end:
+            batch, end = self._get_batch(in_queue)
+            if len(batch) == 0:
+                continue
+            time_dict = {"formula": 0}
+            system._predict_formula([item["res"] for item in batch], time_dict)
+            for item in batch:
+                item["time_dict"]["formula"] += time_dict["formula"] / len(batch)
+                item["time_dict"]["all"] = sum(
+                    v for k, v in item["time_dict"].items() if k != "all"
+                )
+                self._put(out_queue, item)
@@ -39,15 +39,25 @@ logger = get_logger()
 
 
 class SerPredictor(object):
-    def __init__(self, args):
+    def __init__(self, args, ocr_engine=None):
+        """
+        Args:
+            args: the inference args.
+            ocr_engine: the OCR of the images, e.g. a TextSystem shared with the
+                rest of the pipeline. A PaddleOCR is created if it is None and
+                args.kie_use_ocr is true, otherwise the OCR results of every
+                image must be given as ocr_info.
+        """
         self.args = args
-        self.ocr_engine = PaddleOCR(
-            use_angle_cls=args.use_angle_cls,
-            det_model_dir=args.det_model_dir,
-            rec_model_dir=args.rec_model_dir,
-            show_log=False,
-            use_gpu=args.use_gpu,
-        )
+        if ocr_engine is None and getattr(args, "kie_use_ocr", True):
+            ocr_engine = PaddleOCR(
+                use_angle_cls=args.use_angle_cls,
+                det_model_dir=args.det_model_dir,
+                rec_model_dir=args.rec_model_dir,
+                show_log=False,
+                use_gpu=args.use_gpu,
+            )
+        self.ocr_engine = ocr_engine
 
         pre_process_list = [
             {
@@ -59,8 +69,13 @@ class SerPredictor(object):
                     "order_method": args.ocr_order_method,
                 }
             },
-            {"VQATokenPad": {"max_seq_len": 512, "return_attention_mask": True}},
-            {"VQASerTokenChunk": {"max_seq_len": 512, "return_attention_mask": True}},
+            {
+                "VQASerTokenChunk": {
+                    "max_seq_len": 512,
+                    "return_attention_mask": True,
+                    "return_all_chunks": True,
+                }
+            },
             {"Resize": {"size": [224, 224]}},
             {
                 "NormalizeImage": {
@@ -100,28 +115,83 @@ class SerPredictor(object):
             self.output_tensors,
             self.config,
         ) = utility.create_predictor(args, "ser", logger)
+        self.batch_num = getattr(args, "kie_batch_num", 1)
 
-    def __call__(self, img):
-        ori_im = img.copy()
-        data = {"image": img}
-        data = transform(data, self.preprocess_op)
-        if data[0] is None:
-            return None, 0
-        starttime = time.time()
+    def __call__(self, img, ocr_info=None):
+        post_results, batch_data, elapse = self.predict_batch(
+            [img], None if ocr_info is None else [ocr_info]
+        )
+        if batch_data[0] is None:
+            return None, None, 0
+        return post_results[:1], batch_data[0], elapse
 
-        for idx in range(len(data)):
-            if isinstance(data[idx], np.ndarray):
-                data[idx] = np.expand_dims(data[idx], axis=0)
-            else:
+    def predict_batch(self, imgs, ocr_infos=None):
+        """
+        SER of several documents. Every document is split into chunks of 512
+        tokens, and the chunks of all the documents run in one padded batch,
+        so the lines after the first 512 tokens are predicted too.
+        Args:
+            imgs: list of images.
+            ocr_infos: the OCR results computed beforehand, a list of
+                {"transcription": str, "points": [[x, y], ...]} for every
+                image. The OCR of the ocr_engine is skipped when it is given.
+        Returns:
+            the SER results of every document (None if it has no text), the
+            inputs of every document with its chunks in the batch axis, and
+            the elapsed time.
+        """
+        batch_data = []
+        if ocr_infos is None:
+            ocr_infos = [None] * len(imgs)
+        for img, ocr_info in zip(imgs, ocr_infos):
+            data = transform({"image": img, "ocr_info": ocr_info}, self.preprocess_op)
+            if data[0] is None:
+                batch_data.append(None)
+                continue
+            # one image for every chunk of the document
+            num_chunks = len(data[0])
+            data[4] = np.repeat(data[4][np.newaxis], num_chunks, axis=0)
+            for idx in range(5, len(data)):
                 data[idx] = [data[idx]]
+            batch_data.append(data)
+        starttime = time.time()
+
+        datas = [data for data in batch_data if data is not None]
+        if len(datas) == 0:
+            return [None] * len(imgs), batch_data, 0
+        inputs = [
+            np.concatenate([data[idx] for data in datas])
+            for idx in range(len(self.input_tensor))
+        ]
+        preds = self._predict(inputs)
+
+        # the predictions of the tokens of every document, without the padding
+        preds_list = []
+        for data, doc_preds in zip(
+            datas, np.split(preds, np.cumsum([len(data[0]) for data in datas])[:-1])
+        ):
+            preds_list.append(doc_preds[data[2].astype(bool)])
+        post_results = self.postprocess_op(
+            preds_list,
+            segment_offset_ids=[data[6][0] for data in datas],
+            ocr_infos=[data[7][0] for data in datas],
+        )
+        post_results = iter(post_results)
+        post_results = [
+            None if data is None else next(post_results) for data in batch_data
+        ]
+        elapse = time.time() - starttime
+        return post_results, batch_data, elapse
+
+    def _predict(self, inputs):
         if self.args.use_onnx:
             input_tensor = {
-                name: data[idx] for idx, name in enumerate(self.input_tensor)
+                name: inputs[idx] for idx, name in enumerate(self.input_tensor)
             }
             self.output_tensors = self.predictor.run(None, input_tensor)
         else:
             for idx in range(len(self.input_tensor)):
-                self.input_tensor[idx].copy_from_cpu(data[idx])
+                self.input_tensor[idx].copy_from_cpu(inputs[idx])
 
             self.predictor.run()
 
@@ -131,13 +201,7 @@ class SerPredictor(object):
                 output_tensor if self.args.use_onnx else output_tensor.copy_to_cpu()
             )
             outputs.append(output)
-        preds = outputs[0]
-
-        post_result = self.postprocess_op(
-            preds, segment_offset_ids=data[6], ocr_infos=data[7]
-        )
-        elapse = time.time() - starttime
-        return post_result, data, elapse
+        return outputs[0]
 
 
 def main(args):
@@ -150,41 +214,55 @@ def main(args):
     with open(
         os.path.join(args.output, "infer.txt"), mode="w", encoding="utf-8"
     ) as f_w:
-        for image_file in image_file_list:
-            img, flag, _ = check_and_read(image_file)
-            if not flag:
-                img = cv2.imread(image_file)
-                img = img[:, :, ::-1]
-            if img is None:
-                logger.info("error in loading image:{}".format(image_file))
+        # the chunks of batch_num documents run in one batch
+        for beg_idx in range(0, len(image_file_list), ser_predictor.batch_num):
+            image_files, imgs = [], []
+            for image_file in image_file_list[
+                beg_idx : beg_idx + ser_predictor.batch_num
+            ]:
+                img, flag, _ = check_and_read(image_file)
+                if not flag:
+                    img = cv2.imread(image_file)
+                    img = img[:, :, ::-1]
+                if img is None:
+                    logger.info("error in loading image:{}".format(image_file))
+                    continue
+                image_files.append(image_file)
+                imgs.append(img)
+            if len(imgs) == 0:
                 continue
-            ser_res, _, elapse = ser_predictor(img)
-            ser_res = ser_res[0]
-
-            res_str = "{}\t{}\n".format(
-                image_file,
-                json.dumps(
-                    {
-                        "ocr_info": ser_res,
-                    },
-                    ensure_ascii=False,
-                ),
-            )
-            f_w.write(res_str)
+            ser_results, _, elapse = ser_predictor.predict_batch(imgs)
 
-            img_res = draw_ser_results(
-                image_file,
-                ser_res,
-                font_path=args.vis_font_path,
-            )
+            for image_file, ser_res in zip(image_files, ser_results):
+                if ser_res is None:
+                    logger.info("no text in {}".format(image_file))
+                    continue
+                res_str = "{}\t{}\n".format(
+                    image_file,
+                    json.dumps(
+                        {
+                            "ocr_info": ser_res,
+                        },
+                        ensure_ascii=False,
+                    ),
+                )
+                f_w.write(res_str)
 
-            img_save_path = os.path.join(args.output, os.path.basename(image_file))
-            cv2.imwrite(img_save_path, img_res)
-            logger.info("save vis result to {}".format(img_save_path))
+                img_res = draw_ser_results(
+                    image_file,
+                    ser_res,
+                    font_path=args.vis_font_path,
+                )
+
+                img_save_path = os.path.join(args.output, os.path.basename(image_file))
+                cv2.imwrite(img_save_path, img_res)
+                logger.info("save vis result to {}".format(img_save_path))
             if count > 0:
                 total_time += elapse
             count += 1
-            logger.info("Predict time of {}: {}".format(image_file, elapse))
+            logger.info(
+                "Predict time of {} images: {}".format(len(image_files), elapse)
+            )
 
 
 if __name__ == "__main__":
@@ -38,9 +38,9 @@ logger = get_logger()
 
 
 class SerRePredictor(object):
-    def __init__(self, args):
+    def __init__(self, args, ocr_engine=None):
         self.use_visual_backbone = args.use_visual_backbone
-        self.ser_engine = SerPredictor(args)
+        self.ser_engine = SerPredictor(args, ocr_engine=ocr_engine)
         if args.re_model_dir is not None:
             postprocess_params = {"name": "VQAReTokenLayoutLMPostProcess"}
             self.postprocess_op = build_post_process(postprocess_params)
@@ -53,15 +53,30 @@ class SerRePredictor(object):
         else:
             self.predictor = None
 
-    def __call__(self, img):
+    def __call__(self, img, ocr_info=None):
+        """
+        Args:
+            img: the image of the document.
+            ocr_info: the OCR results computed beforehand, a list of
+                {"transcription": str, "points": [[x, y], ...]}, see
+                SerPredictor.predict_batch.
+        """
         starttime = time.time()
-        ser_results, ser_inputs, ser_elapse = self.ser_engine(img)
+        ser_results, ser_inputs, ser_elapse = self.ser_engine(img, ocr_info)
         if self.predictor is None:
             return ser_results, ser_elapse
 
+        if ser_results is None:
+            return [[]], ser_elapse
+
+        # the tokens and the image of the SER inputs are reused, with every
+        # chunk of the document in the batch
         re_input, entity_idx_dict_batch = make_input(ser_inputs, ser_results)
         if self.use_visual_backbone == False:
             re_input.pop(4)
+        # the RE model is not run without a pair of a question and an answer
+        if re_input[-1][:, 0, 0].max() == 0:
+            return [[]], time.time() - starttime
         for idx in range(len(self.input_tensor)):
             self.input_tensor[idx].copy_from_cpu(re_input[idx])
 
@@ -77,8 +92,12 @@ class SerRePredictor(object):
         )
 
         post_result = self.postprocess_op(
-            preds, ser_results=ser_results, entity_idx_dict_batch=entity_idx_dict_batch
+            preds,
+            ser_results=ser_results * len(entity_idx_dict_batch),
+            entity_idx_dict_batch=entity_idx_dict_batch,
         )
+        # the relations of all the chunks of the document
+        post_result = [[pair for result in post_result for pair in result]]
 
         elapse = time.time() - starttime
         return post_result, elapse
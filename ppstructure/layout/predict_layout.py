@@ -66,6 +66,24 @@ class LayoutPredictor(object):
             self.config,
         ) = utility.create_predictor(args, "layout", logger)
         self.use_onnx = args.use_onnx
+        self.batch_num = max(args.layout_batch_num, 1)
+        if self.batch_num > 1 and self._fixed_batch_size():
+            logger.warning(
+                "the layout model is exported with a fixed batch size, "
+                "layout_batch_num is set to 1"
+            )
+            self.batch_num = 1
+
+    def _fixed_batch_size(self):
+        """Whether the batch dimension of the model input is fixed, e.g. 1"""
+        try:
+            if self.use_onnx:
+                batch_dim = self.input_tensor.shape[0]
+            else:
+                batch_dim = self.input_tensor.shape()[0]
+        except Exception:
+            return False
+        return isinstance(batch_dim, int) and batch_dim > 0
 
     def __call__(self, img):
         ori_im = img.copy()
@@ -82,36 +100,54 @@ class LayoutPredictor(object):
         preds, elapse = 0, 1
         starttime = time.time()
 
+        preds = self._predict(img)
+
+        post_preds = self.postprocess_op(ori_im, img, preds)
+        elapse = time.time() - starttime
+        return post_preds, elapse
+
+    def predict_batch(self, pages):
+        """
+        Layout analysis of several pages, e.g. the pages of a pdf.
+        Pages are resized to the same input size, so layout_batch_num pages
+        run in one forward pass.
+        Args:
+            pages: list of images.
+        Returns:
+            the layout results of every page, and the elapsed time.
+        """
+        batch_results = []
+        starttime = time.time()
+        for beg_idx in range(0, len(pages), self.batch_num):
+            ori_ims = pages[beg_idx : beg_idx + self.batch_num]
+            img_list = []
+            for ori_im in ori_ims:
+                data = transform({"image": ori_im}, self.preprocess_op)
+                img_list.append(data[0])
+            img = np.stack(img_list, axis=0)
+
+            preds = self._predict(img)
+            batch_results.extend(self.postprocess_op(list(ori_ims), img, preds))
+        elapse = time.time() - starttime
+        return batch_results, elapse
+
+    def _predict(self, img):
         np_score_list, np_boxes_list = [], []
         if self.use_onnx:
             input_dict = {}
             input_dict[self.input_tensor.name] = img
             outputs = self.predictor.run(self.output_tensors, input_dict)
-            num_outs = int(len(outputs) / 2)
-            for out_idx in range(num_outs):
-                np_score_list.append(outputs[out_idx])
-                np_boxes_list.append(outputs[out_idx + num_outs])
         else:
             self.input_tensor.copy_from_cpu(img)
             self.predictor.run()
-            output_names = self.predictor.get_output_names()
-            num_outs = int(len(output_names) / 2)
-            for out_idx in range(num_outs):
-                np_score_list.append(
-                    self.predictor.get_output_handle(
-                        output_names[out_idx]
-                    ).copy_to_cpu()
-                )
-                np_boxes_list.append(
-                    self.predictor.get_output_handle(
-                        output_names[out_idx + num_outs]
-                    ).copy_to_cpu()
-                )
-        preds = dict(boxes=np_score_list, boxes_num=np_boxes_list)
-
-        post_preds = self.postprocess_op(ori_im, img, preds)
-        elapse = time.time() - starttime
-        return post_preds, elapse
+            outputs = [
+                output_tensor.copy_to_cpu() for output_tensor in self.output_tensors
+            ]
+        num_outs = int(len(outputs) / 2)
+        for out_idx in range(num_outs):
+            np_score_list.append(outputs[out_idx])
+            np_boxes_list.append(outputs[out_idx + num_outs])
+        return dict(boxes=np_score_list, boxes_num=np_boxes_list)
 
 
 def main(args):
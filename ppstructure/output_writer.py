@@ -0,0 +1,185 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from paddle.utils import try_import
+
+from ppocr.utils.logging import get_logger
+
+logger = get_logger()
+
+# footer of the msgpack result file: the offset of the region offset index
+MSGPACK_FOOTER = struct.Struct("<Q")
+
+
+def region_to_dict(region):
+    """Shallow copy of a region without the image, the pixel data is never copied"""
+    return {k: v for k, v in region.items() if k != "img"}
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError("can not serialize {} to msgpack".format(type(obj)))
+
+
+def dump_structure_res_msgpack(res, file_path):
+    """
+    Save the regions of a page as concatenated msgpack objects, followed by
+    the msgpack array of region offsets and the offset of that array (uint64).
+    Regions can be read one by one with load_structure_res_msgpack.
+    """
+    msgpack = try_import("msgpack")
+    offsets = []
+    with open(file_path, "wb") as f:
+        for region in res:
+            offsets.append(f.tell())
+            f.write(msgpack.packb(region_to_dict(region), default=_msgpack_default))
+        index_offset = f.tell()
+        f.write(msgpack.packb(offsets))
+        f.write(MSGPACK_FOOTER.pack(index_offset))
+
+
+def load_structure_res_msgpack(file_path, region_idx=None):
+    """
+    Load the regions saved by dump_structure_res_msgpack, or only the region
+    of region_idx, which only reads the bytes of that region.
+    """
+    msgpack = try_import("msgpack")
+    with open(file_path, "rb") as f:
+        f.seek(-MSGPACK_FOOTER.size, os.SEEK_END)
+        end = f.tell()
+        (index_offset,) = MSGPACK_FOOTER.unpack(f.read(MSGPACK_FOOTER.size))
+        f.seek(index_offset)
+        offsets = msgpack.unpackb(f.read(end - index_offset))
+        ends = offsets[1:] + [index_offset]
+        if region_idx is not None:
+            f.seek(offsets[region_idx])
+            return msgpack.unpackb(f.read(ends[region_idx] - offsets[region_idx]))
+        regions = []
+        for beg, end in zip(offsets, ends):
+            f.seek(beg)
+            regions.append(msgpack.unpackb(f.read(end - beg)))
+        return regions
+
+
+def save_region_files(region, save_folder, img_idx, to_excel):
+    """Save the excel of a table region, or the crop of a figure region"""
+    if (
+        region["type"].lower() == "table"
+        and len(region["res"]) > 0
+        and "html" in region["res"]
+    ):
+        excel_path = os.path.join(
+            save_folder, "{}_{}.xlsx".format(region["bbox"], img_idx)
+        )
+        to_excel(region["res"]["html"], excel_path)
+    elif region["type"].lower() == "figure":
+        img_path = os.path.join(
+            save_folder, "{}_{}.jpg".format(region["bbox"], img_idx)
+        )
+        cv2.imwrite(img_path, region["img"])
+
+
+class StructureOutputWriter(object):
+    """
+    Writer of the structure results. The regions of every page are written as
+    JSON lines, without copying the region images, while the table excels and
+    the figure crops are written by a pool of I/O threads. At most max_pending
+    files are queued, the caller blocks when the queue is full.
+
+    Args:
+        save_folder: the output folder, results of an image are saved to save_folder/img_name.
+        num_workers: number of I/O threads, the files are written synchronously if it is 0.
+        max_pending: max number of queued files.
+        save_msgpack: whether to also save the regions in msgpack, see dump_structure_res_msgpack.
+    """
+
+    def __init__(self, save_folder, num_workers=2, max_pending=16, save_msgpack=False):
+        from ppstructure.table.predict_table import to_excel
+
+        self.save_folder = save_folder
+        self.save_msgpack = save_msgpack
+        self.to_excel = to_excel
+        self.executor = None
+        if num_workers > 0:
+            self.executor = ThreadPoolExecutor(max_workers=num_workers)
+            self.pending = threading.BoundedSemaphore(max_pending)
+        self.futures = []
+
+    def write(self, res, img_name, img_idx=0):
+        excel_save_folder = os.path.join(self.save_folder, img_name)
+        os.makedirs(excel_save_folder, exist_ok=True)
+        # save res
+        with open(
+            os.path.join(excel_save_folder, "res_{}.txt".format(img_idx)),
+            "w",
+            encoding="utf8",
+        ) as f:
+            for region in res:
+                f.write("{}\n".format(json.dumps(region_to_dict(region))))
+        if self.save_msgpack:
+            dump_structure_res_msgpack(
+                res, os.path.join(excel_save_folder, "res_{}.msgpack".format(img_idx))
+            )
+
+        for region in res:
+            if region["type"].lower() not in ["table", "figure"]:
+                continue
+            if self.executor is None:
+                save_region_files(region, excel_save_folder, img_idx, self.to_excel)
+                continue
+            self.pending.acquire()
+            future = self.executor.submit(
+                save_region_files, region, excel_save_folder, img_idx, self.to_excel
+            )
+            future.add_done_callback(lambda _: self.pending.release())
+            self.futures.append(future)
+        self._check_done()
+
+    def _check_done(self, wait=False):
+        futures = []
+        for future in self.futures:
+            if not wait and not future.done():
+                futures.append(future)
+                continue
+            try:
+                future.result()
+            except Exception as ex:
+                logger.error("error in saving structure result, err msg: {}".format(ex))
+        self.futures = futures
+
+    def flush(self):
+        """Wait until all queued files are written, e.g. before reading the figure crops"""
+        self._check_done(wait=True)
+
+    def close(self):
+        """Wait until all queued files are written"""
+        self.flush()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -29,14 +29,21 @@ import logging
 from copy import deepcopy
 
 from paddle.utils import try_import
-from ppocr.utils.utility import get_image_file_list, check_and_read
+from ppocr.utils.utility import get_image_file_list, check_and_read, iter_pdf_pages
 from ppocr.utils.logging import get_logger
 from ppocr.utils.visual import draw_ser_results, draw_re_results
 from tools.infer.predict_system import TextSystem
 from tools.infer.predict_rec import TextRecognizer
 from ppstructure.layout.predict_layout import LayoutPredictor
 from ppstructure.table.predict_table import TableSystem, to_excel
-from ppstructure.utility import parse_args, draw_structure_result, cal_ocr_word_box
+from ppstructure.output_writer import StructureOutputWriter
+from ppstructure.document_pipeline import DocumentPipeline
+from ppstructure.utility import (
+    parse_args,
+    draw_structure_result,
+    cal_ocr_word_box,
+    assign_text_to_regions,
+)
 
 logger = get_logger()
 
@@ -94,113 +101,214 @@ class StructureSystem(object):
             self.kie_predictor = SerRePredictor(args)
 
         self.return_word_box = args.return_word_box
-
-    def __call__(self, img, return_ocr_result_in_table=False, img_idx=0):
-        time_dict = {
-            "image_orientation": 0,
-            "layout": 0,
-            "table": 0,
-            "table_match": 0,
-            "formula": 0,
-            "det": 0,
-            "rec": 0,
-            "kie": 0,
-            "all": 0,
-        }
+        self.text_region_best_overlap = getattr(args, "text_region_best_overlap", False)
+        self.use_doc_pipeline = getattr(args, "use_doc_pipeline", True)
+        self.page_batch_num = getattr(args, "layout_batch_num", 1)
+
+    def __call__(
+        self,
+        img,
+        return_ocr_result_in_table=False,
+        img_idx=0,
+        layout_res=None,
+        ocr_info=None,
+    ):
+        """
+        Args:
+            img: the image to analyse.
+            return_ocr_result_in_table: whether to return the ocr results of table regions.
+            img_idx: the page index of the image.
+            layout_res: layout results computed beforehand, e.g. by
+                LayoutPredictor.predict_batch for all pages of a pdf. The layout
+                stage is skipped when it is given.
+            ocr_info: in kie mode, the OCR results computed beforehand, a list of
+                {"transcription": str, "points": [[x, y], ...]}. The OCR of the
+                kie predictor is skipped when it is given.
+        """
+        time_dict = self._init_time_dict()
         start = time.time()
 
         if self.image_orientation_predictor is not None:
-            tic = time.time()
-            cls_result = self.image_orientation_predictor.predict(input_data=img)
-            cls_res = next(cls_result)
-            angle = cls_res[0]["label_names"][0]
-            cv_rotate_code = {
-                "90": cv2.ROTATE_90_COUNTERCLOCKWISE,
-                "180": cv2.ROTATE_180,
-                "270": cv2.ROTATE_90_CLOCKWISE,
-            }
-            if angle in cv_rotate_code:
-                img = cv2.rotate(img, cv_rotate_code[angle])
-            toc = time.time()
-            time_dict["image_orientation"] = toc - tic
+            img, time_dict["image_orientation"] = self._correct_orientation(img)
 
         if self.mode == "structure":
-            ori_im = img.copy()
-            if self.layout_predictor is not None:
+            if layout_res is None and self.layout_predictor is not None:
                 layout_res, elapse = self.layout_predictor(img)
                 time_dict["layout"] += elapse
-            else:
-                h, w = ori_im.shape[:2]
-                layout_res = [dict(bbox=None, label="table", score=0.0)]
-
-            # As reported in issues such as #10270 and #11665, the old
-            # implementation, which recognizes texts from the layout regions,
-            # has problems with OCR recognition accuracy.
-            #
-            # To enhance the OCR recognition accuracy, we implement a patch fix
-            # that first use text_system to detect and recognize all text information
-            # and then filter out relevant texts according to the layout regions.
-            text_res = None
-            if self.text_system is not None:
-                text_res, ocr_time_dict = self._predict_text(img)
-                time_dict["det"] += ocr_time_dict["det"]
-                time_dict["rec"] += ocr_time_dict["rec"]
-
-            res_list = []
-            for region in layout_res:
-                res = ""
-                if region["bbox"] is not None:
-                    x1, y1, x2, y2 = region["bbox"]
-                    x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                    roi_img = ori_im[y1:y2, x1:x2, :]
-                else:
-                    x1, y1, x2, y2 = 0, 0, w, h
-                    roi_img = ori_im
-                bbox = [x1, y1, x2, y2]
-
-                if region["label"] == "table":
-                    if self.table_system is not None:
-                        res, table_time_dict = self.table_system(
-                            roi_img, return_ocr_result_in_table
-                        )
-                        time_dict["table"] += table_time_dict["table"]
-                        time_dict["table_match"] += table_time_dict["match"]
-                        time_dict["det"] += table_time_dict["det"]
-                        time_dict["rec"] += table_time_dict["rec"]
-
-                elif region["label"] == "equation" and self.formula_system is not None:
-                    latex_res, formula_time = self.formula_system([roi_img])
-                    time_dict["formula"] += formula_time
-                    res = {"latex": latex_res[0]}
-
-                else:
-                    if text_res is not None:
-                        # Filter the text results whose regions intersect with the current layout bbox.
-                        res = self._filter_text_res(text_res, bbox)
-
-                res_list.append(
-                    {
-                        "type": region["label"].lower(),
-                        "bbox": bbox,
-                        "img": roi_img,
-                        "res": res,
-                        "img_idx": img_idx,
-                        "score": region["score"],
-                    }
-                )
+            res_list = self._predict_regions(
+                img, layout_res, return_ocr_result_in_table, img_idx, time_dict
+            )
+            self._predict_formula([res_list], time_dict)
 
             end = time.time()
             time_dict["all"] = end - start
             return res_list, time_dict
 
         elif self.mode == "kie":
-            re_res, elapse = self.kie_predictor(img)
+            re_res, elapse = self.kie_predictor(img, ocr_info)
             time_dict["kie"] = elapse
             time_dict["all"] = elapse
             return re_res[0], time_dict
 
         return None, None
 
+    def _init_time_dict(self):
+        return {
+            "image_orientation": 0,
+            "layout": 0,
+            "table": 0,
+            "table_match": 0,
+            "formula": 0,
+            "det": 0,
+            "rec": 0,
+            "kie": 0,
+            "all": 0,
+        }
+
+    def predict_layout_batch(self, imgs):
+        """
+        Layout analysis of all pages in batches, which can be passed to __call__
+        as layout_res. Returns None when the layout of every page has to be
+        predicted in __call__, e.g. the image orientation is corrected first.
+        """
+        if (
+            self.mode != "structure"
+            or self.layout_predictor is None
+            or self.image_orientation_predictor is not None
+        ):
+            return None, 0
+        return self.layout_predictor.predict_batch(imgs)
+
+    def _correct_orientation(self, img):
+        tic = time.time()
+        cls_result = self.image_orientation_predictor.predict(input_data=img)
+        cls_res = next(cls_result)
+        angle = cls_res[0]["label_names"][0]
+        cv_rotate_code = {
+            "90": cv2.ROTATE_90_COUNTERCLOCKWISE,
+            "180": cv2.ROTATE_180,
+            "270": cv2.ROTATE_90_CLOCKWISE,
+        }
+        if angle in cv_rotate_code:
+            img = cv2.rotate(img, cv_rotate_code[angle])
+        toc = time.time()
+        return img, toc - tic
+
+    def _predict_regions(
+        self, img, layout_res, return_ocr_result_in_table, img_idx, time_dict
+    ):
+        """
+        OCR and table recognition of the layout regions of a page. The equation
+        regions are left empty for _predict_formula, so that their crops can be
+        recognized together with those of other pages.
+        """
+        ori_im = img.copy()
+        if layout_res is None:
+            layout_res = [dict(bbox=None, label="table", score=0.0)]
+        h, w = ori_im.shape[:2]
+
+        # As reported in issues such as #10270 and #11665, the old
+        # implementation, which recognizes texts from the layout regions,
+        # has problems with OCR recognition accuracy.
+        #
+        # To enhance the OCR recognition accuracy, we implement a patch fix
+        # that first use text_system to detect and recognize all text information
+        # and then filter out relevant texts according to the layout regions.
+        text_res = None
+        if self.text_system is not None:
+            text_res, ocr_time_dict = self._predict_text(img)
+            time_dict["det"] += ocr_time_dict["det"]
+            time_dict["rec"] += ocr_time_dict["rec"]
+
+        bboxes = []
+        for region in layout_res:
+            if region["bbox"] is not None:
+                x1, y1, x2, y2 = region["bbox"]
+                x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+            else:
+                x1, y1, x2, y2 = 0, 0, w, h
+            bboxes.append([x1, y1, x2, y2])
+
+        region_text_res = None
+        if text_res is not None:
+            # Filter the text results whose regions intersect with the layout bboxes
+            # in one pass, only for the regions that use the page text results.
+            text_region_indexes = [
+                idx
+                for idx, region in enumerate(layout_res)
+                if not (
+                    (region["label"] == "table")
+                    or (
+                        region["label"] == "equation"
+                        and self.formula_system is not None
+                    )
+                )
+            ]
+            filtered_text_res = assign_text_to_regions(
+                text_res,
+                [bboxes[idx] for idx in text_region_indexes],
+                best_overlap=self.text_region_best_overlap,
+            )
+            region_text_res = dict(zip(text_region_indexes, filtered_text_res))
+
+        res_list = []
+        for region_idx, (region, bbox) in enumerate(zip(layout_res, bboxes)):
+            res = ""
+            x1, y1, x2, y2 = bbox
+            if region["bbox"] is not None:
+                roi_img = ori_im[y1:y2, x1:x2, :]
+            else:
+                roi_img = ori_im
+
+            if region["label"] == "table":
+                if self.table_system is not None:
+                    res, table_time_dict = self.table_system(
+                        roi_img, return_ocr_result_in_table
+                    )
+                    time_dict["table"] += table_time_dict["table"]
+                    time_dict["table_match"] += table_time_dict["match"]
+                    time_dict["det"] += table_time_dict["det"]
+                    time_dict["rec"] += table_time_dict["rec"]
+
+            elif region["label"] == "equation" and self.formula_system is not None:
+                # recognized by _predict_formula
+                pass
+
+            else:
+                if region_text_res is not None:
+                    res = region_text_res[region_idx]
+
+            res_list.append(
+                {
+                    "type": region["label"].lower(),
+                    "bbox": bbox,
+                    "img": roi_img,
+                    "res": res,
+                    "img_idx": img_idx,
+                    "score": region["score"],
+                }
+            )
+        return res_list
+
+    def _predict_formula(self, res_lists, time_dict):
+        """Recognize the equation regions of several pages in one call"""
+        if self.formula_system is None:
+            return
+        regions = [
+            region
+            for res_list in res_lists
+            for region in res_list
+            if region["type"] == "equation" and region["res"] == ""
+        ]
+        if len(regions) == 0:
+            return
+        latex_res, formula_time = self.formula_system(
+            [region["img"] for region in regions]
+        )
+        time_dict["formula"] += formula_time
+        for region, latex in zip(regions, latex_res):
+            region["res"] = {"latex": latex}
+
     def _predict_text(self, img):
         filter_boxes, filter_rec_res, ocr_time_dict = self.text_system(img)
 
@@ -253,13 +361,7 @@ class StructureSystem(object):
         return res, ocr_time_dict
 
     def _filter_text_res(self, text_res, bbox):
-        res = []
-        for r in text_res:
-            box = r["text_region"]
-            rect = box[0][0], box[0][1], box[2][0], box[2][1]
-            if self._has_intersection(bbox, rect):
-                res.append(r)
-        return res
+        return assign_text_to_regions(text_res, [bbox])[0]
 
     def _has_intersection(self, rect1, rect2):
         x_min1, y_min1, x_max1, y_max1 = rect1
@@ -272,33 +374,7 @@ class StructureSystem(object):
 
 
 def save_structure_res(res, save_folder, img_name, img_idx=0):
-    excel_save_folder = os.path.join(save_folder, img_name)
-    os.makedirs(excel_save_folder, exist_ok=True)
-    res_cp = deepcopy(res)
-    # save res
-    with open(
-        os.path.join(excel_save_folder, "res_{}.txt".format(img_idx)),
-        "w",
-        encoding="utf8",
-    ) as f:
-        for region in res_cp:
-            roi_img = region.pop("img")
-            f.write("{}\n".format(json.dumps(region)))
-
-            if (
-                region["type"].lower() == "table"
-                and len(region["res"]) > 0
-                and "html" in region["res"]
-            ):
-                excel_path = os.path.join(
-                    excel_save_folder, "{}_{}.xlsx".format(region["bbox"], img_idx)
-                )
-                to_excel(region["res"]["html"], excel_path)
-            elif region["type"].lower() == "figure":
-                img_path = os.path.join(
-                    excel_save_folder, "{}_{}.jpg".format(region["bbox"], img_idx)
-                )
-                cv2.imwrite(img_path, roi_img)
+    StructureOutputWriter(save_folder, num_workers=0).write(res, img_name, img_idx)
 
 
 def main(args):
@@ -310,12 +386,27 @@ def main(args):
         structure_sys = StructureSystem(args)
         save_folder = os.path.join(args.output, structure_sys.mode)
         os.makedirs(save_folder, exist_ok=True)
+        output_writer = StructureOutputWriter(
+            save_folder,
+            num_workers=args.output_num_workers,
+            save_msgpack=args.save_res_msgpack,
+        )
     img_num = len(image_file_list)
 
     for i, image_file in enumerate(image_file_list):
         logger.info("[{}/{}] {}".format(i, img_num, image_file))
-        img, flag_gif, flag_pdf = check_and_read(image_file)
         img_name = os.path.basename(image_file).split(".")[0]
+        use_pipeline = (
+            not args.use_pdf2docx_api
+            and structure_sys.mode == "structure"
+            and structure_sys.use_doc_pipeline
+            and image_file.lower().endswith("pdf")
+        )
+        if use_pipeline:
+            # the pages are rendered lazily while they are analysed
+            img, flag_gif, flag_pdf = iter_pdf_pages(image_file), False, True
+        else:
+            img, flag_gif, flag_pdf = check_and_read(image_file)
 
         if args.recovery and args.use_pdf2docx_api and flag_pdf:
             try_import("pdf2docx")
@@ -340,16 +431,26 @@ def main(args):
         else:
             imgs = img
 
-        all_res = []
-        for index, img in enumerate(imgs):
-            res, time_dict = structure_sys(img, img_idx=index)
+        if use_pipeline:
+            page_results = DocumentPipeline(
+                structure_sys, page_batch_num=structure_sys.page_batch_num
+            )(imgs)
+        else:
+            page_results = (
+                (index, img) + structure_sys(img, img_idx=index)
+                for index, img in enumerate(imgs)
+            )
+
+        # the recovered docx and markdown are written page by page
+        recovery_writers = None
+        for index, img, res, time_dict in page_results:
             img_save_path = os.path.join(
                 save_folder, img_name, "show_{}.jpg".format(index)
             )
             os.makedirs(os.path.join(save_folder, img_name), exist_ok=True)
             if structure_sys.mode == "structure" and res != []:
                 draw_img = draw_structure_result(img, res, args.vis_font_path)
-                save_structure_res(res, save_folder, img_name, index)
+                output_writer.write(res, img_name, index)
             elif structure_sys.mode == "kie":
                 if structure_sys.kie_predictor.predictor is not None:
                     draw_img = draw_re_results(img, res, font_path=args.vis_font_path)
@@ -368,24 +469,43 @@ def main(args):
             if res != []:
                 cv2.imwrite(img_save_path, draw_img)
                 logger.info("result save to {}".format(img_save_path))
-            if args.recovery and res != []:
+            if args.recovery and res != [] and recovery_writers != []:
                 from ppstructure.recovery.recovery_to_doc import (
                     sorted_layout_boxes,
-                    convert_info_docx,
+                    DocxRecoveryWriter,
                 )
                 from ppstructure.recovery.recovery_to_markdown import (
-                    convert_info_markdown,
+                    MarkdownRecoveryWriter,
                 )
 
                 h, w, _ = img.shape
                 res = sorted_layout_boxes(res, w)
-                all_res += res
+                try:
+                    if recovery_writers is None:
+                        recovery_writers = [DocxRecoveryWriter(save_folder, img_name)]
+                        if args.recovery_to_markdown:
+                            recovery_writers.append(
+                                MarkdownRecoveryWriter(save_folder, img_name)
+                            )
+                    # the docx reads the figure crops saved by the output writer
+                    output_writer.flush()
+                    for writer in recovery_writers:
+                        writer.add_regions(res)
+                except Exception as ex:
+                    logger.error(
+                        "error in layout recovery image:{}, err msg: {}".format(
+                            image_file, ex
+                        )
+                    )
+                    # no partial docx or markdown is left
+                    for writer in recovery_writers or []:
+                        writer.abort()
+                    recovery_writers = []
 
-        if args.recovery and all_res != []:
+        if recovery_writers:
             try:
-                convert_info_docx(img, all_res, save_folder, img_name)
-                if args.recovery_to_markdown:
-                    convert_info_markdown(all_res, save_folder, img_name)
+                for writer in recovery_writers:
+                    writer.close()
             except Exception as ex:
                 logger.error(
                     "error in layout recovery image:{}, err msg: {}".format(
@@ -394,6 +514,8 @@ def main(args):
                 )
                 continue
         logger.info("Predict time : {:.3f}s".format(time_dict["all"]))
+    if not args.use_pdf2docx_api:
+        output_writer.close()
 
 
 if __name__ == "__main__":
@@ -30,58 +30,83 @@ logger = get_logger()
 
 
 def convert_info_docx(img, res, save_folder, img_name):
-    doc = Document()
-    doc.styles["Normal"].font.name = "Times New Roman"
-    doc.styles["Normal"]._element.rPr.rFonts.set(qn("w:eastAsia"), "宋体")
-    doc.styles["Normal"].font.size = shared.Pt(6.5)
-
-    flag = 1
-    for i, region in enumerate(res):
-        if len(region["res"]) == 0:
-            continue
-        img_idx = region["img_idx"]
-        if flag == 2 and region["layout"] == "single":
-            section = doc.add_section(WD_SECTION.CONTINUOUS)
-            section._sectPr.xpath("./w:cols")[0].set(qn("w:num"), "1")
-            flag = 1
-        elif flag == 1 and region["layout"] == "double":
-            section = doc.add_section(WD_SECTION.CONTINUOUS)
-            section._sectPr.xpath("./w:cols")[0].set(qn("w:num"), "2")
-            flag = 2
-
-        if region["type"].lower() == "figure":
-            excel_save_folder = os.path.join(save_folder, img_name)
-            img_path = os.path.join(
-                excel_save_folder, "{}_{}.jpg".format(region["bbox"], img_idx)
-            )
-            paragraph_pic = doc.add_paragraph()
-            paragraph_pic.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            run = paragraph_pic.add_run("")
-            if flag == 1:
-                run.add_picture(img_path, width=shared.Inches(5))
-            elif flag == 2:
-                run.add_picture(img_path, width=shared.Inches(2))
-        elif region["type"].lower() == "title":
-            doc.add_heading(region["res"][0]["text"])
-        elif region["type"].lower() == "table":
-            parser = HtmlToDocx()
-            parser.table_style = "TableGrid"
-            parser.handle_table(region["res"]["html"], doc)
-        elif region["type"] == "equation" and "latex" in region["res"]:
-            pass
-        else:
-            paragraph = doc.add_paragraph()
-            paragraph_format = paragraph.paragraph_format
-            for i, line in enumerate(region["res"]):
-                if i == 0:
-                    paragraph_format.first_line_indent = shared.Inches(0.25)
-                text_run = paragraph.add_run(line["text"] + " ")
-                text_run.font.size = shared.Pt(10)
-
-    # save to docx
-    docx_path = os.path.join(save_folder, "{}_ocr.docx".format(img_name))
-    doc.save(docx_path)
-    logger.info("docx save to {}".format(docx_path))
+    writer = DocxRecoveryWriter(save_folder, img_name)
+    writer.add_regions(res)
+    writer.close()
+
+
+class DocxRecoveryWriter(object):
+    """
+    Build the recovered docx incrementally, e.g. add the sorted regions of
+    every page as soon as the page is finished, and save the docx at the end.
+    The figure crops of the added regions must have been saved already.
+    """
+
+    def __init__(self, save_folder, img_name):
+        self.save_folder = save_folder
+        self.img_name = img_name
+        self.doc = Document()
+        self.doc.styles["Normal"].font.name = "Times New Roman"
+        self.doc.styles["Normal"]._element.rPr.rFonts.set(qn("w:eastAsia"), "宋体")
+        self.doc.styles["Normal"].font.size = shared.Pt(6.5)
+        self.flag = 1
+
+    def add_regions(self, res):
+        doc = self.doc
+        save_folder, img_name = self.save_folder, self.img_name
+        flag = self.flag
+        for i, region in enumerate(res):
+            if len(region["res"]) == 0:
+                continue
+            img_idx = region["img_idx"]
+            if flag == 2 and region["layout"] == "single":
+                section = doc.add_section(WD_SECTION.CONTINUOUS)
+                section._sectPr.xpath("./w:cols")[0].set(qn("w:num"), "1")
+                flag = 1
+            elif flag == 1 and region["layout"] == "double":
+                section = doc.add_section(WD_SECTION.CONTINUOUS)
+                section._sectPr.xpath("./w:cols")[0].set(qn("w:num"), "2")
+                flag = 2
+
+            if region["type"].lower() == "figure":
+                excel_save_folder = os.path.join(save_folder, img_name)
+                img_path = os.path.join(
+                    excel_save_folder, "{}_{}.jpg".format(region["bbox"], img_idx)
+                )
+                paragraph_pic = doc.add_paragraph()
+                paragraph_pic.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                run = paragraph_pic.add_run("")
+                if flag == 1:
+                    run.add_picture(img_path, width=shared.Inches(5))
+                elif flag == 2:
+                    run.add_picture(img_path, width=shared.Inches(2))
+            elif region["type"].lower() == "title":
+                doc.add_heading(region["res"][0]["text"])
+            elif region["type"].lower() == "table":
+                parser = HtmlToDocx()
+                parser.table_style = "TableGrid"
+                parser.handle_table(region["res"]["html"], doc)
+            elif region["type"] == "equation" and "latex" in region["res"]:
+                pass
+            else:
+                paragraph = doc.add_paragraph()
+                paragraph_format = paragraph.paragraph_format
+                for i, line in enumerate(region["res"]):
+                    if i == 0:
+                        paragraph_format.first_line_indent = shared.Inches(0.25)
+                    text_run = paragraph.add_run(line["text"] + " ")
+                    text_run.font.size = shared.Pt(10)
+        self.flag = flag
+
+    def close(self):
+        # save to docx
+        docx_path = os.path.join(self.save_folder, "{}_ocr.docx".format(self.img_name))
+        self.doc.save(docx_path)
+        logger.info("docx save to {}".format(docx_path))
+
+    def abort(self):
+        # the docx is only saved by close, nothing is on disk yet
+        self.doc = None
 
 
 def sorted_layout_boxes(res, w):
@@ -137,51 +137,116 @@ def convert_info_markdown(res, save_folder, img_name):
     Returns:
         None
     """
+    with MarkdownRecoveryWriter(save_folder, img_name) as writer:
+        writer.add_regions(res)
 
-    def replace_special_char(content):
-        special_chars = ["*", "`", "~", "$"]
-        for char in special_chars:
-            content = content.replace(char, "\\" + char)
-        return content
 
-    markdown_string = []
+def replace_special_char(content):
+    special_chars = ["*", "`", "~", "$"]
+    for char in special_chars:
+        content = content.replace(char, "\\" + char)
+    return content
 
-    for i, region in enumerate(res):
-        if len(region["res"]) == 0:
-            continue
-        img_idx = region["img_idx"]
-
-        if region["type"].lower() == "figure":
-            img_file_name = "{}_{}.jpg".format(region["bbox"], img_idx)
-            markdown_string.append(
-                f"""<div align="center">\n\t<img src="{img_name+"/"+img_file_name}">\n</div>"""
-            )
-        elif region["type"].lower() == "title":
-            markdown_string.append(
-                f"""# {region['res'][0]['text']}"""
-                + "".join(
-                    [" " + one_region["text"] for one_region in region["res"][1:]]
-                )
-            )
-        elif region["type"].lower() == "table":
-            markdown_string.append(region["res"]["html"])
-        elif region["type"].lower() == "header" or region["type"].lower() == "footer":
-            pass
-        elif region["type"].lower() == "equation" and "latex" in region["res"]:
-            markdown_string.append(f"""$${region["res"]["latex"]}$$""")
-        elif region["type"].lower() == "text":
-            merge_func = check_merge_method(region)
-            # logger.warning(f"use merge method:{merge_func.__name__}")
-            markdown_string.append(replace_special_char(merge_func(region)))
+
+def region_to_markdown(region, img_name):
+    """Convert a region to its markdown section.
+
+    Args:
+        region: Element of the layout result.
+        img_name: PDF file or image file name
+
+    Returns:
+        The markdown string of the region, or None if the region is skipped.
+    """
+    if len(region["res"]) == 0:
+        return None
+    img_idx = region["img_idx"]
+
+    if region["type"].lower() == "figure":
+        img_file_name = "{}_{}.jpg".format(region["bbox"], img_idx)
+        return f"""<div align="center">\n\t<img src="{img_name+"/"+img_file_name}">\n</div>"""
+    elif region["type"].lower() == "title":
+        return f"""# {region['res'][0]['text']}""" + "".join(
+            [" " + one_region["text"] for one_region in region["res"][1:]]
+        )
+    elif region["type"].lower() == "table":
+        return region["res"]["html"]
+    elif region["type"].lower() == "header" or region["type"].lower() == "footer":
+        return None
+    elif region["type"].lower() == "equation" and "latex" in region["res"]:
+        return f"""$${region["res"]["latex"]}$$"""
+    elif region["type"].lower() == "text":
+        merge_func = check_merge_method(region)
+        # logger.warning(f"use merge method:{merge_func.__name__}")
+        return replace_special_char(merge_func(region))
+    else:
+        string = ""
+        for line in region["res"]:
+            string += line["text"] + " "
+        return string
+
+
+class MarkdownRecoveryWriter(object):
+    """Stream the markdown of the recognition result to file.
+
+    The sections of the regions added are written at once, e.g. page by page
+    as pages are finished. The file content is the same as converting all
+    regions at the end, the newlines at the end of the written text are held
+    back until the next section, to merge the runs of newlines across sections.
+
+    Args:
+        save_folder: Folder to save the markdown file
+        img_name: PDF file or image file name
+    """
+
+    def __init__(self, save_folder, img_name):
+        self.img_name = img_name
+        self.md_path = os.path.join(save_folder, "{}_ocr.md".format(img_name))
+        self.file = open(self.md_path, "w", encoding="utf-8")
+        self.has_section = False
+        self.pending_newlines = ""
+
+    def add_regions(self, res):
+        sections = []
+        for region in res:
+            section = region_to_markdown(region, self.img_name)
+            if section is not None:
+                sections.append(section)
+        if len(sections) == 0:
+            return
+        markdown_string = "\n\n".join(sections)
+        if self.has_section:
+            markdown_string = "\n\n" + markdown_string
+        self.has_section = True
+        markdown_string = self.pending_newlines + markdown_string
+        markdown_string = re.sub(r"\n{3,}", "\n\n", markdown_string)
+        content = markdown_string.rstrip("\n")
+        self.pending_newlines = markdown_string[len(content) :]
+        self.file.write(content)
+        self.file.flush()
+
+    def close(self):
+        if self.file is None:
+            return
+        self.file.write(self.pending_newlines)
+        self.file.close()
+        self.file = None
+        logger.info("markdown save to {}".format(self.md_path))
+
+    def abort(self):
+        """Close the file and remove the partial markdown, e.g. on an error"""
+        if self.file is None:
+            return
+        self.file.close()
+        self.file = None
+        if os.path.exists(self.md_path):
+            os.remove(self.md_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.abort()
         else:
-            string = ""
-            for line in region["res"]:
-                string += line["text"] + " "
-            markdown_string.append(string)
-
-    md_path = os.path.join(save_folder, "{}_ocr.md".format(img_name))
-    markdown_string = "\n\n".join(markdown_string)
-    markdown_string = re.sub(r"\n{3,}", "\n\n", markdown_string)
-    with open(md_path, "w", encoding="utf-8") as f:
-        f.write(markdown_string)
-    logger.info("markdown save to {}".format(md_path))
+            self.close()
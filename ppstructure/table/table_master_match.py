@@ -23,6 +23,7 @@ import glob
 import copy
 import math
 import pickle
+import bisect
 import numpy as np
 
 from shapely.geometry import Polygon, MultiPoint
@@ -131,6 +132,68 @@ def cal_iou(bbox1, bbox2):
     return iou
 
 
+def _as_bbox_array(bboxes):
+    """
+    Convert bboxes to a 2-D ndarray, empty input gives an array of shape (0, 4).
+    :param bboxes:
+    :return:
+    """
+    bboxes = np.asarray(bboxes)
+    if bboxes.size == 0:
+        return np.zeros([0, 4], dtype=np.float32)
+    return bboxes.reshape(len(bboxes), -1)
+
+
+def cal_iou_matrix(bboxes1, bboxes2):
+    """
+    Vectorized version of cal_iou for two groups of xyxy bboxes.
+    Same as cal_iou, the union area is the convex hull area of two bboxes,
+    which is the bounding rectangle minus the four triangles cut at its corners.
+    :param bboxes1: xyxy bboxes, shape (N, 4)
+    :param bboxes2: xyxy bboxes, shape (M, 4)
+    :return: iou matrix, shape (N, M)
+    """
+    # same precision as convert_coord
+    b1 = _as_bbox_array(bboxes1)[:, :4].astype(np.float32).astype(np.float64)
+    b2 = _as_bbox_array(bboxes2)[:, :4].astype(np.float32).astype(np.float64)
+
+    def _normalize(b):
+        return (
+            np.minimum(b[:, 0], b[:, 2]),
+            np.minimum(b[:, 1], b[:, 3]),
+            np.maximum(b[:, 0], b[:, 2]),
+            np.maximum(b[:, 1], b[:, 3]),
+        )
+
+    ax1, ay1, ax2, ay2 = [v[:, None] for v in _normalize(b1)]
+    bx1, by1, bx2, by2 = [v[None, :] for v in _normalize(b2)]
+
+    inter_w = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    inter_h = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter_area = inter_w * inter_h
+
+    x1, y1 = np.minimum(ax1, bx1), np.minimum(ay1, by1)
+    x2, y2 = np.maximum(ax2, bx2), np.maximum(ay2, by2)
+
+    def _corner_cut(dxa, dya, dxb, dyb):
+        # the cut triangle is spanned by the bbox reaching the corner's row
+        # and the bbox reaching the corner's column, zero if one contains it.
+        return np.maximum(dxa * dyb, dxb * dya) / 2
+
+    cut = (
+        _corner_cut(ax1 - x1, ay1 - y1, bx1 - x1, by1 - y1)
+        + _corner_cut(x2 - ax2, ay1 - y1, x2 - bx2, by1 - y1)
+        + _corner_cut(ax1 - x1, y2 - ay2, bx1 - x1, y2 - by2)
+        + _corner_cut(x2 - ax2, y2 - ay2, x2 - bx2, y2 - by2)
+    )
+    union_area = (x2 - x1) * (y2 - y1) - cut
+
+    iou = np.zeros_like(inter_area)
+    valid = (inter_area > 0) & (union_area > 0)
+    iou[valid] = inter_area[valid] / union_area[valid]
+    return iou
+
+
 def cal_distance(p1, p2):
     delta_x = p1[0] - p2[0]
     delta_y = p1[1] - p2[1]
@@ -176,12 +239,11 @@ def find_no_match(match_list, all_end2end_nums, type="end2end"):
     else:
         raise ValueError
 
-    no_match_indexs = []
     # m[0] is end2end index m[1] is master index
-    matched_bbox_indexs = [m[idx] for m in match_list]
-    for n in range(all_end2end_nums):
-        if n not in matched_bbox_indexs:
-            no_match_indexs.append(n)
+    matched_bbox_indexs = set(m[idx] for m in match_list)
+    no_match_indexs = [
+        n for n in range(all_end2end_nums) if n not in matched_bbox_indexs
+    ]
     return no_match_indexs
 
 
@@ -203,15 +265,10 @@ def sort_line_bbox(g, bg):
     :return:
     """
 
-    xs = [bg_item[0] for bg_item in bg]
-    xs_sorted = sorted(xs)
-
-    g_sorted = [None] * len(xs_sorted)
-    bg_sorted = [None] * len(xs_sorted)
-    for g_item, bg_item in zip(g, bg):
-        idx = xs_sorted.index(bg_item[0])
-        bg_sorted[idx] = bg_item
-        g_sorted[idx] = g_item
+    # stable sort, bboxes with the same 'x' keep their input order
+    order = sorted(range(len(bg)), key=lambda k: bg[k][0])
+    g_sorted = [g[k] for k in order]
+    bg_sorted = [bg[k] for k in order]
 
     return g_sorted, bg_sorted
 
@@ -235,24 +292,33 @@ def sort_bbox(end2end_xywh_bboxes, no_match_end2end_indexes):
     """
     groups = []
     bbox_groups = []
+    # the 'y' of every row's first bbox, kept sorted together with the row index.
+    # A bbox joins the earliest created row whose first bbox is close in 'y',
+    # so any two row anchors are at least threshold apart, and only the two
+    # anchors around 'y' need to be checked.
+    anchor_ys = []
+    anchor_rows = []
     for index, end2end_xywh_bbox in zip(no_match_end2end_indexes, end2end_xywh_bboxes):
         this_bbox = end2end_xywh_bbox
-        if len(groups) == 0:
+        pos = bisect.bisect_left(anchor_ys, this_bbox[1])
+        row = None
+        for k in (pos - 1, pos):
+            if 0 <= k < len(anchor_ys):
+                # this_bbox is belong to the row or not
+                if is_abs_lower_than_threshold(
+                    this_bbox, bbox_groups[anchor_rows[k]][0]
+                ):
+                    if row is None or anchor_rows[k] < row:
+                        row = anchor_rows[k]
+        if row is not None:
+            groups[row].append(index)
+            bbox_groups[row].append(this_bbox)
+        else:
+            # this_bbox is not belong to any row, create a row.
+            anchor_ys.insert(pos, this_bbox[1])
+            anchor_rows.insert(pos, len(groups))
             groups.append([index])
             bbox_groups.append([this_bbox])
-        else:
-            flag = False
-            for g, bg in zip(groups, bbox_groups):
-                # this_bbox is belong to bg's row or not
-                if is_abs_lower_than_threshold(this_bbox, bg[0]):
-                    g.append(index)
-                    bg.append(this_bbox)
-                    flag = True
-                    break
-            if not flag:
-                # this_bbox is not belong to bg's row, create a row.
-                groups.append([index])
-                bbox_groups.append([this_bbox])
 
     # sorted bboxes in a group
     tmp_groups, tmp_bbox_groups = [], []
@@ -261,15 +327,9 @@ def sort_bbox(end2end_xywh_bboxes, no_match_end2end_indexes):
         tmp_groups.append(g_sorted)
         tmp_bbox_groups.append(bg_sorted)
 
-    # sorted groups, sort by coord y's value.
-    sorted_groups = [None] * len(tmp_groups)
-    sorted_bbox_groups = [None] * len(tmp_bbox_groups)
-    ys = [bg[0][1] for bg in tmp_bbox_groups]
-    sorted_ys = sorted(ys)
-    for g, bg in zip(tmp_groups, tmp_bbox_groups):
-        idx = sorted_ys.index(bg[0][1])
-        sorted_groups[idx] = g
-        sorted_bbox_groups[idx] = bg
+    # sorted groups, sort by coord y's value, which is the order of anchor_ys.
+    sorted_groups = [tmp_groups[row] for row in anchor_rows]
+    sorted_bbox_groups = [tmp_bbox_groups[row] for row in anchor_rows]
 
     # flatten, get final result
     end2end_sorted_idx_list, end2end_sorted_bbox_list = flatten(
@@ -326,20 +386,18 @@ def center_rule_match(end2end_xywh_bboxes, structure_master_xyxy_bboxes):
     :param structure_master_xyxy_bboxes:
     :return: match pairs list, e.g. [[0,1], [1,2], ...]
     """
-    match_pairs_list = []
-    for i, end2end_xywh in enumerate(end2end_xywh_bboxes):
-        for j, master_xyxy in enumerate(structure_master_xyxy_bboxes):
-            x_end2end, y_end2end = end2end_xywh[0], end2end_xywh[1]
-            x_master1, y_master1, x_master2, y_master2 = (
-                master_xyxy[0],
-                master_xyxy[1],
-                master_xyxy[2],
-                master_xyxy[3],
-            )
-            center_point_end2end = (x_end2end, y_end2end)
-            corner_point_master = ((x_master1, y_master1), (x_master2, y_master2))
-            if is_inside(center_point_end2end, corner_point_master):
-                match_pairs_list.append([i, j])
+    end2end_xywh_bboxes = _as_bbox_array(end2end_xywh_bboxes)
+    structure_master_xyxy_bboxes = _as_bbox_array(structure_master_xyxy_bboxes)
+    x_end2end = end2end_xywh_bboxes[:, 0:1]
+    y_end2end = end2end_xywh_bboxes[:, 1:2]
+    # same as is_inside, inside matrix of shape (end2end nums, master nums)
+    inside = (
+        (x_end2end >= structure_master_xyxy_bboxes[:, 0])
+        & (x_end2end <= structure_master_xyxy_bboxes[:, 2])
+        & (y_end2end >= structure_master_xyxy_bboxes[:, 1])
+        & (y_end2end <= structure_master_xyxy_bboxes[:, 3])
+    )
+    match_pairs_list = np.argwhere(inside).tolist()
     return match_pairs_list
 
 
@@ -355,23 +413,17 @@ def iou_rule_match(
     :return: match pairs list, e.g. [[0,1], [1,2], ...]
     """
     match_pair_list = []
-    for end2end_xyxy_index, end2end_xyxy in zip(
-        end2end_xyxy_indexes, end2end_xyxy_bboxes
+    if len(end2end_xyxy_indexes) == 0 or len(structure_master_xyxy_bboxes) == 0:
+        return match_pair_list
+    iou = cal_iou_matrix(end2end_xyxy_bboxes, structure_master_xyxy_bboxes)
+    # argmax returns the first max, the same as updating on strict greater iou.
+    max_indexes = iou.argmax(axis=1)
+    max_ious = iou[np.arange(len(iou)), max_indexes]
+    for end2end_xyxy_index, j, max_iou in zip(
+        end2end_xyxy_indexes, max_indexes.tolist(), max_ious
     ):
-        max_iou = 0
-        max_match = [None, None]
-        for j, master_xyxy in enumerate(structure_master_xyxy_bboxes):
-            end2end_4xy = convert_coord(end2end_xyxy)
-            master_4xy = convert_coord(master_xyxy)
-            iou = cal_iou(end2end_4xy, master_4xy)
-            if iou > max_iou:
-                max_match[0], max_match[1] = end2end_xyxy_index, j
-                max_iou = iou
-
-        if max_match[0] is None:
-            # no match
-            continue
-        match_pair_list.append(max_match)
+        if max_iou > 0:
+            match_pair_list.append([end2end_xyxy_index, j])
     return match_pair_list
 
 
@@ -388,19 +440,20 @@ def distance_rule_match(end2end_indexes, end2end_bboxes, master_indexes, master_
     :return: match_pairs list, e.g. [[0,1], [1,2], ...]
     """
     min_match_list = []
-    for j, master_bbox in zip(master_indexes, master_bboxes):
-        min_distance = np.inf
-        min_match = [0, 0]  # i, j
-        for i, end2end_bbox in zip(end2end_indexes, end2end_bboxes):
-            x_end2end, y_end2end = end2end_bbox[0], end2end_bbox[1]
-            x_master, y_master = master_bbox[0], master_bbox[1]
-            end2end_point = (x_end2end, y_end2end)
-            master_point = (x_master, y_master)
-            dist = cal_distance(master_point, end2end_point)
-            if dist < min_distance:
-                min_match[0], min_match[1] = i, j
-                min_distance = dist
-        min_match_list.append(min_match)
+    if len(master_indexes) == 0:
+        return min_match_list
+    if len(end2end_indexes) == 0:
+        return [[0, 0] for _ in master_indexes]
+    end2end_bboxes = _as_bbox_array(end2end_bboxes)
+    master_bboxes = _as_bbox_array(master_bboxes)
+    # distance matrix of shape (master nums, end2end nums), same as cal_distance
+    delta_x = master_bboxes[:, 0:1] - end2end_bboxes[:, 0]
+    delta_y = master_bboxes[:, 1:2] - end2end_bboxes[:, 1]
+    dist = np.sqrt((delta_x**2 + delta_y**2).astype(np.float64))
+    # argmin returns the first min, the same as updating on strict less distance.
+    min_indexes = dist.argmin(axis=1).tolist()
+    for j, i in zip(master_indexes, min_indexes):
+        min_match_list.append([end2end_indexes[i], j])
     return min_match_list
 
 
@@ -868,11 +921,11 @@ class Matcher:
                 extra_match_list = extra_match(
                     end2end_sorted_indexes_list, len(structure_master_xywh_bboxes)
                 )
-                match_list_add_extra_match = copy.deepcopy(match_list)
+                match_list_add_extra_match = [list(m) for m in match_list]
                 match_list_add_extra_match.extend(extra_match_list)
             else:
                 # no no-match end2end bboxes
-                match_list_add_extra_match = copy.deepcopy(match_list)
+                match_list_add_extra_match = [list(m) for m in match_list]
                 sorted_groups = []
                 sorted_bboxes_groups = []
 
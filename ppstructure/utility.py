@@ -30,6 +30,18 @@ def init_args():
 
     # params for output
     parser.add_argument("--output", type=str, default="./output")
+    parser.add_argument(
+        "--output_num_workers",
+        type=int,
+        default=2,
+        help="Number of threads to save table excels and figure crops",
+    )
+    parser.add_argument(
+        "--save_res_msgpack",
+        type=str2bool,
+        default=False,
+        help="Whether to also save the structure results in msgpack with region offsets",
+    )
     # params for table structure
     parser.add_argument("--table_max_len", type=int, default=488)
     parser.add_argument("--table_algorithm", type=str, default="TableAttn")
@@ -62,6 +74,25 @@ def init_args():
     parser.add_argument(
         "--layout_nms_threshold", type=float, default=0.5, help="Threshold of nms."
     )
+    parser.add_argument(
+        "--layout_batch_num",
+        type=int,
+        default=1,
+        help="Number of pages in one layout batch, the model must be exported "
+        "with a dynamic batch size for more than 1",
+    )
+    parser.add_argument(
+        "--text_region_best_overlap",
+        type=str2bool,
+        default=False,
+        help="Whether to assign each ocr line only to its best-overlap layout region",
+    )
+    parser.add_argument(
+        "--use_doc_pipeline",
+        type=str2bool,
+        default=True,
+        help="Whether to analyse the pages of a pdf in a pipeline of layout, ocr and formula stages",
+    )
     # params for kie
     parser.add_argument("--kie_algorithm", type=str, default="LayoutXLM")
     parser.add_argument("--ser_model_dir", type=str)
@@ -72,6 +103,19 @@ def init_args():
     )
     # need to be None or tb-yx
     parser.add_argument("--ocr_order_method", type=str, default=None)
+    parser.add_argument(
+        "--kie_batch_num",
+        type=int,
+        default=1,
+        help="Number of documents whose token chunks run in one SER batch",
+    )
+    parser.add_argument(
+        "--kie_use_ocr",
+        type=str2bool,
+        default=True,
+        help="Whether the KIE predictors create their own OCR, the OCR results "
+        "must be given as ocr_info otherwise",
+    )
     # params for inference
     parser.add_argument(
         "--mode",
@@ -296,3 +340,98 @@ def cal_ocr_word_box(rec_str, box, rec_word_info):
             word_box_list.append(cell)
 
     return word_box_content_list, word_box_list
+
+
+def assign_text_to_regions(text_res, region_bboxes, best_overlap=False):
+    """Assign each ocr line to the layout regions it intersects with, in one pass over the lines.
+
+    The regions are bucketed into a uniform grid over the page, so every line only checks
+    the regions registered in the grid cells it covers. With best_overlap, each line is
+    only assigned to the region with the largest overlap, to avoid duplicated text in
+    overlapping regions.
+
+    Args:
+        text_res: list of ocr results, each with the "text_region" quad.
+        region_bboxes: list of [x1, y1, x2, y2] layout regions.
+        best_overlap: assign each line to its single best-overlap region.
+
+    Returns:
+        A list with the ocr results of every region, in the order of text_res.
+    """
+    region_text_res = [[] for _ in region_bboxes]
+    if len(region_bboxes) == 0 or len(text_res) == 0:
+        return region_text_res
+
+    regions = np.array(region_bboxes, dtype=np.float64).reshape(-1, 4)
+    # the same rect as before: the top-left and bottom-right points of the quad
+    rects = np.array(
+        [
+            [r["text_region"][0][0], r["text_region"][0][1]]
+            + [r["text_region"][2][0], r["text_region"][2][1]]
+            for r in text_res
+        ],
+        dtype=np.float64,
+    )
+
+    # bucket the regions by their extent into a grid of about one region per cell
+    x_min = regions[:, [0, 2]].min(axis=1)
+    y_min = regions[:, [1, 3]].min(axis=1)
+    x_max = regions[:, [0, 2]].max(axis=1)
+    y_max = regions[:, [1, 3]].max(axis=1)
+    grid_num = max(int(math.sqrt(len(regions))), 1)
+    origin_x, origin_y = x_min.min(), y_min.min()
+    cell_w = max((x_max.max() - origin_x) / grid_num, 1.0)
+    cell_h = max((y_max.max() - origin_y) / grid_num, 1.0)
+
+    def _cell_range(lo, hi, origin, size):
+        start = np.clip(np.floor((lo - origin) / size), 0, grid_num - 1).astype(int)
+        end = np.clip(np.floor((hi - origin) / size), 0, grid_num - 1).astype(int)
+        return start, end
+
+    col_start, col_end = _cell_range(x_min, x_max, origin_x, cell_w)
+    row_start, row_end = _cell_range(y_min, y_max, origin_y, cell_h)
+    grid = [[] for _ in range(grid_num * grid_num)]
+    for idx in range(len(regions)):
+        for row in range(row_start[idx], row_end[idx] + 1):
+            for col in range(col_start[idx], col_end[idx] + 1):
+                grid[row * grid_num + col].append(idx)
+
+    rect_x_min = np.minimum(rects[:, 0], rects[:, 2])
+    rect_y_min = np.minimum(rects[:, 1], rects[:, 3])
+    rect_x_max = np.maximum(rects[:, 0], rects[:, 2])
+    rect_y_max = np.maximum(rects[:, 1], rects[:, 3])
+    line_col_start, line_col_end = _cell_range(rect_x_min, rect_x_max, origin_x, cell_w)
+    line_row_start, line_row_end = _cell_range(rect_y_min, rect_y_max, origin_y, cell_h)
+
+    for line_idx, r in enumerate(text_res):
+        candidates = set()
+        for row in range(line_row_start[line_idx], line_row_end[line_idx] + 1):
+            for col in range(line_col_start[line_idx], line_col_end[line_idx] + 1):
+                candidates.update(grid[row * grid_num + col])
+        if len(candidates) == 0:
+            continue
+        candidates = np.array(sorted(candidates))
+        region = regions[candidates]
+        rect = rects[line_idx]
+        hit = ~(
+            (region[:, 0] > rect[2])
+            | (region[:, 2] < rect[0])
+            | (region[:, 1] > rect[3])
+            | (region[:, 3] < rect[1])
+        )
+        hit_indexes = candidates[hit]
+        if len(hit_indexes) == 0:
+            continue
+        if best_overlap and len(hit_indexes) > 1:
+            region = region[hit]
+            overlap_w = np.minimum(region[:, 2], rect_x_max[line_idx]) - np.maximum(
+                region[:, 0], rect_x_min[line_idx]
+            )
+            overlap_h = np.minimum(region[:, 3], rect_y_max[line_idx]) - np.maximum(
+                region[:, 1], rect_y_min[line_idx]
+            )
+            overlap = np.clip(overlap_w, 0, None) * np.clip(overlap_h, 0, None)
+            hit_indexes = hit_indexes[[int(np.argmax(overlap))]]
+        for region_idx in hit_indexes:
+            region_text_res[region_idx].append(r)
+    return region_text_res
@@ -0,0 +1,101 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppstructure.utility import assign_text_to_regions
+
+
+def has_intersection(rect1, rect2):
+    # StructureSystem._has_intersection
+    x_min1, y_min1, x_max1, y_max1 = rect1
+    x_min2, y_min2, x_max2, y_max2 = rect2
+    if x_min1 > x_max2 or x_max1 < x_min2:
+        return False
+    if y_min1 > y_max2 or y_max1 < y_min2:
+        return False
+    return True
+
+
+def line_rect(r):
+    box = r["text_region"]
+    return box[0][0], box[0][1], box[2][0], box[2][1]
+
+
+def reference_assign(text_res, region_bboxes):
+    # the scan of all the lines for every region before
+    return [
+        [r for r in text_res if has_intersection(bbox, line_rect(r))]
+        for bbox in region_bboxes
+    ]
+
+
+def reference_best_overlap(text_res, region_bboxes):
+    region_text_res = [[] for _ in region_bboxes]
+    for r in text_res:
+        x1, y1, x2, y2 = line_rect(r)
+        hits = [
+            idx
+            for idx, bbox in enumerate(region_bboxes)
+            if has_intersection(bbox, (x1, y1, x2, y2))
+        ]
+        if len(hits) == 0:
+            continue
+        overlaps = [
+            max(min(region_bboxes[idx][2], x2) - max(region_bboxes[idx][0], x1), 0)
+            * max(min(region_bboxes[idx][3], y2) - max(region_bboxes[idx][1], y1), 0)
+            for idx in hits
+        ]
+        region_text_res[hits[int(np.argmax(overlaps))]].append(r)
+    return region_text_res
+
+
+def random_page(rng, num_regions, num_lines):
+    # integer boxes on a coarse grid, so that many edges lie on the cell
+    # borders of the index and touch each other
+    regions = []
+    for _ in range(num_regions):
+        x1, y1 = rng.integers(0, 20, 2) * 50
+        w, h = rng.integers(1, 6, 2) * 50
+        regions.append([int(x1), int(y1), int(x1 + w), int(y1 + h)])
+    text_res = []
+    for idx in range(num_lines):
+        # a part of the lines far away from all the regions
+        offset = 5000 if idx % 7 == 0 else 0
+        x1, y1 = rng.integers(0, 22, 2) * 50 + offset
+        w, h = rng.integers(1, 4) * 25, 25
+        box = [[x1, y1], [x1 + w, y1], [x1 + w, y1 + h], [x1, y1 + h]]
+        text_res.append({"text": str(idx), "text_region": np.array(box).tolist()})
+    return text_res, regions
+
+
+@pytest.mark.parametrize("num_regions", [1, 5, 40])
+def test_assign_text_to_regions_same_as_scan(num_regions):
+    rng = np.random.default_rng(num_regions)
+    text_res, regions = random_page(rng, num_regions, 200)
+    result = assign_text_to_regions(text_res, regions)
+    expected = reference_assign(text_res, regions)
+    assert result == expected
+    assigned = {r["text"] for lines in result for r in lines}
+    assert len(assigned) < len(text_res)
+    assert assign_text_to_regions([], regions) == [[] for _ in regions]
+    assert assign_text_to_regions(text_res, []) == []
+
+
+def test_assign_text_to_regions_best_overlap():
+    rng = np.random.default_rng(0)
+    text_res, regions = random_page(rng, 40, 200)
+    result = assign_text_to_regions(text_res, regions, best_overlap=True)
+    assert result == reference_best_overlap(text_res, regions)
+    # every line is in at most one region
+    texts = [r["text"] for lines in result for r in lines]
+    assert len(texts) == len(set(texts))
+    # a line on two regions goes to the one it overlaps most
+    line = {"text": "a", "text_region": [[90, 0], [150, 0], [150, 10], [90, 10]]}
+    regions = [[0, 0, 100, 100], [100, 0, 200, 100]]
+    assert assign_text_to_regions([line], regions) == [[line], [line]]
+    assert assign_text_to_regions([line], regions, best_overlap=True) == [[], [line]]
@@ -0,0 +1,75 @@
+import os
+import sys
+import logging
+import pickle
+
+import numpy as np
+import paddle
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.utils.save_load import save_model
+from tools.program import async_eval_supported, update_best_model
+
+
+def test_update_best_model(tmp_path):
+    logger = logging.getLogger()
+    config = {"Architecture": {"model_type": "rec", "algorithm": "CRNN"}}
+    model = paddle.nn.Linear(4, 2)
+    optimizer = paddle.optimizer.Adam(parameters=model.parameters())
+    best_model_dict = {"acc": 0.5}
+    params = []
+    for step in [10, 20]:
+        params.append(model.weight.numpy())
+        save_model(
+            model,
+            optimizer,
+            str(tmp_path),
+            logger,
+            config,
+            prefix="async_eval_{}".format(step),
+            best_model_dict=best_model_dict,
+            epoch=1,
+            global_step=step,
+        )
+        model.weight.set_value(model.weight.numpy() + 1)
+
+    update_best_model(
+        best_model_dict,
+        ("async_eval_10", 1, 10, {"acc": 0.6}),
+        "acc",
+        str(tmp_path),
+        logger,
+    )
+    update_best_model(
+        best_model_dict,
+        ("async_eval_20", 1, 20, {"acc": 0.55}),
+        "acc",
+        str(tmp_path),
+        logger,
+    )
+    assert best_model_dict == {"acc": 0.6, "best_epoch": 1}
+    assert not [name for name in os.listdir(tmp_path) if "async_eval" in name]
+    for path in ["best_accuracy.pdparams", "best_model/model.pdparams"]:
+        state_dict = paddle.load(str(tmp_path / path))
+        np.testing.assert_array_equal(state_dict["weight"].numpy(), params[0])
+    with open(tmp_path / "best_accuracy.states", "rb") as f:
+        states = pickle.load(f)
+    assert states["global_step"] == 10
+    assert states["best_model_dict"] == best_model_dict
+
+
+def test_async_eval_supported():
+    def make_config(algorithm, model_type="rec", uniform_output_enabled=False):
+        return {
+            "Global": {"uniform_output_enabled": uniform_output_enabled},
+            "Architecture": {"model_type": model_type, "algorithm": algorithm},
+        }
+
+    assert async_eval_supported(make_config("CRNN"))
+    assert async_eval_supported(make_config("SDMGR", "kie"))
+    # SRN evaluates with the averaged weights, which are not saved
+    assert not async_eval_supported(make_config("SRN"))
+    assert not async_eval_supported(make_config("LayoutXLM", "kie"))
+    assert not async_eval_supported(make_config("CRNN", uniform_output_enabled=True))
@@ -0,0 +1,77 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.data.collate_fn import BatchRecAugCollator
+from ppocr.data.imaug.rec_img_aug import resize_norm_img
+from ppocr.data.imaug.text_image_aug.warp_mls import (
+    WarpMLS,
+    mls_points,
+    warp_mls_batch,
+)
+
+
+@pytest.fixture
+def control_pts():
+    rng = np.random.default_rng(0)
+    src_pts = rng.random((4, 8, 2)) * [320, 48]
+    dst_pts = src_pts + rng.normal(0, 5, src_pts.shape)
+    return src_pts, dst_pts
+
+
+def test_mls_points(control_pts):
+    src_pts, dst_pts = control_pts
+    # the control points but the last are moved to src_pts
+    np.testing.assert_allclose(
+        mls_points(dst_pts[:, :-1], src_pts, dst_pts), src_pts[:, :-1]
+    )
+    points = np.random.default_rng(1).random((4, 10, 2)) * [320, 48]
+    expected = [mls_points(p, s, d) for p, s, d in zip(points, src_pts, dst_pts)]
+    np.testing.assert_allclose(mls_points(points, src_pts, dst_pts), expected)
+
+
+def test_warp_mls_batch_same_as_warp_mls(control_pts):
+    src_pts, dst_pts = control_pts
+    rng = np.random.default_rng(2)
+    imgs = rng.integers(0, 256, (4, 48, 320, 3)).astype(np.uint8)
+    widths = np.array([320, 250, 101, 60])
+
+    warped = warp_mls_batch(imgs, src_pts, dst_pts, widths)
+    assert warped.shape == imgs.shape and warped.dtype == np.float32
+    for img, out, width, src, dst in zip(imgs, warped, widths, src_pts, dst_pts):
+        expected = WarpMLS(img[:, :width], src, dst, width, 48).generate()
+        # remap interpolates with the weights in 1/32
+        diff = np.abs(np.clip(out[:, :width], 0, 255) - expected)
+        assert diff.mean() < 1 and diff.max() <= 8
+        np.testing.assert_array_equal(out[:, width:], img[:, width:])
+
+
+def test_batch_rec_aug_collator():
+    rng = np.random.default_rng(3)
+    batch = []
+    for idx in range(8):
+        img = rng.integers(0, 256, (48, 40 + 40 * idx, 3)).astype(np.uint8)
+        norm_img, valid_ratio = resize_norm_img(img, [3, 48, 320])
+        batch.append([norm_img, np.array([idx]), valid_ratio])
+
+    imgs = np.stack([sample[0] for sample in batch])
+    widths = [round(sample[2] * 320) for sample in batch]
+    probs = ["tia_prob", "crop_prob", "reverse_prob", "noise_prob"]
+    probs += ["jitter_prob", "blur_prob", "hsv_aug_prob"]
+
+    collator = BatchRecAugCollator(valid_ratio_idx=2, **{p: 1.0 for p in probs})
+    out_imgs, labels, valid_ratios = collator(batch)
+    assert out_imgs.shape == imgs.shape and out_imgs.dtype == np.float32
+    assert labels.shape == (8, 1)
+    assert np.all(np.abs(out_imgs) <= 1)
+    for img, out, width in zip(imgs, out_imgs, widths):
+        assert not np.allclose(out[..., :width], img[..., :width])
+        np.testing.assert_array_equal(out[..., width:], img[..., width:])
+
+    collator = BatchRecAugCollator(valid_ratio_idx=2, **{p: 0.0 for p in probs})
+    np.testing.assert_allclose(collator(batch)[0], imgs, atol=1e-6)
@@ -0,0 +1,90 @@
+import os
+import sys
+import logging
+
+import cv2
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.data.simple_dataset import SimpleDataSet
+from ppocr.data.bucket_sampler import RatioBucketSampler, load_image_sizes
+
+
+@pytest.fixture
+def label_file(tmp_path):
+    rng = np.random.RandomState(0)
+    lines = []
+    for i in range(150):
+        w, h = rng.randint(16, 400), rng.randint(16, 64)
+        cv2.imwrite(str(tmp_path / "{}.png".format(i)), np.zeros((h, w), np.uint8))
+        lines.append("{}.png\tl\n".format(i))
+    lines.append("missing.png\tl\n")
+    label_file = tmp_path / "label.txt"
+    label_file.write_text("".join(lines))
+    return str(label_file)
+
+
+def make_sampler(label_file, nranks=1, rank=0, **kwargs):
+    config = {
+        "Global": {},
+        "Train": {
+            "dataset": {
+                "data_dir": os.path.dirname(label_file),
+                "label_file_list": [label_file],
+                "transforms": [],
+            },
+            "loader": {"shuffle": True},
+        },
+    }
+    dataset = SimpleDataSet(config, "Train", logging.getLogger(), 1)
+    sampler = RatioBucketSampler(dataset, batch_size=8, **kwargs)
+    sampler.nranks, sampler.local_rank = nranks, rank
+    sampler.length = -(-sampler.num_batches // nranks)
+    return sampler
+
+
+def test_image_sizes_cached(label_file, tmp_path):
+    wh = load_image_sizes(label_file, str(tmp_path))
+    assert wh.shape == (151, 2)
+    assert tuple(wh[0]) == cv2.imread(str(tmp_path / "0.png")).shape[1::-1]
+    assert tuple(wh[-1]) == (0, 0)
+    assert os.path.exists(label_file + ".wh.npz")
+    os.remove(str(tmp_path / "0.png"))
+    np.testing.assert_array_equal(load_image_sizes(label_file, str(tmp_path)), wh)
+
+
+def test_batches_under_pixel_budget(label_file):
+    sampler = make_sampler(label_file, max_width=320)
+    batches = list(sampler)
+    assert len(batches) == len(sampler)
+    idxs = sorted(idx for batch in batches for _, _, idx, _ in batch)
+    assert idxs == list(range(151))
+    for batch in batches:
+        widths = {width for width, _, _, _ in batch}
+        assert len(widths) == 1
+        width = widths.pop()
+        assert width % 8 == 0 and width <= 320
+        assert len(batch) * width <= 8 * 320
+        assert (sampler.widths[[idx for _, _, idx, _ in batch]] <= width).all()
+    assert sampler.padding_efficiency() > 0.8
+
+
+def test_epochs_deterministic(label_file):
+    first, second = make_sampler(label_file), make_sampler(label_file)
+    epoch0, epoch1 = list(first), list(first)
+    assert epoch0 != epoch1
+    assert list(second) == epoch0
+    second.set_epoch(1)
+    assert list(second) == epoch1
+
+
+def test_distributed_batches_split(label_file):
+    expected = list(make_sampler(label_file))
+    samplers = [make_sampler(label_file, 3, rank) for rank in range(3)]
+    batches = [list(sampler) for sampler in samplers]
+    assert all(len(rank_batches) == len(samplers[0]) for rank_batches in batches)
+    merged = [batch for step in zip(*batches) for batch in step]
+    assert merged[: len(expected)] == expected
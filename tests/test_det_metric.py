@@ -0,0 +1,137 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from shapely.geometry import Polygon
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.metrics.det_metric import DetMetric
+from ppocr.metrics.eval_det_iou import DetectionIoUEvaluator
+from ppocr.utils.nms import convex_intersection_area
+
+
+def reference_evaluate_image(gt, pred, iou_constraint=0.5, precision_constraint=0.5):
+    """The pairwise shapely evaluation of DetectionIoUEvaluator before"""
+    gt_pols = [g["points"] for g in gt if Polygon(g["points"]).is_valid]
+    gt_dont_care = [
+        i
+        for i, g in enumerate([g for g in gt if Polygon(g["points"]).is_valid])
+        if g["ignore"]
+    ]
+    det_pols, det_dont_care = [], []
+    for p in pred:
+        if not Polygon(p["points"]).is_valid:
+            continue
+        det_pols.append(p["points"])
+        for i in gt_dont_care:
+            inter = Polygon(gt_pols[i]).intersection(Polygon(p["points"])).area
+            area = Polygon(p["points"]).area
+            if (0 if area == 0 else inter / area) > precision_constraint:
+                det_dont_care.append(len(det_pols) - 1)
+                break
+    gt_matched, det_matched = set(), set()
+    for g, pG in enumerate(gt_pols):
+        for d, pD in enumerate(det_pols):
+            if g in gt_matched or d in det_matched:
+                continue
+            if g in gt_dont_care or d in det_dont_care:
+                continue
+            inter = Polygon(pD).intersection(Polygon(pG)).area
+            if inter / Polygon(pD).union(Polygon(pG)).area > iou_constraint:
+                gt_matched.add(g)
+                det_matched.add(d)
+    return {
+        "gtCare": len(gt_pols) - len(gt_dont_care),
+        "detCare": len(det_pols) - len(det_dont_care),
+        "detMatched": len(det_matched),
+    }
+
+
+def random_image(rng):
+    def polygons(num):
+        integer = rng.random() < 0.5
+        kind = rng.integers(3)
+        result = []
+        for _ in range(num):
+            center = rng.random(2) * 20
+            if kind == 0:
+                # rotated rectangles
+                w, h = rng.random(2) * 5 + 0.5
+                angle = rng.random() * np.pi
+                rot = np.array(
+                    [[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]]
+                )
+                points = np.array([[-w, -h], [w, -h], [w, h], [-w, h]]) / 2 @ rot.T
+            elif kind == 1:
+                # any quads, concave or invalid
+                points = rng.random((4, 2)) * 6 - 3
+            else:
+                angles = np.sort(rng.random(rng.integers(5, 10))) * 2 * np.pi
+                points = np.stack([np.cos(angles), np.sin(angles)], axis=1) * 3
+            points = points + center
+            if integer:
+                points = np.round(points)
+            result.append(points[::-1] if rng.random() < 0.5 else points)
+        return result
+
+    gt_points = polygons(rng.integers(12))
+    det_points = polygons(rng.integers(12))
+    # the same polygons give the ties of the constraints
+    det_points += [p for p in gt_points if rng.random() < 0.3]
+    gt = [{"points": p, "text": "", "ignore": rng.random() < 0.2} for p in gt_points]
+    pred = [{"points": p, "text": ""} for p in det_points]
+    return gt, pred
+
+
+def test_count_matches_same_as_reference():
+    rng = np.random.default_rng(0)
+    evaluator = DetectionIoUEvaluator()
+    for _ in range(300):
+        gt, pred = random_image(rng)
+        expected = reference_evaluate_image(gt, pred)
+        assert evaluator.count_matches(gt, pred) == expected
+        result = evaluator.evaluate_image(gt, pred)
+        assert {key: result[key] for key in expected} == expected
+        assert len(result["pairs"]) == result["detMatched"]
+
+
+def test_convex_intersection_area():
+    rng = np.random.default_rng(0)
+    quads = []
+    for _ in range(2):
+        center = rng.random((200, 1, 2)) * 10
+        size = rng.random((200, 1, 2)) * 5 + 0.5
+        angle = rng.random((200, 1)) * np.pi
+        unit = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]]) / 2 * size
+        x = unit[..., 0] * np.cos(angle) - unit[..., 1] * np.sin(angle)
+        y = unit[..., 0] * np.sin(angle) + unit[..., 1] * np.cos(angle)
+        quads.append(np.stack([x, y], axis=-1) + center)
+    quads[1][::2] = quads[1][::2, ::-1]
+    expected = [
+        Polygon(a).intersection(Polygon(b)).area for a, b in zip(quads[0], quads[1])
+    ]
+    np.testing.assert_allclose(
+        convex_intersection_area(quads[0], quads[1]), expected, atol=1e-9
+    )
+
+
+@pytest.mark.parametrize("num_workers", [0, 2])
+def test_det_metric(num_workers):
+    rng = np.random.default_rng(1)
+    images = [random_image(rng) for _ in range(12)]
+    metric = DetMetric(num_workers=num_workers)
+    for i in range(0, len(images), 4):
+        gts = [[g["points"] for g in gt] for gt, _ in images[i : i + 4]]
+        ignores = [[g["ignore"] for g in gt] for gt, _ in images[i : i + 4]]
+        preds = [
+            {"points": [p["points"] for p in pred]} for _, pred in images[i : i + 4]
+        ]
+        metric(preds, [None, None, gts, ignores])
+    expected = DetectionIoUEvaluator().combine_results(
+        [reference_evaluate_image(gt, pred) for gt, pred in images]
+    )
+    assert metric.get_metric() == expected
+    assert metric.evaluator.pool is None
@@ -0,0 +1,149 @@
+import os
+import re
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppstructure.document_pipeline import DocumentPipeline
+from ppstructure.recovery.recovery_to_markdown import (
+    MarkdownRecoveryWriter,
+    region_to_markdown,
+)
+
+
+class FakeLayoutPredictor(object):
+    def __init__(self, rng):
+        self.rng = rng
+
+    def predict_batch(self, imgs):
+        time.sleep(self.rng.random() * 0.01)
+        return [[{"page": int(img[0, 0])}] for img in imgs], 0.0
+
+
+class FakeStructureSystem(object):
+    """The stages of a StructureSystem, with random delays"""
+
+    def __init__(self, seed=0, fail_page=None):
+        self.rng = np.random.default_rng(seed)
+        self.mode = "structure"
+        self.image_orientation_predictor = None
+        self.layout_predictor = FakeLayoutPredictor(self.rng)
+        self.fail_page = fail_page
+        self.region_pages = []
+        self.lock = threading.Lock()
+
+    def _init_time_dict(self):
+        return {"layout": 0, "formula": 0, "all": 0}
+
+    def _predict_regions(self, img, layout_res, return_ocr, img_idx, time_dict):
+        time.sleep(self.rng.random() * 0.01)
+        with self.lock:
+            self.region_pages.append(img_idx)
+        if img_idx == self.fail_page:
+            raise ValueError("bad page {}".format(img_idx))
+        return [dict(layout_res[0], img_idx=img_idx)]
+
+    def _predict_formula(self, res_lists, time_dict):
+        time.sleep(self.rng.random() * 0.01)
+        for res in res_lists:
+            res[0]["formula"] = True
+
+
+def pages(num, consumed=None):
+    for idx in range(num):
+        if consumed is not None:
+            consumed.append(idx)
+        yield np.full((4, 4), idx, dtype=np.int64)
+
+
+@pytest.mark.parametrize("page_batch_num", [1, 3])
+def test_document_pipeline_page_order(page_batch_num):
+    system = FakeStructureSystem()
+    pipeline = DocumentPipeline(system, page_batch_num=page_batch_num, queue_size=2)
+    results = list(pipeline(pages(20)))
+    assert [idx for idx, _, _, _ in results] == list(range(20))
+    for idx, img, res, time_dict in results:
+        assert img[0, 0] == idx
+        assert res == [{"page": idx, "img_idx": idx, "formula": True}]
+        assert "all" in time_dict
+
+
+def test_document_pipeline_stage_error_raises():
+    system = FakeStructureSystem(fail_page=3)
+    pipeline = DocumentPipeline(system, page_batch_num=2, queue_size=2)
+    yielded = []
+    with pytest.raises(ValueError, match="bad page 3"):
+        for idx, _, _, _ in pipeline(pages(10)):
+            yielded.append(idx)
+    assert yielded == [0, 1, 2]
+
+
+def test_document_pipeline_stops_on_first_error():
+    system = FakeStructureSystem(fail_page=0)
+    pipeline = DocumentPipeline(system, page_batch_num=2, queue_size=2)
+    consumed = []
+    with pytest.raises(ValueError):
+        list(pipeline(pages(1000, consumed)))
+    # the pages after the error are neither rendered nor analysed
+    assert len(consumed) < 20
+    assert system.region_pages == [0]
+
+
+def reference_markdown(res, img_name):
+    # convert_info_markdown before, all the regions joined at the end
+    sections = [region_to_markdown(region, img_name) for region in res]
+    markdown_string = "\n\n".join(s for s in sections if s is not None)
+    return re.sub(r"\n{3,}", "\n\n", markdown_string)
+
+
+def random_regions(rng, img_idx):
+    regions = []
+    for _ in range(rng.integers(0, 4)):
+        region_type = rng.choice(["text", "title", "header", "figure", "equation"])
+        x1 = int(rng.integers(0, 50))
+        lines = [
+            {
+                "text": "line *{}*".format(i) + "\n" * int(rng.integers(0, 4)),
+                "text_region": [[x1 + 5 * i, 10 * i], [300, 10 * i]]
+                + [[int(rng.integers(100, 400)), 10 * i + 8], [x1, 10 * i + 8]],
+            }
+            for i in range(rng.integers(0, 4))
+        ]
+        region = {
+            "type": region_type,
+            "bbox": [x1, 0, 300, 100],
+            "img_idx": img_idx,
+            "res": lines,
+        }
+        if region_type == "equation" and rng.random() < 0.5:
+            region["res"] = {"latex": "x^2"}
+        regions.append(region)
+    return regions
+
+
+def test_streaming_markdown_same_as_convert_at_end(tmp_path):
+    rng = np.random.default_rng(0)
+    for doc_idx in range(30):
+        doc_pages = [random_regions(rng, idx) for idx in range(rng.integers(1, 6))]
+        img_name = "doc{}".format(doc_idx)
+        with MarkdownRecoveryWriter(str(tmp_path), img_name) as writer:
+            for res in doc_pages:
+                writer.add_regions(res)
+        with open(tmp_path / "{}_ocr.md".format(img_name), "rb") as f:
+            content = f.read()
+        expected = reference_markdown(sum(doc_pages, []), img_name)
+        assert content == expected.encode("utf-8")
+
+
+def test_markdown_writer_abort_removes_partial_file(tmp_path):
+    writer = MarkdownRecoveryWriter(str(tmp_path), "doc")
+    writer.add_regions(random_regions(np.random.default_rng(1), 0))
+    writer.abort()
+    assert writer.file is None
+    assert not (tmp_path / "doc_ocr.md").exists()
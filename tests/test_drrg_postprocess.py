@@ -0,0 +1,172 @@
+import functools
+import operator
+import os
+import sys
+
+import numpy as np
+import pytest
+from numpy.linalg import norm
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.postprocess.drrg_postprocess import (
+    DRRGPostprocess,
+    fix_corner,
+    graph_propagation,
+    min_connect_path,
+)
+
+
+def reference_min_connect_path(points):
+    # the greedy path before, with dicts of the lengths to the two ends
+    def norm2(point1, point2):
+        return ((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2) ** 0.5
+
+    points_queue = points.copy()
+    shortest_path = []
+    current_edge = [points_queue[0], points_queue[0]]
+    points_queue.remove(points_queue[0])
+    while points_queue:
+        edge_dict0, edge_dict1 = {}, {}
+        for point in points_queue:
+            edge_dict0[norm2(point, current_edge[0])] = [point, current_edge[0]]
+            edge_dict1[norm2(current_edge[1], point)] = [current_edge[1], point]
+        key0, key1 = min(edge_dict0.keys()), min(edge_dict1.keys())
+        if key0 <= key1:
+            start, end = edge_dict0[key0]
+            shortest_path.insert(0, [points.index(start), points.index(end)])
+            points_queue.remove(start)
+            current_edge[0] = start
+        else:
+            start, end = edge_dict1[key1]
+            shortest_path.append([points.index(start), points.index(end)])
+            points_queue.remove(end)
+            current_edge[1] = end
+    shortest_path = functools.reduce(operator.concat, shortest_path)
+    return sorted(set(shortest_path), key=shortest_path.index)
+
+
+def reference_labels(edges, scores, text_comps, link_thr, edge_len_thr=50.0):
+    # the graph of dicts and the breadth first search before, the clusters are
+    # numbered by their smallest component here
+    edges = np.sort(edges, axis=1)
+    score_dict = {}
+    for i, edge in enumerate(edges):
+        center1 = np.mean(text_comps[edge[0], :8].reshape(4, 2), axis=0)
+        center2 = np.mean(text_comps[edge[1], :8].reshape(4, 2), axis=0)
+        if norm(center1 - center2) > edge_len_thr:
+            scores[i] = 0
+        key = (edge[0], edge[1])
+        if key in score_dict:
+            score_dict[key] = 0.5 * (score_dict[key] + scores[i])
+        else:
+            score_dict[key] = scores[i]
+    links = {}
+    for a, b in edges:
+        links.setdefault(a, set()).add(b)
+        links.setdefault(b, set()).add(a)
+    labels = np.zeros(len(text_comps))
+    remaining = set(links)
+    for node in sorted(links):
+        if node not in remaining:
+            continue
+        cluster, queue = {node}, [node]
+        while queue:
+            node = queue.pop(0)
+            for neighbor in links[node] - cluster:
+                if score_dict[tuple(sorted([node, neighbor]))] >= link_thr:
+                    cluster.add(neighbor)
+                    queue.append(neighbor)
+        remaining -= cluster
+        labels[list(cluster)] = min(cluster)
+    return labels
+
+
+def reference_boundaries(text_comps, labels):
+    boundaries = []
+    for label in np.unique(labels):
+        inds = np.where(labels == label)[0]
+        if len(inds) < 2:
+            continue
+        boxes = text_comps[inds, :8].reshape((-1, 4, 2)).astype(np.int32)
+        centers = np.mean(boxes, axis=1).astype(np.int32).tolist()
+        boxes = boxes[reference_min_connect_path(centers)]
+        top_line = np.mean(boxes[:, 0:2, :], axis=1).astype(np.int32).tolist()
+        bot_line = np.mean(boxes[:, 2:4, :], axis=1).astype(np.int32).tolist()
+        top_line, bot_line = fix_corner(top_line, bot_line, boxes[0], boxes[-1])
+        boundary_points = top_line + bot_line[::-1]
+        score = np.mean(text_comps[inds, -1])
+        boundaries.append([p for point in boundary_points for p in point] + [score])
+    return boundaries
+
+
+def random_graph(rng, num_lines, k=4):
+    # text components along lines, and the edges to their k nearest
+    # components, scored high on the same line
+    comps, line_ids = [], []
+    for line_id in range(num_lines):
+        start = rng.random(2) * 600
+        angle = rng.uniform(-0.5, 0.5)
+        step = np.array([np.cos(angle), np.sin(angle)]) * rng.uniform(8, 20)
+        normal = np.array([-step[1], step[0]]) / norm(step) * rng.uniform(5, 12)
+        for j in range(rng.integers(1, 12)):
+            center = start + j * step + rng.normal(0, 1, 2)
+            box = [center - step / 2 - normal, center + step / 2 - normal]
+            box += [center + step / 2 + normal, center - step / 2 + normal]
+            comps.append(np.append(np.concatenate(box), rng.random()))
+            line_ids.append(line_id)
+    text_comps = np.array(comps, dtype=np.float32)
+    line_ids = np.array(line_ids)
+    centers = text_comps[:, :8].reshape(-1, 4, 2).mean(axis=1)
+    distances = norm(centers[:, None] - centers[None], axis=-1)
+    neighbors = np.argsort(distances, axis=1, kind="stable")[:, 1 : k + 1]
+    edges = np.stack(
+        [np.repeat(np.arange(len(text_comps)), neighbors.shape[1]), neighbors.ravel()],
+        axis=1,
+    )
+    same_line = line_ids[edges[:, 0]] == line_ids[edges[:, 1]]
+    scores = np.clip(same_line * 0.7 + rng.normal(0.15, 0.2, len(edges)), 0, 1)
+    return edges, scores, text_comps
+
+
+def test_min_connect_path_same_as_reference():
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        # small integer points, with ties and repeated points
+        points = rng.integers(0, 8, (rng.integers(2, 30), 2)).tolist()
+        assert min_connect_path(points) == reference_min_connect_path(points)
+
+
+@pytest.mark.parametrize("num_lines", [3, 40])
+def test_drrg_postprocess_same_as_reference(num_lines):
+    rng = np.random.default_rng(num_lines)
+    post_process = DRRGPostprocess(link_thr=0.8)
+    shape_list = np.array([[640, 640, 0.5, 0.8]])
+    edges, scores, text_comps = random_graph(rng, num_lines)
+    labels = reference_labels(edges, scores.copy(), text_comps, 0.8)
+    expected, expected_scores = post_process.resize_boundary(
+        reference_boundaries(text_comps, labels),
+        (1 / shape_list[0, 2:]).tolist()[::-1],
+    )
+    result = post_process((edges, scores, text_comps), shape_list)[0]
+    assert len(expected) >= num_lines // 2
+
+    # the clusters were in the order of a set before, so are the boundaries
+    def sort_boundaries(points, scores):
+        return sorted([p.tolist(), s] for p, s in zip(points, scores))
+
+    assert sort_boundaries(result["points"], result["scores"]) == sort_boundaries(
+        expected, expected_scores
+    )
+
+
+def test_graph_propagation_without_text_comps():
+    edges = np.array([[0, 1], [1, 0], [2, 5], [5, 5]])
+    scores = np.array([0.4, 0.8, 0.9, 0.3])
+    nodes, (indptr, indices, link_scores) = graph_propagation(edges, scores, None)
+    # no edge is too long without the text components
+    np.testing.assert_array_equal(nodes, [0, 1, 2, 5])
+    np.testing.assert_array_equal(indptr, [0, 1, 2, 3, 5])
+    np.testing.assert_array_equal(indices, [1, 0, 3, 3, 2])
+    np.testing.assert_allclose(link_scores, [0.6, 0.6, 0.9, 0.3, 0.9])
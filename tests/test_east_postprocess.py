@@ -0,0 +1,28 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.postprocess.east_postprocess import EASTPostProcess
+
+
+def test_mean_scores_same_as_mask():
+    rng = np.random.default_rng(0)
+    score_map = rng.random((60, 80)).astype("float32")
+    # overlapping quads, some partly outside or without any pixel
+    center = rng.random((50, 1, 2)) * [360, 280] - 20
+    quads = center + rng.normal(0, 20, (50, 4, 2))
+    quads[:3] = center[:3]
+    boxes = np.concatenate([quads.reshape(50, 8), np.ones((50, 1))], axis=1)
+
+    expected = []
+    for box in boxes:
+        mask = np.zeros_like(score_map, dtype=np.uint8)
+        cv2.fillPoly(mask, box[:8].reshape((-1, 4, 2)).astype(np.int32) // 4, 1)
+        expected.append(cv2.mean(score_map, mask)[0])
+    scores = EASTPostProcess().mean_scores(score_map, boxes)
+    np.testing.assert_allclose(scores, expected, rtol=1e-6)
@@ -0,0 +1,116 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.postprocess.fce_postprocess import (
+    FCEPostProcess,
+    fill_hole,
+    fourier2poly,
+)
+from ppocr.utils.poly_nms import poly_nms
+
+
+def reference_fourier2poly(fourier_coeff, num_reconstr_points):
+    a = np.zeros((len(fourier_coeff), num_reconstr_points), dtype="complex")
+    k = (len(fourier_coeff[0]) - 1) // 2
+    a[:, 0 : k + 1] = fourier_coeff[:, k:]
+    a[:, -k:] = fourier_coeff[:, :k]
+    poly_complex = np.fft.ifft(a) * num_reconstr_points
+    return np.stack([poly_complex.real, poly_complex.imag], axis=-1).reshape(
+        len(fourier_coeff), -1
+    )
+
+
+def reference_decode(post_process, cls_pred, reg_pred, scale):
+    # the decoding of a level before, one text region after another
+    k = post_process.fourier_degree
+    score_pred = cls_pred[1] * cls_pred[3]
+    tr_mask = fill_hole(score_pred > post_process.score_thr)
+    contours, _ = cv2.findContours(
+        tr_mask.astype(np.uint8), cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE
+    )
+    reg_pred = reg_pred.transpose([1, 2, 0])
+    boundaries = []
+    for cont in contours:
+        deal_map = np.zeros(tr_mask.shape, np.int8)
+        cv2.drawContours(deal_map, [cont], -1, 1, -1)
+        score_mask = score_pred * deal_map > 0
+        xy_text = np.argwhere(score_mask)
+        c = (
+            reg_pred[score_mask][:, : 2 * k + 1]
+            + reg_pred[score_mask][:, 2 * k + 1 :] * 1j
+        )
+        c[:, k] = c[:, k] + xy_text[:, 1] + xy_text[:, 0] * 1j
+        c *= scale
+        polygons = reference_fourier2poly(c, post_process.num_reconstr_points)
+        polygons = polygons.astype("int32")
+        score = score_pred[score_mask].reshape(-1, 1)
+        boundaries += poly_nms(np.hstack((polygons, score)).tolist(), 0.1)
+    return poly_nms(boundaries, 0.1)
+
+
+def to_quad(boundary):
+    poly = np.array(boundary[:-1], np.float32).reshape(-1, 2)
+    points = np.int64(cv2.boxPoints(cv2.minAreaRect(poly)))
+    return points.reshape(-1).tolist() + [boundary[-1]]
+
+
+def random_preds(rng, batch_size, fourier_degree=5):
+    preds = {}
+    for level, (h, w) in enumerate([(40, 48), (20, 24), (10, 12)]):
+        tr = np.zeros((batch_size, h, w), np.float32)
+        for b in range(batch_size):
+            for _ in range(4):
+                x, y = rng.integers(0, w - 4), rng.integers(0, h - 3)
+                tr[b, y : y + rng.integers(2, 8), x : x + rng.integers(3, 16)] = 1
+        tr = np.clip(tr * 0.8 + rng.random(tr.shape) * 0.3, 0, 1)
+        tcl = np.clip(tr + rng.normal(0, 0.1, tr.shape), 0, 1)
+        reg = rng.normal(0, 0.3, (batch_size, 4 * fourier_degree + 2, h, w))
+        # a ring of radius 3 around every pixel, with some noise
+        reg[:, fourier_degree + 1] += 3
+        cls = np.stack([1 - tr, tr, 1 - tcl, tcl], axis=1)
+        preds["level_{}".format(level)] = np.concatenate([cls, reg], axis=1).astype(
+            np.float32
+        )
+    return preds
+
+
+def test_fourier2poly_same_as_ifft():
+    rng = np.random.default_rng(0)
+    coeff = rng.normal(0, 10, (20, 11)) + 1j * rng.normal(0, 10, (20, 11))
+    np.testing.assert_allclose(
+        fourier2poly(coeff, 50),
+        reference_fourier2poly(coeff, 50).astype("int32"),
+        atol=1,
+    )
+    assert fourier2poly(coeff[:0], 50).shape == (0, 100)
+
+
+@pytest.mark.parametrize("box_type", ["poly", "quad"])
+def test_fce_postprocess_same_as_per_region(box_type):
+    rng = np.random.default_rng(1)
+    post_process = FCEPostProcess(scales=[8, 16, 32], box_type=box_type)
+    preds = random_preds(rng, batch_size=3)
+    shape_list = np.array([[320, 384, 1.0, 1.0], [320, 384, 0.5, 0.8]] * 2)[:3]
+    results = post_process(preds, shape_list)
+    assert len(results) == 3
+    for b, result in enumerate(results):
+        boundaries = []
+        for level, scale in enumerate([8, 16, 32]):
+            pred = preds["level_{}".format(level)][b]
+            level_boundaries = reference_decode(post_process, pred[:4], pred[4:], scale)
+            if box_type == "quad":
+                level_boundaries = [to_quad(boundary) for boundary in level_boundaries]
+            boundaries += level_boundaries
+        expected, scores = post_process.resize_boundary(
+            poly_nms(boundaries, 0.1), (1 / shape_list[b, 2:]).tolist()[::-1]
+        )
+        assert len(expected) > 3
+        np.testing.assert_array_equal(result["points"], expected)
+        assert result["scores"] == scores
@@ -0,0 +1,68 @@
+import os
+import sys
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.data.imaug.vqa.token import VQAReTokenRelation
+from tools.infer_kie_token_ser_re import make_input
+
+
+def ser_document(preds, lengths, max_seq_len, num_chunks):
+    entities, start = [], 0
+    for length in lengths:
+        entities.append({"start": start, "end": start + length, "label": "O"})
+        start += length
+    ser_inputs = [np.zeros((num_chunks, max_seq_len), np.int64)] * 5
+    ser_inputs += [None, None, None, [entities]]
+    return ser_inputs, [[{"pred": pred} for pred in preds]]
+
+
+def test_make_input_pairs_questions_with_answers():
+    preds = ["QUESTION", "ANSWER", "O", "QUESTION", "HEADER", "ANSWER"]
+    ser_inputs, ser_results = ser_document(preds, [2, 3, 1, 2, 2, 1], 16, 1)
+    re_input, entity_idx_dict_batch = make_input(ser_inputs, ser_results)
+    entities, relations = re_input[5][0], re_input[6][0]
+    assert entities.shape == (17, 3)
+    np.testing.assert_array_equal(
+        entities[:6],
+        [[5, 5, 5], [0, 2, 1], [2, 5, 2], [6, 8, 1], [8, 10, 0], [10, 11, 2]],
+    )
+    # every question with every answer, in the order of the questions
+    np.testing.assert_array_equal(relations, [[4, 4], [0, 1], [0, 4], [2, 1], [2, 4]])
+    assert entity_idx_dict_batch == [{0: 0, 1: 1, 2: 3, 3: 4, 4: 5}]
+
+
+def test_make_input_entities_of_every_chunk():
+    preds = ["QUESTION", "ANSWER", "QUESTION", "ANSWER", "ANSWER"]
+    ser_inputs, ser_results = ser_document(preds, [3, 3, 3, 3, 3], 8, 2)
+    re_input, entity_idx_dict_batch = make_input(ser_inputs, ser_results)
+    entities, relations = re_input[5], re_input[6]
+    # the third line crosses the two chunks, so it is in neither of them
+    assert entity_idx_dict_batch == [{0: 0, 1: 1}, {0: 3, 1: 4}]
+    np.testing.assert_array_equal(entities[1, :3], [[2, 2, 2], [1, 4, 2], [4, 7, 2]])
+    np.testing.assert_array_equal(relations[0], [[1, 1], [0, 1]])
+    np.testing.assert_array_equal(relations[1], [[0, 0], [-1, -1]])
+
+
+def test_re_token_relation_question_heads():
+    data = {
+        "entities": [
+            {"start": 0, "end": 2, "label": "QUESTION"},
+            {"start": 2, "end": 5, "label": "ANSWER"},
+            {"start": 5, "end": 6, "label": "ANSWER"},
+            {"start": 6, "end": 9, "label": "HEADER"},
+        ],
+        "relations": [(1, 3), (1, 3), (1, 5), (5, 7), (3, 5)],
+        "id2label": {1: "question", 3: "answer", 5: "answer", 7: "header"},
+        "empty_entity": set(),
+        "entity_id_to_index_map": {1: 0, 3: 1, 5: 2, 7: 3},
+    }
+    relations = VQAReTokenRelation()(data)["relations"]
+    assert relations == [
+        {"head": 0, "tail": 1, "start_index": 0, "end_index": 5},
+        {"head": 0, "tail": 2, "start_index": 0, "end_index": 6},
+    ]
+    assert "id2label" not in data
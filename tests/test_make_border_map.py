@@ -0,0 +1,45 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from shapely.geometry import Polygon
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.data.imaug.make_border_map import MakeBorderMap, polygon_area_length
+
+
+@pytest.fixture
+def polygon():
+    return np.array(
+        [[10.0, 10.0], [60.0, 12.5], [75.0, 20.0], [58.0, 30.0], [9.0, 28.0]]
+    )
+
+
+def test_polygon_area_length(polygon):
+    area, length = polygon_area_length(polygon)
+    assert area == pytest.approx(Polygon(polygon).area)
+    assert length == pytest.approx(Polygon(polygon).length)
+    areas, lengths = polygon_area_length(np.stack([polygon, polygon[::-1] * 2]))
+    np.testing.assert_allclose(areas, [area, area * 4])
+    np.testing.assert_allclose(lengths, [length, length * 2])
+
+
+def test_min_square_distance_same_as_distance(polygon):
+    op = MakeBorderMap()
+    height, width, distance = 45, 90, 6.5
+    xs = np.broadcast_to(np.arange(width, dtype=np.float64), (height, width))
+    ys = np.broadcast_to(np.arange(height, dtype=np.float64)[:, None], (height, width))
+    expected = np.stack(
+        [
+            op._distance(xs, ys, polygon[i], polygon[(i + 1) % len(polygon)])
+            for i in range(len(polygon))
+        ]
+    ).min(axis=0)
+    expected = np.clip(expected / distance, 0, 1)
+
+    result = op._min_square_distance(polygon, height, width, distance)
+    result = np.clip(np.sqrt(result) / distance, 0, 1)
+    np.testing.assert_allclose(result, expected, atol=1e-6)
@@ -0,0 +1,129 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.postprocess.locality_aware_nms import (
+    bounds_overlap,
+    intersection,
+    nms,
+    nms_locality,
+    standard_nms,
+    weighted_merge,
+)
+from ppocr.utils.nms import overlap_pairs
+from ppocr.utils.poly_nms import boundary_iou, poly_nms
+
+
+def random_quads(rng, num, integer):
+    points = rng.random((num, 1, 2)) * 50 + rng.random((num, 4, 2)) * 12
+    # sort the corners around the center, the quads may be concave
+    center = points.mean(axis=1, keepdims=True)
+    angle = np.arctan2(*(points - center).transpose(2, 0, 1)[::-1])
+    points = np.take_along_axis(points, np.argsort(angle)[:, :, None], axis=1)
+    if integer:
+        points = np.round(points)
+    quads = np.concatenate([points.reshape(num, 8), rng.random((num, 1))], axis=1)
+    duplicated = np.flatnonzero(rng.random(num) < 0.2)
+    quads[duplicated, :8] = quads[duplicated - 1, :8]
+    return quads
+
+
+def reference_nms(S, thres):
+    order = np.argsort(S[:, 8])[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        ovr = np.array([intersection(S[i], S[t]) for t in order[1:]])
+        order = order[np.where(ovr <= thres)[0] + 1]
+    return keep
+
+
+@pytest.mark.parametrize("integer", [False, True])
+def test_nms_same_as_reference(integer):
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        S = random_quads(rng, rng.integers(1, 60), integer)
+        thres = rng.choice([0.0, 0.2, 0.5])
+        keep = nms(S, thres)
+        assert list(keep) == reference_nms(S, thres)
+        np.testing.assert_array_equal(standard_nms(S, thres), S[keep])
+    assert list(nms(np.zeros((0, 9)), 0.2)) == []
+
+
+def test_nms_locality_same_as_reference():
+    rng = np.random.default_rng(4)
+    for _ in range(10):
+        # runs of jittered quads, like the quads of the pixels of a text line
+        S = random_quads(rng, rng.integers(1, 20), integer=False)
+        S = np.repeat(S, rng.integers(1, 8, len(S)), axis=0)
+        S[:, :8] += rng.normal(0, 0.5, (len(S), 8))
+        thres = rng.choice([0.2, 0.5])
+
+        polys = S.copy()
+        merged = []
+        p = None
+        for g in polys:
+            if p is not None and intersection(g, p) > thres:
+                p = weighted_merge(g, p)
+            else:
+                if p is not None:
+                    merged.append(p)
+                p = g
+        merged.append(p)
+        expected = standard_nms(np.array(merged), thres)
+        np.testing.assert_array_equal(nms_locality(S, thres), expected)
+    assert len(nms_locality(np.zeros((0, 9)), 0.2)) == 0
+
+
+def test_bounds_overlap():
+    rng = np.random.default_rng(1)
+    S = random_quads(rng, 200, integer=True)
+    for g, p in zip(S[::2], S[1::2]):
+        if not bounds_overlap(g, p):
+            assert intersection(g, p) == 0
+
+
+def test_overlap_pairs():
+    rng = np.random.default_rng(2)
+    bounds = rng.random((100, 2)) * 10
+    bounds = np.round(np.concatenate([bounds, bounds + rng.random((100, 2))], axis=1))
+    indptr, indices = overlap_pairs(bounds)
+    for i in range(len(bounds)):
+        overlap = (bounds[:, :2] <= bounds[i, 2:]).all(axis=1) & (
+            bounds[i, :2] <= bounds[:, 2:]
+        ).all(axis=1)
+        overlap[i] = False
+        assert sorted(indices[indptr[i] : indptr[i + 1]]) == list(
+            np.flatnonzero(overlap)
+        )
+
+
+def test_poly_nms_same_as_reference():
+    rng = np.random.default_rng(3)
+    angle = np.linspace(0, 2 * np.pi, 10, endpoint=False)
+    for _ in range(5):
+        num = rng.integers(1, 40)
+        center = rng.random((num, 1, 2)) * 60
+        radius = rng.random((num, 10, 1)) * 4 + 8
+        points = center + radius * np.stack([np.cos(angle), np.sin(angle)], axis=1)
+        polygons = [
+            list(p) + [s] for p, s in zip(points.reshape(num, -1), rng.random(num))
+        ]
+
+        sorted_polygons = np.array(sorted(polygons, key=lambda x: x[-1]))
+        expected = []
+        index = list(range(num))
+        while len(index) > 0:
+            expected.append(sorted_polygons[index[-1]].tolist())
+            A = sorted_polygons[index.pop()][:-1]
+            index = [
+                i for i in index if boundary_iou(A, sorted_polygons[i][:-1]) <= 0.1
+            ]
+        assert poly_nms(polygons, 0.1) == expected
+    assert poly_nms([], 0.1) == []
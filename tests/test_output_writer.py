@@ -0,0 +1,99 @@
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppstructure.output_writer import (
+    StructureOutputWriter,
+    dump_structure_res_msgpack,
+    load_structure_res_msgpack,
+)
+
+TABLE_HTML = "<html><body><table><tr><td>a</td><td>b</td></tr></table></body></html>"
+
+
+def page_regions(rng, np_values=True):
+    # the JSON lines, as before, take python values only
+    to_value = (lambda value: value) if np_values else (lambda value: value.tolist())
+    return [
+        {
+            "type": "text",
+            "bbox": [0, 0, 50, 20],
+            "img": rng.integers(0, 255, (20, 50, 3), dtype=np.uint8),
+            "res": [{"text": "hello", "confidence": to_value(np.float32(0.5))}],
+        },
+        {
+            "type": "table",
+            "bbox": [0, 30, 80, 90],
+            "img": rng.integers(0, 255, (60, 80, 3), dtype=np.uint8),
+            "res": {
+                "html": TABLE_HTML,
+                "cell_bbox": to_value(np.arange(8).reshape(2, 4)),
+            },
+        },
+        {
+            "type": "figure",
+            "bbox": [10, 100, 40, 140],
+            "img": np.full((40, 30, 3), 128, dtype=np.uint8),
+            "res": [],
+        },
+    ]
+
+
+def expected_region(region):
+    # the regions as saved: no image, numpy converted to lists
+    region = {k: v for k, v in region.items() if k != "img"}
+    return json.loads(json.dumps(region, default=lambda obj: obj.tolist()))
+
+
+def test_msgpack_dump_load_round_trip(tmp_path):
+    pytest.importorskip("msgpack")
+    regions = page_regions(np.random.default_rng(0))
+    file_path = str(tmp_path / "res_0.msgpack")
+    dump_structure_res_msgpack(regions, file_path)
+    expected = [expected_region(region) for region in regions]
+    assert load_structure_res_msgpack(file_path) == expected
+    for region_idx in range(len(regions)):
+        region = load_structure_res_msgpack(file_path, region_idx)
+        assert region == expected[region_idx]
+
+    dump_structure_res_msgpack([], file_path)
+    assert load_structure_res_msgpack(file_path) == []
+
+
+@pytest.mark.parametrize("num_workers", [0, 2])
+def test_output_writer_write_flush_close(tmp_path, num_workers):
+    pytest.importorskip("msgpack")
+    rng = np.random.default_rng(1)
+    writer = StructureOutputWriter(
+        str(tmp_path), num_workers=num_workers, max_pending=1, save_msgpack=True
+    )
+    pages = [page_regions(rng, np_values=False) for _ in range(3)]
+    for index, regions in enumerate(pages):
+        writer.write(regions, "doc", index)
+    writer.flush()
+
+    save_folder = tmp_path / "doc"
+    for index, regions in enumerate(pages):
+        # the figure crops and the table excels exist after flush
+        figure_path = save_folder / "{}_{}.jpg".format(regions[2]["bbox"], index)
+        np.testing.assert_array_equal(cv2.imread(str(figure_path)), regions[2]["img"])
+        assert (save_folder / "{}_{}.xlsx".format(regions[1]["bbox"], index)).exists()
+
+        with open(save_folder / "res_{}.txt".format(index), encoding="utf8") as f:
+            lines = [json.loads(line) for line in f]
+        expected = [expected_region(region) for region in regions]
+        assert lines == expected
+        msgpack_path = str(save_folder / "res_{}.msgpack".format(index))
+        assert load_structure_res_msgpack(msgpack_path) == expected
+
+    writer.close()
+    assert writer.executor is None
+    # the regions keep their images
+    assert all("img" in region for regions in pages for region in regions)
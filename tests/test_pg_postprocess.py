@@ -0,0 +1,147 @@
+import os
+import sys
+from itertools import groupby
+
+import cv2
+import numpy as np
+import pytest
+from skimage.morphology._skeletonize import thin
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.postprocess.pg_postprocess import PGPostProcess
+from ppocr.utils.e2e_utils.extract_textpoint_fast import (
+    _align_gather_info_loop,
+    align_gather_info,
+    expand_poly_along_width,
+    get_dict,
+    point_pair2poly,
+    sort_and_expand_with_direction_v2,
+    thin_components,
+)
+
+DICT_PATH = os.path.join(current_dir, "..", "ppocr", "utils", "ic15_dict.txt")
+
+
+def reference_pg_fast(outs_dict, shape_list, point_gather_mode):
+    # the fast path before, the instances and their points one at a time
+    lexicon_table = get_dict(DICT_PATH)
+    p_score = outs_dict["f_score"][0]
+    p_border = outs_dict["f_border"][0]
+    p_char = outs_dict["f_char"][0].transpose([1, 2, 0])
+    f_direction = outs_dict["f_direction"][0].transpose(1, 2, 0)
+    src_h, src_w, ratio_h, ratio_w = shape_list[0]
+    p_tcl_map = (p_score[0] > 0.5) * 1.0
+    skeleton_map = thin(p_tcl_map.astype(np.uint8))
+    instance_count, instance_label_map = cv2.connectedComponents(
+        skeleton_map.astype(np.uint8), connectivity=8
+    )
+    points, texts = [], []
+    for instance_id in range(1, instance_count):
+        ys, xs = np.where(instance_label_map == instance_id)
+        if len(ys) < 3:
+            continue
+        gather_info = sort_and_expand_with_direction_v2(
+            list(zip(ys, xs)), f_direction, p_tcl_map
+        )
+        if len(gather_info) < 6:
+            continue
+        if point_gather_mode == "align":
+            gather_info = _align_gather_info_loop(np.array(gather_info)).tolist()
+        ys, xs = zip(*gather_info)
+        labels = np.argmax(p_char[list(ys), list(xs)], axis=1)
+        text = "".join(
+            lexicon_table[k] for k, _ in groupby(labels) if k != p_char.shape[2] - 1
+        )
+        if len(text) < 2:
+            continue
+        detal = len(gather_info) // 5
+        keep_idx_list = [0] + [detal * (i + 1) for i in range(4)] + [-1]
+        point_pair_list = []
+        for idx in keep_idx_list:
+            y, x = gather_info[idx]
+            offset = p_border[:, y, x].reshape(2, 2) * 1.2
+            ori_yx = np.array([y, x], dtype=np.float32)
+            point_pair_list.append(
+                (ori_yx + offset)[:, ::-1]
+                * 4.0
+                / np.array([ratio_w, ratio_h]).reshape(-1, 2)
+            )
+        poly = expand_poly_along_width(point_pair2poly(point_pair_list), 0.2)
+        poly[:, 0] = np.clip(poly[:, 0], a_min=0, a_max=src_w)
+        poly[:, 1] = np.clip(poly[:, 1], a_min=0, a_max=src_h)
+        points.append(poly)
+        texts.append(text)
+    return points, texts
+
+
+def random_outputs(rng, h, w, num, num_classes=37):
+    # curved text lines, whose directions are along the lines
+    score = rng.random((1, 1, h, w)).astype(np.float32) * 0.3
+    border = rng.normal(0, 0.5, (1, 4, h, w)).astype(np.float32)
+    char = rng.normal(0, 1, (1, num_classes, h, w)).astype(np.float32)
+    char[0, -1] += 1.5
+    direction = rng.normal(0, 0.1, (1, 2, h, w)).astype(np.float32)
+    yy, xx = np.mgrid[:h, :w]
+    for _ in range(num):
+        cx, cy = rng.random(2) * [w, h]
+        length, half = rng.uniform(10, 60), rng.uniform(1.5, 4)
+        angle, bend = rng.uniform(-0.6, 0.6), rng.uniform(-0.02, 0.02)
+        c, s = np.cos(angle), np.sin(angle)
+        u = (xx - cx) * c + (yy - cy) * s
+        v = -(xx - cx) * s + (yy - cy) * c - bend * u**2
+        inside = (np.abs(u) < length / 2) & (np.abs(v) < half)
+        score[0, 0][inside] = rng.uniform(0.6, 1.0, inside.sum())
+        tangent = np.stack([np.ones_like(u), 2 * bend * u])
+        tangent = tangent / np.linalg.norm(tangent, axis=0)
+        direction[0, 0][inside] = 3 * (tangent[0] * c - tangent[1] * s)[inside]
+        direction[0, 1][inside] = 3 * (tangent[0] * s + tangent[1] * c)[inside]
+        border[0, 0][inside] = -half - 1
+        border[0, 2][inside] = half + 1
+        chars = rng.integers(0, num_classes - 1, int(length // 3) + 2)
+        char_idx = ((u[inside] + length / 2) // 3).astype(int)
+        char[0, chars[char_idx], yy[inside], xx[inside]] += 4
+    return {
+        "f_score": score,
+        "f_border": border,
+        "f_char": char,
+        "f_direction": direction,
+    }
+
+
+def test_align_gather_info_same_as_insert():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        gather_info = rng.integers(0, 100, (rng.integers(2, 12), 2))
+        moved = np.abs(np.diff(gather_info, axis=0)).max(axis=1) > 0
+        gather_info = gather_info[np.append(True, moved)]
+        expected = _align_gather_info_loop(gather_info.copy())
+        np.testing.assert_array_equal(align_gather_info(gather_info), expected)
+
+
+def test_thin_components_same_as_thin():
+    rng = np.random.default_rng(1)
+    outs = random_outputs(rng, 96, 128, 20)
+    tcl_map = (outs["f_score"][0, 0] > 0.5) * 1.0
+    np.testing.assert_array_equal(
+        thin_components(tcl_map), thin(tcl_map.astype(np.uint8))
+    )
+
+
+@pytest.mark.parametrize("point_gather_mode", [None, "align"])
+def test_pg_postprocess_same_as_per_instance(point_gather_mode):
+    rng = np.random.default_rng(2)
+    post_process = PGPostProcess(
+        DICT_PATH, "totaltext", 0.5, "fast", point_gather_mode=point_gather_mode
+    )
+    shape_list = np.array([[384, 512, 0.5, 0.5]])
+    for _ in range(2):
+        outs = random_outputs(rng, 96, 128, 20)
+        result = post_process(outs, shape_list)
+        points, texts = reference_pg_fast(outs, shape_list, point_gather_mode)
+        assert len(texts) > 5
+        assert result["texts"] == texts
+        assert len(result["points"]) == len(points)
+        for poly, expected in zip(result["points"], points):
+            np.testing.assert_array_equal(poly, expected)
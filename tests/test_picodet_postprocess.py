@@ -0,0 +1,110 @@
+import os
+import sys
+
+import numpy as np
+from scipy.special import softmax
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.postprocess.picodet_postprocess import PicoDetPostProcess, hard_nms
+
+LAYOUT_DICT = os.path.join(
+    current_dir, "..", "ppocr", "utils", "dict", "layout_dict", "layout_cdla_dict.txt"
+)
+
+
+def reference_boxes(post_process, ori_img, img, preds, batch_id):
+    # the decoding of one image before, with hard_nms for every class
+    scores, raw_boxes = preds["boxes"], preds["boxes_num"]
+    reg_max = int(raw_boxes[0].shape[-1] / 4 - 1)
+    input_shape = img.shape[2:]
+    decode_boxes, select_scores = [], []
+    for stride, box_distribute, score in zip(post_process.strides, raw_boxes, scores):
+        box_distribute, score = box_distribute[batch_id], score[batch_id]
+        ww, hh = np.meshgrid(
+            np.arange(input_shape[1] / stride), np.arange(input_shape[0] / stride)
+        )
+        ct_row = (hh.flatten() + 0.5) * stride
+        ct_col = (ww.flatten() + 0.5) * stride
+        center = np.stack((ct_col, ct_row, ct_col, ct_row), axis=1)
+        box_distance = softmax(box_distribute.reshape((-1, reg_max + 1)), axis=1)
+        box_distance = box_distance * np.arange(reg_max + 1)[None]
+        box_distance = np.sum(box_distance, axis=1).reshape((-1, 4)) * stride
+        topk_idx = np.argsort(score.max(axis=1))[::-1][: post_process.nms_top_k]
+        decode_boxes.append(center[topk_idx] + [-1, -1, 1, 1] * box_distance[topk_idx])
+        select_scores.append(score[topk_idx])
+    bboxes = np.concatenate(decode_boxes)
+    confidences = np.concatenate(select_scores)
+    results = []
+    for class_index in range(confidences.shape[1]):
+        probs = confidences[:, class_index]
+        mask = probs > post_process.score_threshold
+        if mask.sum() == 0:
+            continue
+        box_probs = np.concatenate([bboxes[mask], probs[mask].reshape(-1, 1)], axis=1)
+        box_probs = hard_nms(
+            box_probs, post_process.nms_threshold, top_k=post_process.keep_top_k
+        )
+        ori_shape, _, scale_factor = post_process.img_info(ori_img, img)
+        box_probs[:, :4] = post_process.warp_boxes(box_probs[:, :4], ori_shape[0])
+        box_probs[:, :4] /= np.tile(scale_factor[0][::-1], 2)
+        for box_prob in box_probs:
+            results.append(
+                {
+                    "bbox": box_prob[:4],
+                    "label": post_process.labels[class_index],
+                    "score": box_prob[4],
+                }
+            )
+    return post_process.remove_duplicate(results)
+
+
+def random_preds(rng, batch_size, input_shape, num_classes, strides, reg_max=7):
+    scores, boxes = [], []
+    for stride in strides:
+        num = (input_shape[0] // stride) * (input_shape[1] // stride)
+        score = rng.random((batch_size, num, num_classes)).astype(np.float32) * 0.3
+        # some confident cells, with overlapping boxes
+        hot = rng.random((batch_size, num)) < 0.05
+        score[hot, rng.integers(0, num_classes, hot.sum())] += 0.5
+        scores.append(score)
+        # small boxes around the cells
+        box = rng.normal(0, 1, (batch_size, num, 4, reg_max + 1))
+        box[..., :2] += 3
+        boxes.append(box.reshape(batch_size, num, -1).astype(np.float32))
+    return dict(boxes=scores, boxes_num=boxes)
+
+
+def assert_same_results(result, expected):
+    assert len(result) == len(expected)
+    for res, exp in zip(result, expected):
+        assert res["label"] == exp["label"]
+        np.testing.assert_allclose(res["bbox"], exp["bbox"], rtol=1e-5, atol=1e-3)
+        np.testing.assert_allclose(res["score"], exp["score"], rtol=1e-6)
+
+
+def test_picodet_batch_same_as_per_image():
+    rng = np.random.default_rng(0)
+    post_process = PicoDetPostProcess(LAYOUT_DICT)
+    num_classes = len(post_process.labels)
+    img = np.zeros((3, 3, 160, 128), np.float32)
+    ori_imgs = [np.zeros(shape, np.uint8) for shape in [(400, 300, 3)] * 3]
+    preds = random_preds(rng, 3, img.shape[2:], num_classes, post_process.strides)
+
+    batch_results = post_process(ori_imgs, img, preds)
+    assert len(batch_results) == 3
+    for batch_id, result in enumerate(batch_results):
+        single_preds = {
+            key: [value[batch_id : batch_id + 1] for value in values]
+            for key, values in preds.items()
+        }
+        single = post_process(
+            ori_imgs[batch_id], img[batch_id : batch_id + 1], single_preds
+        )
+        expected = reference_boxes(
+            post_process, ori_imgs[batch_id], img, preds, batch_id
+        )
+        assert len(expected) > 3
+        assert_same_results(single, expected)
+        assert_same_results(result, expected)
@@ -0,0 +1,87 @@
+import os
+import sys
+from collections import deque
+
+import cv2
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.postprocess.pse_postprocess import PSEPostProcess
+from ppocr.postprocess.pse_postprocess.pse.pse_numpy import pse
+
+
+def reference_pse(kernels, min_area):
+    # the breadth first search of pse.pyx, one pixel at a time
+    kernel_num, h, w = kernels.shape
+    label_num, label = cv2.connectedComponents(kernels[-1], connectivity=4)
+    for i in range(1, label_num):
+        if np.sum(label == i) < min_area:
+            label[label == i] = 0
+    pred = label.copy()
+    queue = deque(zip(*np.where(label > 0)))
+    for kernel_idx in range(kernel_num - 2, -1, -1):
+        next_queue = deque()
+        while queue:
+            x, y = queue.popleft()
+            is_edge = True
+            for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+                tx, ty = x + dx, y + dy
+                if tx < 0 or tx >= h or ty < 0 or ty >= w:
+                    continue
+                if kernels[kernel_idx, tx, ty] == 0 or pred[tx, ty] > 0:
+                    continue
+                queue.append((tx, ty))
+                pred[tx, ty] = pred[x, y]
+                is_edge = False
+            if is_edge:
+                next_queue.append((x, y))
+        queue = next_queue
+    return pred
+
+
+def random_kernels(rng, h, w, kernel_num, num_blobs):
+    # nested kernels from a noisy map of ellipses, whose components touch
+    yy, xx = np.mgrid[:h, :w]
+    score = rng.random((h, w)) * 0.3
+    for _ in range(num_blobs):
+        cx, cy = rng.random(2) * [w, h]
+        ax, ay = rng.random(2) * [w / 6, h / 10] + 2
+        score = np.maximum(score, 1 - ((xx - cx) / ax) ** 2 - ((yy - cy) / ay) ** 2)
+    thresholds = np.linspace(0.2, 0.9, kernel_num)
+    return np.stack([score > t for t in thresholds]).astype(np.uint8)
+
+
+def test_pse_same_as_reference():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        h, w = rng.integers(10, 80, 2)
+        kernels = random_kernels(rng, h, w, rng.integers(2, 8), rng.integers(1, 20))
+        min_area = int(rng.integers(0, 20))
+        expected = reference_pse(kernels, min_area)
+        np.testing.assert_array_equal(pse(kernels, min_area), expected)
+
+
+def test_generate_box_per_label():
+    rng = np.random.default_rng(1)
+    kernels = random_kernels(rng, 96, 160, 7, 40)
+    label = pse(kernels, 16)
+    score = rng.random(label.shape).astype("float32") * 0.3 + 0.7 * kernels[0]
+    post_process = PSEPostProcess(box_thresh=0.5, min_area=16)
+    boxes, scores = post_process.generate_box(score, label, (192, 320, 0.5, 0.5))
+
+    expected = []
+    for i in range(1, label.max() + 1):
+        ind = label == i
+        if ind.sum() >= 16 and score[ind].mean() >= 0.5:
+            points = np.array(np.where(ind)).transpose((1, 0))[:, ::-1]
+            bbox = cv2.boxPoints(cv2.minAreaRect(points))
+            bbox[:, 0] = np.clip(np.round(bbox[:, 0] / 0.5), 0, 320)
+            bbox[:, 1] = np.clip(np.round(bbox[:, 1] / 0.5), 0, 192)
+            expected.append((bbox, score[ind].mean()))
+    assert len(expected) > 5
+    assert len(boxes) == len(expected)
+    for box, score_i, (bbox, expected_score) in zip(boxes, scores, expected):
+        np.testing.assert_array_equal(box, bbox)
+        np.testing.assert_allclose(score_i, expected_score, rtol=1e-6)
@@ -0,0 +1,195 @@
+import os
+import sys
+
+import numpy as np
+import paddle
+import paddle.nn.functional as F
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.modeling.heads.rec_latexocr_head import LaTeXOCRHead
+from ppocr.modeling.heads.rec_nrtr_head import Transformer
+from ppocr.modeling.heads.rec_parseq_head import ParseQHead
+from ppocr.modeling.heads.rec_satrn_head import SATRNHead
+
+
+def end_lengths(seq, end_idx):
+    """The lengths of the sequences up to and including the first end_idx"""
+    return [list(s).index(end_idx) + 1 if end_idx in s else len(s) for s in seq]
+
+
+def end_on_feature(linear, end_idx, scale=1.0):
+    # the logit of end_idx follows one feature, so the sequences end at
+    # different steps
+    weight = linear.weight.numpy()
+    weight[:, end_idx] = 0
+    weight[0, end_idx] = scale
+    linear.weight.set_value(weight)
+
+
+def test_nrtr_same_as_teacher_forcing():
+    paddle.seed(0)
+    np.random.seed(0)
+    model = Transformer(
+        d_model=32,
+        nhead=4,
+        num_encoder_layers=1,
+        num_decoder_layers=2,
+        dim_feedforward=64,
+        out_channels=20,
+    )
+    model.eval()
+    end_on_feature(model.tgt_word_prj, 3, scale=2.0)
+    src = paddle.randn([16, 12, 32])
+    with paddle.no_grad():
+        dec_seq, dec_prob = model(src)
+        prob = F.softmax(model.forward_train(src, dec_seq), axis=-1).numpy()
+    dec_seq, dec_prob = dec_seq.numpy(), dec_prob.numpy()
+    lengths = end_lengths(dec_seq[:, 1:], 3)
+    assert len(set(lengths)) > 2
+    for i, length in enumerate(lengths):
+        # the last step of the last sequences, which is </s>, is not in dec_seq
+        length = min(length, dec_seq.shape[1] - 1)
+        np.testing.assert_array_equal(
+            prob[i, :length].argmax(-1), dec_seq[i, 1 : length + 1]
+        )
+        np.testing.assert_allclose(
+            prob[i, :length].max(-1), dec_prob[i, 1 : length + 1], atol=1e-5
+        )
+
+
+def test_satrn_same_as_teacher_forcing():
+    paddle.seed(0)
+    rng = np.random.default_rng(0)
+    enc_cfg = dict(n_layers=1, n_head=2, d_k=8, d_v=8, d_model=16, d_inner=32)
+    dec_cfg = dict(
+        n_layers=2,
+        d_embedding=16,
+        n_head=2,
+        d_model=16,
+        d_inner=32,
+        d_k=8,
+        d_v=8,
+        num_classes=20,
+        max_seq_len=12,
+        start_idx=18,
+        padding_idx=19,
+    )
+    model = SATRNHead(enc_cfg, dec_cfg)
+    model.eval()
+    end_on_feature(model.decoder.classifier, 18, scale=4.0)
+    feat = paddle.randn([16, 16, 2, 8])
+    valid_ratio = paddle.to_tensor(rng.uniform(0.3, 1, 16).astype("float32"))
+    with paddle.no_grad():
+        outputs = model(feat, targets=[None, valid_ratio]).numpy()
+        preds = outputs.argmax(-1)
+        targets = paddle.to_tensor(np.concatenate([np.full((16, 1), 18), preds], 1))
+        out_enc = model.encoder(feat, valid_ratio)
+        expected = model.decoder.forward_train(feat, out_enc, targets, valid_ratio)
+    expected = F.softmax(expected, axis=-1).numpy()
+    lengths = end_lengths(preds, 18)
+    assert len(set(lengths)) > 2
+    for i, length in enumerate(lengths):
+        np.testing.assert_allclose(outputs[i, :length], expected[i, :length], atol=1e-5)
+
+
+def test_parseq_same_as_teacher_forcing():
+    paddle.seed(0)
+    model = ParseQHead(
+        out_channels=22,
+        max_text_length=12,
+        embed_dim=32,
+        dec_num_heads=4,
+        dec_mlp_ratio=2,
+        dec_depth=2,
+        perm_num=6,
+        perm_forward=True,
+        perm_mirrored=True,
+        decode_ar=True,
+        refine_iters=0,
+        dropout=0.1,
+    )
+    model.eval()
+    end_on_feature(model.head, 0)
+    memory = paddle.randn([16, 10, 32])
+    with paddle.no_grad():
+        outputs = model(memory)["predict"].numpy()
+        num_steps = outputs.shape[1]
+        tgt_in = np.concatenate(
+            [np.full((16, 1), model.bos_id), outputs[:, :-1].argmax(-1)], 1
+        )
+        mask = paddle.triu(paddle.full([num_steps, num_steps], float("-inf")), 1)
+        expected = model.decode(
+            paddle.to_tensor(tgt_in),
+            memory,
+            mask,
+            tgt_query=model.pos_queries[:, :num_steps].expand([16, -1, -1]),
+            tgt_query_mask=mask,
+        )
+    expected = F.softmax(model.head(expected), axis=-1).numpy()
+    lengths = end_lengths(outputs.argmax(-1), 0)
+    assert len(set(lengths)) > 2
+    for i, length in enumerate(lengths):
+        np.testing.assert_allclose(outputs[i, :length], expected[i, :length], atol=1e-5)
+
+
+@pytest.mark.parametrize("attn_talking_heads", [False, True])
+def test_latexocr_same_as_full_decoding(attn_talking_heads):
+    paddle.seed(0)
+    head = LaTeXOCRHead(
+        decoder_args=dict(
+            attn_on_attn=True,
+            cross_attend=True,
+            ff_glu=True,
+            rel_pos_bias=False,
+            use_scalenorm=False,
+            attn_talking_heads=attn_talking_heads,
+        )
+    )
+    head.eval()
+    # the talking heads are not cached, generate decodes all the positions
+    assert head.net.attn_layers.supports_cache() != attn_talking_heads
+    end_on_feature(head.net.to_logits, head.eos_token, scale=2.0)
+    context = paddle.randn([8, 20, 256])
+    # a start token after [BOS] for the positions before the sampling
+    start_tokens = paddle.concat(
+        [paddle.full([8, 1], head.bos_token, "int64"), paddle.randint(3, 8000, [8, 1])],
+        1,
+    )
+    # top_k keeps only the best token, so that the sampling is greedy
+    filter_thres = 1 - 1.5 / 8000
+    with paddle.no_grad():
+        out = head.generate(
+            start_tokens,
+            24,
+            eos_token=head.eos_token,
+            context=context,
+            filter_thres=filter_thres,
+        ).numpy()
+        lengths = end_lengths(out, head.eos_token)
+        assert len(set(lengths)) > 2
+        for i, length in enumerate(lengths):
+            seq = start_tokens[i : i + 1]
+            for _ in range(length):
+                logits = head.net(
+                    seq,
+                    context=context[i : i + 1],
+                    mask=paddle.ones(seq.shape, dtype="bool"),
+                )[:, -1]
+                seq = paddle.concat([seq, logits.argmax(-1, keepdim=True)], 1)
+            np.testing.assert_array_equal(out[i, :length], seq.numpy()[0, 2:])
+            assert (out[i, length:] == head.pad_value).all()
+
+
+def test_latexocr_forward_step_unsupported():
+    head = LaTeXOCRHead(
+        decoder_args=dict(cross_attend=True, attn_sparse_topk=4),
+    )
+    attn_layers = head.net.attn_layers
+    assert not attn_layers.supports_cache()
+    x = paddle.randn([2, 1, 256])
+    self_cache = paddle.zeros([attn_layers.num_attn_layers, 2, 2, 8, 1, 32])
+    with pytest.raises(NotImplementedError):
+        attn_layers.forward_step(x, self_cache, attn_layers.context_cache(x))
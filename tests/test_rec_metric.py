@@ -0,0 +1,98 @@
+import os
+import sys
+import string
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from rapidfuzz.distance import Levenshtein
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.metrics.rec_metric import RecMetric
+from ppocr.utils.stats import TrainingStats
+
+
+@pytest.fixture
+def batches():
+    rng = np.random.default_rng(0)
+    chars = list("abcXYZ019 -é")
+
+    def text():
+        return "".join(rng.choice(chars, rng.integers(0, 16)))
+
+    batches = []
+    for _ in range(10):
+        labels = [(text(), 0) for _ in range(32)]
+        preds = [(t if rng.random() < 0.5 else text(), 0.9) for t, _ in labels]
+        batches.append((preds, labels))
+    return batches
+
+
+@pytest.mark.parametrize("is_filter", [False, True])
+def test_same_as_per_pair(batches, is_filter):
+    metric = RecMetric(is_filter=is_filter)
+    correct_num, norm_edit_dis, all_num = 0, 0.0, 0
+    for preds, labels in batches:
+        metric((preds, labels))
+        batch_norm_edit_dis = 0.0
+        for (pred, _), (target, _) in zip(preds, labels):
+            pred, target = pred.replace(" ", ""), target.replace(" ", "")
+            if is_filter:
+                keep = string.digits + string.ascii_letters
+                pred = "".join(c for c in pred if c in keep).lower()
+                target = "".join(c for c in target if c in keep).lower()
+            batch_norm_edit_dis += Levenshtein.normalized_distance(pred, target)
+            correct_num += pred == target
+            all_num += 1
+        norm_edit_dis += batch_norm_edit_dis
+    assert metric.get_metric() == {
+        "acc": correct_num / (all_num + 1e-5),
+        "norm_edit_dis": 1 - norm_edit_dis / (all_num + 1e-5),
+    }
+
+
+def test_length_buckets_in_threads(batches):
+    metric = RecMetric(length_buckets=[4, 8])
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(metric, batches))
+    result = metric.get_metric()
+
+    buckets = {"len_0-3": [], "len_4-7": [], "len_8+": []}
+    for preds, labels in batches:
+        for (pred, _), (target, _) in zip(preds, labels):
+            pred, target = pred.replace(" ", ""), target.replace(" ", "")
+            name = list(buckets)[np.searchsorted([4, 8], len(target), side="right")]
+            buckets[name].append(
+                (pred == target, Levenshtein.normalized_distance(pred, target))
+            )
+    all_num = sum(len(values) for values in buckets.values())
+    assert result["acc"] == pytest.approx(
+        sum(c for values in buckets.values() for c, _ in values) / all_num
+    )
+    for name, values in buckets.items():
+        correct, edit_dis = np.array(values).T
+        assert result["acc_" + name] == pytest.approx(correct.mean())
+        assert result["norm_edit_dis_" + name] == pytest.approx(1 - edit_dis.mean())
+
+
+def test_char_confusion():
+    metric = RecMetric(char_confusion_topk=2)
+    metric(([("a1b", 1), ("xy", 1), ("xy", 1)], [("a2bc", 1), ("xy", 1), ("x", 1)]))
+    metric(([("a1", 1)], [("a2", 1)]))
+    result = metric.get_metric()
+    assert "char_confusion" not in result
+    assert metric.get_char_confusion() == "'2'->'1': 2, 'c'->'': 1"
+
+
+def test_char_confusion_training_stats():
+    # the metrics of cal_metric_during_train are smoothed by TrainingStats
+    metric = RecMetric(char_confusion_topk=3)
+    stats = TrainingStats(20, ["lr"])
+    for _ in range(2):
+        metric(([("ab", 1), ("cd", 1)], [("ab", 1), ("ce", 1)]))
+        stats.update(metric.get_metric())
+    assert "acc: 0.49" in stats.log()
+    assert stats.get()["acc"] == pytest.approx(0.5, abs=1e-4)
+    assert metric.get_char_confusion() == "'e'->'d': 1"
@@ -0,0 +1,104 @@
+import os
+import sys
+import logging
+
+import pytest
+from paddle.io import DistributedBatchSampler
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.data.simple_dataset import SimpleDataSet
+from ppocr.data.resample_sampler import ResampleBatchSampler
+
+
+@pytest.fixture
+def label_files(tmp_path):
+    files = []
+    for source, num in enumerate([23, 40, 7]):
+        label_file = tmp_path / "label_{}.txt".format(source)
+        label_file.write_text(
+            "".join("img_{}_{}.jpg\tl\n".format(source, i) for i in range(num))
+        )
+        files.append(str(label_file))
+    return files
+
+
+def make_dataset(label_files, seed, resample_by_sampler):
+    config = {
+        "Global": {},
+        "Train": {
+            "dataset": {
+                "data_dir": ".",
+                "label_file_list": label_files,
+                "ratio_list": [0.5, 0.3, 1.0],
+                "transforms": [],
+                "resample_by_sampler": resample_by_sampler,
+            },
+            "loader": {"shuffle": True},
+        },
+    }
+    return SimpleDataSet(config, "Train", logging.getLogger(), seed)
+
+
+@pytest.mark.parametrize("nranks", [1, 3])
+def test_resample_same_as_rebuild(label_files, nranks):
+    dataset = make_dataset(label_files, 1, True)
+    assert len(dataset) == 70
+    samplers = [
+        ResampleBatchSampler(dataset, 4, shuffle=True, drop_last=False, seed=1)
+        for _ in range(nranks)
+    ]
+    for rank, sampler in enumerate(samplers):
+        sampler.nranks, sampler.local_rank = nranks, rank
+
+    for epoch in range(1, 4):
+        rebuilt_dataset = make_dataset(label_files, epoch, False)
+        for rank, sampler in enumerate(samplers):
+            sampler.resample(epoch)
+            rebuilt_sampler = DistributedBatchSampler(
+                rebuilt_dataset, 4, num_replicas=nranks, rank=rank, shuffle=True
+            )
+            expected = [
+                [rebuilt_dataset.data_lines[idx] for idx in batch]
+                for batch in rebuilt_sampler
+            ]
+            batches = [[dataset.data_lines[idx] for idx in batch] for batch in sampler]
+            assert batches == expected
+            assert len(sampler) == len(rebuilt_sampler)
+
+
+def test_build_dataloader_keeps_config(label_files):
+    import copy
+
+    import paddle
+
+    from ppocr.data import build_dataloader
+
+    config = {
+        "Global": {},
+        "Train": {
+            "dataset": {
+                "name": "SimpleDataSet",
+                "data_dir": ".",
+                "label_file_list": label_files,
+                "ratio_list": [0.5, 0.3, 1.0],
+                "transforms": [],
+            },
+            "loader": {
+                "shuffle": True,
+                "batch_size_per_card": 4,
+                "drop_last": False,
+                "num_workers": 0,
+            },
+        },
+    }
+    config["Eval"] = copy.deepcopy(config["Train"])
+    expected = copy.deepcopy(config)
+    logger = logging.getLogger()
+    train_loader = build_dataloader(config, "Train", paddle.CPUPlace(), logger, 1)
+    assert isinstance(train_loader.batch_sampler, ResampleBatchSampler)
+    eval_loader = build_dataloader(config, "Eval", paddle.CPUPlace(), logger, 1)
+    assert not isinstance(eval_loader.batch_sampler, ResampleBatchSampler)
+    assert not eval_loader.dataset.resample_by_sampler
+    assert config == expected
@@ -0,0 +1,102 @@
+import os
+import sys
+import logging
+
+import cv2
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.data.simple_dataset import SimpleDataSet
+from ppocr.data.shard_dataset import ShardDataSet, ShardFile
+from ppocr.utils.create_shard_dataset import create_shard_dataset
+
+
+@pytest.fixture
+def rec_data(tmp_path):
+    rng = np.random.default_rng(0)
+    lines = []
+    for i in range(7):
+        img = rng.integers(0, 256, (32, 20 + 10 * i, 3), dtype=np.uint8)
+        cv2.imwrite(str(tmp_path / "{}.png".format(i)), img)
+        lines.append("{}.png\tlabel_{}\n".format(i, i))
+    lines.append("missing.png\tmissing\n")
+    label_file = tmp_path / "label.txt"
+    label_file.write_text("".join(lines), encoding="utf-8")
+    return tmp_path, str(label_file)
+
+
+def make_config(data_dir, label_file=None, img_mode="BGR"):
+    dataset = {
+        "data_dir": str(data_dir),
+        "transforms": [
+            {"DecodeImage": {"img_mode": img_mode, "channel_first": False}},
+            {"KeepKeys": {"keep_keys": ["image", "label"]}},
+        ],
+    }
+    if label_file is not None:
+        dataset["label_file_list"] = [label_file]
+    return {
+        "Global": {},
+        "Eval": {"dataset": dataset, "loader": {"shuffle": False}},
+    }
+
+
+def test_shard_dataset_same_as_simple_dataset(rec_data):
+    data_dir, label_file = rec_data
+    shard_dir = data_dir / "shards"
+    num = create_shard_dataset(str(data_dir), [label_file], str(shard_dir), 3)
+    assert num == 7
+    assert len(os.listdir(shard_dir)) == 3
+
+    logger = logging.getLogger(__name__)
+    dataset = ShardDataSet(make_config(shard_dir), "Eval", logger)
+    simple_dataset = SimpleDataSet(make_config(data_dir, label_file), "Eval", logger)
+    assert len(dataset) == 7
+    for idx in range(7):
+        img, label = dataset[idx]
+        expected_img, expected_label = simple_dataset[idx]
+        assert label == expected_label
+        np.testing.assert_array_equal(img, expected_img)
+
+
+def test_decoded_shard(rec_data):
+    data_dir, label_file = rec_data
+    shard_dir = data_dir / "decoded"
+    create_shard_dataset(str(data_dir), [label_file], str(shard_dir), decode_height=16)
+    shard = ShardFile(str(shard_dir / "part-00000.shard"))
+    assert shard.decoded and len(shard) == 7
+    assert shard.get_image(2).shape == (16, 20)
+    assert shard.get_label(2) == "label_2"
+
+    dataset = ShardDataSet(make_config(shard_dir), "Eval", logging.getLogger())
+    img, label = dataset[2]
+    assert img.shape == (16, 20, 3) and label == "label_2"
+
+    gray_dataset = ShardDataSet(
+        make_config(shard_dir, img_mode="GRAY"), "Eval", logging.getLogger()
+    )
+    gray_img, _ = gray_dataset[2]
+    assert gray_img.shape == (16, 20)
+    np.testing.assert_array_equal(gray_img, img[:, :, 0])
+    # writeable, as the images of DecodeImage
+    assert img.flags.writeable and gray_img.flags.writeable
+    gray_img[0, 0] = 255
+
+
+def test_shard_writer_removes_partial_file_on_error(tmp_path):
+    from ppocr.data.shard_dataset import ShardWriter
+
+    file_path = tmp_path / "part-00000.shard"
+    _, encoded = cv2.imencode(".png", np.zeros((8, 8, 3), np.uint8))
+    with pytest.raises(RuntimeError):
+        with ShardWriter(str(file_path)) as writer:
+            writer.add(encoded.tobytes(), "label")
+            raise RuntimeError("interrupted")
+    assert not file_path.exists()
+
+    with ShardWriter(str(file_path)) as writer:
+        writer.add(encoded.tobytes(), "label")
+    assert len(ShardFile(str(file_path))) == 1
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppstructure.table.table_master_match import (
+    cal_iou,
+    cal_iou_matrix,
+    center_rule_match,
+    convert_coord,
+    distance_rule_match,
+    iou_rule_match,
+    sort_bbox,
+)
+
+
+@pytest.fixture
+def random_bboxes():
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(0, 100, (30, 2))
+    wh = rng.uniform(1, 40, (30, 2))
+    return np.concatenate([xy, xy + wh], axis=1)
+
+
+def test_cal_iou_matrix_same_as_cal_iou(random_bboxes):
+    bboxes1, bboxes2 = random_bboxes[:12], random_bboxes[12:]
+    iou = cal_iou_matrix(bboxes1, bboxes2)
+    expected = np.array(
+        [
+            [cal_iou(convert_coord(b1), convert_coord(b2)) for b2 in bboxes2]
+            for b1 in bboxes1
+        ]
+    )
+    np.testing.assert_allclose(iou, expected, rtol=1e-9, atol=1e-12)
+
+
+def test_rule_match():
+    master_xyxy = np.array([[0, 0, 10, 10], [10, 0, 20, 10], [0, 10, 20, 20]])
+    end2end_xyxy = np.array([[1, 1, 9, 9], [12, 2, 30, 8], [25, 25, 30, 30]])
+    end2end_xywh = np.array([[5, 5, 8, 8], [21, 5, 18, 6], [27.5, 27.5, 5, 5]])
+
+    assert center_rule_match(end2end_xywh, master_xyxy) == [[0, 0]]
+    assert iou_rule_match(end2end_xyxy[1:], [1, 2], master_xyxy) == [[1, 1]]
+    assert distance_rule_match([2], end2end_xywh[2:], [2], [[10, 15, 20, 10]]) == [
+        [2, 2]
+    ]
+    assert center_rule_match([], master_xyxy) == []
+
+
+def test_sort_bbox_group_in_row():
+    bboxes = np.array(
+        [[50, 10, 5, 5], [10, 31, 5, 5], [10, 11, 5, 5], [30, 30, 5, 5], [5, 12, 5, 5]]
+    )
+    indexes, _, groups, _ = sort_bbox(bboxes, [0, 1, 2, 3, 4])
+    assert groups == [[4, 2, 0], [1, 3]]
+    assert indexes == [4, 2, 0, 1, 3]
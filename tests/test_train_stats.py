@@ -0,0 +1,48 @@
+import os
+import sys
+
+import numpy as np
+import paddle
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.utils.stats import DeviceStats, MetricWorker, TrainingStats
+
+
+def test_device_stats_same_as_step_stats():
+    rng = np.random.default_rng(0)
+    device_stats = DeviceStats()
+    expected = TrainingStats(5, ["lr"])
+    for step in range(1, 8):
+        loss = {
+            "loss": paddle.to_tensor(rng.random(), dtype="float32"),
+            "loss_ctc": paddle.to_tensor(rng.random((4,)), dtype="float32"),
+        }
+        device_stats.add(step, loss, {"lr": 0.1 * step})
+        stats = {
+            k: float(v) if v.shape == [] else v.numpy().mean() for k, v in loss.items()
+        }
+        stats["lr"] = 0.1 * step
+        expected.update(stats)
+
+    steps = device_stats.fetch()
+    assert [step for step, _ in steps] == list(range(1, 8))
+    train_stats = TrainingStats(5, ["lr"])
+    for _, stats in steps:
+        train_stats.update(stats)
+    assert train_stats.get() == pytest.approx(expected.get())
+    assert device_stats.fetch() == []
+
+
+def test_metric_worker():
+    worker = MetricWorker(max_pending=1)
+    for step in range(5):
+        worker.submit(step, lambda x: {"acc": x / 10}, step)
+    assert worker.wait() == [(step, {"acc": step / 10}) for step in range(5)]
+
+    worker.submit(5, lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        worker.wait()
+    worker.close()
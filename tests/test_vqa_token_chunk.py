@@ -0,0 +1,162 @@
+import functools
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.data.imaug.label_ops import VQATokenLabelEncode
+from ppocr.data.imaug.vqa.token.vqa_token_chunk import VQASerTokenChunk
+
+
+class CharTokenizer(object):
+    # every two characters of a word are a token
+    def tokenize(self, word):
+        return [word[i : i + 2] for i in range(0, len(word), 2)]
+
+    def offsets(self, text):
+        offsets, start = [], 0
+        for word in text.split():
+            start = text.index(word, start)
+            for i in range(0, len(word), 2):
+                offsets.append((start + i, start + min(i + 2, len(word))))
+            start += len(word)
+        return offsets
+
+
+def test_split_bbox_by_offsets_same_as_split_bbox():
+    tokenizer = CharTokenizer()
+    bbox = [10, 20, 130, 40]
+    texts = ["a", "hello world", "ab cde fghij k", "x  yz", "  lead and trail  "]
+    for text in texts:
+        expected = VQATokenLabelEncode.split_bbox(None, bbox, text, tokenizer)
+        result = VQATokenLabelEncode.split_bbox_by_offsets(
+            None, bbox, text, tokenizer.offsets(text)
+        )
+        assert result == expected
+    assert VQATokenLabelEncode.split_bbox_by_offsets(None, bbox, " ", []) == []
+
+
+@pytest.fixture
+def word_bbox_encoder(tmp_path):
+    pytest.importorskip("paddlenlp")
+    class_path = tmp_path / "class_list.txt"
+    class_path.write_text("OTHER\nQUESTION\nANSWER\nHEADER\n")
+    try:
+        return VQATokenLabelEncode(
+            str(class_path), use_textline_bbox_info=False, infer_mode=True
+        )
+    except Exception as e:
+        pytest.skip("the tokenizer is not available: {}".format(e))
+
+
+def check_same_as_per_line(encoder):
+    texts = ["Date: 2024-01-02", "  Total   12.50 ", "姓名 张三", "x  yz", "a"]
+    ocr_info = [
+        {
+            "transcription": text,
+            "points": [[5, 10 * i], [95, 10 * i], [95, 10 * i + 8], [5, 10 * i + 8]],
+        }
+        for i, text in enumerate(texts)
+    ]
+    image = np.zeros((60, 100, 3), np.uint8)
+    data = encoder({"image": image, "ocr_info": ocr_info})
+
+    # the tokens and the bboxes of the lines encoded one by one before
+    input_ids, bboxes = [], []
+    for info in ocr_info:
+        encode_res = encoder.tokenizer.encode(
+            info["transcription"],
+            pad_to_max_seq_len=False,
+            return_attention_mask=True,
+            return_token_type_ids=True,
+        )
+        input_ids.extend(encode_res["input_ids"][1:-1])
+        bbox = encoder.split_bbox(
+            encoder.trans_poly_to_bbox(info["points"]),
+            info["transcription"],
+            encoder.tokenizer,
+        )
+        bboxes.extend(encoder._smooth_box(bbox, 60, 100))
+    assert data["input_ids"] == input_ids
+    assert data["bbox"] == bboxes
+
+
+def test_vqa_token_label_encode_offsets_same_as_per_line(word_bbox_encoder):
+    if not word_bbox_encoder.use_offsets_mapping:
+        pytest.skip("the tokenizer returns no offsets")
+    check_same_as_per_line(word_bbox_encoder)
+
+
+def test_vqa_token_label_encode_split_bbox_same_as_per_line(word_bbox_encoder):
+    # the fallback of the tokenizers without offsets
+    word_bbox_encoder.use_offsets_mapping = False
+    check_same_as_per_line(word_bbox_encoder)
+
+
+def test_ser_token_chunk_return_all_chunks():
+    seq_len = 10
+    data = {
+        "input_ids": list(range(2, 2 + seq_len)),
+        "bbox": [[i] * 4 for i in range(seq_len)],
+        "token_type_ids": [0] * seq_len,
+        "attention_mask": [1] * seq_len,
+        "labels": [0, 1, 2],
+        "segment_offset_id": [4, 10],
+        "tokenizer_params": {
+            "padding_side": "right",
+            "pad_token_type_id": 0,
+            "pad_token_id": 1,
+        },
+    }
+    first = VQASerTokenChunk(max_seq_len=4, infer_mode=True)(dict(data))
+    assert first["input_ids"] == [2, 3, 4, 5]
+
+    result = VQASerTokenChunk(max_seq_len=4, infer_mode=True, return_all_chunks=True)(
+        dict(data)
+    )
+    assert "tokenizer_params" not in result
+    assert result["input_ids"].shape == (3, 4)
+    assert result["bbox"].shape == (3, 4, 4)
+    mask = result["attention_mask"].astype(bool)
+    assert mask.sum() == seq_len
+    np.testing.assert_array_equal(result["input_ids"][mask], data["input_ids"])
+    np.testing.assert_array_equal(result["input_ids"][~mask], [1, 1])
+    assert result["labels"] == data["labels"]
+
+
+class FakeTextSystem(object):
+    def __call__(self, img, cls=True):
+        boxes = [np.array([[1, 2], [9, 2], [9, 6], [1, 6]], np.float32)]
+        return boxes, [("text", 0.9)], {}
+
+
+def test_load_ocr_info_from_ocr_info_or_text_system():
+    encoder = types.SimpleNamespace(
+        infer_mode=True,
+        ocr_engine=FakeTextSystem(),
+        trans_poly_to_bbox=functools.partial(
+            VQATokenLabelEncode.trans_poly_to_bbox, None
+        ),
+    )
+    image = np.zeros((8, 10, 3), np.uint8)
+    ocr_info = VQATokenLabelEncode._load_ocr_info(encoder, {"image": image})
+    assert ocr_info == [
+        {
+            "transcription": "text",
+            "bbox": [1, 2, 9, 6],
+            "points": [[1, 2], [9, 2], [9, 6], [1, 6]],
+        }
+    ]
+
+    # the OCR results given with the image are used as they are
+    encoder.ocr_engine = None
+    given = [{"transcription": "a b", "points": [[0, 0], [4, 0], [4, 2], [0, 2]]}]
+    result = VQATokenLabelEncode._load_ocr_info(
+        encoder, {"image": image, "ocr_info": given}
+    )
+    assert result == given and result is not given
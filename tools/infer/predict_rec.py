@@ -651,6 +651,23 @@ class TextRecognizer(object):
                     )
                     norm_img = norm_img[np.newaxis, :]
                     norm_img_batch.append(norm_img)
+            if self.rec_algorithm == "LaTeXOCR":
+                # pad the crops of different sizes as norm_img_latexocr pads them
+                max_h = max(norm_img.shape[2] for norm_img in norm_img_batch)
+                max_w = max(norm_img.shape[3] for norm_img in norm_img_batch)
+                norm_img_batch = [
+                    np.pad(
+                        norm_img,
+                        (
+                            (0, 0),
+                            (0, 0),
+                            (0, max_h - norm_img.shape[2]),
+                            (0, max_w - norm_img.shape[3]),
+                        ),
+                        constant_values=1,
+                    )
+                    for norm_img in norm_img_batch
+                ]
             norm_img_batch = np.concatenate(norm_img_batch)
             norm_img_batch = norm_img_batch.copy()
             if self.benchmark:
@@ -809,8 +826,8 @@ class TextRecognizer(object):
                     max_wh_ratio=max_wh_ratio,
                 )
             elif self.postprocess_params["name"] == "LaTeXOCRDecode":
-                preds = [p.reshape([-1]) for p in preds]
-                rec_result = self.postprocess_op(preds)
+                # the sequences [batch_size, L] of the batch, padded after [EOS]
+                rec_result = self.postprocess_op(preds[0])
             else:
                 rec_result = self.postprocess_op(preds)
             for rno in range(len(rec_result)):
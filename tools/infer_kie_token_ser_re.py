@@ -62,6 +62,12 @@ class ReArgsParser(ArgsParser):
 
 
 def make_input(ser_inputs, ser_results):
+    """
+    The RE inputs of a document from its SER inputs, whose chunks of
+    max_seq_len tokens are in the batch axis. The entities of a chunk are the
+    lines not predicted as "O" whose tokens are in the chunk, and the relation
+    candidates are all the pairs of a question and an answer among them.
+    """
     entities_labels = {"HEADER": 0, "QUESTION": 1, "ANSWER": 2}
     batch_size, max_seq_len = ser_inputs[0].shape[:2]
     entities = ser_inputs[8][0]
@@ -69,55 +75,49 @@ def make_input(ser_inputs, ser_results):
     assert len(entities) == len(ser_results)
 
     # entities
-    start = []
-    end = []
-    label = []
-    entity_idx_dict = {}
-    for i, (res, entity) in enumerate(zip(ser_results, entities)):
-        if res["pred"] == "O":
-            continue
-        entity_idx_dict[len(start)] = i
-        start.append(entity["start"])
-        end.append(entity["end"])
-        label.append(entities_labels[res["pred"]])
-
-    entities = np.full([max_seq_len + 1, 3], fill_value=-1, dtype=np.int64)
-    entities[0, 0] = len(start)
-    entities[1 : len(start) + 1, 0] = start
-    entities[0, 1] = len(end)
-    entities[1 : len(end) + 1, 1] = end
-    entities[0, 2] = len(label)
-    entities[1 : len(label) + 1, 2] = label
-
-    # relations
-    head = []
-    tail = []
-    for i in range(len(label)):
-        for j in range(len(label)):
-            if label[i] == 1 and label[j] == 2:
-                head.append(i)
-                tail.append(j)
-
-    relations = np.full([len(head) + 1, 2], fill_value=-1, dtype=np.int64)
-    relations[0, 0] = len(head)
-    relations[1 : len(head) + 1, 0] = head
-    relations[0, 1] = len(tail)
-    relations[1 : len(tail) + 1, 1] = tail
-
-    entities = np.expand_dims(entities, axis=0)
-    entities = np.repeat(entities, batch_size, axis=0)
-    relations = np.expand_dims(relations, axis=0)
-    relations = np.repeat(relations, batch_size, axis=0)
+    entity_ids = np.array(
+        [i for i, res in enumerate(ser_results) if res["pred"] != "O"], dtype=np.int64
+    )
+    start = np.array([entities[i]["start"] for i in entity_ids], dtype=np.int64)
+    end = np.array([entities[i]["end"] for i in entity_ids], dtype=np.int64)
+    label = np.array(
+        [entities_labels[ser_results[i]["pred"]] for i in entity_ids], dtype=np.int64
+    )
+
+    entities_batch, relations_batch, entity_idx_dict_batch = [], [], []
+    for b in range(batch_size):
+        chunk_beg = b * max_seq_len
+        in_chunk = (start >= chunk_beg) & (end < chunk_beg + max_seq_len)
+        num = int(in_chunk.sum())
+        entities = np.full([max_seq_len + 1, 3], fill_value=-1, dtype=np.int64)
+        entities[0] = num
+        entities[1 : num + 1, 0] = start[in_chunk] - chunk_beg
+        entities[1 : num + 1, 1] = end[in_chunk] - chunk_beg
+        entities[1 : num + 1, 2] = label[in_chunk]
+        entities_batch.append(entities)
+        entity_idx_dict_batch.append(dict(enumerate(entity_ids[in_chunk].tolist())))
+
+        # relations, every question with every answer
+        chunk_label = label[in_chunk]
+        head, tail = np.nonzero(
+            (chunk_label == 1)[:, np.newaxis] & (chunk_label == 2)[np.newaxis, :]
+        )
+        relations_batch.append(np.stack([head, tail], axis=1))
+
+    max_num_relations = max(len(relations) for relations in relations_batch)
+    relations = np.full(
+        [batch_size, max_num_relations + 1, 2], fill_value=-1, dtype=np.int64
+    )
+    for b, chunk_relations in enumerate(relations_batch):
+        relations[b, 0] = len(chunk_relations)
+        relations[b, 1 : len(chunk_relations) + 1] = chunk_relations
+    entities = np.stack(entities_batch)
 
     # remove ocr_info segment_offset_id and label in ser input
     if isinstance(ser_inputs[0], paddle.Tensor):
         entities = paddle.to_tensor(entities)
         relations = paddle.to_tensor(relations)
     ser_inputs = ser_inputs[:5] + [entities, relations]
-
-    entity_idx_dict_batch = []
-    for b in range(batch_size):
-        entity_idx_dict_batch.append(entity_idx_dict)
     return ser_inputs, entity_idx_dict_batch
 
 
@@ -19,7 +19,11 @@ from __future__ import print_function
 import os
 import gc
 import sys
+import atexit
 import platform
+import queue
+import traceback
+import multiprocessing
 import yaml
 import time
 import datetime
@@ -31,13 +35,14 @@ import numpy as np
 import copy
 from argparse import ArgumentParser, RawDescriptionHelpFormatter
 
-from ppocr.utils.stats import TrainingStats
-from ppocr.utils.save_load import save_model
+from ppocr.utils.stats import TrainingStats, DeviceStats, MetricWorker
+from ppocr.utils.save_load import save_model, promote_model, remove_model
 from ppocr.utils.utility import print_dict, AverageMeter
 from ppocr.utils.logging import get_logger
 from ppocr.utils.loggers import WandbLogger, Loggers
 from ppocr.utils import profiler
 from ppocr.data import build_dataloader
+from ppocr.data.resample_sampler import ResampleBatchSampler
 from ppocr.utils.export_model import export
 
 
@@ -181,6 +186,76 @@ def to_float32(preds):
     return preds
 
 
+def get_length_idx(config):
+    """The index of the text lengths in the train batches of rec, or None"""
+    if config["Architecture"].get("model_type") != "rec":
+        return None
+    collate_fn = config["Train"]["loader"].get("collate_fn")
+    if isinstance(collate_fn, dict):
+        collate_fn = collate_fn.get("name")
+    if collate_fn not in [None, "BatchRecAugCollator"]:
+        return None
+    for op in config["Train"]["dataset"]["transforms"]:
+        keep_keys = (op.get("KeepKeys") or {}).get("keep_keys", [])
+        if "length" in keep_keys:
+            return keep_keys.index("length")
+    return None
+
+
+def train_metric(
+    config,
+    preds,
+    batch,
+    post_process_class,
+    eval_class,
+    model_type,
+    algorithm,
+    epoch_reset,
+):
+    """The metric of the train batch, which copies preds and batch to host"""
+    batch = [item.numpy() for item in batch]
+    if model_type in ["kie", "sr"]:
+        eval_class(preds, batch)
+    elif model_type in ["table"]:
+        post_result = post_process_class(preds, batch)
+        eval_class(post_result, batch)
+    elif algorithm in ["CAN"]:
+        eval_class(preds[0], batch[2:], epoch_reset=epoch_reset)
+    elif algorithm in ["LaTeXOCR"]:
+        post_result = post_process_class(preds, batch[1], mode="train")
+        eval_class(post_result[0], post_result[1], epoch_reset=epoch_reset)
+    else:
+        if config["Loss"]["name"] in [
+            "MultiLoss",
+            "MultiLoss_v2",
+        ]:  # for multi head loss
+            post_result = post_process_class(preds["ctc"], batch[1])  # for CTC head out
+        elif config["Loss"]["name"] in ["VLLoss"]:
+            post_result = post_process_class(preds, batch[1], batch[-1])
+        else:
+            post_result = post_process_class(preds, batch[1])
+        eval_class(post_result, batch)
+    return eval_class.get_metric()
+
+
+def update_train_stats(train_stats, device_stats, metric_results, log_writer):
+    """
+    Fetch the stats of the steps since the last update from the device, and
+    update train_stats and log_writer step by step with them and the metrics
+    of the steps. Return the number of tokens of the steps.
+    """
+    metrics = dict(metric_results)
+    num_tokens = 0
+    for step, stats in device_stats.fetch():
+        num_tokens += stats.pop("tokens", 0)
+        if step in metrics:
+            train_stats.update(metrics[step])
+        train_stats.update(stats)
+        if log_writer is not None and dist.get_rank() == 0:
+            log_writer.log_metrics(metrics=train_stats.get(), prefix="TRAIN", step=step)
+    return num_tokens
+
+
 def train(
     config,
     train_dataloader,
@@ -203,6 +278,8 @@ def train(
     amp_dtype="float16",
 ):
     cal_metric_during_train = config["Global"].get("cal_metric_during_train", False)
+    async_train_metric = config["Global"].get("async_train_metric", False)
+    async_eval = config["Global"].get("async_eval", False)
     calc_epoch_interval = config["Global"].get("calc_epoch_interval", 1)
     log_smooth_window = config["Global"]["log_smooth_window"]
     epoch_num = config["Global"]["epoch_num"]
@@ -282,11 +359,34 @@ def train(
 
     algorithm = config["Architecture"]["algorithm"]
 
+    # the models saved at eval_step are evaluated in another process
+    async_evaluator = None
+    if async_eval and eval_batch_step and dist.get_rank() == 0:
+        if not async_eval_supported(config):
+            logger.warning(
+                "async_eval is not supported with uniform_output_enabled, "
+                "model averaging (SRN) or kie nlp models, the evaluation is "
+                "run during training"
+            )
+        else:
+            async_evaluator = AsyncEvaluator(
+                config, config["Global"].get("async_eval_device", "cpu")
+            )
+
     start_epoch = (
         best_model_dict["start_epoch"] if "start_epoch" in best_model_dict else 1
     )
 
+    # the losses are fetched from the device every print_batch_step
+    device_stats = DeviceStats()
+    metric_worker = (
+        MetricWorker() if cal_metric_during_train and async_train_metric else None
+    )
+    metric_results = []
+    length_idx = get_length_idx(config)
+
     total_samples = 0
+    total_tokens = 0
     train_reader_cost = 0.0
     train_batch_cost = 0.0
     reader_start = time.time()
@@ -299,7 +399,15 @@ def train(
     )
 
     for epoch in range(start_epoch, epoch_num + 1):
-        if train_dataloader.dataset.need_reset:
+        if isinstance(train_dataloader.batch_sampler, ResampleBatchSampler):
+            # draw the samples of the epoch, the dataloader and its workers are kept
+            train_dataloader.batch_sampler.resample(epoch)
+            max_iter = (
+                len(train_dataloader) - 1
+                if platform.system() == "Windows"
+                else len(train_dataloader)
+            )
+        elif train_dataloader.dataset.need_reset:
             train_dataloader = build_dataloader(
                 config, "Train", device, logger, seed=epoch
             )
@@ -361,37 +469,51 @@ def train(
 
             optimizer.clear_grad()
 
+            # the step is counted below
+            step = global_step + 1
             if (
                 cal_metric_during_train and epoch % calc_epoch_interval == 0
             ):  # only rec and cls need
-                batch = [item.numpy() for item in batch]
-                if model_type in ["kie", "sr"]:
-                    eval_class(preds, batch)
-                elif model_type in ["table"]:
-                    post_result = post_process_class(preds, batch)
-                    eval_class(post_result, batch)
-                elif algorithm in ["CAN"]:
+                if algorithm in ["CAN"]:
                     model_type = "can"
-                    eval_class(preds[0], batch[2:], epoch_reset=(idx == 0))
                 elif algorithm in ["LaTeXOCR"]:
                     model_type = "latexocr"
-                    post_result = post_process_class(preds, batch[1], mode="train")
-                    eval_class(post_result[0], post_result[1], epoch_reset=(idx == 0))
+                metric_args = (
+                    config,
+                    preds,
+                    batch,
+                    post_process_class,
+                    eval_class,
+                    model_type,
+                    algorithm,
+                    idx == 0,
+                )
+                if metric_worker is not None:
+                    metric_worker.submit(step, train_metric, *metric_args)
                 else:
-                    if config["Loss"]["name"] in [
-                        "MultiLoss",
-                        "MultiLoss_v2",
-                    ]:  # for multi head loss
-                        post_result = post_process_class(
-                            preds["ctc"], batch[1]
-                        )  # for CTC head out
-                    elif config["Loss"]["name"] in ["VLLoss"]:
-                        post_result = post_process_class(preds, batch[1], batch[-1])
-                    else:
-                        post_result = post_process_class(preds, batch[1])
-                    eval_class(post_result, batch)
-                metric = eval_class.get_metric()
-                train_stats.update(metric)
+                    metric_results.append((step, train_metric(*metric_args)))
+
+            tensor_stats = dict(loss)
+            if length_idx is not None:
+                tensor_stats["tokens"] = batch[length_idx].sum()
+            device_stats.add(step, tensor_stats, {"lr": lr})
+
+            log_step = (step % print_batch_step == 0) or (
+                idx >= len(train_dataloader) - 1
+            )
+            eval_step = (
+                step > start_eval_step
+                and (step - start_eval_step) % eval_batch_step == 0
+                and dist.get_rank() == 0
+            )
+            if log_step or eval_step:
+                # wait for the device, so that the batch cost is measured
+                if metric_worker is not None:
+                    metric_results += metric_worker.wait()
+                total_tokens += update_train_stats(
+                    train_stats, device_stats, metric_results, log_writer
+                )
+                metric_results = []
 
             train_batch_time = time.time() - reader_start
             train_batch_cost += train_batch_time
@@ -402,22 +524,7 @@ def train(
             if not isinstance(lr_scheduler, float):
                 lr_scheduler.step()
 
-            # logger and visualdl
-            stats = {
-                k: float(v) if v.shape == [] else v.numpy().mean()
-                for k, v in loss.items()
-            }
-            stats["lr"] = lr
-            train_stats.update(stats)
-
-            if log_writer is not None and dist.get_rank() == 0:
-                log_writer.log_metrics(
-                    metrics=train_stats.get(), prefix="TRAIN", step=global_step
-                )
-
-            if (global_step > 0 and global_step % print_batch_step == 0) or (
-                idx >= len(train_dataloader) - 1
-            ):
+            if log_step:
                 logs = train_stats.log()
 
                 eta_sec = (
@@ -429,10 +536,15 @@ def train(
                 if paddle.device.is_compiled_with_cuda() and print_mem_info:
                     max_mem_reserved_str = f", max_mem_reserved: {paddle.device.cuda.max_memory_reserved() // (1024 ** 2)} MB,"
                     max_mem_allocated_str = f" max_mem_allocated: {paddle.device.cuda.max_memory_allocated() // (1024 ** 2)} MB"
+                ips_tokens_str = ""
+                if length_idx is not None:
+                    ips_tokens_str = ", ips_tokens: {:.5f} tokens/s".format(
+                        total_tokens / train_batch_cost
+                    )
                 strs = (
                     "epoch: [{}/{}], global_step: {}, {}, avg_reader_cost: "
                     "{:.5f} s, avg_batch_cost: {:.5f} s, avg_samples: {}, "
-                    "ips: {:.5f} samples/s, eta: {}{}{}".format(
+                    "ips: {:.5f} samples/s{}, eta: {}{}{}".format(
                         epoch,
                         epoch_num,
                         global_step,
@@ -441,6 +553,7 @@ def train(
                         train_batch_cost / print_batch_step,
                         total_samples / print_batch_step,
                         total_samples / train_batch_cost,
+                        ips_tokens_str,
                         eta_sec_format,
                         max_mem_reserved_str,
                         max_mem_allocated_str,
@@ -449,14 +562,38 @@ def train(
                 logger.info(strs)
 
                 total_samples = 0
+                total_tokens = 0
                 train_reader_cost = 0.0
                 train_batch_cost = 0.0
-            # eval
-            if (
-                global_step > start_eval_step
-                and (global_step - start_eval_step) % eval_batch_step == 0
-                and dist.get_rank() == 0
-            ):
+            if eval_step and async_evaluator is not None:
+                prefix = "async_eval_{}".format(global_step)
+                if async_evaluator.pending < async_evaluator.max_pending:
+                    save_model(
+                        model,
+                        optimizer,
+                        save_model_dir,
+                        logger,
+                        config,
+                        is_best=False,
+                        prefix=prefix,
+                        best_model_dict=best_model_dict,
+                        epoch=epoch,
+                        global_step=global_step,
+                    )
+                    async_evaluator.submit(
+                        prefix,
+                        epoch,
+                        global_step,
+                        {"model_type": model_type, "extra_input": extra_input},
+                    )
+                else:
+                    logger.warning(
+                        "the evaluation of global_step {} is skipped, {} models "
+                        "are being evaluated".format(
+                            global_step, async_evaluator.pending
+                        )
+                    )
+            elif eval_step:
                 if model_average:
                     Model_Average = paddle.incubate.ModelAverage(
                         0.15,
@@ -542,6 +679,17 @@ def train(
                         is_best=True, prefix="best_accuracy", metadata=best_model_dict
                     )
 
+            if async_evaluator is not None:
+                for result in async_evaluator.poll():
+                    update_best_model(
+                        best_model_dict,
+                        result,
+                        main_indicator,
+                        save_model_dir,
+                        logger,
+                        log_writer,
+                    )
+
             reader_start = time.time()
         if dist.get_rank() == 0:
             prefix = "latest"
@@ -603,10 +751,22 @@ def train(
                     is_best=False, prefix="iter_epoch_{}".format(epoch)
                 )
 
+    if async_evaluator is not None:
+        for result in async_evaluator.close():
+            update_best_model(
+                best_model_dict,
+                result,
+                main_indicator,
+                save_model_dir,
+                logger,
+                log_writer,
+            )
     best_str = "best metric, {}".format(
         ", ".join(["{}: {}".format(k, v) for k, v in best_model_dict.items()])
     )
     logger.info(best_str)
+    if metric_worker is not None:
+        metric_worker.close()
     if dist.get_rank() == 0 and log_writer is not None:
         log_writer.close()
     return
@@ -624,13 +784,18 @@ def eval(
     amp_custom_black_list=[],
     amp_custom_white_list=[],
     amp_dtype="float16",
+    show_progress=True,
 ):
     model.eval()
     with paddle.no_grad():
         total_frame = 0.0
         total_time = 0.0
         pbar = tqdm(
-            total=len(valid_dataloader), desc="eval model:", position=0, leave=True
+            total=len(valid_dataloader),
+            desc="eval model:",
+            position=0,
+            leave=True,
+            disable=not show_progress,
         )
         max_iter = (
             len(valid_dataloader) - 1
@@ -713,6 +878,9 @@ def eval(
             sum_images += 1
         # Get final metric，eg. acc or hmean
         metric = eval_class.get_metric()
+        char_confusion = getattr(eval_class, "get_char_confusion", None)
+        if char_confusion is not None and char_confusion():
+            get_logger().info("char confusion: {}".format(char_confusion()))
 
     pbar.close()
     model.train()
@@ -724,6 +892,184 @@ def eval(
     return metric
 
 
+def update_best_model(
+    best_model_dict, result, main_indicator, save_model_dir, logger, log_writer=None
+):
+    """
+    Update best_model_dict with a result of AsyncEvaluator, the evaluated
+    model becomes best_accuracy if it is the best, else it is removed.
+    """
+    prefix, epoch, global_step, cur_metric = result
+    cur_metric_str = "cur metric of global_step {}, {}".format(
+        global_step,
+        ", ".join(["{}: {}".format(k, v) for k, v in cur_metric.items()]),
+    )
+    logger.info(cur_metric_str)
+    if log_writer is not None:
+        log_writer.log_metrics(metrics=cur_metric, prefix="EVAL", step=global_step)
+
+    if cur_metric[main_indicator] >= best_model_dict[main_indicator]:
+        best_model_dict.update(cur_metric)
+        best_model_dict["best_epoch"] = epoch
+        promote_model(
+            save_model_dir,
+            prefix,
+            logger,
+            best_model_dict=best_model_dict,
+            epoch=epoch,
+            global_step=global_step,
+        )
+        if log_writer is not None:
+            log_writer.log_model(
+                is_best=True, prefix="best_accuracy", metadata=best_model_dict
+            )
+    else:
+        remove_model(save_model_dir, prefix)
+    best_str = "best metric, {}".format(
+        ", ".join(["{}: {}".format(k, v) for k, v in best_model_dict.items()])
+    )
+    logger.info(best_str)
+    if log_writer is not None:
+        log_writer.log_metrics(
+            metrics={"best_{}".format(main_indicator): best_model_dict[main_indicator]},
+            prefix="EVAL",
+            step=global_step,
+        )
+
+
+def async_eval_supported(config):
+    """
+    The async evaluation loads the saved checkpoint, so it is not used when
+    the synchronous evaluation does more than evaluating the weights: the
+    uniform output export, the kie nlp models and the model averaging of SRN,
+    which is only applied to the model being trained.
+    """
+    if config["Global"].get("uniform_output_enabled", False):
+        return False
+    arch_config = config["Architecture"]
+    if arch_config["algorithm"] == "SRN":
+        return False
+    if arch_config.get("model_type") == "kie" and arch_config["algorithm"] not in [
+        "SDMGR"
+    ]:
+        return False
+    return True
+
+
+def async_eval_worker(config, device, tasks, results):
+    """
+    Evaluate the models saved by the training process, see AsyncEvaluator
+    """
+    from ppocr.modeling.architectures import build_model
+    from ppocr.postprocess import build_post_process
+    from ppocr.metrics import build_metric
+
+    try:
+        device = paddle.set_device(device)
+        logger = get_logger()
+        valid_dataloader = build_dataloader(config, "Eval", device, logger)
+        post_process_class = build_post_process(config["PostProcess"], config["Global"])
+        model = build_model(config["Architecture"])
+        eval_class = build_metric(config["Metric"])
+        state_dict = model.state_dict()
+        while True:
+            try:
+                task = tasks.get(timeout=1)
+            except queue.Empty:
+                if not multiprocessing.parent_process().is_alive():
+                    break
+                continue
+            if task is None:
+                break
+            prefix, epoch, global_step, eval_kwargs = task
+            params = paddle.load(
+                os.path.join(config["Global"]["save_model_dir"], prefix + ".pdparams")
+            )
+            # the params of amp O2 are loaded in the dtype of the model
+            model.set_state_dict(
+                {
+                    key: (
+                        value.astype(state_dict[key].dtype)
+                        if key in state_dict
+                        else value
+                    )
+                    for key, value in params.items()
+                }
+            )
+            metric = eval(
+                model,
+                valid_dataloader,
+                post_process_class,
+                eval_class,
+                show_progress=False,
+                **eval_kwargs,
+            )
+            results.put((task[:3], metric))
+    except Exception:
+        results.put((None, traceback.format_exc()))
+
+
+class AsyncEvaluator(object):
+    """
+    Evaluate the models saved during training in a separate process on its own
+    device, e.g. cpu or another gpu, so that the training is not paused by the
+    evaluation. At most max_pending models are waiting or being evaluated.
+    """
+
+    def __init__(self, config, device="cpu", max_pending=2):
+        ctx = multiprocessing.get_context("spawn")
+        self.tasks = ctx.Queue()
+        self.results = ctx.Queue()
+        self.max_pending = max_pending
+        self.pending = 0
+        self.process = ctx.Process(
+            target=async_eval_worker,
+            args=(copy.deepcopy(config), device, self.tasks, self.results),
+        )
+        self.process.start()
+        atexit.register(self.terminate)
+
+    def submit(self, prefix, epoch, global_step, eval_kwargs):
+        """Evaluate the model saved by save_model with prefix"""
+        self.tasks.put((prefix, epoch, global_step, eval_kwargs))
+        self.pending += 1
+
+    def poll(self, block=False):
+        """The (prefix, epoch, global_step, metric) of the evaluated models"""
+        results = []
+        while self.pending > 0:
+            try:
+                task, metric = (
+                    self.results.get(timeout=1)
+                    if block
+                    else (self.results.get_nowait())
+                )
+            except queue.Empty:
+                if not self.process.is_alive():
+                    raise RuntimeError("the async eval process exited")
+                if block:
+                    continue
+                break
+            if task is None:
+                raise RuntimeError("async eval failed:\n{}".format(metric))
+            self.pending -= 1
+            results.append(tuple(task) + (metric,))
+        return results
+
+    def close(self):
+        """Wait for the pending models and stop the process"""
+        results = self.poll(block=True)
+        self.tasks.put(None)
+        self.process.join()
+        atexit.unregister(self.terminate)
+        return results
+
+    def terminate(self):
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+
 def update_center(char_center, post_result, preds):
     result, label = post_result
     feats, logits = preds